@@ -18,6 +18,7 @@ kwargs = {'author': 'Yi Guo, Taylor Parsons and Ryan King',
  'package_data': {'DriveSE': []},
  'package_dir': {'': 'src'},
  'packages': ['drivese', 'test'],
+ 'entry_points': {'console_scripts': ['drivese = drivese.drivese_cli:main']},
  'zip_safe': False}
 
 
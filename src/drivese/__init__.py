@@ -0,0 +1,11 @@
+import os
+
+# DRIVESE_PROFILE=<report file> profiles the component calls of the whole run (see drivese_profile.py)
+if os.environ.get('DRIVESE_PROFILE'):
+    from drivese.drivese_profile import enable_from_env
+    enable_from_env()
+
+# DRIVESE_LOG=DEBUG or DRIVESE_LOG=<Component>=DEBUG,... turns on the component debug logging (see drivese_log.py)
+if os.environ.get('DRIVESE_LOG'):
+    from drivese.drivese_log import configure_from_env
+    configure_from_env()
@@ -0,0 +1,453 @@
+"""
+drivese_bedplate.py
+Vectorized bedplate section functions.
+
+The bedplate is modelled as 2 parallel I-beams (cantilevers from the tower top): a rear steel
+section and a front cast section. The functions here evaluate any number of candidate sections
+(and/or any number of designs) in one NumPy pass - all arguments broadcast against each other.
+They contain NO state, so Bedplate.characterize_Bedplate_Rear/Front() are thin wrappers around them.
+
+The load terms reproduce the original characterize_Bedplate_*() code, including its quirks:
+  - rear section: point loads use half the component weight in the deflection but the full weight
+    in the root bending moment, and the gearbox contributes to the deflection only
+  - front section: the main bearing locations are used without abs()
+"""
+
+import os
+import hashlib
+import collections
+
+import numpy as np
+
+G_GRAV = 9.81
+
+# material properties
+STEEL_E = 210e9          # Young's modulus of steel     in N/m^2
+STEEL_DENSITY = 7800.0   # kg/m^3
+STEEL_STRESS_MAX = 620e6 # yield strength of alloy steel in N/m^2
+CAST_E = 169e9           # Young's modulus of cast iron in N/m^2
+CAST_DENSITY = 7100.0    # kg/m^3
+CAST_STRESS_MAX = 200e6  # yield strength of cast iron   in N/m^2
+
+# initial I-beam dimensions in m and their increments per legacy sizing step
+TF_0 = 0.01905  # flange thickness
+TW_0 = 0.0127   # web thickness
+H0_0 = 0.6096   # overall height (overall width b0 starts at h0 / 2)
+TF_STEP = 0.002
+TW_STEP = 0.002
+H0_STEP = 0.006 # also used for b0
+
+#-------------------------------------------------------------------------
+
+def ibeam_properties(tf, tw, b0, h0):
+    ''' Second moment of area (m^4) and area (m^2) of a symmetric I-beam
+          tf, tw : flange and web thickness
+          b0, h0 : overall width and height
+    '''
+    bi = (b0 - tw) / 2.0
+    hi = h0 - 2.0 * tf
+    I_b = b0 * h0**3 / 12.0 - 2 * bi * hi**3 / 12.0
+    A = b0 * h0 - 2.0 * bi * hi
+    return I_b, A
+
+def mid_deflection(totalLength, loadLength, load, E, I):
+    ''' Eq. 2.154 - tip deflection for load applied at x (Eq. 2.66 in 2015 rpt) '''
+    return load * loadLength**2.0 * (3.0 * totalLength - loadLength) / (6.0 * E * I)
+
+def dist_deflection(totalLength, distWeight, E, I):
+    ''' Eq. 2.155 - tip deflection for distributed load (Eq. 2.67 in 2015 rpt)'''
+    return distWeight * totalLength**4 / (8.0 * E * I)
+
+#-------------------------------------------------------------------------
+
+def bedplate_rear_section(tf, tw, b0, h0, length,
+                          hss_location, hss_mass, generator_location, generator_mass,
+                          conv_location, conv_mass, transformer_location, transformer_mass,
+                          gearbox_location, gearbox_mass,
+                          E=STEEL_E, density=STEEL_DENSITY, g=G_GRAV):
+    '''
+    Evaluate candidate rear (steel) bedplate sections
+
+    Returns (tipDefl, rootStress, mass) where mass is the mass of both I-beams (before the support multiplier)
+    '''
+    I_b, A = ibeam_properties(tf, tw, b0, h0)
+    w = A * density # mass per unit length
+
+    tipDefl = mid_deflection(length, hss_location,         hss_mass * g / 2,         E, I_b) \
+            + mid_deflection(length, generator_location,   generator_mass * g / 2,   E, I_b) \
+            + mid_deflection(length, conv_location,        conv_mass * g / 2,        E, I_b) \
+            + mid_deflection(length, transformer_location, transformer_mass * g / 2, E, I_b) \
+            + mid_deflection(length, gearbox_location,     gearbox_mass * g / 2,     E, I_b) \
+            + dist_deflection(length,                      w * g,                    E, I_b)
+
+    bendingMoment = (hss_location * hss_mass
+                   + generator_location * generator_mass
+                   + conv_location * conv_mass
+                   + transformer_location * transformer_mass
+                   + w * length**2 / 2.0) * g
+    rootStress = bendingMoment * h0 / (2. * I_b)
+
+    mass = 2.0 * (A * length * density)  # 2 parallel I-beams
+
+    return tipDefl, rootStress, mass
+
+def bedplate_front_section(tf, tw, b0, h0, length,
+                           gearbox_location, gearbox_mass, mb1_location, mb1_mass, mb2_location, mb2_mass,
+                           lss_location, lss_mass, rotor_location, rotor_mass, rotor_force_z, rotor_moment_y,
+                           E=CAST_E, density=CAST_DENSITY, g=G_GRAV):
+    '''
+    Evaluate candidate front (cast) bedplate sections
+      rotor_force_z and rotor_moment_y are the magnitudes of the rotor loads
+
+    Returns (tipDefl, rootStress, mass) where mass is the mass of both I-beams (before the support multiplier)
+    '''
+    I_b, A = ibeam_properties(tf, tw, b0, h0)
+    w = A * density
+
+    tipDefl = mid_deflection(length, gearbox_location, gearbox_mass * g / 2.0, E, I_b) \
+            + mid_deflection(length, mb1_location,     mb1_mass * g / 2.0,     E, I_b) \
+            + mid_deflection(length, mb2_location,     mb2_mass * g / 2.0,     E, I_b) \
+            + mid_deflection(length, lss_location,     lss_mass * g / 2.0,     E, I_b) \
+            + mid_deflection(length, rotor_location,   rotor_mass * g / 2.0,   E, I_b) \
+            + mid_deflection(length, rotor_location,   rotor_force_z / 2.0,    E, I_b) \
+            + dist_deflection(length,                  w * g,                  E, I_b) \
+            + rotor_moment_y / 2.0 * length**2 / (2.0 * E * I_b)
+
+    bendingMoment = (  mb1_location * mb1_mass / 2.0
+                     + mb2_location * mb2_mass / 2.0
+                     + lss_location * lss_mass / 2.0
+                     + w * length**2 / 2.0
+                     + rotor_location * rotor_mass / 2.0) * g \
+                  + rotor_location * rotor_force_z / 2.0 \
+                  + rotor_moment_y / 2.0
+    rootStress = bendingMoment * h0 / 2 / I_b
+
+    mass = 2.0 * (A * length * density)
+
+    return tipDefl, rootStress, mass
+
+#-------------------------------------------------------------------------
+# Candidate sections
+
+def scaled_sections(scale):
+    ''' I-beam dimensions (tf, tw, b0, h0) for a (possibly array-valued) sizing scale parameter:
+          scale = n is the section after n legacy sizing steps '''
+    scale = np.asarray(scale, dtype=float)
+    return (TF_0 + TF_STEP * scale,
+            TW_0 + TW_STEP * scale,
+            H0_0 / 2.0 + H0_STEP * scale,
+            H0_0 + H0_STEP * scale)
+
+def legacy_sections(n):
+    ''' Dimensions (tf, tw, b0, h0) of the first n sections visited by the legacy sizing loop.
+          The dimensions are accumulated step by step exactly as in the loop, so results are bit-identical. '''
+    def accumulate(x0, step):
+        x = np.full(n, step)
+        x[0] = x0
+        return np.add.accumulate(x)
+    return (accumulate(TF_0, TF_STEP),
+            accumulate(TW_0, TW_STEP),
+            accumulate(H0_0 / 2.0, H0_STEP),
+            accumulate(H0_0, H0_STEP))
+
+def first_feasible(feasible):
+    ''' Index of the first True along the last axis (-1 where there is none) '''
+    feasible = np.asarray(feasible, dtype=bool)
+    idx = np.argmax(feasible, axis=-1)
+    return np.where(np.any(feasible, axis=-1), idx, -1)
+
+def search_legacy_sections(section, stressMax, deflMax, stressTol=5e5, deflTol=1e-4, stress_mult=8.0, nstart=256):
+    '''
+    Reproduce the legacy sizing loop as a search over an array of candidate sections:
+      the loop stops at the first section with
+        rootStress * stress_mult - stressMax <= stressTol  and  tipDefl - deflMax <= deflTol
+
+    section : function(tf, tw, b0, h0) -> (tipDefl, rootStress, mass) with the loads bound in
+              (e.g. a functools.partial of bedplate_rear_section)
+
+    Returns the index k of the first feasible section (the legacy loop reports the dims of section k + 1).
+    The candidate array is doubled until a feasible section is found.
+    The dims are passed as column vectors, so array-valued loads (load cases) broadcast along the
+      second axis - a section is feasible when all cases are.
+    '''
+    n = nstart
+    while True:
+        tf, tw, b0, h0 = [x[:, np.newaxis] for x in legacy_sections(n)]
+        tipDefl, rootStress, mass = section(tf, tw, b0, h0)
+        ok = (rootStress * stress_mult - stressMax <= stressTol) & (tipDefl - deflMax <= deflTol)
+        k = first_feasible(ok.reshape(n, -1).all(axis=1))
+        if k >= 0:
+            return int(k)
+        if n >= 2**20:
+            raise RuntimeError('search_legacy_sections(): no feasible section found')
+        n *= 2
+
+def section_feasible(tipDefl, rootStress, stressMax, deflMax, stress_mult=8.0):
+    ''' True where a candidate section meets the stress and deflection limits.
+          Any trailing axes beyond the first (e.g. load cases) must all be feasible. '''
+    ok = (rootStress * stress_mult <= stressMax) & (tipDefl <= deflMax)
+    ok = np.atleast_1d(ok)
+    if ok.ndim > 1:
+        ok = ok.reshape(ok.shape[0], -1).all(axis=1)
+    return ok
+
+#-------------------------------------------------------------------------
+# Standard section catalogue
+
+class SectionCatalogue(object):
+    '''
+    Table of standard (rolled or welded) I-beam sections for catalogue sizing of the bedplate.
+
+    The table is sorted once by mass per metre (i.e. by area). Sections that are dominated by a lighter
+    section (one with at least the same second moment of area I and section modulus S = 2 I / h0) are
+    dropped: with more self weight and less stiffness and strength they can never be the lightest
+    feasible section.
+
+    If the remaining sections have I and S both non-decreasing with mass, feasibility is monotone along
+    the table and lightest_feasible() uses a binary search (each probe checks all load cases at once).
+    Otherwise every section is checked in one vectorized pass.
+    All dimensions are in m.
+    '''
+
+    def __init__(self, names, tf, tw, b0, h0):
+
+        tf, tw, b0, h0 = [np.asarray(x, dtype=float).flatten() for x in (tf, tw, b0, h0)]
+        names = np.asarray(names, dtype=str).flatten()
+        if not (len(names) == len(tf) == len(tw) == len(b0) == len(h0)):
+            raise ValueError('SectionCatalogue: all columns must have the same length')
+        if np.any(tw >= b0) or np.any(2 * tf >= h0):
+            raise ValueError('SectionCatalogue: web thicker than flange width or flanges thicker than section')
+
+        I_b, A = ibeam_properties(tf, tw, b0, h0)
+        S = 2.0 * I_b / h0
+        order = np.lexsort((-I_b, A))  # by area, stiffest first among equal areas
+
+        # drop sections dominated by a lighter (or equal area) one in both I and S
+        keep = np.ones(len(order), dtype=bool)
+        Is, Ss = I_b[order], S[order]
+        for k in range(1, len(order)):
+            keep[k] = not np.any((Is[:k] >= Is[k]) & (Ss[:k] >= Ss[k]))
+        order = order[keep]
+
+        self.names = names[order]
+        self.tf, self.tw, self.b0, self.h0 = tf[order], tw[order], b0[order], h0[order]
+        self.I_b, self.A, self.S = I_b[order], A[order], S[order]
+        self.monotone = bool(np.all(np.diff(self.I_b) >= 0) and np.all(np.diff(self.S) >= 0))
+
+        digest = hashlib.sha256(np.concatenate([self.tf, self.tw, self.b0, self.h0]).tobytes()).hexdigest()
+        self.signature = digest[:16]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return 'SectionCatalogue({} sections, {})'.format(len(self), self.signature)
+
+    def mass_per_metre(self, density):
+        return self.A * density
+
+    def section(self, idx):
+        ''' (tf, tw, b0, h0) of section idx in the sorted table '''
+        return float(self.tf[idx]), float(self.tw[idx]), float(self.b0[idx]), float(self.h0[idx])
+
+    #----------------------------
+
+    @classmethod
+    def from_csv(cls, filename, length_scale=1e-3):
+        '''
+        Read a section table with a header row containing (in any order) the columns
+          name, h0, b0, tw, tf
+        Dimensions are in mm unless length_scale (factor to m) says otherwise.
+        '''
+        table = np.genfromtxt(filename, delimiter=',', names=True, dtype=None, encoding='utf-8', autostrip=True)
+        table = np.atleast_1d(table)
+        return cls(table['name'], table['tf'] * length_scale, table['tw'] * length_scale,
+                   table['b0'] * length_scale, table['h0'] * length_scale)
+
+    @classmethod
+    def welded(cls, depths=None, plates=None, fy=355.0):
+        '''
+        Welded plate girders built from standard plate thicknesses:
+          flange width = depth / 2 (as in the parametric sizing), web no thicker than the flange
+          Only plastic (class 1) sections are included, so that local buckling does not govern:
+            web c/t <= 72 eps, flange outstand c/t <= 9 eps with eps = sqrt(235 / fy) (fy in MPa)
+        depths and plates in m
+        '''
+        if depths is None:
+            depths = np.arange(0.3, 3.001, 0.05)
+        if plates is None:
+            plates = np.array([8, 10, 12, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80, 100, 120, 150]) * 1e-3
+        eps = np.sqrt(235.0 / fy)
+        names, tf, tw, b0, h0 = [], [], [], [], []
+        for h in depths:
+            for f in plates:
+                for w in plates:
+                    if w > f or 2 * f >= 0.5 * h or w >= 0.5 * h:
+                        continue
+                    if (h - 2 * f) / w > 72 * eps or (0.25 * h - 0.5 * w) / f > 9 * eps:
+                        continue
+                    names.append('WPG{:.0f}x{:.0f}x{:.0f}x{:.0f}'.format(h * 1e3, 0.5 * h * 1e3, w * 1e3, f * 1e3))
+                    tf.append(f)
+                    tw.append(w)
+                    b0.append(0.5 * h)
+                    h0.append(h)
+        return cls(names, tf, tw, b0, h0)
+
+    #----------------------------
+
+    def feasible(self, section, stressMax, deflMax, stress_mult=8.0, idx=None):
+        '''
+        Vectorized feasibility check of catalogue sections (all of them, or those in idx)
+
+        section : function(tf, tw, b0, h0) -> (tipDefl, rootStress, mass), e.g. Bedplate.rearSection
+                  The dims are passed as column vectors so that array-valued loads (load cases) broadcast
+                  along the second axis - all cases must be feasible.
+        '''
+        if idx is None:
+            idx = slice(None)
+        tf, tw, b0, h0 = [np.atleast_1d(x[idx])[:, np.newaxis] for x in (self.tf, self.tw, self.b0, self.h0)]
+        tipDefl, rootStress, mass = section(tf, tw, b0, h0)
+        return section_feasible(tipDefl, rootStress, stressMax, deflMax, stress_mult)
+
+    def lightest_feasible(self, section, stressMax, deflMax, stress_mult=8.0):
+        ''' Index (into the sorted table) of the lightest feasible section, or -1 if none is feasible '''
+
+        if not self.monotone:
+            return int(first_feasible(self.feasible(section, stressMax, deflMax, stress_mult)))
+
+        lo, hi = 0, len(self) - 1
+        if not self.feasible(section, stressMax, deflMax, stress_mult, idx=hi)[0]:
+            return -1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.feasible(section, stressMax, deflMax, stress_mult, idx=mid)[0]:
+                hi = mid
+            else:
+                lo = mid + 1
+        return hi
+
+_catalogues = {}
+
+def load_catalogue(filename, length_scale=1e-3):
+    ''' Return the SectionCatalogue for a csv file - each file is read and sorted only once per process '''
+    key = (os.path.abspath(filename), length_scale)
+    if key not in _catalogues:
+        _catalogues[key] = SectionCatalogue.from_csv(filename, length_scale=length_scale)
+    return _catalogues[key]
+
+_default_catalogue = None
+
+def default_catalogue():
+    ''' Built-in catalogue of welded plate girders (SectionCatalogue.welded()), built once per process '''
+    global _default_catalogue
+    if _default_catalogue is None:
+        _default_catalogue = SectionCatalogue.welded()
+    return _default_catalogue
+
+#-------------------------------------------------------------------------
+# Finite element beam model
+
+class CantileverFE(object):
+    '''
+    Euler-Bernoulli finite element model of a uniform cantilever of unit bending stiffness (EI = 1),
+      clamped at x = 0. Each bedplate half is one such beam (the 2 parallel I-beams each carry half the load).
+
+    Nodes are placed on a uniform mesh plus at every mount (load) location, so point loads act at nodes.
+    The stiffness matrix is stored in banded form and its Cholesky factor is computed once. Because the
+    section is uniform, K(EI) = EI * K(1): a new section or a new load case only needs a back-substitution
+    (or just a rescaling of an existing solution), never a new factorization.
+
+    Loads at locations beyond the free end are carried to the tip as a force plus a moment
+      (the tip formulas in midDeflection() are only valid for loads within the span).
+    '''
+
+    def __init__(self, length, mounts=(), n_elements=20):
+
+        from scipy.linalg import cholesky_banded
+
+        self.length = float(length)
+        mounts = np.clip(np.abs(np.asarray(mounts, dtype=float).flatten()), 0.0, self.length)
+        x = np.union1d(np.linspace(0.0, self.length, n_elements + 1), mounts)
+        keep = np.concatenate([[True], np.diff(x) > 1e-9 * self.length])
+        self.x = x[keep]
+        self.nnodes = len(self.x)
+        self.ndof = 2 * (self.nnodes - 1)  # (w, theta) at each free node
+
+        # assemble the upper banded form (bandwidth 3) of K for the free dofs
+        ab = np.zeros((4, self.ndof))
+        self.f_dist = np.zeros(self.ndof)   # consistent nodal loads for a unit distributed load
+        for e in range(self.nnodes - 1):
+            l = self.x[e + 1] - self.x[e]
+            ke = np.array([[ 12.0,    6*l,  -12.0,    6*l  ],
+                           [  6*l, 4*l*l,   -6*l, 2*l*l  ],
+                           [-12.0,   -6*l,  12.0,    -6*l ],
+                           [  6*l, 2*l*l,   -6*l, 4*l*l  ]]) / l**3
+            fe = np.array([l / 2, l * l / 12, l / 2, -l * l / 12])
+            dofs = [2 * e - 2, 2 * e - 1, 2 * e, 2 * e + 1]  # dofs of node 0 are clamped (negative)
+            for i in range(4):
+                if dofs[i] < 0:
+                    continue
+                self.f_dist[dofs[i]] += fe[i]
+                for j in range(i, 4):
+                    if dofs[j] < 0:
+                        continue
+                    ab[3 + dofs[i] - dofs[j], dofs[j]] += ke[i, j]
+        self.factor = cholesky_banded(ab, lower=False)
+
+        self.u_dist = self.solve(self.f_dist)
+
+    def solve(self, F):
+        ''' Displacements (EI = 1) for nodal load vector(s) F of shape (ndof,) or (ndof, ncases) '''
+        from scipy.linalg import cho_solve_banded
+        return cho_solve_banded((self.factor, False), F)
+
+    def node_index(self, location):
+        return int(np.argmin(np.abs(self.x - location)))
+
+    def nodal_loads(self, locations, forces, tip_moment=0.0):
+        '''
+        Nodal load vector for point forces at locations (along the beam from the root) and a moment at the tip.
+          forces and tip_moment may be arrays of load cases (all with the same shape), giving F of shape (ndof, ncases...)
+        '''
+        forces = [np.asarray(f, dtype=float) for f in forces]
+        tip_moment = np.asarray(tip_moment, dtype=float)
+        case_shape = np.broadcast(tip_moment, *forces).shape
+        F = np.zeros((self.ndof,) + case_shape)
+        tip = self.nnodes - 1
+        for a, f in zip(locations, forces):
+            a = abs(float(a))
+            if a > self.length:
+                F[2 * tip - 2] += f
+                F[2 * tip - 1] += f * (a - self.length)
+            else:
+                node = self.node_index(a)
+                if node > 0:
+                    F[2 * node - 2] += f
+        F[2 * tip - 1] += tip_moment
+        return F
+
+    def max_deflection(self, I, w, E, u_point):
+        '''
+        Largest deflection magnitude along the beam for sections with second moment of area I and
+          weight per unit length w (any broadcastable shapes), given u_point = solve(nodal_loads(...))
+          for the point loads (shape (ndof,) + load case shape).
+        '''
+        EI = E * I
+        defl = 0.0
+        for k in range(0, self.ndof, 2):
+            defl = np.maximum(defl, np.abs(u_point[k] + w * self.u_dist[k]) / EI)
+        return defl
+
+_fe_models = collections.OrderedDict()
+FE_MODEL_CACHE_SIZE = 64
+
+def cantilever_fe(length, mounts=(), n_elements=20):
+    ''' Return a (cached) CantileverFE - the factorization is reused for the same length and mount locations '''
+    key = (float(length), tuple(float(m) for m in np.asarray(mounts, dtype=float).flatten()), n_elements)
+    model = _fe_models.pop(key, None)
+    if model is None:
+        model = CantileverFE(length, mounts, n_elements)
+    _fe_models[key] = model
+    while len(_fe_models) > FE_MODEL_CACHE_SIZE:
+        _fe_models.popitem(last=False)
+    return model
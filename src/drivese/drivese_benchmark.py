@@ -0,0 +1,248 @@
+"""
+drivese_benchmark.py
+
+Performance baseline for DriveSE: timings of the expensive components and of the whole Drive3pt / Drive4pt
+groups, stored per commit so that changes can be compared.
+
+Benchmarks
+  - micro: compute() of LowSpeedShaft4pt, LowSpeedShaft3pt, Gearbox, Bedplate, Hub, Spinner and
+    NacelleSystemAdder, with the inputs they get in the 5 MW examples
+  - macro: prob.run() of the Drive3pt and Drive4pt groups (set up once, see DrivetrainProblemPool) for the
+    0.75, 1.5, 5 and 15 MW turbines of benchmark_turbines()
+The component memo store (drivese_cache.py) is switched off while the benchmarks run, so every call computes.
+
+Each benchmark is timed as in timeit: calls are grouped in loops of at least min_time seconds, and the
+best, median and mean time per call over `repeat` loops are kept.
+
+Results are written to <results_dir>/<commit>.json (the commit of the drivese source, with '-dirty' if it
+has uncommitted changes). compare_results() / `drivese compare OLD NEW` lists the change of the median
+time of each benchmark and flags those that got slower by more than a threshold.
+
+Usage:
+    drivese benchmark                       # run all, save to .benchmarks/<commit>.json
+    drivese benchmark --filter Drive4pt     # only the names that contain Drive4pt
+    drivese compare 6dffdbe                 # 6dffdbe against the current commit, 10% threshold
+
+There is NO OpenMDAO code in this file (the groups are built in drivese_omdao.py).
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import subprocess
+
+import numpy as np
+
+from drivese.drivese_cache import get_default_cache, set_default_cache
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_record
+
+DEFAULT_RESULTS_DIR = '.benchmarks'
+DEFAULT_THRESHOLD = 0.10
+
+#-------------------------------------------------------------------------
+# Turbines - inputs of the macro benchmarks
+
+def _turbine_record(rotor_diameter, rotor_rpm, machine_rating, loads, gear_ratio, planet_numbers, carrier_mass,
+                    overhang, distance_hub2mb, blade_mass, blade_root_diameter, blade_length, tower_top_diameter):
+    record = dict(rotor_diameter=rotor_diameter, rotor_rpm=rotor_rpm, machine_rating=machine_rating, drivetrain_efficiency=0.95)
+    record['rotor_torque'] = 1.5 * (machine_rating * 1000 / 0.95) / (rotor_rpm * (np.pi / 30))
+    (record['rotor_bending_moment_x'], record['rotor_bending_moment_y'], record['rotor_bending_moment_z'],
+     record['rotor_thrust'], record['rotor_force_y'], record['rotor_force_z']) = loads
+    record.update(gear_ratio=gear_ratio, shaft_angle=5.0 * np.pi / 180.0, shaft_ratio=0.10, planet_numbers=planet_numbers,
+                  shrink_disc_mass=333.3 * machine_rating / 1000.0, carrier_mass=carrier_mass,
+                  overhang=overhang, distance_hub2mb=distance_hub2mb, gearbox_input_xcm=0.1, hss_input_length=1.5,
+                  blade_mass=blade_mass, blade_root_diameter=blade_root_diameter, blade_length=blade_length,
+                  tower_top_diameter=tower_top_diameter)
+    return record
+
+def benchmark_turbines():
+    '''
+    Inputs and configuration of the macro benchmark turbines - dict of name: (record, model options).
+      0.75 and 1.5 MW follow the nacelle_example_p75_* and nacelle_example_1p5MW_* examples, 5 MW is
+      example_5MW_baseline_record(), and 15 MW has the rotor of the IEA 15 MW reference turbine with
+      loads scaled up from the 5 MW example (a geared drivetrain, so it is a sizing workload, not a reference design).
+    '''
+    options = dict(IEC_Class='B', shaft_factor='normal', drivetrain_design='geared', yaw_motors_number=0, blade_number=3)
+    turbines = {}
+    turbines['0.75MW'] = (_turbine_record(48.2, 22.0, 750.0, (401.0e3, 495.6e3, -443.0e3, 143000.0, -12600.0, -142.0e3),
+                                          81.491, [3, 1, 1], 250.0, 2.26, 1.22, 3400.0, 1.6, 22.0, 2.21),
+                          dict(options, gear_configuration='epp', uptower_transformer=False, crane=False))
+    turbines['1.5MW'] = (_turbine_record(77.0, 16.18, 1500.0, (8.4389e5, -2.6758e6, 7.5222e2, 2.6204e5, 2.8026e4, -3.4763e5),
+                                         78.0, [3, 1, 1], 2000.0, 3.3, 1.535, 4470.0, 2.0, 36.0, 2.3),
+                         dict(options, gear_configuration='epp', uptower_transformer=False, crane=False))
+    turbines['5MW'] = (example_5MW_baseline_record(),
+                       dict(options, gear_configuration='eep', uptower_transformer=True, crane=True))
+    scale = 240.0 / 126.0
+    turbines['15MW'] = (_turbine_record(240.0, 7.56, 15000.0, (330770.0 * scale ** 3, -16665000.0 * scale ** 3, 2896300.0 * scale ** 3,
+                                                               599610.0 * scale ** 2, 186780.0 * scale ** 2, -842710.0 * scale ** 2.5),
+                                        150.0, [3, 3, 1], 8000.0 * scale ** 3, 11.35, 0.0, 65250.0, 5.2, 117.0, 6.5),
+                        dict(options, gear_configuration='eep', uptower_transformer=True, crane=True))
+    return turbines
+
+#-------------------------------------------------------------------------
+# Benchmarks - each is a name and a function of no arguments
+
+class _RecordingModel(DrivetrainModel):
+    ''' DrivetrainModel that keeps the arguments of each component call '''
+
+    def run_component(self, name, *args):
+        self.arguments[name] = args
+        return DrivetrainModel.run_component(self, name, *args)
+
+def _component_calls(mb2Type=None):
+    options = dict(mb1Type='SRB' if mb2Type is None else 'CARB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal',
+                   drivetrain_design='geared', uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+    model = _RecordingModel(mb2Type=mb2Type, incremental=False, **options)
+    model.arguments = {}
+    record = example_5MW_baseline_record()
+    if mb2Type is not None:
+        record['flange_length'] = 0.5
+    model.compute(record)
+    return model
+
+def component_benchmarks(pattern=None):
+    ''' Micro benchmarks: (name, function) for compute() of each of the expensive components '''
+    model3 = _component_calls()
+    model4 = _component_calls('SRB')
+
+    def call(model, name):
+        component, args = getattr(model, name), model.arguments[name]
+        return lambda: component.compute(*args)
+
+    benchmarks = [('LowSpeedShaft4pt.compute', call(model4, 'lowSpeedShaft')),
+                  ('LowSpeedShaft3pt.compute', call(model3, 'lowSpeedShaft')),
+                  ('Gearbox.compute',          call(model3, 'gearbox')),
+                  ('Bedplate.compute',         call(model3, 'bedplate')),
+                  ('Hub.compute',              call(model3, 'hub')),
+                  ('Spinner.compute',          call(model3, 'spinner')),
+                  ('NacelleSystemAdder.compute', call(model3, 'nacelleSystem'))]
+    return [(name, function) for name, function in benchmarks if not pattern or pattern in name]
+
+def group_benchmarks(pattern=None):
+    ''' Macro benchmarks: (name, function) for prob.run() of Drive3pt and Drive4pt at each turbine scale '''
+    from drivese.drivese_omdao import DrivetrainProblemPool
+    pool = DrivetrainProblemPool()
+    benchmarks = []
+    turbines = benchmark_turbines()
+    for scale in sorted(turbines, key=lambda name: float(name[:-2])):
+        record, options = turbines[scale]
+        for group, mb1Type, mb2Type in [('Drive3pt', 'SRB', None), ('Drive4pt', 'CARB', 'SRB')]:
+            name = '{}.run[{}]'.format(group, scale)
+            if pattern and pattern not in name:
+                continue
+            prob = pool.acquire(mb1Type=mb1Type, mb2Type=mb2Type, **options)
+            inputs = dict(record, flange_length=0.5) if mb2Type is not None else record
+
+            def run(prob=prob, inputs=inputs):
+                for name, value in inputs.items():
+                    prob[name] = value
+                prob.run()
+
+            benchmarks.append((name, run))
+    return benchmarks
+
+#-------------------------------------------------------------------------
+# Timing
+
+def time_callable(function, repeat=5, min_time=0.1):
+    ''' Best, median and mean seconds per call of function(), over `repeat` loops of at least min_time seconds '''
+    number = 1
+    while True:
+        start = time.time()
+        for i in range(number):
+            function()
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    times = [elapsed / number]
+    for r in range(repeat - 1):
+        start = time.time()
+        for i in range(number):
+            function()
+        times.append((time.time() - start) / number)
+    return dict(best=min(times), median=float(np.median(times)), mean=float(np.mean(times)), number=number, repeat=repeat)
+
+def run_benchmarks(pattern=None, repeat=5, min_time=0.1, verbose=False):
+    ''' Time every benchmark whose name contains pattern (all if None) - returns dict of name: timings '''
+    previous = get_default_cache()
+    set_default_cache(None)
+    try:
+        results = {}
+        for group in (component_benchmarks, group_benchmarks):
+            for name, function in group(pattern):
+                function()  # warm up (first-call imports, lazily built tables)
+                results[name] = time_callable(function, repeat, min_time)
+                if verbose:
+                    print('{:40s} {:10.3f} ms'.format(name, 1000.0 * results[name]['median']))
+        return results
+    finally:
+        set_default_cache(previous)
+
+#-------------------------------------------------------------------------
+# Results per commit
+
+def current_commit():
+    ''' Short hash of the commit of the drivese source ('-dirty' if it has changes), 'unknown' outside of git '''
+    source = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=source, stderr=subprocess.STDOUT)
+        status = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no', '--', '.'], cwd=source, stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit.decode().strip() + ('-dirty' if status.strip() else '')
+
+def save_results(results, results_dir=DEFAULT_RESULTS_DIR, commit=None):
+    ''' Write results to <results_dir>/<commit>.json - returns the path '''
+    commit = commit or current_commit()
+    if not os.path.isdir(results_dir):
+        os.makedirs(results_dir)
+    document = dict(commit=commit, date=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(),
+                    numpy=np.__version__, machine=platform.node(), processor=platform.processor() or platform.machine(),
+                    benchmarks=results)
+    path = os.path.join(results_dir, '{}.json'.format(commit))
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+def load_results(ref, results_dir=DEFAULT_RESULTS_DIR):
+    ''' Results document of ref: a .json path, or a commit (or the start of one) with results in results_dir '''
+    if os.path.isfile(ref):
+        path = ref
+    else:
+        matches = sorted(glob.glob(os.path.join(results_dir, '{}*.json'.format(ref))))
+        if not matches:
+            raise ValueError('no benchmark results for {} in {}'.format(ref, results_dir))
+        exact = [m for m in matches if os.path.basename(m) == '{}.json'.format(ref)]
+        if len(matches) > 1 and not exact:
+            raise ValueError('{} matches several results: {}'.format(ref, [os.path.basename(m) for m in matches]))
+        path = exact[0] if exact else matches[0]
+    with open(path) as f:
+        return json.load(f)
+
+def compare_results(base, new, threshold=DEFAULT_THRESHOLD, statistic='median'):
+    '''
+    Compare two results documents - returns a list of (name, base seconds, new seconds, ratio, flag) for the
+      benchmarks in both, flag 'REGRESSION' when new/base > 1 + threshold, 'faster' when base/new > 1 + threshold
+    '''
+    rows = []
+    for name in sorted(set(base['benchmarks']) & set(new['benchmarks'])):
+        old_time = base['benchmarks'][name][statistic]
+        new_time = new['benchmarks'][name][statistic]
+        ratio = new_time / old_time
+        flag = 'REGRESSION' if ratio > 1.0 + threshold else 'faster' if 1.0 / ratio > 1.0 + threshold else ''
+        rows.append((name, old_time, new_time, ratio, flag))
+    return rows
+
+def print_comparison(base, new, rows, out=sys.stdout):
+    print('{} -> {}'.format(base['commit'], new['commit']), file=out)
+    if base.get('machine') != new.get('machine'):
+        print('  (results from different machines: {} and {})'.format(base.get('machine'), new.get('machine')), file=out)
+    print('  {:40s} {:>12s} {:>12s} {:>8s}'.format('benchmark', 'old ms', 'new ms', 'ratio'), file=out)
+    for name, old_time, new_time, ratio, flag in rows:
+        print('  {:40s} {:12.3f} {:12.3f} {:8.3f}  {}'.format(name, 1000.0 * old_time, 1000.0 * new_time, ratio, flag), file=out)
@@ -0,0 +1,329 @@
+"""
+drivese_cache.py
+Persistent memo store for expensive DriveSE component solutions.
+
+The iterative parts of DriveSE (gearbox stage split, LSS length/diameter loops, bedplate
+sizing loops) are deterministic functions of their inputs, the component configuration and
+the code itself. Results are stored in a small SQLite file keyed on a hash of:
+  - the component name
+  - the normalized inputs (floats are stored exactly, array shapes are kept)
+  - the component configuration (e.g. bearing types) and module-level model flags
+  - a code version (hash of the drivese source files)
+so editing any drivese module invalidates every entry.
+
+Usage:
+  - caching is on by default, with the store in $DRIVESE_CACHE_DIR (default ~/.cache/drivese). Set DRIVESE_CACHE=0
+    (or off/false/no) to switch it off, or call set_default_cache(ComponentCache(path)) to use another store -
+    path None for an in-memory store
+  - set_default_cache(None) switches it off in this process (it returns the previous store, so that it can be put
+    back); enable_default_cache() switches it on again
+  - get_default_cache().stats() returns hit/miss counts
+  - components with debug=True (or debug logging on, see drivese_log.py) always recompute so that their
+    debug output is produced
+
+NOTES:
+  - the cache stores return values plus the member variables named in memoize(state=...) - state=ALL_STATE
+    stores every public member variable (e.g. self.L_ms of the LSS components), so that a hit leaves the
+    component as the computation would have. Members that cannot be pickled are not restored.
+"""
+
+import os
+import sqlite3
+import pickle
+import hashlib
+import threading
+import time
+import functools
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # size bound for the whole store
+CACHE_FILENAME = 'components.sqlite'
+
+#-------------------------------------------------------------------------
+# Key construction
+
+def _normalize(value):
+    ''' Return a hashable, exactly reproducible representation of a component input
+        Floats are represented by their IEEE bytes (via float.hex) so 1.0 and 1.0000000001 never collide.
+        Arrays keep their shape so that (1,) arrays from OpenMDAO and python floats give different keys
+        (the return types differ as well).
+    '''
+    if value is None or isinstance(value, (bool, str)):
+        return (type(value).__name__, value)
+    if isinstance(value, (int, np.integer)):
+        return ('i', int(value))
+    if isinstance(value, (float, np.floating)):
+        return ('f', float(value).hex())
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'biuf':
+            arr = np.ascontiguousarray(value, dtype=float)
+            return ('a', arr.shape, tuple(x.hex() for x in arr.ravel().tolist()))
+        return ('o', value.shape, tuple(_normalize(v) for v in value.ravel().tolist()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_normalize(v) for v in value))
+    if isinstance(value, dict):
+        return ('d', tuple(sorted((str(k), _normalize(v)) for k, v in value.items())))
+    return ('r', repr(value))
+
+def make_key(*parts):
+    ''' Hash any number of component inputs / settings into a hex key '''
+    return hashlib.sha256(repr(_normalize(parts)).encode('utf-8')).hexdigest()
+
+_code_version = None
+
+def code_version():
+    ''' Hash of the source of every module in the drivese package (computed once per process) '''
+    global _code_version
+    if _code_version is None:
+        h = hashlib.sha256()
+        pkgdir = os.path.dirname(os.path.abspath(__file__))
+        for fname in sorted(os.listdir(pkgdir)):
+            if fname.endswith('.py'):
+                h.update(fname.encode('utf-8'))
+                with open(os.path.join(pkgdir, fname), 'rb') as f:
+                    h.update(f.read())
+        _code_version = h.hexdigest()[:16]
+    return _code_version
+
+#-------------------------------------------------------------------------
+
+class ComponentCache(object):
+    ''' SQLite-backed, size-bounded LRU store of pickled component results
+
+        path      : sqlite file (None -> in-memory store, handy for tests)
+        max_bytes : total size of stored values; least recently used entries are evicted beyond this
+
+        Database errors (locked file, read-only home, ...) are never raised to the caller - the lookup
+        is simply counted as a miss and the value is recomputed.
+    '''
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self.component_stats = {}
+
+    #----------------------------
+
+    def _connect(self):
+        ''' (Re)open the database - connections are not shared across forked worker processes '''
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if self.path is None:
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+        else:
+            dirname = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                          key TEXT PRIMARY KEY,
+                          component TEXT,
+                          value BLOB,
+                          size INTEGER,
+                          last_access REAL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)')
+        conn.commit()
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _count(self, component, hit):
+        cstats = self.component_stats.setdefault(component, {'hits': 0, 'misses': 0})
+        if hit:
+            self.hits += 1
+            cstats['hits'] += 1
+        else:
+            self.misses += 1
+            cstats['misses'] += 1
+
+    #----------------------------
+
+    def get(self, key, component=''):
+        ''' Return (True, value) on a hit and (False, None) on a miss '''
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+                    conn.commit()
+                    value = pickle.loads(row[0])
+                    self._count(component, True)
+                    return True, value
+            except (sqlite3.Error, OSError, pickle.UnpicklingError, EOFError):
+                self.errors += 1
+            self._count(component, False)
+            return False, None
+
+    def put(self, key, value, component=''):
+        ''' Store value under key, then evict least recently used entries if the store is too large '''
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute('INSERT OR REPLACE INTO entries (key, component, value, size, last_access) VALUES (?, ?, ?, ?, ?)',
+                             (key, component, sqlite3.Binary(blob), len(blob), time.time()))
+                total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(conn, total)
+                conn.commit()
+            except (sqlite3.Error, OSError):
+                self.errors += 1
+
+    def _evict(self, conn, total):
+        ''' Drop oldest entries until the store is back under max_bytes '''
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access ASC'):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+        self.evictions += len(victims)
+
+    def clear(self):
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute('DELETE FROM entries')
+                conn.commit()
+            except (sqlite3.Error, OSError):
+                self.errors += 1
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    #----------------------------
+
+    def stats(self):
+        ''' Hit/miss counts for this process plus the current size of the store '''
+        entries, nbytes = 0, 0
+        with self._lock:
+            try:
+                entries, nbytes = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            except (sqlite3.Error, OSError):
+                self.errors += 1
+        lookups = self.hits + self.misses
+        return {'hits'       : self.hits,
+                'misses'     : self.misses,
+                'hit_rate'   : self.hits / float(lookups) if lookups > 0 else 0.0,
+                'evictions'  : self.evictions,
+                'errors'     : self.errors,
+                'entries'    : entries,
+                'bytes'      : nbytes,
+                'max_bytes'  : self.max_bytes,
+                'components' : dict((k, dict(v)) for k, v in self.component_stats.items())}
+
+#-------------------------------------------------------------------------
+# Process-wide default store
+
+_default_cache = None
+_default_cache_set = False
+
+def cache_disabled_by_env():
+    return os.environ.get('DRIVESE_CACHE', '').strip().lower() in ('0', 'off', 'false', 'no')
+
+def default_cache_path():
+    cachedir = os.environ.get('DRIVESE_CACHE_DIR',
+                              os.path.join(os.path.expanduser('~'), '.cache', 'drivese'))
+    return os.path.join(cachedir, CACHE_FILENAME)
+
+def get_default_cache():
+    ''' Return the process-wide ComponentCache (created on first use unless $DRIVESE_CACHE switches it off), or None if caching is off '''
+    global _default_cache, _default_cache_set
+    if not _default_cache_set:
+        _default_cache = None if cache_disabled_by_env() else ComponentCache(default_cache_path())
+        _default_cache_set = True
+    return _default_cache
+
+def set_default_cache(cache):
+    ''' Replace the process-wide store. Pass None to switch caching off. Returns the previous store. '''
+    global _default_cache, _default_cache_set
+    previous = get_default_cache()
+    _default_cache = cache
+    _default_cache_set = True
+    return previous
+
+def enable_default_cache(path=None):
+    ''' Switch the process-wide store on (path: sqlite file, default $DRIVESE_CACHE_DIR) - returns it '''
+    cache = get_default_cache()
+    if cache is None:
+        cache = ComponentCache(path or default_cache_path())
+        set_default_cache(cache)
+    return cache
+
+#-------------------------------------------------------------------------
+
+ALL_STATE = '*'
+
+def _saved_state(obj, state, config):
+    if state != ALL_STATE:
+        return dict((name, getattr(obj, name)) for name in state if hasattr(obj, name))
+    saved = {}
+    for name, value in vars(obj).items():
+        if name.startswith('_') or name in config or name in ('log', 'debug'):
+            continue
+        try:
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            continue
+        saved[name] = value
+    return saved
+
+def memoize(component, config=(), flags=(), state=()):
+    ''' Decorator for component methods whose return value depends only on their arguments,
+          the instance attributes named in config and the module-level globals named in flags.
+        Instance attributes named in state (ALL_STATE: all public ones) are stored with the return value
+          and restored on a hit.
+
+        e.g.
+          @memoize('Bedplate.compute', config=('uptower_transformer',))
+          def compute(self, ...):
+    '''
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = get_default_cache()
+            log = getattr(self, 'log', None)
+            if cache is None or not cache.enabled or getattr(self, 'debug', False) or (log is not None and log.enabled()):
+                return func(self, *args, **kwargs)
+
+            key = make_key(component, code_version(),
+                           [getattr(self, name, None) for name in config],
+                           [func.__globals__.get(name) for name in flags],
+                           args, kwargs)
+            found, value = cache.get(key, component)
+            if found:
+                value, saved = value
+                for name, val in saved.items():
+                    setattr(self, name, val)
+                return value
+            value = func(self, *args, **kwargs)
+            saved = _saved_state(self, state, config)
+            cache.put(key, (value, saved), component)
+            return value
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
@@ -0,0 +1,341 @@
+"""
+drivese_cli.py
+
+The drivese command: evaluate a table of turbines (CSV or Parquet, see drivese_io.py) with a drivetrain
+configuration and stream the outputs to another table.
+
+    drivese run fleet.csv nacelles.parquet --config 4pt --mb1Type CARB --mb2Type SRB --jobs 8
+
+The input table is read in chunks (--chunk-size rows); with --jobs N the chunks are evaluated by N worker
+processes, and written to the output in order as they come back, so memory use stays at a few chunks
+whatever the size of the table. Progress and throughput are written to stderr.
+
+Engines:
+  vectorized  whole chunks as arrays (drivese_vectorized.py) - the default, for 3-bladed rotors
+  pipeline    one design at a time (drivese_pipeline.py) - any configuration; rows that fail are NaN
+
+--benchmark reports where the time went (reading, computing, writing) and the throughput of each part;
+--profile FILE runs in one process under cProfile and writes the statistics to FILE (and prints the top entries,
+  and the per-component table of drivese_profile.py when components were called).
+
+    drivese benchmark / drivese compare OLD [NEW]
+
+run the benchmark suite and store its results for the current commit, and compare the results of two
+commits, flagging regressions (see drivese_benchmark.py).
+
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import argparse
+import collections
+import multiprocessing
+
+import numpy as np
+
+from drivese.drivese_benchmark import DEFAULT_RESULTS_DIR, DEFAULT_THRESHOLD, run_benchmarks, save_results, load_results, \
+                                      compare_results, print_comparison, current_commit
+from drivese.drivese_cache import enable_default_cache, get_default_cache, set_default_cache
+from drivese.drivese_doe import evaluate_chunk
+from drivese.drivese_io import ColumnMapping, OUTPUT_NAMES, read_table_chunks, table_writer, compute_chunk
+from drivese.drivese_pipeline import DrivetrainModel, DRIVETRAIN_INPUTS, example_5MW_baseline_record
+from drivese.drivese_profile import profiling
+from drivese.drivese_vectorized import VectorizedDrivetrain
+
+#-------------------------------------------------------------------------
+
+class PipelineEngine(object):
+    ''' PipelineEngine class
+          DrivetrainModel behind the struct of arrays interface of VectorizedDrivetrain.compute():
+          every design is run on its own, and the outputs of designs that fail are NaN.
+    '''
+
+    def __init__(self, **model_kwargs):
+        super(PipelineEngine, self).__init__()
+        self.model = DrivetrainModel(**model_kwargs)
+        self.errors = []
+
+    def compute(self, record):
+        samples = {}
+        base_record = {}
+        for name, value in record.items():
+            per_design = np.ndim(value) == 2 if name == 'planet_numbers' else np.ndim(value) == 1
+            (samples if per_design else base_record)[name] = value
+        outputs, self.errors = evaluate_chunk(self.model, samples, base_record)
+        if not outputs:
+            raise RuntimeError('every design of the chunk failed, e.g. {}'.format(self.errors[0]))
+        return outputs
+
+ENGINES = {'vectorized': VectorizedDrivetrain, 'pipeline': PipelineEngine}
+
+_worker = {}
+
+def _init_worker(engine, model_kwargs, mapping, base_record, outputs, use_cache):
+    ''' Pool initializer (or setup for jobs=1) - returns the memo store it replaced '''
+    previous = get_default_cache()
+    if use_cache:
+        enable_default_cache()
+    else:
+        # rows of a table are all different, so the memo store would only add writes
+        set_default_cache(None)
+    _worker.update(model=ENGINES[engine](**model_kwargs), mapping=mapping, base_record=base_record, outputs=outputs)
+    return previous
+
+def _compute(chunk):
+    start = time.time()
+    table, units = compute_chunk(_worker['model'], _worker['mapping'], chunk, _worker['base_record'], _worker['outputs'])
+    return table, units, time.time() - start
+
+#-------------------------------------------------------------------------
+
+class Progress(object):
+    ''' Rows done and rows per second on stderr - one line per chunk, or updated in place on a terminal '''
+
+    def __init__(self, quiet=False):
+        super(Progress, self).__init__()
+        self.quiet = quiet
+        self.start = time.time()
+        self.rows = 0
+        self.chunks = 0
+        self.inplace = hasattr(sys.stderr, 'isatty') and sys.stderr.isatty()
+
+    def update(self, rows):
+        self.rows += rows
+        self.chunks += 1
+        if not self.quiet:
+            elapsed = time.time() - self.start
+            sys.stderr.write('{}{} rows in {} chunks, {:.1f} s, {:.0f} rows/s{}'.format('\r' if self.inplace else '',
+                             self.rows, self.chunks, elapsed, self.rows / max(elapsed, 1e-9), '' if self.inplace else '\n'))
+            sys.stderr.flush()
+
+    def done(self):
+        if not self.quiet and self.inplace:
+            sys.stderr.write('\n')
+
+def run(args):
+    ''' drivese run - returns a dict of timings (seconds) and counts '''
+    model_kwargs = dict(mb1Type=args.mb1Type, IEC_Class=args.IEC_Class, gear_configuration=args.gear_configuration,
+                        shaft_factor=args.shaft_factor, drivetrain_design=args.drivetrain_design,
+                        uptower_transformer=args.uptower_transformer, yaw_motors_number=args.yaw_motors_number,
+                        crane=args.crane, blade_number=args.blade_number, mb2Type=args.mb2Type if args.config == '4pt' else None)
+    base_record = example_5MW_baseline_record() if args.base == '5MW' else {}
+    if args.config == '4pt' and args.base == '5MW':
+        base_record['flange_length'] = 0.5  # as in the 4-point example
+    base_record.update(args.set)
+
+    headers, chunks = read_table_chunks(args.input, args.chunk_size)
+    mapping = ColumnMapping(headers, args.column_map, args.units, args.keep)
+    outputs = args.outputs or OUTPUT_NAMES
+    jobs = 1 if args.profile else args.jobs
+    stats = collections.OrderedDict([('rows', 0), ('read', 0.0), ('compute', 0.0), ('write', 0.0), ('total', 0.0)])
+    progress = Progress(args.quiet)
+
+    def timed_chunks():
+        while True:
+            start = time.time()
+            chunk = next(chunks, None)
+            stats['read'] += time.time() - start
+            if chunk is None:
+                return
+            yield chunk
+
+    previous = None
+    if jobs == 1:
+        previous = _init_worker(args.engine, model_kwargs, mapping, base_record, outputs, args.cache)
+        results = (_compute(chunk) for chunk in timed_chunks())
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs, initializer=_init_worker,
+                                    initargs=(args.engine, model_kwargs, mapping, base_record, outputs, args.cache))
+        results = _ordered(pool, timed_chunks(), window=2 * jobs)
+
+    writer = table_writer(args.output)
+    try:
+        for table, units, seconds in results:
+            start = time.time()
+            writer.write(table, units)
+            stats['write'] += time.time() - start
+            stats['compute'] += seconds
+            n = len(next(iter(table.values())))
+            stats['rows'] += n
+            progress.update(n)
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        else:
+            set_default_cache(previous)
+    progress.done()
+    stats['total'] = time.time() - progress.start
+    return stats
+
+def _ordered(pool, chunks, window):
+    ''' Results of _compute over chunks, in order, with at most `window` chunks in flight '''
+    pending = collections.deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(_compute, (chunk,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def print_benchmark(stats, jobs, out=sys.stdout):
+    rows = stats['rows']
+    print('{} rows in {:.2f} s: {:.0f} rows/s overall'.format(rows, stats['total'], rows / max(stats['total'], 1e-9)), file=out)
+    for part in ['read', 'compute', 'write']:
+        seconds = stats[part]
+        note = ' (summed over {} workers)'.format(jobs) if part == 'compute' and jobs > 1 else ''
+        print('  {:8s} {:8.2f} s  {:10.0f} rows/s{}'.format(part, seconds, rows / max(seconds, 1e-9), note), file=out)
+
+#-------------------------------------------------------------------------
+# Command line
+
+def _assignments(text):
+    ''' name=value -> (name, value) '''
+    if '=' not in text:
+        raise argparse.ArgumentTypeError('expected name=value, got {}'.format(text))
+    name, value = text.split('=', 1)
+    return name.strip(), value.strip()
+
+def _input_value(text):
+    ''' --set name=value: a drivetrain input from base_record; planet_numbers as 3,3,1 '''
+    name, value = _assignments(text)
+    if name not in DRIVETRAIN_INPUTS:
+        raise argparse.ArgumentTypeError('{} is not a drivetrain input'.format(name))
+    return name, ([float(v) for v in value.split(',')] if name == 'planet_numbers' else float(value))
+
+def _yes_no(text):
+    if text.lower() in ('yes', 'true', '1', 'on'):
+        return True
+    if text.lower() in ('no', 'false', '0', 'off'):
+        return False
+    raise argparse.ArgumentTypeError('expected yes or no, got {}'.format(text))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='drivese', description='Drivetrain sizing for tables of turbines (DriveSE)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    p = commands.add_parser('run', help='evaluate a table of turbines', description='Evaluate every row of a CSV / Parquet table of '
+                            'drivetrain inputs and write the masses, cms, inertias and dimensions to another table.')
+    p.add_argument('input', help='input table (.csv or .parquet) - columns named after the drivetrain inputs, units in [] or ()')
+    p.add_argument('output', help='output table (.csv or .parquet)')
+
+    g = p.add_argument_group('model configuration')
+    g.add_argument('--config', choices=['3pt', '4pt'], default='3pt', help='3-point (one main bearing) or 4-point suspension')
+    g.add_argument('--mb1Type', default='SRB', help='main bearing type (default SRB)')
+    g.add_argument('--mb2Type', default='SRB', help='second bearing type, 4pt only (default SRB)')
+    g.add_argument('--IEC-class', dest='IEC_Class', default='B', help='IEC class letter (default B)')
+    g.add_argument('--gear-configuration', default='eep', help='gearbox stage types, e.g. eep, eep_3 (default eep)')
+    g.add_argument('--shaft-factor', default='normal', help='normal or short (default normal)')
+    g.add_argument('--drivetrain-design', choices=['geared', 'single_stage', 'multi', 'pm_direct'], default='geared',
+                   help='drivetrain used to size the generator (default geared)')
+    g.add_argument('--uptower-transformer', type=_yes_no, default=True, metavar='yes|no', help='(default yes)')
+    g.add_argument('--crane', type=_yes_no, default=True, metavar='yes|no', help='(default yes)')
+    g.add_argument('--yaw-motors-number', type=int, default=0, help='0 to size it from the rotor diameter (default 0)')
+    g.add_argument('--blade-number', type=int, default=3)
+
+    g = p.add_argument_group('inputs and outputs')
+    g.add_argument('--base', choices=['5MW', 'none'], default='5MW',
+                   help='values of the inputs not in the table: the NREL 5 MW example, or 0 (default 5MW)')
+    g.add_argument('--set', type=_input_value, action='append', default=[], metavar='NAME=VALUE',
+                   help='set an input for all rows, e.g. --set shaft_angle=0.0873 (repeatable)')
+    g.add_argument('--column-map', type=_assignments, action='append', default=[], metavar='COLUMN=INPUT',
+                   help='feed a column to an input of another name (repeatable)')
+    g.add_argument('--units', type=_assignments, action='append', default=[], metavar='COLUMN=UNIT',
+                   help='units of a column without units in its header (repeatable)')
+    g.add_argument('--keep', action='append', default=[], metavar='COLUMN', help='copy a column to the output, e.g. a turbine id')
+    g.add_argument('--outputs', nargs='+', metavar='NAME', help='outputs to write (default: all masses, cms, inertias, dimensions)')
+
+    g = p.add_argument_group('execution')
+    g.add_argument('--engine', choices=sorted(ENGINES), default='vectorized')
+    g.add_argument('--cache', action='store_true', help='use the component memo store (drivese_cache.py) with the pipeline engine')
+    g.add_argument('--jobs', '-j', type=int, default=1, help='worker processes (default 1)')
+    g.add_argument('--chunk-size', type=int, default=10000, help='rows per chunk (default 10000)')
+    g.add_argument('--quiet', '-q', action='store_true', help='no progress readout')
+    g.add_argument('--benchmark', action='store_true', help='report read / compute / write times and throughput')
+    g.add_argument('--profile', metavar='FILE', help='run in one process under cProfile, statistics to FILE')
+
+    p = commands.add_parser('benchmark', help='time the components and drivetrain groups, save the results for this commit',
+                            description='Micro benchmarks of the expensive components and macro benchmarks of Drive3pt / Drive4pt '
+                            'at 0.75, 1.5, 5 and 15 MW (drivese_benchmark.py), saved to RESULTS_DIR/<commit>.json.')
+    p.add_argument('--filter', metavar='TEXT', help='only the benchmarks whose name contains TEXT')
+    p.add_argument('--repeat', type=int, default=5, help='timing loops per benchmark (default 5)')
+    p.add_argument('--min-time', type=float, default=0.1, help='minimum seconds per timing loop (default 0.1)')
+    p.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR, help='(default {})'.format(DEFAULT_RESULTS_DIR))
+    p.add_argument('--no-save', action='store_true', help='print the timings only')
+
+    p = commands.add_parser('compare', help='compare saved benchmark results and flag regressions',
+                            description='Change of the median time of each benchmark from OLD to NEW; exits with 1 if any '
+                            'benchmark is slower by more than the threshold.')
+    p.add_argument('old', help='commit (or start of one) with saved results, or a results .json file')
+    p.add_argument('new', nargs='?', help='as OLD (default: the current commit)')
+    p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                   help='relative slowdown flagged as a regression (default {})'.format(DEFAULT_THRESHOLD))
+    p.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR, help='(default {})'.format(DEFAULT_RESULTS_DIR))
+    return parser
+
+def run_command(parser, args):
+    args.set = dict(args.set)
+    args.column_map = dict(args.column_map)
+    args.units = dict(args.units)
+    if args.jobs < 1 or args.chunk_size < 1:
+        parser.error('--jobs and --chunk-size must be at least 1')
+    if args.profile and args.jobs > 1:
+        sys.stderr.write('drivese: --profile runs in one process, ignoring --jobs {}\n'.format(args.jobs))
+        args.jobs = 1
+
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        with profiling() as components:
+            stats = profiler.runcall(run, args)
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(25)
+        if components.stats:
+            # the pipeline engine calls the components one design at a time
+            print(components.report())
+    else:
+        stats = run(args)
+
+    if args.benchmark:
+        print_benchmark(stats, args.jobs)
+    return 0
+
+def benchmark_command(parser, args):
+    results = run_benchmarks(args.filter, repeat=args.repeat, min_time=args.min_time, verbose=True)
+    if not results:
+        raise ValueError('no benchmark matches {}'.format(args.filter))
+    if not args.no_save:
+        print('saved to {}'.format(save_results(results, args.results_dir)))
+    return 0
+
+def compare_command(parser, args):
+    base = load_results(args.old, args.results_dir)
+    new = load_results(args.new or current_commit(), args.results_dir)
+    rows = compare_results(base, new, args.threshold)
+    print_comparison(base, new, rows)
+    return 1 if any(row[-1] == 'REGRESSION' for row in rows) else 0
+
+COMMANDS = {'run': run_command, 'benchmark': benchmark_command, 'compare': compare_command}
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return COMMANDS[args.command](parser, args)
+    except (IOError, OSError, ValueError, ImportError) as e:
+        sys.stderr.write('drivese: {}\n'.format(e))
+        return 1
+    except Exception as e: # the model itself failed, e.g. no bedplate section for any row of a chunk
+        message = str(e) if type(e) is RuntimeError else '{}: {}'.format(type(e).__name__, e)
+        sys.stderr.write('drivese: {}\n'.format(message))
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -44,37 +44,156 @@ useComputeD = True    # use computeD() function to compute shaft diameter?
 useFlangeModel = True # use new flange model to compute len, mass?
 #useFlangeModel = False # use new flange model to compute len, mass?
 
-import sys, os
-
-# development hack to get (un)assembleI from commonse - remove if not needed
-devcodepath = 'Y:/Wind/Home/A-L/GScott/SystemsEngr/WISDEM2019/CommonSE-master/src'
-if not devcodepath in sys.path:
-    sys.path.append(devcodepath)
 
 import numpy as np
-import scipy as scp
-import scipy.optimize as opt
 from math import pi, cos, sqrt, sin, exp, log10, log
 
-from drivese.drivese_utils import get_rotor_mass, get_distance_hub2mb, get_My, get_Mz, resize_for_bearings, mainshaftFlangeCalc 
-#from commonse.utilities import assembleI, unassembleI 
+from drivese.drivese_utils import get_rotor_mass, get_distance_hub2mb, get_My, get_Mz, resize_for_bearings, mainshaftFlangeCalc, \
+                                  rotationMatrix
+from drivese.drivese_cache import memoize, ALL_STATE
+from drivese.drivese_profile import count_iterations
+from drivese.drivese_log import get_logger
+from drivese import drivese_bedplate as bp
 
 #from drivese.msFlange import mainshaftFlangeCalc # new (2019 07 07) model for mainshaft flange
 
-try:
-    from commonse.utilities import assembleI, unassembleI 
-except:
-    # commonse comes with lots of extras, including akima which requires Fortran
-    # See if we can do without it
-    # GNS 2019 04 01
-    sys.stderr.write('*** Problem importing from commonse.utilities\n')
-    sys.stderr.write('Defining (un)assembleI()\n')
-    def assembleI(I):
-        Ixx, Iyy, Izz, Ixy, Ixz, Iyz = I[0], I[1], I[2], I[3], I[4], I[5] 
-        return np.array([[Ixx, Ixy, Ixz], [Ixy, Iyy, Iyz], [Ixz, Iyz, Izz]])
-
-    def unassembleI(I):
-        return np.array([I[0, 0], I[1, 1], I[2, 2], I[0, 1], I[0, 2], I[1, 2]])
+# (un)assembleI() as in commonse.utilities - defined here so that importing drivese does not pull in
+#   commonse and its extras (akima requires Fortran)
+
+def assembleI(I):
+    Ixx, Iyy, Izz, Ixy, Ixz, Iyz = I[0], I[1], I[2], I[3], I[4], I[5] 
+    return np.array([[Ixx, Ixy, Ixz], [Ixy, Iyy, Iyz], [Ixz, Iyz, Izz]])
+
+def unassembleI(I):
+    return np.array([I[0, 0], I[1, 1], I[2, 2], I[0, 1], I[0, 2], I[1, 2]])
+
+def parallelAxisI(masses, cms, Is, cm):
+    '''
+    Inertia [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] about cm of n components: masses (..., n), cms (..., n, 3),
+      inertias about their own cms Is (..., n, 3) ([Ixx, Iyy, Izz]) or (..., n, 6), cm (..., 3).
+      Leading axes are batch axes (one set of components per design).
+    '''
+    r = cms - cm[..., np.newaxis, :]
+    mrr = np.einsum('...n,...nj,...nk->...jk', masses, r, r)
+    I = np.einsum('...jj->...', mrr)[..., np.newaxis, np.newaxis] * np.eye(3) - mrr
+    I = np.stack([I[..., 0, 0], I[..., 1, 1], I[..., 2, 2], I[..., 0, 1], I[..., 0, 2], I[..., 1, 2]], axis=-1)
+    own = Is.sum(axis=-2)
+    I[..., :own.shape[-1]] += own
+    return I
+
+def rotateI(I, R):
+    ''' Inertia [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] (..., 6) of a body turned by the rotation matrices R (..., 3, 3): R I R^T '''
+    T = np.stack([I[..., [0, 3, 4]], I[..., [3, 1, 5]], I[..., [4, 5, 2]]], axis=-2)
+    T = np.einsum('...ij,...jk,...lk->...il', R, T, R)
+    return np.stack([T[..., 0, 0], T[..., 1, 1], T[..., 2, 2], T[..., 0, 1], T[..., 0, 2], T[..., 1, 2]], axis=-1)
+
+def principalI(Ixx, Iyy, Izz, shaft_angle=None):
+    '''
+    Inertia [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] (..., 6) of a body with principal moments Ixx, Iyy, Izz along x, y, z -
+      with x along the shaft for a body on the tilted shaft if shaft_angle (rad) is given
+    '''
+    Ixx, Iyy, Izz = np.broadcast_arrays(Ixx, Iyy, Izz)
+    zeros = np.zeros(Ixx.shape)
+    I = np.stack([Ixx, Iyy, Izz, zeros, zeros, zeros], axis=-1).astype(float)
+    if shaft_angle is None:
+        return I
+    return rotateI(I, rotationMatrix(np.broadcast_to(shaft_angle, Ixx.shape)))
+
+class MassProperties(object):
+    ''' MassProperties class
+          Mass, center of mass and inertia of a body - or of a batch of bodies along leading axes - held as
+          contiguous arrays: mass (...), cm (..., 3), I (..., 6) [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] about the cm.
+          a + b is the composite body; MassProperties.stack() puts n bodies along a last axis and total()
+          composes them in one pass. shifted() moves a body, rotated() turns it, about() gives its inertia about a point.
+    '''
+    __slots__ = ('mass', 'cm', 'I')
+
+    def __init__(self, mass, cm=None, I=None):
+
+        super(MassProperties, self).__init__()
+
+        shape = np.broadcast(np.asarray(mass), np.zeros(np.shape(cm)[:-1]), np.zeros(np.shape(I)[:-1])).shape
+        self.mass = np.array(np.broadcast_to(mass, shape), dtype=float)
+        self.cm = np.zeros(shape + (3,)) if cm is None else np.array(np.broadcast_to(cm, shape + (3,)), dtype=float)
+        self.I = np.zeros(shape + (6,))
+        if I is not None:
+            self.I[..., :np.shape(I)[-1]] = I
+
+    @classmethod
+    def _new(cls, mass, cm, I):
+        # no checks or copies - for arrays made here
+        body = cls.__new__(cls)
+        body.mass, body.cm, body.I = mass, cm, I
+        return body
+
+    @classmethod
+    def stack(cls, masses, cms=None, Is=None):
+        '''
+        n bodies as a batch with the bodies along the last axis: lists of n masses, n cms (None: at the origin) and
+          n inertias ([Ixx, Iyy, Izz] or 6 components, None: point masses). Leading batch axes are broadcast.
+        '''
+        n = len(masses)
+        arrays = list(masses) + list(cms or []) + list(Is or [])
+        shape = np.broadcast(*[np.zeros(np.shape(a)[:-1]) if k >= n else np.asarray(a) for k, a in enumerate(arrays)]).shape
+        mass = np.empty(shape + (n,))
+        cm = np.zeros(shape + (n, 3))
+        I = np.zeros(shape + (n, 6))
+        for k in range(n):
+            mass[..., k] = masses[k]
+            if cms is not None:
+                cm[..., k, :] = cms[k]
+            if Is is not None:
+                I[..., k, :np.shape(Is[k])[-1]] = Is[k]
+        return cls._new(mass, cm, I)
+
+    def first_moment(self):
+        ''' sum of mass * cm over the last batch axis '''
+        return np.einsum('...n,...nj->...j', self.mass, self.cm)
+
+    def center(self):
+        ''' cm of the bodies along the last batch axis taken together (the origin if they have no mass) '''
+        total = self.mass.sum(axis=-1)
+        return np.divide(self.first_moment(), total[..., np.newaxis], out=np.zeros(total.shape + (3,)),
+                         where=(total != 0)[..., np.newaxis])
+
+    def total(self, cm=None):
+        ''' The composite of the bodies along the last batch axis - about cm if given (default: the combined cm) '''
+        if cm is None:
+            cm = self.center()
+        cm = np.array(np.broadcast_to(cm, self.mass.shape[:-1] + (3,)), dtype=float)
+        return self._new(self.mass.sum(axis=-1), cm, parallelAxisI(self.mass, self.cm, self.I, cm))
+
+    def __add__(self, other):
+        if not isinstance(other, MassProperties):
+            return NotImplemented
+        return MassProperties.stack([self.mass, other.mass], [self.cm, other.cm], [self.I, other.I]).total()
+
+    def __radd__(self, other):
+        # sum() of bodies starts from 0
+        if isinstance(other, (int, float)) and other == 0:
+            return self
+        return NotImplemented
+
+    def shifted(self, offset):
+        ''' The body moved by offset (..., 3) '''
+        return self._new(self.mass, self.cm + offset, self.I)
+
+    def about(self, point):
+        ''' Inertia [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] about point (..., 3) instead of the cm '''
+        return parallelAxisI(self.mass[..., np.newaxis], self.cm[..., np.newaxis, :], self.I[..., np.newaxis, :],
+                             np.broadcast_to(point, self.cm.shape))
+
+    def tensor(self):
+        ''' I as (..., 3, 3) tensors '''
+        I = self.I
+        return np.stack([I[..., [0, 3, 4]], I[..., [3, 1, 5]], I[..., [4, 5, 2]]], axis=-2)
+
+    def rotated(self, R):
+        ''' The body turned by the rotation matrices R (..., 3, 3) about the origin - e.g. rotationMatrix(shaft_angle) '''
+        return self._new(self.mass, np.einsum('...ij,...j->...i', R, self.cm), rotateI(self.I, R))
+
+    def __repr__(self):
+        return 'MassProperties(mass={!r}, cm={!r}, I={!r})'.format(self.mass, self.cm, self.I)
 
 # Constants
         
@@ -163,9 +282,10 @@ def computeD(MM, rbmx, Sy, n_safety, debug=False):
     d2 = U_KNM_INLB * (4.0 * (MM * 0.001)**2 + 3.0 * (rbmx * 0.001)**2)**0.5 # units: in-lb
     d3 = (d1 * d2) ** (1./3.) * U_IN_M
     
-    if debug:
-        sys.stderr.write('computeD\n  IN: MM {:.1f} rbmx {:.1f} Sy {:.1f} Nsafe {:.1f}\n'.format(MM, rbmx, Sy, n_safety))
-        sys.stderr.write('  d1 {:.6f} d2 {:.1f} d3 {:.3f}\n'.format(d1,d2,d3))
+    log = get_logger('computeD', debug)
+    if log.enabled():
+        log.debug('computeD\n  IN: MM {MM:.1f} rbmx {rbmx:.1f} Sy {Sy:.1f} Nsafe {n_safety:.1f}\n  d1 {d1:.6f} d2 {d2:.1f} d3 {d3:.3f}',
+                  MM=MM, rbmx=rbmx, Sy=Sy, n_safety=n_safety, d1=d1, d2=d2, d3=d3)
     return d3
 
     #    self.D_max = (16.0 * self.n_safety / pi / self.Sy * (4.0 * (MM * self.u_knm_inlb)**2 + 3.0 * (
@@ -198,6 +318,7 @@ class LowSpeedShaft4pt(object):
         self.IEC_Class = IEC_Class #Enum('A',('A','B','C'),iotype='in',desc='IEC class letter: A, B, or C')
         
         self.debug = debug
+        self.log = get_logger('LowSpeedShaft4pt', debug)
 
     #----------------------------------------------------
     # Deflection functions
@@ -249,6 +370,7 @@ class LowSpeedShaft4pt(object):
     #----------------------------
     
     def size_LSS_4pt_Loop_1(self):
+        count_iterations()
         # Distances
         self.L_as = self.L_ms / 2.0  # distance from main bearing to shaft center
         self.L_cu = self.L_ms + 0.5
@@ -376,6 +498,7 @@ class LowSpeedShaft4pt(object):
     #----------------------------
     
     def size_LSS_4pt_Loop_2(self):
+        count_iterations()
 
         # Distances
         L_as = (self.L_ms_gb + self.L_mb) / 2.0
@@ -423,8 +546,9 @@ class LowSpeedShaft4pt(object):
             + (self.shrinkDiscWeight + self.rotorWeight + self.gearboxWeight + self.lssWeight) * cosSA \
             - self.rotor_force_z
 
-        if self.debug:
-            sys.stderr.write('LSS4L2: s.F_mb_y {:.1f} F_mb1_y {:.1f} F_mb2_y {:.1f}\n'.format(self.F_mb_y, F_mb1_y, F_mb2_y))
+        if self.log.enabled():
+            self.log.debug('LSS4L2: s.F_mb_y {F_mb_y:.1f} F_mb1_y {F_mb1_y:.1f} F_mb2_y {F_mb2_y:.1f}',
+                           F_mb_y=self.F_mb_y, F_mb1_y=F_mb1_y, F_mb2_y=F_mb2_y)
 
         # Bending moments along main shaft in pitching and yaw directions
         
@@ -545,6 +669,7 @@ class LowSpeedShaft4pt(object):
 
     #----------------------------
     
+    @memoize('LowSpeedShaft4pt.compute', config=('mb1Type', 'mb2Type', 'IEC_Class'), flags=('useComputeD', 'useFlangeModel'), state=ALL_STATE)
     def compute(self, rotor_diameter, rotor_mass, rotor_thrust, rotor_force_y, rotor_force_z, 
                       rotor_bending_moment_x, rotor_bending_moment_y, rotor_bending_moment_z, \
                       overhang, machine_rating, drivetrain_efficiency, \
@@ -582,7 +707,7 @@ class LowSpeedShaft4pt(object):
         self.diameter2 = 0.0 #Float(iotype='out', units='m', desc='lss outer diameter at second bearing')
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I =  np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.I =  np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.mb1_facewidth = 0.0 #Float(iotype='out', units='m', desc='facewidth of upwind main bearing') 
         self.mb2_facewidth = 0.0 #Float(iotype='out', units='m', desc='facewidth of main bearing')     
         self.mb1_mass = 0.0 #Float(iotype='out', units = 'kg', desc='main bearing mass')
@@ -615,8 +740,8 @@ class LowSpeedShaft4pt(object):
             self.flange_length = 0.3 * (self.rotor_diameter / 100.0)**2.0 \
                 - 0.1 * (self.rotor_diameter / 100.0) \
                 + 0.4 # (following Eq. 2.32 in 2015 rpt) 
-            if self.debug:
-                sys.stderr.write('MSFlangeLen (approx): {:.2f} m\n'.format(self.flange_length))
+            if self.log.enabled():
+                self.log.debug('MSFlangeLen (approx): {flange_length:.2f} m', flange_length=self.flange_length)
 
         # constants
         self.g = 9.81 # m/s^2
@@ -804,12 +929,11 @@ class LowSpeedShaft4pt(object):
                       / (self.mass + self.shrink_disc_mass)
         self.mass += self.shrink_disc_mass
 
-        I = np.zeros(3)
-        I[0] = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0) / 8.0
-        I[1] = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0
-                             + (4.0 / 3.0) * (self.lss_length ** 2.0)) / 16.0
-        I[2] = I[1]
-        self.I = I
+        # about the shaft axis and across it, turned to yaw-aligned axes
+        I0 = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0) / 8.0
+        I1 = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0
+                          + (4.0 / 3.0) * (self.lss_length ** 2.0)) / 16.0
+        self.I = principalI(I0, I1, I1, self.shaft_angle)
 
         self.mb1_facewidth = facewidth_max
         self.mb2_facewidth = facewidth_med
@@ -822,16 +946,17 @@ class LowSpeedShaft4pt(object):
         '''
         self.length = self.lss_length # quick fix
 
-        if self.debug:
-            sys.stderr.write('LSS4:: Len {:.3f} m (iter) + {:.3f} m (facewidth) + {:.3f} m (flange)\n'.format(self.L_mb_new, 
-                                                0.5*(facewidth_max + facewidth_med), self.flange_length))
-            lssfmt = 'LSS4:: Len {:.3f} m Dia1 {:.2f} m Dia2 {:.2f} m  ID {:.2f} m Mass {:.1f} kg MB1Mass {:.1f} kg MB2Mass {:.1f} kg  F_mb_y {:.1f} N  F_mb_z {:.1f} N\n'
-            sys.stderr.write(lssfmt.format(self.length, self.diameter1, self.diameter2, self.D_in, self.mass, 
-                                               self.mb1_mass, self.mb2_mass, self.F_mb_y, self.F_mb_z))
-            sys.stderr.write(' hub2mb  {:6.3f}\n L_mb    {:6.3f}\n L_ms_gb {:6.3f}\n'.format(self.distance_hub2mb, 
-                             self.L_mb_new, self.L_ms_gb_new))
-            sys.stderr.write(' fwidth1 {:6.3f}\n fwidth2 {:6.3f}\n flange  {:6.3f}\n'.format(self.mb1_facewidth, 
-                             self.mb2_facewidth, self.flange_length))
+        if self.log.enabled():
+            self.log.debug('LSS4:: Len {L_mb:.3f} m (iter) + {facewidth:.3f} m (facewidth) + {flange_length:.3f} m (flange)',
+                           L_mb=self.L_mb_new, facewidth=0.5*(facewidth_max + facewidth_med), flange_length=self.flange_length)
+            lssfmt = 'LSS4:: Len {length:.3f} m Dia1 {diameter1:.2f} m Dia2 {diameter2:.2f} m  ID {D_in:.2f} m Mass {mass:.1f} kg ' \
+                     'MB1Mass {mb1_mass:.1f} kg MB2Mass {mb2_mass:.1f} kg  F_mb_y {F_mb_y:.1f} N  F_mb_z {F_mb_z:.1f} N'
+            self.log.debug(lssfmt, length=self.length, diameter1=self.diameter1, diameter2=self.diameter2, D_in=self.D_in,
+                           mass=self.mass, mb1_mass=self.mb1_mass, mb2_mass=self.mb2_mass, F_mb_y=self.F_mb_y, F_mb_z=self.F_mb_z)
+            self.log.debug(' hub2mb  {distance_hub2mb:6.3f}\n L_mb    {L_mb:6.3f}\n L_ms_gb {L_ms_gb:6.3f}',
+                           distance_hub2mb=self.distance_hub2mb, L_mb=self.L_mb_new, L_ms_gb=self.L_ms_gb_new)
+            self.log.debug(' fwidth1 {mb1_facewidth:6.3f}\n fwidth2 {mb2_facewidth:6.3f}\n flange  {flange_length:6.3f}',
+                           mb1_facewidth=self.mb1_facewidth, mb2_facewidth=self.mb2_facewidth, flange_length=self.flange_length)
 
         return (self.design_torque, self.design_bending_load, self.length, self.diameter1, self.diameter2, self.mass, self.cm, self.I, \
                 self.mb1_facewidth, self.mb2_facewidth, self.mb1_mass, self.mb2_mass, self.mb1_cm, self.mb2_cm)
@@ -861,6 +986,7 @@ class LowSpeedShaft3pt(object):
         self.mb1Type = mb1Type #Enum('SRB',('CARB','TRB1','TRB2','SRB','CRB','RB'),iotype='in',desc='Main bearing type')
         self.IEC_Class = IEC_Class #Enum('A',('A','B','C'),iotype='in',desc='IEC class letter: A, B, or C')
         self.debug = debug
+        self.log = get_logger('LowSpeedShaft3pt', debug)
         
     #----------------------------------------------------
     # Deflection functions
@@ -898,6 +1024,7 @@ class LowSpeedShaft3pt(object):
     #----------------------------
     
     def size_LSS_3pt(self):
+        count_iterations()
         # Distances
         # distance from hub center to gearbox yokes
         self.L_bg = 6.11 * (self.machine_rating / 5.0e3)
@@ -1009,11 +1136,12 @@ class LowSpeedShaft3pt(object):
             MM = MM_max
             self.D_max = (16.0 * self.n_safety / pi / self.Sy * (4.0 * (MM * self.u_knm_inlb)**2 + 3.0 * (
                 self.rotor_bending_moment_x / 1000.0 * self.u_knm_inlb)**2)**0.5)**(1.0 / 3.0) * self.u_in_m
-            sys.stderr.write('D_max\n  IN: MM {:.1f} rbmx {:.1f} Sy {:.1f} Nsafe {:.1f}\n'.format(MM, 
-                             self.rotor_bending_moment_x, self.Sy, self.n_safety))
-            sys.stderr.write('  d1 {:.6f} d2 {:.1f} d3 {:.3f}\n'.format(16.0 * self.n_safety / pi / self.Sy,
-                             (4.0 * (MM * self.u_knm_inlb)**2 + 3.0 * (self.rotor_bending_moment_x / 1000.0 * self.u_knm_inlb)**2)**0.5,
-                             self.D_max))
+            if self.log.enabled():
+                self.log.debug('D_max\n  IN: MM {MM:.1f} rbmx {rbmx:.1f} Sy {Sy:.1f} Nsafe {n_safety:.1f}\n  d1 {d1:.6f} d2 {d2:.1f} d3 {d3:.3f}',
+                               MM=MM, rbmx=self.rotor_bending_moment_x, Sy=self.Sy, n_safety=self.n_safety,
+                               d1=16.0 * self.n_safety / pi / self.Sy,
+                               d2=(4.0 * (MM * self.u_knm_inlb)**2 + 3.0 * (self.rotor_bending_moment_x / 1000.0 * self.u_knm_inlb)**2)**0.5,
+                               d3=self.D_max)
 
             # OD at end
             MM = MM_min
@@ -1056,6 +1184,7 @@ class LowSpeedShaft3pt(object):
 
     #----------------------------
     
+    @memoize('LowSpeedShaft3pt.compute', config=('mb1Type', 'IEC_Class'), flags=('useComputeD', 'useFlangeModel'), state=ALL_STATE)
     def compute(self, rotor_diameter, rotor_mass, rotor_thrust, rotor_force_y, rotor_force_z, 
                       rotor_bending_moment_x, rotor_bending_moment_y, rotor_bending_moment_z, \
                       overhang, machine_rating, drivetrain_efficiency, \
@@ -1093,7 +1222,7 @@ class LowSpeedShaft3pt(object):
         self.diameter2 = 0.0 #Float(iotype='out', units='m', desc='lss outer diameter at second bearing')
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.mb1_facewidth = 0.0 #Float(iotype='out', units='m', desc='facewidth of upwind main bearing') 
         self.mb2_facewidth = 0.0 #Float(iotype='out', units='m', desc='facewidth of main bearing')     
         self.mb1_mass = 0.0 #Float(iotype='out', units = 'kg', desc='main bearing mass')
@@ -1120,8 +1249,8 @@ class LowSpeedShaft3pt(object):
             self.flange_length = 0.3 * (self.rotor_diameter / 100.0)**2.0 \
                 - 0.1 * (self.rotor_diameter / 100.0) \
                 + 0.4 # (following Eq. 2.32 in 2015 rpt) 
-            if self.debug:
-                sys.stderr.write('MSFlangeLen (approx): {:.2f} m\n'.format(self.flange_length))
+            if self.log.enabled():
+                self.log.debug('MSFlangeLen (approx): {flange_length:.2f} m', flange_length=self.flange_length)
                 
         # constants
         self.g = 9.81 # m/s^2
@@ -1234,11 +1363,10 @@ class LowSpeedShaft3pt(object):
         self.cm[2] = (cm[2] * self.mass + downwind_location[2] * self.shrink_disc_mass) / (self.mass + self.shrink_disc_mass)
         self.mass += self.shrink_disc_mass
 
-        I = np.zeros(3)
-        I[0] = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0) / 8.0
-        I[1] = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0 + (4.0 / 3.0) * (self.lss_length ** 2.0)) / 16.0
-        I[2] = I[1]
-        self.I = I
+        # about the shaft axis and across it, turned to yaw-aligned axes
+        I0 = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0) / 8.0
+        I1 = self.mass * (self.D_in ** 2.0 + self.D_outer ** 2.0 + (4.0 / 3.0) * (self.lss_length ** 2.0)) / 16.0
+        self.I = principalI(I0, I1, I1, self.shaft_angle)
 
         self.facewidth_mb = facewidth_max
         self.mb1_mass = bearingmass
@@ -1248,13 +1376,13 @@ class LowSpeedShaft3pt(object):
             2019 06 11 GNS
         '''
         self.length = self.lss_length # quick fix
-        if self.debug:
-            sys.stderr.write('LSS3:: Len {:.2f} m (iter) + {:.2f} m (facewidth) + {:.2f} m (flange)\n'.format(self.L_ms_new, 
-                                                0.5*(facewidth_max + facewidth_min), self.flange_length))
-            #sys.stderr.write('LowSpeedShaft3pt::compute(): ')
-            lssfmt = 'LSS3:: Len {:.2f} m Dia1 {:.2f} m Dia2 {:.2f} m  ID {:.2f} m Mass {:.1f} kg MB1Mass {:.1f} kg  F_mb_y {:.1f} N  F_mb_z {:.1f} N\n'
-            sys.stderr.write(lssfmt.format(self.length, self.diameter1, self.diameter2, self.D_in, self.mass, 
-                                           self.mb1_mass, self.F_mb_y, self.F_mb_z))
+        if self.log.enabled():
+            self.log.debug('LSS3:: Len {L_ms:.2f} m (iter) + {facewidth:.2f} m (facewidth) + {flange_length:.2f} m (flange)',
+                           L_ms=self.L_ms_new, facewidth=0.5*(facewidth_max + facewidth_min), flange_length=self.flange_length)
+            lssfmt = 'LSS3:: Len {length:.2f} m Dia1 {diameter1:.2f} m Dia2 {diameter2:.2f} m  ID {D_in:.2f} m Mass {mass:.1f} kg ' \
+                     'MB1Mass {mb1_mass:.1f} kg  F_mb_y {F_mb_y:.1f} N  F_mb_z {F_mb_z:.1f} N'
+            self.log.debug(lssfmt, length=self.length, diameter1=self.diameter1, diameter2=self.diameter2, D_in=self.D_in,
+                           mass=self.mass, mb1_mass=self.mb1_mass, F_mb_y=self.F_mb_y, F_mb_z=self.F_mb_z)
 
         return (self.design_torque, self.design_bending_load, self.length, self.diameter1, self.diameter2, \
                 self.mass, self.cm, self.I, \
@@ -1280,18 +1408,19 @@ class MainBearing(object):
 
         self.bearing_position = bearing_position #Str(iotype='in',desc='Main bearing type: main or second')
 
-    def compute(self, bearing_mass, lss_diameter, lss_design_torque, rotor_diameter, location):
+    def compute(self, bearing_mass, lss_diameter, lss_design_torque, rotor_diameter, location, shaft_angle=0.0):
         
         self.bearing_mass = bearing_mass #Float(iotype ='in', units = 'kg', desc = 'bearing mass from LSS model')
         self.lss_diameter = lss_diameter #Float(iotype='in', units='m', desc='lss outer diameter at main bearing')
         self.lss_design_torque = lss_design_torque #Float(iotype='in', units='N*m', desc='lss design torque')
         self.rotor_diameter = rotor_diameter #Float(iotype='in', units='m', desc='rotor diameter')
         self.location = location #Array(np.array([0.,0.,0.]),iotype = 'in', units = 'm', desc = 'x,y,z location from shaft model')
+        self.shaft_angle = shaft_angle #Float(iotype='in', units='rad', desc='Angle of the LSS inclindation with respect to the horizontal')
 
         # returns
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I  = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.I  = np.zeros(6) #Array(np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
 
         self.mass = self.bearing_mass
         self.mass += self.mass * (8000.0 / 2700.0)  # add housing weight
@@ -1316,7 +1445,7 @@ class MainBearing(object):
                 
                 b1I0 = (self.mass * inDiam ** 2) / 4.0
                 self.cm = cm
-                self.I = np.array([b1I0, b1I0 / 2.0, b1I0 / 2.0])
+                self.I = principalI(b1I0, b1I0 / 2.0, b1I0 / 2.0, self.shaft_angle)
             else:
                 if self.mass > 0 and self.location[0] != 0.0:
                     cm = self.location
@@ -1326,13 +1455,68 @@ class MainBearing(object):
         
                 b2I0 = (self.mass * inDiam ** 2) / 4.0
                 self.cm = cm
-                self.I = np.array([b2I0, b2I0 / 2.0, b2I0 / 2.0])
+                self.I = principalI(b2I0, b2I0 / 2.0, b2I0 / 2.0, self.shaft_angle)
 
         return (self.mass, self.cm, self.I)
 
 #-------------------------------------------------------------------------
 
 #Size gearbox based on type
+#-------------------------------------------------------------------------
+# Gearbox sizing functions
+#   These were methods / inline functions of Gearbox. They are written so they also work
+#   with complex arguments (complex step derivatives in Gearbox.stageRatioSensitivity())
+
+def gearboxVolume(x, config, planet_numbers):
+    ''' Normalized gearbox volume (objective of the stage ratio optimization) for stage ratios x
+          'eep', 'eep_3' and 'eep_2' differ only in the 2nd stage structure weight coefficient K_r2
+          'epp' and any other configuration use a parallel 2nd stage
+    '''
+    B_1 = planet_numbers[0]
+    if config in ['eep', 'eep_3', 'eep_2']:
+        B_2 = planet_numbers[1]
+        K_r1 = 0
+        K_r2 = {'eep' : 0, 'eep_3' : 0.8, 'eep_2' : 1.6}[config]  # 2nd stage structure weight coefficient
+        return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1.0) + (x[0] / 2.0 - 1)**2 + K_r1 * ((x[0] - 1.0)**2) / B_1 + K_r1 * ((x[0] - 1.0)**2) / (B_1 * (x[0] / 2.0 - 1.0))) \
+             + (1.0 / (x[0] * x[1])) * ((1.0 / B_2) + (1 / (B_2 * ((x[1] / 2.0) - 1.0))) + (x[1] / 2.0 - 1.0) + (x[1] / 2.0 - 1.0)**2.0 + K_r2 * ((x[1] - 1.0)**2.0) / B_2 + K_r2 * ((x[1] - 1.0)**2.0) / (B_2 * (x[1] / 2.0 - 1.0))) \
+             + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
+
+    K_r = 0
+    return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1.0) + (x[0] / 2.0 - 1)**2 +
+        K_r * ((x[0] - 1.0)**2) / B_1 + K_r * ((x[0] - 1.0)**2) / (B_1 * (x[0] / 2.0 - 1.0))) \
+    + (1.0 / (x[0] * x[1])) * (1.0 + (1.0 / x[1]) + x[1] + x[1]**2) \
+    + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
+
+def stageMassFactor(indStageRatio, indNp, indStageType):
+    ''' Dimensionless mass of an individual gearbox stage (see Gearbox.stageMassCalc()) '''
+
+    # Application factor to include ring/housing/carrier weight
+    Kr = 0.4
+    Kgamma = 1.1
+
+    if indNp == 3:
+        Kgamma = 1.1
+    elif indNp == 4:
+        Kgamma = 1.1
+    elif indNp == 5:
+        Kgamma = 1.35
+
+    if indStageType == 1:
+        indStageMass = 1.0 + indStageRatio + \
+            indStageRatio**2 + (1.0 / indStageRatio)
+
+    elif indStageType == 2:
+        sunRatio = 0.5 * indStageRatio - 1.0
+        indStageMass = Kgamma * ( (1 / indNp) 
+                                + (1 / (indNp * sunRatio))
+                                + sunRatio 
+                                + sunRatio**2 
+                                + Kr * ((indStageRatio - 1)**2) / indNp 
+                                + Kr * ((indStageRatio - 1)**2) / (indNp * sunRatio))
+    return indStageMass
+
+#-------------------------------------------------------------------------
+
 class Gearbox(object):
     ''' Gearbox class
           The Gearbox class is used to represent the gearbox component of a wind turbine drivetrain.
@@ -1350,8 +1534,9 @@ class Gearbox(object):
         self.gear_configuration = gear_configuration #Str(iotype='in', desc='string that represents the configuration of the gearbox (stage number and types)')
         self.shaft_factor = shaft_factor #Str(iotype='in', desc = 'normal or short shaft length')
         self.debug = debug
+        self.log = get_logger('Gearbox', debug)
 
-    def compute(self, gear_ratio, planet_numbers, rotor_rpm, rotor_diameter, rotor_torque, gearbox_input_cm):
+    def compute(self, gear_ratio, planet_numbers, rotor_rpm, rotor_diameter, rotor_torque, gearbox_input_cm, shaft_angle=0.0):
 
         #variables
         self.gear_ratio = gear_ratio #Float(iotype='in', desc='overall gearbox speedup ratio')
@@ -1360,12 +1545,13 @@ class Gearbox(object):
         self.rotor_diameter = rotor_diameter #Float(iotype='in', desc='rotor diameter')
         self.rotor_torque = rotor_torque #Float(iotype='in', units='N*m', desc='rotor torque at rated power')
         self.gearbox_input_cm = gearbox_input_cm #Float(0,iotype = 'in', units='m', desc ='gearbox position along x-axis')
+        self.shaft_angle = shaft_angle #Float(iotype='in', units='rad', desc='Angle of the LSS inclindation with respect to the horizontal')
     
         # outputs
         self.stage_masses = np.zeros(4) #Array(np.array([0.0, 0.0, 0.0, 0.0]), iotype='out', units='kg', desc='individual gearbox stage masses')
         self.gearbox_mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.gearbox_cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.gearbox_I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')    
+        self.gearbox_I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')    
         self.gearbox_length = 0.0 #Float(iotype='out', units='m', desc='gearbox length')
         self.gearbox_height = 0.0 #Float(iotype='out', units='m', desc='gearbox height')
         self.gearbox_diameter = 0.0 #Float(iotype='out', units='m', desc='gearbox diameter')
@@ -1402,11 +1588,12 @@ class Gearbox(object):
                                  + (2/3) * (self.gearbox_length ** 2) 
                                  + 0.25 * (self.gearbox_height ** 2)) / 8
         I2 = I1
-        self.gearbox_I = np.array([I0, I1, I2])
+        # I0 is about the shaft axis, so the gearbox turns with the tilted shaft like the LSS
+        self.gearbox_I = principalI(I0, I1, I2, self.shaft_angle)
         
-        if self.debug:
-            sys.stderr.write('GBOX: Mass {:.1f} kg  Len/Ht/Diam (m) {:.2f} {:.2f} {:.2f}\n'.format(self.gearbox_mass, 
-                             self.gearbox_length, self.gearbox_height, self.gearbox_diameter))
+        if self.log.enabled():
+            self.log.debug('GBOX: Mass {mass:.1f} kg  Len/Ht/Diam (m) {length:.2f} {height:.2f} {diameter:.2f}', mass=self.gearbox_mass,
+                           length=self.gearbox_length, height=self.gearbox_height, diameter=self.gearbox_diameter)
 
         return(self.stage_masses, self.gearbox_mass, self.gearbox_cm, self.gearbox_I, self.gearbox_length, self.gearbox_height, self.gearbox_diameter)
 
@@ -1433,33 +1620,11 @@ class Gearbox(object):
           Type of gear.  Use '1' for parallel and '2' for epicyclic.
         '''
 
-        # Application factor to include ring/housing/carrier weight
-        Kr = 0.4
-        Kgamma = 1.1
+        indStageMass = stageMassFactor(indStageRatio, indNp, indStageType)
 
-        if indNp == 3:
-            Kgamma = 1.1
-        elif indNp == 4:
-            Kgamma = 1.1
-        elif indNp == 5:
-            Kgamma = 1.35
-
-        if indStageType == 1:
-            indStageMass = 1.0 + indStageRatio + \
-                indStageRatio**2 + (1.0 / indStageRatio)
-
-        elif indStageType == 2:
-            sunRatio = 0.5 * indStageRatio - 1.0
-            indStageMass = Kgamma * ( (1 / indNp) 
-                                    + (1 / (indNp * sunRatio))
-                                    + sunRatio 
-                                    + sunRatio**2 
-                                    + Kr * ((indStageRatio - 1)**2) / indNp 
-                                    + Kr * ((indStageRatio - 1)**2) / (indNp * sunRatio))
-
-        if self.debug:
-            sys.stderr.write('GBox::stageMassCalc(): ISR {:.3f} INP {} IST {}  Mass {:2f}\n'.format(indStageRatio, 
-                             indNp, indStageType, indStageMass))
+        if self.log.enabled():
+            self.log.debug('GBox::stageMassCalc(): ISR {ratio:.3f} INP {planets} IST {stage_type}  Mass {mass:2f}', ratio=indStageRatio,
+                           planets=indNp, stage_type=indStageType, mass=indStageMass)
             
         return indStageMass
 
@@ -1509,23 +1674,25 @@ class Gearbox(object):
             torqueTemp = self.stageTorque[s]
             self.stageMass[s] = Kunit * Ka / Kfact * self.stageTorque[s] \
                 * self.stageMassCalc(self.stageRatio[s], self.planet_numbers[s], self.stageType[s])
-            if self.debug:
-                sys.stderr.write('GBOX::gbWE(): stage {} mass {:8.1f} kg  torque {:9.1f} N-m\n'.format(s, 
-                                 self.stageMass[s][0], self.stageTorque[s][0]))
+            if self.log.enabled():
+                self.log.debug('GBOX::gbWE(): stage {stage} mass {mass:8.1f} kg  torque {torque:9.1f} N-m', stage=s,
+                               mass=self.stageMass[s][0], torque=self.stageTorque[s][0])
 
         gearboxWeight = (sum(self.stageMass)) * Kshaft
 
         return gearboxWeight
 
+    @memoize('Gearbox.stageRatioCalc')
     def stageRatioCalc(self, overallRatio, planet_numbers, config):
         '''
         Calculates individual stage ratios using either:
             empirical relationships from the Sunderland model, or 
             a SciPy constrained optimization routine.
+            
+        The volume functions that used to be defined inline for each configuration are now in gearboxVolume()
+          so that stageRatioSensitivity() can use them. 'eep_3' also fixes the last stage ratio at 3.
         '''
 
-        K_r = 0
-
         x = np.zeros([3, 1])
 
         try:
@@ -1533,125 +1700,177 @@ class Gearbox(object):
         except ValueError:
             print("Invalid value for gearbox_configuration.  Must be one of: 'eep','eep_2','eep_3','epp'")
         else:
-            if config == 'eep':
-                x0 = [overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0)]
-                B_1 = planet_numbers[0]
-                B_2 = planet_numbers[1]
-                K_r1 = 0
-                K_r2 = 0  # 2nd stage structure weight coefficient
-    
-                def volume(x):
-                    return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1.0) +
-                    (x[0] / 2.0 - 1)**2 + K_r1 * ((x[0] - 1.0)**2) / B_1 + K_r1 * ((x[0] - 1.0)**2) / (B_1 * (x[0] / 2.0 - 1.0))) + \
-                    (1.0 / (x[0] * x[1])) * ((1.0 / B_2) + (1 / (B_2 * ((x[1] / 2.0) - 1.0))) + (x[1] / 2.0 - 1.0) + (x[1] / 2.0 - 1.0)**2.0 + K_r2 * ((x[1] - 1.0)**2.0) / B_2 +
-                     K_r2 * ((x[1] - 1.0)**2.0) / (B_2 * (x[1] / 2.0 - 1.0))) + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
-    
-                def constr1(x, overallRatio):
-                    return x[0] * x[1] * x[2] - overallRatio
-    
-                def constr2(x, overallRatio):
-                    return overallRatio - x[0] * x[1] * x[2]
-    
-                x = opt.fmin_cobyla(volume, x0, [constr1, constr2], consargs=[overallRatio], rhoend=1e-7)
-    
-            elif config == 'eep_3':
-                # fixes last stage ratio at 3
-                x0 = [overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0)]
-                B_1 = planet_numbers[0]
-                B_2 = planet_numbers[1]
-                K_r1 = 0
-                K_r2 = 0.8  # 2nd stage structure weight coefficient
-    
-                def volume(x):
-                    return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1.0) + (x[0] / 2.0 - 1)**2 + K_r1 * ((x[0] - 1.0)**2) / B_1 + K_r1 * ((x[0] - 1.0)**2) / (B_1 * (x[0] / 2.0 - 1.0))) \
-                         + (1.0 / (x[0] * x[1])) * ((1.0 / B_2) + (1 / (B_2 * ((x[1] / 2.0) - 1.0))) + (x[1] / 2.0 - 1.0) + (x[1] / 2.0 - 1.0)**2.0 + K_r2 * ((x[1] - 1.0)**2.0) / B_2 + K_r2 * ((x[1] - 1.0)**2.0) / (B_2 * (x[1] / 2.0 - 1.0))) \
-                         + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
-    
-                def constr1(x, overallRatio):
-                    return x[0] * x[1] * x[2] - overallRatio
-    
-                def constr2(x, overallRatio):
-                    return overallRatio - x[0] * x[1] * x[2]
-    
-                def constr3(x, overallRatio):
-                    return x[2] - 3.0
-    
-                def constr4(x, overallRatio):
-                    return 3.0 - x[2]
-    
-                x = opt.fmin_cobyla(volume, x0, [constr1, constr2, constr3, constr4], consargs=[overallRatio], rhoend=1e-7)
-    
-            elif config == 'eep_2':
-                # fixes final stage ratio at 2
-                x0 = [overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0)]
-                B_1 = planet_numbers[0]
-                B_2 = planet_numbers[1]
-                K_r1 = 0
-                K_r2 = 1.6  # 2nd stage structure weight coefficient
-    
-                def volume(x):
-                    return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1.0) + (x[0] / 2.0 - 1)**2 + K_r1 * ((x[0] - 1.0)**2) / B_1 + K_r1 * ((x[0] - 1.0)**2) / (B_1 * (x[0] / 2.0 - 1.0))) \
-                         + (1.0 / (x[0] * x[1])) * ((1.0 / B_2) + (1 / (B_2 * ((x[1] / 2.0) - 1.0))) + (x[1] / 2.0 - 1.0) + (x[1] / 2.0 - 1.0)**2.0 + K_r2 * ((x[1] - 1.0)**2.0) / B_2 + K_r2 * ((x[1] - 1.0)**2.0) / (B_2 * (x[1] / 2.0 - 1.0))) \
-                         + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
-    
-                def constr1(x, overallRatio):
-                    return x[0] * x[1] * x[2] - overallRatio
-    
-                def constr2(x, overallRatio):
-                    return overallRatio - x[0] * x[1] * x[2]
-    
-                x = opt.fmin_cobyla(volume, x0, [constr1, constr2], consargs=[overallRatio], rhoend=1e-7)
-            elif config == 'epp':
-                # fixes last stage ratio at 3
-                x0 = [overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0)]
-                B_1 = planet_numbers[0]
-                B_2 = planet_numbers[1]
-                K_r = 0
-    
-                def volume(x):
-                    return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1.0) + (x[0] / 2.0 - 1)**2 +
-                        K_r * ((x[0] - 1.0)**2) / B_1 + K_r * ((x[0] - 1.0)**2) / (B_1 * (x[0] / 2.0 - 1.0))) \
-                    + (1.0 / (x[0] * x[1])) * (1.0 + (1.0 / x[1]) + x[1] + x[1]**2) \
-                    + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
-    
-                def constr1(x, overallRatio):
-                    return x[0] * x[1] * x[2] - overallRatio
-    
-                def constr2(x, overallRatio):
-                    return overallRatio - x[0] * x[1] * x[2]
-    
-                x = opt.fmin_cobyla(volume, x0, [constr1, constr2], consargs=[overallRatio], rhoend=1e-7)
-    
-            else:  # Should not execute since try/except checks for acceptable gearbox configuration types
-                x0 = [overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0), 
-                      overallRatio ** (1.0 / 3.0)]
-                B_1 = planet_numbers[0]
-                K_r = 0.0
-    
-                def volume(x):
-                    return (1.0 / (x[0])) * ((1.0 / B_1) + (1.0 / (B_1 * ((x[0] / 2.0) - 1.0))) + (x[0] / 2.0 - 1) + (x[0] / 2.0 - 1.0)**2 + K_r * ((x[0] - 1.0)**2) / B_1 + K_r * ((x[0] - 1)**2) / (B_1 * (x[0] / 2.0 - 1.0))) \
-                         + (1.0 / (x[0] * x[1])) * (1.0 + (1.0 / x[1]) + x[1] + x[1]**2) \
-                         + (1.0 / (x[0] * x[1] * x[2])) * (1.0 + (1.0 / x[2]) + x[2] + x[2]**2)
-    
-                def constr1(x, overallRatio):
-                   return x[0] * x[1] * x[2] - overallRatio
-    
-                def constr2(x, overallRatio):
-                    return overallRatio - x[0] * x[1] * x[2]
-    
-                x = opt.fmin_cobyla(volume, x0, [constr1, constr2], consargs=[overallRatio], rhoend=1e-7)
+            x0 = [overallRatio ** (1.0 / 3.0), 
+                  overallRatio ** (1.0 / 3.0), 
+                  overallRatio ** (1.0 / 3.0)]
+
+            from scipy.optimize import fmin_cobyla  # loaded on first use
+
+            def volume(x):
+                count_iterations()
+                return gearboxVolume(x, config, planet_numbers)
+
+            def constr1(x, overallRatio):
+                return x[0] * x[1] * x[2] - overallRatio
+
+            def constr2(x, overallRatio):
+                return overallRatio - x[0] * x[1] * x[2]
+
+            def constr3(x, overallRatio):
+                return x[2] - 3.0
+
+            def constr4(x, overallRatio):
+                return 3.0 - x[2]
+
+            if config == 'eep_3':
+                x = fmin_cobyla(volume, x0, [constr1, constr2, constr3, constr4], consargs=[overallRatio], rhoend=1e-7)
+            else:
+                x = fmin_cobyla(volume, x0, [constr1, constr2], consargs=[overallRatio], rhoend=1e-7)
     
             return x
 
+    def stageRatioSensitivity(self, stageRatio, overallRatio, planet_numbers, config):
+        '''
+        Sensitivities of the optimal stage ratios found by stageRatioCalc() from the KKT conditions at the optimum.
+        
+        At the optimum  grad(V) = J^T lam  and  c(x) = 0, where c_1 = x0*x1*x2 - overallRatio and,
+          for 'eep_3', c_2 = x2 - 3. Differentiating these w.r.t. a parameter p gives the linear system
+          
+            | H   -J^T | | dx/dp   |   | -d(grad V)/dp |
+            | J    0   | | dlam/dp | = | -dc/dp        |     with H = hess(V) - sum(lam_k * hess(c_k))
+        
+        so no re-optimization is needed. Gradients of V are computed by complex step, second derivatives by
+          central differences of the complex-step gradient. Planet numbers are treated as continuous.
+          
+        Returns:
+          dx_dR : (3,)   d(stage ratios)/d(overallRatio)
+          dx_dB : (3,3)  d(stage ratios)/d(planet_numbers), column j is planet_numbers[j]
+        '''
+        
+        x = np.array(stageRatio, dtype=float).flatten()
+        B = np.array(planet_numbers, dtype=float).flatten()
+        n = len(x)
+        
+        def grad(x, B):
+            ''' complex-step gradient of gearboxVolume w.r.t. x '''
+            h = 1e-30
+            g = np.zeros(n)
+            for i in range(n):
+                xc = x.astype(complex)
+                xc[i] += 1j * h
+                g[i] = gearboxVolume(xc, config, B).imag / h
+            return g
+        
+        def central(func, v, k):
+            ''' central difference of vector function func w.r.t. v[k] '''
+            dv = 1e-6 * max(abs(v[k]), 1.0)
+            vp = v.copy()
+            vm = v.copy()
+            vp[k] += dv
+            vm[k] -= dv
+            return (func(vp) - func(vm)) / (2 * dv)
+        
+        # equality constraints active at the optimum
+        J = [[x[1] * x[2], x[0] * x[2], x[0] * x[1]]]
+        Hc = [np.array([[0.0,  x[2], x[1]], 
+                        [x[2], 0.0,  x[0]], 
+                        [x[1], x[0], 0.0]])]
+        dc_dR = [-1.0]
+        if config == 'eep_3':
+            J.append([0.0, 0.0, 1.0])
+            Hc.append(np.zeros((3, 3)))
+            dc_dR.append(0.0)
+        J = np.array(J)
+        m = J.shape[0]
+        
+        g = grad(x, B)
+        lam = np.linalg.lstsq(J.T, g, rcond=None)[0]
+        
+        H = np.column_stack([central(lambda xx: grad(xx, B), x, k) for k in range(n)])
+        H = 0.5 * (H + H.T)
+        for k in range(m):
+            H -= lam[k] * Hc[k]
+        
+        KKT = np.zeros((n + m, n + m))
+        KKT[:n, :n] = H
+        KKT[:n, n:] = -J.T
+        KKT[n:, :n] = J
+        
+        rhs = np.zeros((n + m, 1 + len(B)))
+        rhs[n:, 0] = -np.array(dc_dR)
+        for k in range(len(B)):
+            rhs[:n, 1 + k] = -central(lambda bb: grad(x, bb), B, k)
+        
+        sol = np.linalg.solve(KKT, rhs)
+        dx_dR = sol[:n, 0]
+        dx_dB = sol[:n, 1:]
+        
+        return dx_dR, dx_dB
+
+    def compute_partials(self):
+        '''
+        Analytic partial derivatives of the outputs of the last call to compute() w.r.t. gear_ratio, rotor_torque, 
+          rotor_diameter, gearbox_input_cm and shaft_angle. Stage ratio sensitivities come from stageRatioSensitivity().
+          
+        Returns a dictionary keyed on (output, input) - missing pairs are zero.
+        Kfact in gearboxWeightEst() is piecewise constant in torque, so the stage masses are linear in torque.
+        '''
+        
+        ratios = np.array(self.stageRatio, dtype=float).flatten()
+        dx_dR, dx_dB = self.stageRatioSensitivity(ratios, self.gear_ratio, self.planet_numbers, self.gear_configuration)
+        self.dStageRatio_dGearRatio = dx_dR
+        self.dStageRatio_dPlanetNumbers = dx_dB
+        
+        # stage masses as a function of the ratios, via complex step
+        nstage = len(ratios)
+        torque = float(np.ravel(self.rotor_torque)[0])
+        def stageMasses(r):
+            masses = np.zeros(nstage, dtype=complex)
+            torqueTemp = torque
+            for s in range(nstage):
+                torqueTemp = torqueTemp / r[s]
+                masses[s] = torqueTemp * stageMassFactor(r[s], self.planet_numbers[s], self.stageType[s])
+            return masses
+        
+        m0 = stageMasses(ratios.astype(complex)).real
+        sm = np.array(self.stageMass, dtype=float).flatten()
+        scale = sm[0] / m0[0] if m0[0] != 0 else 0.0   # Kunit * Ka / Kfact
+        
+        dsm_dx = np.zeros((nstage, nstage))
+        for k in range(nstage):
+            rc = ratios.astype(complex)
+            rc[k] += 1e-30j
+            dsm_dx[:, k] = scale * stageMasses(rc).imag / 1e-30
+        Kshaft = self.gearbox_mass / sm.sum() if sm.sum() != 0 else 0.0
+        
+        dsm_dR = dsm_dx.dot(dx_dR)
+        dsm_dT = sm / torque
+        dm_dR = Kshaft * dsm_dR.sum()
+        dm_dT = Kshaft * dsm_dT.sum()
+        
+        D = float(np.ravel(self.rotor_diameter)[0])
+        I = np.array(self.gearbox_I, dtype=float).flatten()
+        Iperm = I / self.gearbox_mass if self.gearbox_mass != 0 else np.zeros(len(I))
+
+        J = {}
+        J['stage_masses', 'gear_ratio'] = dsm_dR.reshape(nstage, 1)
+        J['stage_masses', 'rotor_torque'] = dsm_dT.reshape(nstage, 1)
+        J['gearbox_mass', 'gear_ratio'] = np.array([[dm_dR]])
+        J['gearbox_mass', 'rotor_torque'] = np.array([[dm_dT]])
+        J['gearbox_cm', 'gearbox_input_cm'] = np.array([[1.0], [0.0], [0.0]])
+        J['gearbox_cm', 'rotor_diameter'] = np.array([[0.0], [0.0], [0.4 * 0.015]])
+        J['gearbox_I', 'gear_ratio'] = (Iperm * dm_dR).reshape(-1, 1)
+        J['gearbox_I', 'rotor_torque'] = (Iperm * dm_dT).reshape(-1, 1)
+        J['gearbox_I', 'rotor_diameter'] = (2.0 * I / D).reshape(-1, 1) # I scales with D**2 for fixed mass
+        # turning gearbox_I by a further small angle about the same axis is the same as changing shaft_angle
+        h = 1e-6
+        J['gearbox_I', 'shaft_angle'] = ((rotateI(I, rotationMatrix(h)) - rotateI(I, rotationMatrix(-h))) / (2.0 * h)).reshape(-1, 1)
+        J['gearbox_length', 'rotor_diameter'] = np.array([[0.012]])
+        J['gearbox_height', 'rotor_diameter'] = np.array([[0.015]])
+        J['gearbox_diameter', 'rotor_diameter'] = np.array([[0.75 * 0.015]])
+        
+        return J
+
 #-------------------------------------------------------------------------
 
 
@@ -1663,130 +1882,220 @@ class Bedplate(object):
           It contains an update method to determine the mass, mass properties, and dimensions of the component.
     '''
 
-    def __init__(self, uptower_transformer=True, debug=False):
+    def __init__(self, uptower_transformer=True, debug=False, sizing='step', catalogue=None, beam_model='cantilever', fe_elements=20):
 
         super(Bedplate, self).__init__()
 
         self.uptower_transformer = uptower_transformer #Bool(iotype = 'in', desc = 'Boolean stating if transformer is uptower')
 
         self.debug = debug
+        self.log = get_logger('Bedplate', debug)
+        
+        # 'step'      : legacy sizing - grow the section by fixed steps until stress and deflection limits are met
+        # 'bisect'    : find the minimal feasible section scale by bracketing and bisection (see sizeSection())
+        # 'catalogue' : lightest feasible section from a table of standard sections (see selectSection())
+        #                 catalogue is a drivese_bedplate.SectionCatalogue, the name of a csv section table 
+        #                 or None for the built-in welded plate girder table
+        if sizing not in ['step', 'bisect', 'catalogue']:
+            raise ValueError("Bedplate sizing must be 'step', 'bisect' or 'catalogue', not '{}'".format(sizing))
+        self.sizing = sizing
+        
+        self.catalogue = None
+        if sizing == 'catalogue':
+            if catalogue is None:
+                catalogue = bp.default_catalogue()
+            elif not isinstance(catalogue, bp.SectionCatalogue):
+                catalogue = bp.load_catalogue(catalogue)
+            self.catalogue = catalogue
+            
+        # 'cantilever' : deflections from superposition of the midDeflection()/distDeflection() tip formulas
+        # 'fe'         : deflections from an Euler-Bernoulli finite element model of each half, with nodes
+        #                  at the component mounts (drivese_bedplate.CantileverFE). Root stresses are unchanged.
+        if beam_model not in ['cantilever', 'fe']:
+            raise ValueError("Bedplate beam_model must be 'cantilever' or 'fe', not '{}'".format(beam_model))
+        self.beam_model = beam_model
+        self.fe_elements = fe_elements
+        
+        # (rearScale, frontScale) - if set, 'bisect' sizing evaluates these sections instead of searching (see compute_partials())
+        self.fixedScales = (None, None)
+        
+    def setSection(self, scale):
+        ''' Set I-beam dimensions from the sizing scale parameter: scale = n gives the section
+              after n legacy sizing steps (scale = 0 is the initial section)
+        '''
+        self.tf, self.tw, self.b0, self.h0 = [float(x) for x in bp.scaled_sections(scale)]
+
+    def sizeSection(self, characterize, stressMax, scaleTol=1e-6, scale=None):
+        '''
+        Find the minimal section scale (see setSection()) that meets the stress and deflection limits
+          by bracketing and bisection. Both constraints are assumed to become less critical as the section grows.
+        
+        characterize : characterize_Bedplate_Rear or characterize_Bedplate_Front
+        stressMax    : allowable stress for the section material (self.deflMax must be set)
+        scale        : if given, no search is done and this section is evaluated
+        
+        Returns (scale, active) where active is 'stress', 'deflection' or 'minimum_section' (initial section is feasible)
+        The section dims and characterized values left in self.* are those of the returned scale.
+        '''
+        
+        def margins(scale):
+            self.setSection(scale)
+            characterize()
+            self.sectionEvaluations += 1
+            return (self.rootStress * self.stress_mult / stressMax - 1.0, 
+                    self.totalTipDefl / self.deflMax - 1.0)
+        
+        self.sectionEvaluations = 0
+        
+        if scale is not None:
+            gs, gd = margins(scale)
+            return scale, 'stress' if gs >= gd else 'deflection'
+        
+        gs, gd = margins(0.0)
+        if gs <= 0 and gd <= 0:
+            return 0.0, 'minimum_section'
+        
+        # bracket
+        lo = 0.0
+        hi = 1.0
+        while max(margins(hi)) > 0:
+            lo = hi
+            hi *= 2.0
+            if hi > 1e6:
+                raise RuntimeError('Bedplate::sizeSection(): no feasible section found')
+        
+        # bisect
+        while hi - lo > scaleTol:
+            mid = 0.5 * (lo + hi)
+            if max(margins(mid)) > 0:
+                lo = mid
+            else:
+                hi = mid
+                
+        gs, gd = margins(hi)
+        active = 'stress' if gs >= gd else 'deflection'
+        
+        return hi, active
         
     # functions used in bedplate sizing
     def midDeflection(self, totalLength, loadLength, load, E, I):
         ''' Eq. 2.154 - tip deflection for load applied at x (Eq. 2.66 in 2015 rpt) '''
-        defl = load * loadLength**2.0 * \
-            (3.0 * totalLength - loadLength) / (6.0 * E * I)
-        return defl
+        return bp.mid_deflection(totalLength, loadLength, load, E, I)
     
     def distDeflection(self, totalLength, distWeight, E, I):
         ''' Eq. 2.155 - tip deflection for distributed load (Eq. 2.67 in 2015 rpt)'''
-        defl = distWeight * totalLength**4 / (8.0 * E * I)
-        return defl
+        return bp.dist_deflection(totalLength, distWeight, E, I)
+        
+    def rearSection(self, tf, tw, b0, h0):
+        ''' Tip deflection, root stress and mass of candidate rear sections (arrays allowed) under the current loads '''
+        tipDefl, rootStress, mass = bp.bedplate_rear_section(tf, tw, b0, h0, self.rearTotalLength,
+                    self.hss_location, self.hss_mass, self.generator_location, self.generator_mass,
+                    self.convLoc, self.convMass, self.transLoc, self.transformer_mass,
+                    self.gearbox_location, self.gearbox_mass,
+                    E=self.steelE, density=self.steelDensity, g=self.g)
+        if self.beam_model == 'fe':
+            I_b, A = bp.ibeam_properties(tf, tw, b0, h0)
+            tipDefl = self.rearFE.max_deflection(I_b, A * self.steelDensity * self.g, self.steelE, self.rearFEPointDefl)
+        return tipDefl, rootStress, mass
+        
+    def frontSection(self, tf, tw, b0, h0):
+        ''' Tip deflection, root stress and mass of candidate front sections (arrays allowed) under the current loads '''
+        tipDefl, rootStress, mass = bp.bedplate_front_section(tf, tw, b0, h0, self.frontTotalLength,
+                    self.gearbox_location, self.gearbox_mass, self.mb1_cm[0], self.mb1_mass, self.mb2_cm[0], self.mb2_mass,
+                    self.lss_location, self.lss_mass, self.rotorLoc, self.rotor_mass, self.rotorFz, self.rotorMy,
+                    E=self.castE, density=self.castDensity, g=self.g)
+        if self.beam_model == 'fe':
+            I_b, A = bp.ibeam_properties(tf, tw, b0, h0)
+            tipDefl = self.frontFE.max_deflection(I_b, A * self.castDensity * self.g, self.castE, self.frontFEPointDefl)
+        return tipDefl, rootStress, mass
+        
+    def setupRearFE(self):
+        ''' FE model of a rear beam (cached factorization) and its deflection (EI = 1) under the mount loads '''
+        locations = [self.hss_location, self.generator_location, self.convLoc, self.transLoc, self.gearbox_location]
+        weights = [self.hss_mass, self.generator_mass, self.convMass, self.transformer_mass, self.gearbox_mass]
+        self.rearFE = bp.cantilever_fe(self.rearTotalLength, locations, self.fe_elements)
+        self.rearFEPointDefl = self.rearFE.solve(self.rearFE.nodal_loads(locations, [m * self.g / 2.0 for m in weights]))
+        
+    def setupFrontFE(self):
+        ''' FE model of a front beam (cached factorization) and its deflection (EI = 1) under the mount and rotor loads '''
+        locations = [self.gearbox_location, self.mb1_cm[0], self.mb2_cm[0], self.lss_location, self.rotorLoc, self.rotorLoc]
+        forces = [self.gearbox_mass * self.g / 2.0, self.mb1_mass * self.g / 2.0, self.mb2_mass * self.g / 2.0, 
+                  self.lss_mass * self.g / 2.0, self.rotor_mass * self.g / 2.0, self.rotorFz / 2.0]
+        self.frontFE = bp.cantilever_fe(self.frontTotalLength, locations[:5], self.fe_elements)
+        self.frontFEPointDefl = self.frontFE.solve(self.frontFE.nodal_loads(locations, forces, tip_moment=self.rotorMy / 2.0))
         
     def characterize_Bedplate_Rear(self):
         '''
-        Evaluate stresses and deflections on the rear (steel) section of bedplate
+        Evaluate stresses and deflections on the rear (steel) section of bedplate for the current self.tf, tw, b0, h0
         
-        Many of the 'self.*' member variables could be local:
-            - all the *TipDefl vbls
-            - rootStress, totalBendingMoment, bi, hi, I_b, A, w
-        This function just needs to set: totalSteelMass rearTotalTipDefl rearBendingStress
-          (similarly for characterize_Bedplate_Front)
+        The calculation is done by drivese_bedplate.bedplate_rear_section(). This sets:
+          totalTipDefl rootStress totalSteelMass rearTotalTipDefl rearBendingStress
+        With several load cases the deflection and stress are the worst over the cases.
         '''
-        self.bi = (self.b0 - self.tw) / 2.0
-        self.hi = self.h0 - 2.0 * self.tf
-        self.I_b = self.b0 * self.h0**3 / 12.0 - 2 * self.bi * self.hi**3 / 12.0
-        self.A = self.b0 * self.h0 - 2.0 * self.bi * self.hi
-        self.w = self.A * self.steelDensity # mass per linear foot
-        
-        # Tip Deflection for load not at end
-
-        self.hssTipDefl = self.midDeflection(
-            self.rearTotalLength, self.hss_location,       self.hss_mass * self.g / 2,         self.steelE, self.I_b)
-        self.genTipDefl = self.midDeflection(
-            self.rearTotalLength, self.generator_location, self.generator_mass * self.g / 2,   self.steelE, self.I_b)
-        self.convTipDefl = self.midDeflection(
-            self.rearTotalLength, self.convLoc,            self.convMass * self.g / 2,         self.steelE, self.I_b)
-        self.transTipDefl = self.midDeflection(
-            self.rearTotalLength, self.transLoc,           self.transformer_mass * self.g / 2, self.steelE, self.I_b)
-        self.gearboxTipDefl = self.midDeflection(
-            self.rearTotalLength, self.gearbox_location,   self.gearbox_mass * self.g / 2,     self.steelE, self.I_b)
-        self.selfTipDefl = self.distDeflection(
-            self.rearTotalLength,                          self.w * self.g,                    self.steelE, self.I_b)
-  
-        self.totalTipDefl = self.hssTipDefl + self.genTipDefl + self.convTipDefl \
-            + self.transTipDefl + self.gearboxTipDefl + self.selfTipDefl
-  
-        # root stress
-        self.totalBendingMoment = (self.hss_location * self.hss_mass 
-                                 + self.generator_location * self.generator_mass 
-                                 + self.convLoc * self.convMass 
-                                 + self.transLoc * self.transformer_mass 
-                                 + self.w * self.rearTotalLength**2 / 2.0) * self.g
-        self.rootStress = self.totalBendingMoment * self.h0 / (2. * self.I_b)
-  
-        # mass
-        self.steelVolume = self.A * self.rearTotalLength
-        self.steelMass = self.steelVolume * self.steelDensity
-  
-        # 2 parallel I-beams
-        self.totalSteelMass = 2.0 * self.steelMass
-  
+        tipDefl, rootStress, self.totalSteelMass = self.rearSection(self.tf, self.tw, self.b0, self.h0)
+        self.totalTipDefl, self.rootStress = self.envelope('rear', tipDefl, rootStress)
         self.rearTotalTipDefl = self.totalTipDefl
         self.rearBendingStress = self.rootStress
 
     def characterize_Bedplate_Front(self):
         '''
-        Evaluate stresses and deflections on the front (cast) section of bedplate
+        Evaluate stresses and deflections on the front (cast) section of bedplate for the current self.tf, tw, b0, h0
+        
+        The calculation is done by drivese_bedplate.bedplate_front_section(). This sets:
+          totalTipDefl rootStress totalCastMass frontTotalTipDefl frontBendingStress
+        With several load cases the deflection and stress are the worst over the cases.
         '''
-        self.bi = (self.b0 - self.tw) / 2.0
-        self.hi = self.h0 - 2.0 * self.tf
-        self.I_b = self.b0 * self.h0**3 / 12.0 - 2 * self.bi * self.hi**3 / 12.0
-        self.A = self.b0 * self.h0 - 2.0 * self.bi * self.hi
-        self.w = self.A * self.castDensity
-  
-        # Tip Deflection for load not at end
-        self.gearboxTipDefl = self.midDeflection(
-            self.frontTotalLength, self.gearbox_location, self.gearbox_mass * self.g / 2.0, self.castE, self.I_b)
-            #self.frontTotalLength, self.gearbox_mass, self.gearbox_mass * self.g / 2.0, self.castE, self.I_b)  Mass should be loc!
-        self.mb1TipDefl = self.midDeflection(
-            self.frontTotalLength, self.mb1_cm[0],    self.mb1_mass * self.g / 2.0,     self.castE, self.I_b)
-        self.mb2TipDefl = self.midDeflection(
-            self.frontTotalLength, self.mb2_cm[0],    self.mb2_mass * self.g / 2.0,     self.castE, self.I_b)
-        self.lssTipDefl = self.midDeflection(
-            self.frontTotalLength, self.lss_location, self.lss_mass * self.g / 2.0,     self.castE, self.I_b)
-        self.rotorTipDefl = self.midDeflection(
-            self.frontTotalLength, self.rotorLoc,     self.rotor_mass * self.g / 2.0,   self.castE, self.I_b)
-        self.rotorFzTipDefl = self.midDeflection(
-            self.frontTotalLength, self.rotorLoc,     self.rotorFz / 2.0,               self.castE, self.I_b)
-        self.selfTipDefl = self.distDeflection(
-            self.frontTotalLength,                    self.w * self.g,                  self.castE, self.I_b)
-
-        self.rotorMyTipDefl = self.rotorMy / 2.0 \
-            * self.frontTotalLength**2 / (2.0 * self.castE * self.I_b)
-  
-        self.totalTipDefl = self.gearboxTipDefl + self.mb1TipDefl + self.mb2TipDefl + self.lssTipDefl  \
-            + self.rotorTipDefl + self.rotorFzTipDefl + self.selfTipDefl + self.rotorMyTipDefl
-  
-        # root stress
-        self.totalBendingMoment = (  self.mb1_cm[0] * self.mb1_mass / 2.0 
-                                   + self.mb2_cm[0] * self.mb2_mass / 2.0 
-                                   + self.lss_location * self.lss_mass / 2.0 
-                                   + self.w * self.frontTotalLength**2 / 2.0 
-                                   + self.rotorLoc * self.rotor_mass / 2.0) * self.g \
-            + self.rotorLoc * self.rotorFz / 2.0 \
-            + self.rotorMy / 2.0
-        self.rootStress = self.totalBendingMoment * self.h0 / 2 / self.I_b
-  
-        # mass
-        self.castVolume = self.A * self.frontTotalLength
-        self.castMass = self.castVolume * self.castDensity
-  
-        # 2 parallel I-beams
-        self.totalCastMass = 2.0 * self.castMass
+        tipDefl, rootStress, self.totalCastMass = self.frontSection(self.tf, self.tw, self.b0, self.h0)
+        self.totalTipDefl, self.rootStress = self.envelope('front', tipDefl, rootStress)
         self.frontTotalTipDefl = self.totalTipDefl
         self.frontBendingStress = self.rootStress
 
+    def envelope(self, side, tipDefl, rootStress):
+        '''
+        Worst tip deflection and root stress over the load cases for one section.
+          The index of the governing load case for each constraint is stored in 
+          self.governing_case['<side>_deflection'] and self.governing_case['<side>_stress']
+        '''
+        tipDefl = np.atleast_1d(tipDefl)
+        rootStress = np.atleast_1d(rootStress)
+        iDefl = int(np.argmax(tipDefl))
+        iStress = int(np.argmax(rootStress))
+        self.governing_case[side + '_deflection'] = iDefl
+        self.governing_case[side + '_stress'] = iStress
+        return float(tipDefl[iDefl]), float(rootStress[iStress])
+
+    def selectSection(self, characterize, section, stressMax):
+        '''
+        Catalogue sizing: select the lightest catalogue section that meets the stress and deflection 
+          limits (no tolerances) and characterize it. Returns the section name.
+        '''
+        idx = self.catalogue.lightest_feasible(section, stressMax, self.deflMax, stress_mult=self.stress_mult)
+        if idx < 0:
+            raise RuntimeError('Bedplate::selectSection(): no feasible section in {}'.format(self.catalogue))
+        self.tf, self.tw, self.b0, self.h0 = self.catalogue.section(idx)
+        characterize()
+        return str(self.catalogue.names[idx])
+
+    def searchSection(self, characterize, section, stressMax):
+        '''
+        Legacy sizing: the section is grown by 2 mm (tf, tw) and 6 mm (b0, h0) per step until the 
+          stress and deflection limits are met (within stressTol and deflTol).
+          
+        All candidate sections are evaluated in one pass with drivese_bedplate.search_legacy_sections().
+          As in the original loop, the final section is characterized and the dims are left one step 
+          past it (so the reported height and width are those of the next section).
+        Returns the number of sections visited by the original loop.
+        '''
+        k = bp.search_legacy_sections(section, stressMax, self.deflMax, 
+                                      stressTol=self.stressTol, deflTol=self.deflTol, stress_mult=self.stress_mult)
+        tf, tw, b0, h0 = bp.legacy_sections(k + 2)
+        self.tf, self.tw, self.b0, self.h0 = float(tf[k]), float(tw[k]), float(b0[k]), float(h0[k])
+        characterize()
+        self.tf, self.tw, self.b0, self.h0 = float(tf[k+1]), float(tw[k+1]), float(b0[k+1]), float(h0[k+1])
+        return k + 1
+
+    @memoize('Bedplate.compute', config=('uptower_transformer', 'sizing', 'catalogue', 'beam_model', 'fe_elements', 'fixedScales'),
+             state=ALL_STATE)
     def compute(self, gearbox_length, gearbox_location, gearbox_mass, hss_location, hss_mass, generator_location, generator_mass, \
                       lss_location, lss_mass, lss_length, mb1_cm, mb1_facewidth, mb1_mass, mb2_cm, mb2_mass, \
                       transformer_mass, transformer_cm, \
@@ -1797,8 +2106,8 @@ class Bedplate(object):
            Deflection constraints applied at each bedplate end
            Stress constraint checked at root of front and rear bedplate sections'''
 
-        if self.debug:
-            sys.stderr.write('GBox loc {} mass {}\n'.format(gearbox_location, gearbox_mass))
+        if self.log.enabled():
+            self.log.debug('GBox loc {gearbox_location} mass {gearbox_mass}', gearbox_location=gearbox_location, gearbox_mass=gearbox_mass)
         
         #variables
         self.gearbox_length = gearbox_length #Float(iotype = 'in', units = 'm', desc = 'gearbox length')
@@ -1830,7 +2139,7 @@ class Bedplate(object):
         #outputs
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')    
+        self.I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')    
         self.length = 0.0 #Float(iotype='out', units='m', desc='length of bedplate')
         self.height = 0.0 #Float(iotype='out', units='m', desc='max height of bedplate')
         self.width = 0.0 #Float(iotype='out', units='m', desc='width of bedplate')
@@ -1876,16 +2185,25 @@ class Bedplate(object):
         self.frontTotalLength = mb1_cm + self.mb1_facewidth / 2.
 
         # rotor weights and loads
+        #   rotor_bending_moment_y and rotor_force_z may be arrays of load cases: every candidate section is
+        #   checked against all cases at once and sized to the worst (see envelope())
         self.rotorLoc = mb1_cm + distance_hub2mb
-        self.rotorFz = abs(self.rotor_force_z)
-        self.rotorMy = abs(self.rotor_bending_moment_y)
+        if np.ndim(self.rotor_force_z) > 0 or np.ndim(self.rotor_bending_moment_y) > 0:
+            self.rotorFz, self.rotorMy = [np.abs(np.ravel(x).astype(float)) 
+                                          for x in np.broadcast_arrays(self.rotor_force_z, self.rotor_bending_moment_y)]
+        else:
+            self.rotorFz = abs(self.rotor_force_z)
+            self.rotorMy = abs(self.rotor_bending_moment_y)
 
         # If user does not know important moment, crude approx
-        if self.rotor_mass > 0 and self.rotorMy == 0:
-            self.rotorMy = get_My(self.rotor_mass, distance_hub2mb)
-
-        if self.rotorFz == 0 and self.rotor_mass > 0:
-            self.rotorFz = self.rotor_mass * self.g
+        if self.rotor_mass > 0:
+            self.rotorMy = np.where(self.rotorMy == 0, get_My(self.rotor_mass, distance_hub2mb), self.rotorMy)
+            self.rotorFz = np.where(self.rotorFz == 0, self.rotor_mass * self.g, self.rotorFz)
+        self.nLoadCases = np.size(self.rotorFz)
+        if self.nLoadCases == 1:
+            self.rotorFz = float(self.rotorFz)
+            self.rotorMy = float(self.rotorMy)
+        self.governing_case = {}
 
         self.defl_denom = 1500.  # factor in deflection check
         self.stressTol = 5e5
@@ -1907,8 +2225,9 @@ class Bedplate(object):
         else:
             self.gearbox_location = self.gearbox_location
             self.gearbox_mass = self.gearbox_mass
-        if self.debug:
-            sys.stderr.write('GBox REAR  loc {} mass {}\n'.format(self.gearbox_location, self.gearbox_mass))
+        if self.log.enabled():
+            self.log.debug('GBox REAR  loc {gearbox_location} mass {gearbox_mass}', gearbox_location=self.gearbox_location,
+                           gearbox_mass=self.gearbox_mass)
 
         self.rootStress = 250e6  # initial value
         self.totalTipDefl = 1.0  # initial value
@@ -1916,19 +2235,18 @@ class Bedplate(object):
         self.stressMax = 620e6  # yield of alloy steel
         self.deflMax = self.rearTotalLength / self.defl_denom
 
-        counter = 0
-        while (self.rootStress * self.stress_mult - self.steelStressMax) > self.stressTol \
-           or (self.totalTipDefl - self.deflMax) > self.deflTol:
-
-            counter += 1
-
-            self.characterize_Bedplate_Rear()
+        if self.beam_model == 'fe':
+            self.setupRearFE()
 
-            self.tf += 0.002
-            self.tw += 0.002
-            self.b0 += 0.006
-            self.h0 += 0.006
-            rearCounter = counter
+        if self.sizing == 'bisect':
+            self.rearScale, self.rearActiveConstraint = self.sizeSection(self.characterize_Bedplate_Rear, self.steelStressMax, 
+                                                                         scale=self.fixedScales[0])
+            rearCounter = self.sectionEvaluations
+        elif self.sizing == 'catalogue':
+            self.rearSectionName = self.selectSection(self.characterize_Bedplate_Rear, self.rearSection, self.steelStressMax)
+            rearCounter = 1
+        else:
+            rearCounter = self.searchSection(self.characterize_Bedplate_Rear, self.rearSection, self.steelStressMax)
 
         self.rearHeight = self.h0
         
@@ -1942,8 +2260,9 @@ class Bedplate(object):
         else: 
             self.gearbox_location = 0
             self.gearbox_mass = 0
-        if self.debug:
-            sys.stderr.write('GBox FRONT loc {} mass {}\n'.format(self.gearbox_location, self.gearbox_mass))
+        if self.log.enabled():
+            self.log.debug('GBox FRONT loc {gearbox_location} mass {gearbox_mass}', gearbox_location=self.gearbox_location,
+                           gearbox_mass=self.gearbox_mass)
 
         self.E = 169e9 #EN-GJS-400-18-LT http://www.claasguss.de/html_e/pdf/THBl2_engl.pdf
         self.castDensity = 7100
@@ -1960,33 +2279,20 @@ class Bedplate(object):
         self.deflMax = self.frontTotalLength/self.defl_denom
         self.stressMax = 200e6
         
-        counter = 0
-        
-        while (self.rootStress*self.stress_mult - self.castStressMax) >  self.stressTol \
-           or (self.totalTipDefl - self.deflMax) >  self.deflTol:
-            counter += 1
-            self.characterize_Bedplate_Front()
-            self.tf += 0.002 
-            self.tw += 0.002
-            self.b0 += 0.006
-            self.h0 += 0.006
-            
-            frontCounter=counter
+        if self.beam_model == 'fe':
+            self.setupFrontFE()
+
+        if self.sizing == 'bisect':
+            self.frontScale, self.frontActiveConstraint = self.sizeSection(self.characterize_Bedplate_Front, self.castStressMax, 
+                                                                           scale=self.fixedScales[1])
+            frontCounter = self.sectionEvaluations
+        elif self.sizing == 'catalogue':
+            self.frontSectionName = self.selectSection(self.characterize_Bedplate_Front, self.frontSection, self.castStressMax)
+            frontCounter = 1
+        else:
+            frontCounter = self.searchSection(self.characterize_Bedplate_Front, self.frontSection, self.castStressMax)
+        count_iterations(rearCounter + frontCounter)
             
-            '''
-            if self.debug:
-                scalc = self.rootStress*self.stress_mult - self.castStressMax
-                dcalc = self.totalTipDefl - self.deflMax
-                sflag = ' '
-                dflag = ' '
-                if scalc <= self.stressTol:
-                    sflag = '*'
-                if dcalc <= self.deflTol:
-                    dflag = '*'
-                sys.stderr.write('BP:front: {:3d} ST {:.1f} calc {:.1f} {} DT {:.5f} calc {:.5f} {}\n'.format(counter,
-                        self.stressTol, scalc, sflag,
-                        self.deflTol, dcalc, dflag))
-            '''
         self.frontHeight = self.h0
   
         # ----------- ----- -------------------
@@ -2010,25 +2316,127 @@ class Bedplate(object):
   
         self.depth = (self.bedplate_length / 2.0)
   
-        I = np.zeros(3)
-        I[0]  = self.mass * (self.width ** 2 + self.depth ** 2) / 8
-        I[1]  = self.mass * (self.depth ** 2 + self.width ** 2 + (4/3) * self.bedplate_length ** 2) / 16
-        I[2]  = I[1]
-        self.I = I
-
-        if self.debug:
-            sys.stderr.write('Bedplate: mass {:.1f} cast {:.1f} steel {:.1f} L {:.1f} m H {:.1f} m W {:.1f} m\n'.format(self.mass, 
-                             self.totalCastMass, self.totalSteelMass, self.bedplate_length, self.height, self.width))
-            sys.stderr.write('Bedplate: frontLen {:.1f} m rearLen {:.1f} m nFront {} nRear {} \n'.format(self.frontTotalLength, 
-                             self.rearTotalLength, frontCounter, rearCounter))
-            sys.stderr.write('  LSS         {:5.2f} m  {:8.1f} kg\n'.format(self.lss_location, self.lss_mass))
-            sys.stderr.write('  HSS         {:5.2f} m  {:8.1f} kg\n'.format(self.hss_location, self.hss_mass))
-            sys.stderr.write('  Gearbox     {:5.2f} m  {:8.1f} kg\n'.format(gearbox_location, gearbox_mass))
-            sys.stderr.write('  Generator   {:5.2f} m  {:8.1f} kg\n'.format(self.generator_location, self.generator_mass))
-            sys.stderr.write('  Transformer {:5.2f} m  {:8.1f} kg\n'.format(self.transformer_location, self.transformer_mass))
+        I0 = self.mass * (self.width ** 2 + self.depth ** 2) / 8
+        I1 = self.mass * (self.depth ** 2 + self.width ** 2 + (4/3) * self.bedplate_length ** 2) / 16
+        self.I = principalI(I0, I1, I1)
+
+        if self.log.enabled():
+            self.log.debug('Bedplate: mass {mass:.1f} cast {cast_mass:.1f} steel {steel_mass:.1f} L {length:.1f} m H {height:.1f} m W {width:.1f} m',
+                           mass=self.mass, cast_mass=self.totalCastMass, steel_mass=self.totalSteelMass, length=self.bedplate_length,
+                           height=self.height, width=self.width)
+            self.log.debug('Bedplate: frontLen {front_length:.1f} m rearLen {rear_length:.1f} m nFront {front_steps} nRear {rear_steps} ',
+                           front_length=self.frontTotalLength, rear_length=self.rearTotalLength, front_steps=frontCounter, rear_steps=rearCounter)
+            for name, location, mass in [('LSS', self.lss_location, self.lss_mass), ('HSS', self.hss_location, self.hss_mass),
+                                         ('Gearbox', gearbox_location, gearbox_mass),
+                                         ('Generator', self.generator_location, self.generator_mass),
+                                         ('Transformer', self.transformer_location, self.transformer_mass)]:
+                self.log.debug('  {part:11s} {location:5.2f} m  {mass:8.1f} kg', part=name, location=location, mass=mass)
             
         return (self.mass, self.cm, self.I, self.bedplate_length, self.height, self.width)
 
+    def compute_partials(self, *args, **kwargs):
+        '''
+        Partial derivatives of the bedplate outputs, called with the same arguments as compute().
+        
+        Only the continuous sizing has derivatives, so this needs sizing='bisect': the 'step' and 'catalogue'
+          sizings are piecewise constant in the inputs (zero or spiky finite differences), and the partials of
+          the bisect relaxation would not be those of the outputs they compute.
+        The section scale s of sizeSection() is continuous. There the active constraint g(s, p) = 0 for each 
+          of the rear and front sections, and the implicit function theorem gives ds/dp = -(dg/dp) / (dg/ds).
+          The outputs are chained through s. The explicit partials at fixed s are smooth and are taken by 
+          central differences - one-sided for inputs at 0, in the direction that keeps the branch compute() takes at 0:
+          forward for the locations (a backward step on gearbox_location crosses from '== 0' to '< 0' and moves the
+          gearbox onto the front section), backward for the masses, distance_hub2mb and transformer_cm ('> 0' switches).
+          That is two compute() calls at fixed sections per scalar input, about 70 in all.
+        Sections at the minimum size (no active constraint) have ds/dp = 0.
+        
+        Returns a dictionary keyed on (output, input) - missing pairs are zero.
+        '''
+        
+        if self.sizing != 'bisect':
+            raise ValueError("Bedplate::compute_partials(): partials need sizing='bisect', not '{}'".format(self.sizing))
+        
+        inputNames = ['gearbox_length', 'gearbox_location', 'gearbox_mass', 'hss_location', 'hss_mass', 'generator_location', 'generator_mass',
+                      'lss_location', 'lss_mass', 'lss_length', 'mb1_cm', 'mb1_facewidth', 'mb1_mass', 'mb2_cm', 'mb2_mass',
+                      'transformer_mass', 'transformer_cm',
+                      'tower_top_diameter', 'rotor_diameter', 'machine_rating', 'rotor_mass', 'rotor_bending_moment_y', 'rotor_force_z',
+                      'flange_length', 'distance_hub2mb']
+        inputs = dict(zip(inputNames, args))
+        inputs.update(kwargs)
+        inputs = dict((k, np.array(v, dtype=float)) for k, v in inputs.items())
+        
+        outputNames = ['bedplate_mass', 'bedplate_cm', 'bedplate_I', 'bedplate_length', 'bedplate_height', 'bedplate_width']
+        outputSizes = [1, 3, 6, 1, 1, 1]
+        
+        bpl = Bedplate(self.uptower_transformer, sizing='bisect', beam_model=self.beam_model, fe_elements=self.fe_elements)
+        Bedplate.compute.uncached(bpl, **inputs)
+        scales = (bpl.rearScale, bpl.frontScale)
+        active = (bpl.rearActiveConstraint, bpl.frontActiveConstraint)
+        
+        def evaluate(x, scales):
+            ''' outputs and constraint margins [g_rear, g_front] for fixed section scales '''
+            bpl.fixedScales = scales
+            out = Bedplate.compute.uncached(bpl, **x)
+            g = np.zeros(2)
+            for k, (stress, defl, length, stressMax) in enumerate([
+                    (bpl.rearBendingStress,  bpl.rearTotalTipDefl,  bpl.rearTotalLength,  bpl.steelStressMax),
+                    (bpl.frontBendingStress, bpl.frontTotalTipDefl, bpl.frontTotalLength, bpl.castStressMax)]):
+                if active[k] == 'stress':
+                    g[k] = stress * bpl.stress_mult / stressMax - 1.0
+                elif active[k] == 'deflection':
+                    g[k] = defl / (length / bpl.defl_denom) - 1.0
+            return np.hstack([np.ravel(o) for o in out]), g
+        
+        # scale sensitivities of the outputs and the active constraints
+        nout = sum(outputSizes)
+        dy_ds = np.zeros((nout, 2))
+        dg_ds = np.ones(2)
+        for k in range(2):
+            h = 1e-4 * max(1.0, scales[k])
+            sp, sm = list(scales), list(scales)
+            sp[k] += h
+            sm[k] -= h
+            yp, gp = evaluate(inputs, tuple(sp))
+            ym, gm = evaluate(inputs, tuple(sm))
+            dy_ds[:, k] = (yp - ym) / (2 * h)
+            if active[k] != 'minimum_section':
+                dg_ds[k] = (gp[k] - gm[k]) / (2 * h)
+        
+        forward = ['gearbox_location', 'hss_location', 'generator_location', 'lss_location', 'mb1_cm', 'mb2_cm']
+        J = {}
+        for name in inputNames:
+            x0 = inputs[name]
+            dy_dp = np.zeros((nout, x0.size))
+            for i in range(x0.size):
+                xi = float(x0.flat[i])
+                h = 1e-6 * max(1.0, abs(xi))
+                if xi != 0:
+                    steps = (h, -h)
+                elif name in forward:
+                    steps = (h, 0.0)
+                else:
+                    steps = (0.0, -h)
+                res = []
+                for step in steps:
+                    x = dict(inputs)
+                    x[name] = x0.copy()
+                    x[name].flat[i] = xi + step
+                    res.append(evaluate(x, scales))
+                dp = steps[0] - steps[1]
+                dydp = (res[0][0] - res[1][0]) / dp
+                dgdp = (res[0][1] - res[1][1]) / dp
+                ds_dp = -dgdp / dg_ds
+                dy_dp[:, i] = dydp + dy_ds.dot(ds_dp)
+            
+            start = 0
+            for out, size in zip(outputNames, outputSizes):
+                block = dy_dp[start:start+size, :]
+                start += size
+                if np.any(block != 0):
+                    J[out, name] = block
+        
+        return J
+
 #---------------------------------------------------------------------------------------------------------------
 
 class YawSystem(object):
@@ -2057,7 +2465,7 @@ class YawSystem(object):
         #outputs
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')    
+        self.I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')    
 
         if self.yaw_motors_number == 0 :
           if self.rotor_diameter < 90.0 :
@@ -2085,9 +2493,9 @@ class YawSystem(object):
         cm[2] = -self.bedplate_height
         self.cm = cm
   
-        # assuming 0 MOI for yaw system (ie mass is nonrotating)
-        I = np.zeros(3)
-        self.I = I
+        # friction plate and motors taken as a thin ring on the tower top (vertical axis z)
+        ring_I = self.mass * (self.tower_top_diameter / 2.0) ** 2
+        self.I = principalI(ring_I / 2.0, ring_I / 2.0, ring_I)
 
         return(self.mass, self.cm, self.I)
 
@@ -2120,7 +2528,7 @@ class Transformer(object):
         #outputs
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')    
+        self.I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')    
 
         if self.uptower_transformer:
             # function places transformer where tower top CM is within tower bottom OD to reduce tower moments
@@ -2153,15 +2561,11 @@ class Transformer(object):
             def get_I(d1,d2,mass):
                 return mass*(d1**2 + d2**2)/12.
             
-            I = np.zeros(3)
-            I[0] = get_I(height, width,  self.mass)
-            I[1] = get_I(length, height, self.mass)
-            I[2] = get_I(length, width,  self.mass)
-            self.I = I
+            self.I = principalI(get_I(height, width,  self.mass), get_I(length, height, self.mass), get_I(length, width,  self.mass))
             
         else:
             self.cm = np.zeros(3)
-            self.I = self.cm.copy()
+            self.I = np.zeros(6)
             self.mass = 0.
 
         return(self.mass, self.cm, self.I)
@@ -2180,7 +2584,7 @@ class HighSpeedSide(object):
 
         super(HighSpeedSide, self).__init__()
 
-    def compute(self, rotor_diameter, rotor_torque, gear_ratio, lss_diameter, gearbox_length, gearbox_height, gearbox_cm, length_in):
+    def compute(self, rotor_diameter, rotor_torque, gear_ratio, lss_diameter, gearbox_length, gearbox_height, gearbox_cm, length_in, shaft_angle=0.0):
 
         # variables
         self.rotor_diameter = rotor_diameter #Float(iotype='in', units='m', desc='rotor diameter')
@@ -2191,11 +2595,12 @@ class HighSpeedSide(object):
         self.gearbox_height = gearbox_height #Float(iotype='in', units = 'm', desc = 'gearbox height')
         self.gearbox_cm = gearbox_cm #Array(iotype = 'in', units = 'm', desc = 'gearbox cm [x,y,z]')
         self.length_in = length_in #Float(iotype = 'in', units = 'm', desc = 'high speed shaft length determined by user. Default 0.5m')
+        self.shaft_angle = shaft_angle #Float(iotype='in', units='rad', desc='Angle of the LSS inclindation with respect to the horizontal')
     
         # returns
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.length = 0.0 #Float(iotype='out', desc='length of high speed shaft')
 
         # compute masses, dimensions and cost
@@ -2223,11 +2628,9 @@ class HighSpeedSide(object):
         cm[2]   = self.gearbox_cm[2]+self.gearbox_height*0.2
         self.cm = cm
   
-        I = np.zeros(3)
-        I[0]    = 0.25 * hss_length * 3.14159 * matlDensity * (diameter ** 2) * (self.gear_ratio**2) * (diameter ** 2) / 8.
-        I[1]    = self.mass * ((3/4.) * (diameter ** 2) + (hss_length ** 2)) / 12.
-        I[2]    = I[1]
-        self.I = I
+        I0 = 0.25 * hss_length * 3.14159 * matlDensity * (diameter ** 2) * (self.gear_ratio**2) * (diameter ** 2) / 8.
+        I1 = self.mass * ((3/4.) * (diameter ** 2) + (hss_length ** 2)) / 12.
+        self.I = principalI(I0, I1, I1, self.shaft_angle)
 
         return(self.mass, self.cm, self.I, self.hss_length)
 
@@ -2248,7 +2651,7 @@ class Generator(object):
 
         self.drivetrain_design = drivetrain_design #Enum('geared', ('geared', 'single_stage', 'multi_drive', 'pm_direct_drive'), iotype='in')
        
-    def compute(self, rotor_diameter, machine_rating, gear_ratio, hss_length, hss_cm, rotor_rpm):
+    def compute(self, rotor_diameter, machine_rating, gear_ratio, hss_length, hss_cm, rotor_rpm, shaft_angle=0.0):
 
         # variables
         self.rotor_diameter = rotor_diameter #Float(iotype='in', units='m', desc='rotor diameter')
@@ -2257,11 +2660,12 @@ class Generator(object):
         self.hss_length = hss_length #Float( iotype = 'in', units = 'm', desc='length of high speed shaft and brake')
         self.hss_cm = hss_cm #Array(np.array([0.0,0.0,0.0]), iotype = 'in', units = 'm', desc='cm of high speed shaft and brake')
         self.rotor_rpm = rotor_rpm #Float(iotype='in', units='rpm', desc='Speed of rotor at rated power')
+        self.shaft_angle = shaft_angle #Float(iotype='in', units='rad', desc='Angle of the LSS inclindation with respect to the horizontal')
     
         # returns
         self.mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.I = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.I = np.zeros(6) #Array(np.zeros(6), iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
 
         # coefficients based on generator configuration
         massCoeff = [None, 6.4737, 10.51 ,  5.34  , 37.68  ]
@@ -2303,14 +2707,12 @@ class Generator(object):
         cm[2]  = self.hss_cm[2]
         self.cm = cm
   
-        I = np.zeros(3)
-        I[0]   = 4.86e-5 * self.rotor_diameter**5.333 \
-                + (2./3. * self.mass) * (depth**2 + width**2) / 8.
-        I[1]   = I[0] / 2. / self.gear_ratio**2 \
-                 + 1. / 3. * self.mass * length**2 / 12. \
-                 + 2. / 3. * self.mass * (depth**2. + width**2. + 4./3. * length**2.) / 16.
-        I[2]   = I[1]
-        self.I = I 
+        I0 = 4.86e-5 * self.rotor_diameter**5.333 \
+             + (2./3. * self.mass) * (depth**2 + width**2) / 8.
+        I1 = I0 / 2. / self.gear_ratio**2 \
+             + 1. / 3. * self.mass * length**2 / 12. \
+             + 2. / 3. * self.mass * (depth**2. + width**2. + 4./3. * length**2.) / 16.
+        self.I = principalI(I0, I1, I1, self.shaft_angle)
 
         return(self.mass, self.cm, self.I)
 
@@ -2433,16 +2835,16 @@ class RNASystemAdder(object):
         self.RNA_mass = 0.0 #Float(iotype = 'out', units='kg', desc='mass of total RNA')
         self.RNA_cm = 0.0 #Float(iotype='out', units='m', desc='RNA CM along x-axis')
 
-        if self.rotor_mass > 0:
-            rotor_mass = self.rotor_mass
-        else:
-            [rotor_mass] = get_rotor_mass(self.machine_rating,False)
+        [default_rotor_mass] = get_rotor_mass(self.machine_rating,False)
+        rotor_mass = np.where(np.asarray(self.rotor_mass) > 0, self.rotor_mass, default_rotor_mass)
 
-        masses = np.array([rotor_mass, self.lss_mass, self.mb1_mass,self.mb2_mass,self.gearbox_mass,self.hss_mass,self.generator_mass])
-        cms = np.array([(-self.overhang), self.lss_cm[0], self.mb1_cm[0], self.mb2_cm[0], self.gearbox_cm[0], self.hss_cm[0], self.generator_cm[0]])
-        
-        self.RNA_mass = np.sum(masses)
-        self.RNA_cm = np.sum(masses*cms)/np.sum(masses)
+        # the rotor sits at -overhang along x; only the x cm is used
+        parts = MassProperties.stack([rotor_mass, self.lss_mass, self.mb1_mass, self.mb2_mass, self.gearbox_mass, self.hss_mass, self.generator_mass],
+                                     [np.multiply.outer(-np.asarray(self.overhang), [1.0, 0.0, 0.0]), self.lss_cm, self.mb1_cm, self.mb2_cm,
+                                      self.gearbox_cm, self.hss_cm, self.generator_cm])
+
+        self.RNA_mass = parts.mass.sum(axis=-1)
+        self.RNA_cm = parts.center()[..., 0]
         
         return(self.RNA_mass, self.RNA_cm)
 
@@ -2462,7 +2864,7 @@ class NacelleSystemAdder(object): #added to drive to include transformer
                       hss_mass, generator_mass, bedplate_mass, mainframe_mass, \
                       lss_cm, mb1_cm, mb2_cm, gearbox_cm, hss_cm, generator_cm, bedplate_cm, \
                       lss_I, mb1_I, mb2_I, gearbox_I, hss_I, generator_I, bedplate_I, \
-                      transformer_mass, transformer_cm, transformer_I):
+                      transformer_mass, transformer_cm, transformer_I, yaw_cm=None, yaw_I=None):
 
         # variables
         self.above_yaw_mass = above_yaw_mass #Float(iotype='in', units='kg', desc='mass above yaw system')
@@ -2492,47 +2894,35 @@ class NacelleSystemAdder(object): #added to drive to include transformer
         self.transformer_mass = transformer_mass #Float(iotype = 'in', units='kg', desc='component mass')
         self.transformer_cm = transformer_cm #Array(np.array([0.0,0.0,0.0]),iotype = 'in', units='kg', desc='component CM')
         self.transformer_I = transformer_I #Array(np.array([0.0,0.0,0.0]),iotype = 'in', units='kg', desc='component I')
+        self.yaw_cm = np.zeros(3) if yaw_cm is None else yaw_cm #Array(np.array([0.0,0.0,0.0]),iotype = 'in', units='m', desc='component CM')
+        self.yaw_I = np.zeros(6) if yaw_I is None else yaw_I #Array(np.zeros(6),iotype = 'in', units='kg*m**2', desc='component I')
     
         # returns
         self.nacelle_mass = 0.0 #Float(0.0, iotype='out', units='kg', desc='overall component mass')
         self.nacelle_cm = np.zeros(3) #Array(np.array([0.0, 0.0, 0.0]), units='m', iotype='out', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.nacelle_I = np.zeros(3) # Array(np.array([0.0, 0.0, 0.0]), units='kg*m**2', iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.nacelle_I = np.zeros(6) # Array(np.zeros(6), units='kg*m**2', iotype='out', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
 
         # aggregation of nacelle mass
         self.nacelle_mass = (self.above_yaw_mass + self.yaw_mass)
-  
-        # calculation of mass center and moments of inertia
-        self.nacelle_cm = ( (self.lss_mass*self.lss_cm
-                           + self.transformer_mass*self.transformer_cm 
-                           + self.mb1_mass*self.mb1_cm 
-                           + self.mb2_mass*self.mb2_cm 
-                           + self.gearbox_mass*self.gearbox_cm 
-                           + self.hss_mass*self.hss_cm 
-                           + self.generator_mass*self.generator_cm 
-                           + self.mainframe_mass*self.bedplate_cm 
-                           + self.yaw_mass*np.zeros(3))
-                      / (self.lss_mass + self.mb1_mass + self.mb2_mass + self.gearbox_mass +
-                         self.hss_mass + self.generator_mass + self.mainframe_mass + self.yaw_mass) )
-  
-        # calculating MOI, at nacelle center of gravity with origin at tower top center / yaw mass center, ignoring masses of non-drivetrain components / auxiliary systems
 
-        def appendI(xmass, xcm, xI):
-            r    = xcm - self.nacelle_cm
-            Icg  = assembleI( np.r_[xI, np.zeros(3)] ) # not used
-            Iadd = xmass*(np.dot(r, r)*np.eye(3) - np.outer(r, r))
-            return Iadd
-
-        I   = np.zeros((3,3))
-        I += appendI(self.lss_mass, self.lss_cm, self.lss_I)
-        I += appendI(self.hss_mass, self.hss_cm, self.hss_I)
-        I += appendI(self.mb1_mass, self.mb1_cm, self.mb1_I)
-        I += appendI(self.mb2_mass, self.mb2_cm, self.mb2_I)
-        I += appendI(self.gearbox_mass, self.gearbox_cm, self.gearbox_I)
-        I += appendI(self.transformer_mass, self.transformer_cm, self.transformer_I)
-        I += appendI(self.generator_mass, self.generator_cm, self.generator_I)
+        # components stacked along the last axis (after any leading design axis)
         # Mainframe mass includes bedplate mass and other components that assume the bedplate cm
-        I += appendI(self.mainframe_mass, self.bedplate_cm, (self.mainframe_mass/self.bedplate_mass)*self.bedplate_I)
-        self.nacelle_I = unassembleI(I)
+        bedplate_scale = np.divide(self.mainframe_mass, self.bedplate_mass, out=np.zeros(np.shape(self.bedplate_mass)),
+                                   where=np.asarray(self.bedplate_mass) != 0)
+        parts = MassProperties.stack([self.lss_mass, self.hss_mass, self.mb1_mass, self.mb2_mass, self.gearbox_mass,
+                                      self.transformer_mass, self.generator_mass, self.mainframe_mass, self.yaw_mass],
+                                     [self.lss_cm, self.hss_cm, self.mb1_cm, self.mb2_cm, self.gearbox_cm,
+                                      self.transformer_cm, self.generator_cm, self.bedplate_cm, self.yaw_cm],
+                                     [self.lss_I, self.hss_I, self.mb1_I, self.mb2_I, self.gearbox_I,
+                                      self.transformer_I, self.generator_I, np.asarray(bedplate_scale)[..., np.newaxis] * self.bedplate_I,
+                                      self.yaw_I])
+
+        # calculation of mass center - the transformer does not count in the total mass
+        self.nacelle_cm = parts.first_moment() \
+                          / (parts.mass.sum(axis=-1) - parts.mass[..., 5])[..., np.newaxis]
+
+        # calculating MOI, at nacelle center of gravity with origin at tower top center / yaw mass center, ignoring masses of non-drivetrain components / auxiliary systems
+        self.nacelle_I = parts.total(self.nacelle_cm).I
 
         return(self.nacelle_mass, self.nacelle_cm, self.nacelle_I)
 
@@ -2540,6 +2930,6 @@ class NacelleSystemAdder(object): #added to drive to include transformer
         
 if __name__ == '__main__':
 
-    '''TODO: add full drivetrain examples in pure python'''
+    # full drivetrain examples in pure python are in drivese_pipeline.py
 
     pass
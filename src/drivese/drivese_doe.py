@@ -0,0 +1,270 @@
+"""
+drivese_doe.py
+
+Design-of-experiments runner for the Drive3pt / Drive4pt drivetrain (pure-python pipeline, drivese_pipeline.py).
+
+The sample table is a struct of arrays: a dict of input columns of length N (planet_numbers may be (N, 3)).
+Inputs that are not in the table are taken from a base record, e.g. example_5MW_baseline_record().
+The table is split into chunks that are evaluated by a pool of worker processes, each of which builds
+one DrivetrainModel and reuses it for all of its samples. Each finished chunk is written to the output
+directory as a columnar .npz file (one array per input / output name) as soon as it comes back, so
+  - an interrupted run resumes where it stopped: chunks that are already on disk are not recomputed
+  - a sample that raises an error does not stop the run: its outputs are NaN and the exception
+    is recorded in the 'error' column ('' for samples that ran)
+When all chunks are done they are gathered into one results file (results.npz).
+
+Usage:
+    samples = latin_hypercube({'rotor_diameter': (100., 140.), 'overhang': (4., 6.)}, 1000)
+    runner = DOERunner('doe_5MW', dict(mb1Type='SRB', IEC_Class='B', ...), base_record=example_5MW_baseline_record())
+    results = runner.run(samples)   # dict of columns
+
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import hashlib
+import itertools
+import multiprocessing
+import traceback
+
+import numpy as np
+
+from drivese.drivese_cache import enable_default_cache, get_default_cache, set_default_cache
+from drivese.drivese_pipeline import DrivetrainModel, DRIVETRAIN_INPUTS
+
+MANIFEST_FILENAME = 'manifest.json'
+RESULTS_FILENAME = 'results.npz'
+CHUNK_FILENAME = 'chunk_{:06d}.npz'
+
+#-------------------------------------------------------------------------
+# Sample tables
+
+def latin_hypercube(bounds, n, seed=None):
+    ''' Latin hypercube of n samples - bounds is a dict of name: (lower, upper). Returns a dict of columns '''
+    rng = np.random.RandomState(seed)
+    samples = {}
+    for name in sorted(bounds):
+        lower, upper = bounds[name]
+        u = (rng.permutation(n) + rng.uniform(size=n)) / n
+        samples[name] = lower + u * (upper - lower)
+    return samples
+
+def full_factorial(levels):
+    ''' All combinations of the levels - levels is a dict of name: sequence of values. Returns a dict of columns '''
+    names = sorted(levels)
+    rows = list(itertools.product(*[levels[name] for name in names]))
+    return dict((name, np.array([row[i] for row in rows], dtype=float)) for i, name in enumerate(names))
+
+def sample_count(samples):
+    ''' Number of rows of a sample table (all columns must have the same length) '''
+    lengths = set(len(np.asarray(column)) for column in samples.values())
+    if len(lengths) != 1:
+        raise ValueError('sample columns have different lengths: {}'.format(sorted(lengths)))
+    return lengths.pop()
+
+def _sample_record(samples, base_record, i):
+    ''' Input record of sample i - scalars as python floats, as in a single run of the model '''
+    record = dict(base_record)
+    for name, column in samples.items():
+        value = column[i]
+        record[name] = value.item() if np.ndim(value) == 0 else value
+    return record
+
+def _table_hash(samples, base_record):
+    ''' Digest of the sample table and base record - a resumed run must be given the same ones '''
+    h = hashlib.sha1()
+    for name in sorted(samples):
+        h.update(name.encode('utf-8'))
+        h.update(np.ascontiguousarray(samples[name], dtype=float).tobytes())
+    for name in sorted(base_record):
+        h.update(name.encode('utf-8'))
+        h.update(np.ascontiguousarray(base_record[name], dtype=float).tobytes())
+    return h.hexdigest()
+
+#-------------------------------------------------------------------------
+# Worker side - one model per process
+
+_worker_model = None
+
+def _init_worker(model_kwargs, use_cache):
+    '''
+    Pool initializer: build the drivetrain model once for this process
+      Returns the memo store it replaced, so that a run in the calling process can put it back.
+    '''
+    global _worker_model
+    previous = get_default_cache()
+    if use_cache:
+        enable_default_cache()
+    else:
+        # the samples are all different, so the memo store would only add writes
+        set_default_cache(None)
+    _worker_model = DrivetrainModel(**model_kwargs)
+    return previous
+
+def evaluate_chunk(model, samples, base_record):
+    '''
+    Evaluate every sample of a (chunk of a) sample table with one model.
+    Returns (outputs, errors): outputs is a dict of arrays with a row per sample (NaN for failed samples),
+      errors a list with the exception of each failed sample ('' for the others)
+    '''
+    n = sample_count(samples)
+    rows = []
+    errors = []
+    for i in range(n):
+        try:
+            rows.append(model.compute(_sample_record(samples, base_record, i)))
+            errors.append('')
+        except Exception:
+            exc_type, exc_value = sys.exc_info()[:2]
+            rows.append(None)
+            errors.append(''.join(traceback.format_exception_only(exc_type, exc_value)).strip())
+
+    outputs = {}
+    template = next((row for row in rows if row is not None), None)
+    if template is not None:
+        for name, value in template.items():
+            shape = np.shape(value)
+            column = np.full((n,) + shape, np.nan)
+            for i, row in enumerate(rows):
+                if row is not None:
+                    column[i] = row[name]
+            outputs[name] = column
+    return outputs, errors
+
+def _run_chunk(task):
+    k, samples, base_record = task
+    return (k,) + evaluate_chunk(_worker_model, samples, base_record)
+
+#-------------------------------------------------------------------------
+# Parent side
+
+class DOERunner(object):
+    ''' DOERunner class
+          Runs a sample table through DrivetrainModel(**model_kwargs) on a pool of worker processes,
+          writing one columnar file per chunk into output_dir and gathering them in results.npz.
+    '''
+
+    def __init__(self, output_dir, model_kwargs, base_record=None, chunk_size=100, jobs=None, use_cache=False, verbose=False):
+
+        super(DOERunner, self).__init__()
+
+        self.output_dir = output_dir
+        self.model_kwargs = dict(model_kwargs)
+        self.base_record = dict(base_record or {})
+        self.chunk_size = int(chunk_size)
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.use_cache = use_cache
+        self.verbose = verbose
+        self.computed_chunks = []  # chunks evaluated by the last run() (the others were already on disk)
+
+    def chunk_path(self, k):
+        return os.path.join(self.output_dir, CHUNK_FILENAME.format(k))
+
+    def check_manifest(self, n, digest):
+        ''' Write the run description, or check that it matches the one of the run being resumed '''
+        manifest = dict(n_samples=n, chunk_size=self.chunk_size, table_hash=digest,
+                        model_kwargs=dict((k, v) for k, v in self.model_kwargs.items()))
+        path = os.path.join(self.output_dir, MANIFEST_FILENAME)
+        if os.path.exists(path):
+            with open(path) as f:
+                previous = json.load(f)
+            if previous != json.loads(json.dumps(manifest)):
+                raise ValueError('DOERunner: {} holds a different run (samples, chunk size or model) - '
+                                 'use a new output directory'.format(self.output_dir))
+        else:
+            with open(path, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def write_chunk(self, k, index, samples, outputs, errors):
+        ''' Write one chunk atomically (a partial file is never taken for a finished chunk on resume) '''
+        columns = dict(('in:' + name, np.asarray(column)) for name, column in samples.items())
+        columns.update(('out:' + name, column) for name, column in outputs.items())
+        columns['sample'] = index
+        columns['error'] = np.array(errors, dtype=str)
+        tmp = self.chunk_path(k) + '.tmp.npz'
+        np.savez(tmp, **columns)
+        os.rename(tmp, self.chunk_path(k))
+
+    def run(self, samples):
+        '''
+        Evaluate the sample table (dict of columns) - returns the gathered results (see load_results()).
+          Chunks already in output_dir from an interrupted run with the same table are reused.
+        '''
+        samples = dict((name, np.asarray(column)) for name, column in samples.items())
+        unknown = [name for name in samples if name not in DRIVETRAIN_INPUTS]
+        if unknown:
+            raise ValueError('DOERunner: unknown inputs {}'.format(unknown))
+        n = sample_count(samples)
+
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+        self.check_manifest(n, _table_hash(samples, self.base_record))
+
+        bounds = [(start, min(start + self.chunk_size, n)) for start in range(0, n, self.chunk_size)]
+        todo = [k for k in range(len(bounds)) if not os.path.exists(self.chunk_path(k))]
+        tasks = [(k, dict((name, column[slice(*bounds[k])]) for name, column in samples.items()), self.base_record)
+                 for k in todo]
+        chunk_samples = dict((task[0], task[1]) for task in tasks)
+        self.computed_chunks = []
+
+        previous = None
+        if self.jobs == 1 or len(tasks) <= 1:
+            previous = _init_worker(self.model_kwargs, self.use_cache)
+            results = (_run_chunk(task) for task in tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(min(self.jobs, len(tasks)), initializer=_init_worker,
+                                        initargs=(self.model_kwargs, self.use_cache))
+            results = pool.imap_unordered(_run_chunk, tasks)
+        try:
+            for k, outputs, errors in results:
+                start, stop = bounds[k]
+                self.write_chunk(k, np.arange(start, stop), chunk_samples[k], outputs, errors)
+                self.computed_chunks.append(k)
+                if self.verbose:
+                    print('chunk {} of {}: samples {}-{}, {} failed'.format(len(self.computed_chunks), len(tasks),
+                          start, stop - 1, sum(1 for e in errors if e)))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            else:
+                set_default_cache(previous)
+
+        results = load_results(self.output_dir)
+        np.savez(os.path.join(self.output_dir, RESULTS_FILENAME), **results)
+        return results
+
+def load_results(output_dir):
+    '''
+    Gather the chunk files of a run into one dict of columns, in sample order:
+      'sample', 'error', 'in:<input name>' and 'out:<output name>'.
+    Outputs missing from a chunk (every sample in it failed) are NaN.
+    '''
+    names = sorted(f for f in os.listdir(output_dir) if f.startswith('chunk_') and f.endswith('.npz') and '.tmp' not in f)
+    chunks = []
+    for name in names:
+        with np.load(os.path.join(output_dir, name)) as data:
+            chunks.append(dict((key, data[key]) for key in data.files))
+    if not chunks:
+        return {}
+
+    shapes = {}
+    for chunk in chunks:
+        for key, column in chunk.items():
+            shapes.setdefault(key, column.shape[1:])
+    results = {}
+    for key in sorted(shapes):
+        columns = []
+        for chunk in chunks:
+            if key in chunk:
+                columns.append(chunk[key])
+            else:
+                columns.append(np.full((len(chunk['sample']),) + shapes[key], np.nan))
+        results[key] = np.concatenate(columns)
+    order = np.argsort(results['sample'], kind='mergesort')
+    return dict((key, column[order]) for key, column in results.items())
@@ -0,0 +1,410 @@
+"""
+drivese_io.py
+
+Columnar batch input / output for fleets of turbines: turbine definitions in CSV or Parquet tables are read
+in chunks, mapped onto the drivetrain inputs by column name and units, evaluated with the vectorized
+drivetrain (drivese_vectorized.py) one chunk at a time, and written back out as typed columns.
+
+Input tables
+  - a column feeds the input of the same name (case and spaces ignored, so 'Rotor Diameter' is rotor_diameter);
+    column_map can map other names, e.g. {'D': 'rotor_diameter'}
+  - units are taken from the header, 'rotor_diameter [ft]' or 'machine_rating (MW)', or from the units
+    argument ({column: unit}), and converted to the units of the input (INPUT_UNITS); a column without
+    units is taken to be in the input's units
+  - planet_numbers is given as three columns planet_numbers_1, planet_numbers_2, planet_numbers_3
+  - inputs that are not in the table come from base_record; other columns are passed through to the output
+    when listed in keep_columns (e.g. a turbine id) - as they are, so a CSV id like 00123 stays text
+Output tables hold the kept columns followed by all the mass, cm, inertia and dimension outputs (OUTPUT_NAMES),
+  float64, in SI units given in the header (CSV) or the field metadata (Parquet). Vector outputs are split into
+  one column per component: nacelle_cm_x, nacelle_cm_y, nacelle_cm_z, nacelle_I_xx, ..., nacelle_I_yz.
+  The last column, error, is '' for the rows that were sized - as in drivese_doe, a row that fails does not
+  stop the run: its outputs are NaN and error says why.
+
+Parquet needs pyarrow, which is only imported when a Parquet file is read or written. When it is installed,
+the CSV writer also uses it (pyarrow.csv) to format the output rows.
+
+Usage:
+    run_table('fleet.csv', 'fleet_nacelles.parquet', dict(mb1Type='SRB', IEC_Class='B', ...),
+              base_record=example_5MW_baseline_record(), keep_columns=['turbine_id'])
+
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import csv
+import sys
+import traceback
+from collections import OrderedDict
+from math import pi
+
+import numpy as np
+
+from drivese.drivese_pipeline import DRIVETRAIN_INPUTS
+from drivese.drivese_vectorized import VectorizedDrivetrain, STATUS_MESSAGES
+
+# Units of the drivetrain inputs (those of the OpenMDAO parameters) - None for dimensionless inputs
+INPUT_UNITS = {'rotor_diameter': 'm', 'rotor_rpm': 'rpm', 'rotor_torque': 'N*m', 'rotor_thrust': 'N',
+               'rotor_bending_moment_x': 'N*m', 'rotor_bending_moment_y': 'N*m', 'rotor_bending_moment_z': 'N*m',
+               'rotor_force_y': 'N', 'rotor_force_z': 'N', 'machine_rating': 'kW', 'drivetrain_efficiency': None,
+               'gear_ratio': None, 'shaft_angle': 'rad', 'shaft_ratio': None, 'planet_numbers': None,
+               'shrink_disc_mass': 'kg', 'carrier_mass': 'kg', 'flange_length': 'm', 'overhang': 'm', 'distance_hub2mb': 'm',
+               'gearbox_input_xcm': 'm', 'hss_input_length': 'm', 'blade_mass': 'kg', 'blade_root_diameter': 'm',
+               'blade_length': 'm', 'tower_top_diameter': 'm', 'hub_flange_thickness': 'm'}
+
+# unit: (dimension, factor to the SI unit of the dimension)
+UNITS = {'m': ('length', 1.0), 'mm': ('length', 1e-3), 'cm': ('length', 1e-2), 'km': ('length', 1e3),
+         'ft': ('length', 0.3048), 'in': ('length', 0.0254),
+         'kg': ('mass', 1.0), 't': ('mass', 1e3), 'lbm': ('mass', 0.45359237),
+         'N': ('force', 1.0), 'kN': ('force', 1e3), 'MN': ('force', 1e6), 'lbf': ('force', 4.4482216152605),
+         'N*m': ('moment', 1.0), 'kN*m': ('moment', 1e3), 'MN*m': ('moment', 1e6),
+         'W': ('power', 1.0), 'kW': ('power', 1e3), 'MW': ('power', 1e6),
+         'rpm': ('speed', pi / 30.0), 'rad/s': ('speed', 1.0),
+         'rad': ('angle', 1.0), 'deg': ('angle', pi / 180.0),
+         'kg*m**2': ('inertia', 1.0)}
+
+# Outputs written to the output tables, with their units
+OUTPUT_NAMES = ['nacelle_mass', 'nacelle_cm', 'nacelle_I', 'nacelle_length', 'nacelle_width', 'nacelle_height',
+                'RNA_mass', 'RNA_cm', 'rotor_mass', 'above_yaw_mass',
+                'hub_mass', 'hub_cm', 'hub_diameter', 'hub_thickness', 'hub_I', 'hub_system_mass', 'hub_system_cm', 'hub_system_I',
+                'pitch_system_mass', 'spinner_mass',
+                'lss_mass', 'lss_cm', 'lss_I', 'lss_length', 'lss_diameter1', 'lss_diameter2',
+                'lss_mb1_facewidth', 'lss_mb2_facewidth',
+                'mb1_mass', 'mb1_cm', 'mb1_I', 'mb2_mass', 'mb2_cm', 'mb2_I',
+                'gearbox_mass', 'gearbox_cm', 'gearbox_I', 'gearbox_length', 'gearbox_height', 'gearbox_diameter',
+                'hss_mass', 'hss_cm', 'hss_I', 'hss_length',
+                'generator_mass', 'generator_cm', 'generator_I',
+                'bedplate_mass', 'bedplate_cm', 'bedplate_I', 'bedplate_length', 'bedplate_height', 'bedplate_width',
+                'transformer_mass', 'transformer_cm', 'transformer_I',
+                'yaw_mass', 'yaw_cm', 'yaw_I',
+                'electrical_mass', 'vs_electronics_mass', 'hvac_mass', 'controls_mass', 'platforms_mass', 'crane_mass',
+                'mainframe_mass', 'cover_mass']
+
+VECTOR_SUFFIXES = {'cm': ['x', 'y', 'z'], 'I': ['xx', 'yy', 'zz', 'xy', 'xz', 'yz']}
+
+#-------------------------------------------------------------------------
+# Names and units
+
+def unit_factor(from_unit, to_unit):
+    ''' Factor that converts values in from_unit to to_unit (same dimension) - None means dimensionless '''
+    if from_unit == to_unit:
+        return 1.0
+    if from_unit not in UNITS or to_unit not in UNITS:
+        raise ValueError('unknown unit {} (units are {})'.format(from_unit if from_unit not in UNITS else to_unit, sorted(UNITS)))
+    (from_dimension, from_factor), (to_dimension, to_factor) = UNITS[from_unit], UNITS[to_unit]
+    if from_dimension != to_dimension:
+        raise ValueError('can not convert {} ({}) to {} ({})'.format(from_unit, from_dimension, to_unit, to_dimension))
+    return from_factor / to_factor
+
+def split_header(header):
+    ''' 'Rotor Diameter [ft]' -> ('rotor_diameter', 'ft'); units may also be in (), and are optional '''
+    match = re.match(r'^\s*(.*?)\s*(?:[\[(]\s*([^\])]*?)\s*[\])])?\s*$', header)
+    name, unit = match.group(1), match.group(2)
+    return re.sub(r'\s+', '_', name).lower(), unit or None
+
+def output_unit(name):
+    if name.endswith('_mass'):
+        return 'kg'
+    if name.endswith('_I'):
+        return 'kg*m**2'
+    return 'm'
+
+def output_columns(name, value):
+    ''' Names of the table columns of an output (value: its (N,) or (N, k) array) '''
+    if np.ndim(value) == 1:
+        return [name]
+    suffixes = VECTOR_SUFFIXES[name.rsplit('_', 1)[1]]
+    return ['{}_{}'.format(name, suffix) for suffix in suffixes[:np.shape(value)[1]]]
+
+class ColumnMapping(object):
+    ''' ColumnMapping class
+          Which table column feeds which drivetrain input, and the factor that converts it to the input's units.
+          Built once from the header of a table, and applied to each chunk of it.
+    '''
+
+    def __init__(self, headers, column_map=None, units=None, keep_columns=None):
+
+        super(ColumnMapping, self).__init__()
+
+        column_map = dict(column_map or {})
+        mapped_names = dict((split_header(key)[0], value) for key, value in column_map.items())
+        units = dict(units or {})
+        self.inputs = {}  # input name: (column, factor)
+        self.planets = [None, None, None]
+        self.keep = list(keep_columns or [])
+
+        for header in headers:
+            name, unit = split_header(header)
+            name = column_map.get(header, mapped_names.get(name, name))
+            unit = units.get(header, unit)
+            planet = re.match(r'^planet_numbers_([123])$', name)
+            if planet:
+                self.planets[int(planet.group(1)) - 1] = header
+            elif name in DRIVETRAIN_INPUTS:
+                if name in self.inputs:
+                    raise ValueError('columns {} and {} both map to {}'.format(self.inputs[name][0], header, name))
+                self.inputs[name] = (header, 1.0 if unit is None else unit_factor(unit, INPUT_UNITS[name]))
+        if any(self.planets) and not all(self.planets):
+            raise ValueError('planet_numbers needs all of the columns planet_numbers_1, planet_numbers_2, planet_numbers_3')
+        missing = [name for name in self.keep if name not in headers]
+        if missing:
+            raise ValueError('keep_columns {} are not in the table'.format(missing))
+
+    def record(self, columns, base_record=None):
+        ''' Struct of arrays of drivetrain inputs for a chunk (dict of column: array) '''
+        record = dict(base_record or {})
+        for name, (column, factor) in self.inputs.items():
+            values = _float_column(columns[column])
+            record[name] = values * factor if factor != 1.0 else values
+        if all(self.planets):
+            record['planet_numbers'] = np.column_stack([_float_column(columns[column]) for column in self.planets])
+        return record
+
+#-------------------------------------------------------------------------
+# Readers - iterate over a table in chunks, each a dict of column: array
+
+def _table_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.csv', '.txt'):
+        return 'csv'
+    raise ValueError('unknown table format {} (.csv or .parquet)'.format(path))
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Parquet tables need pyarrow (pip install pyarrow)')
+    return pyarrow
+
+def _float_column(values):
+    ''' float array of a table column - text from a CSV is parsed, blanks are NaN '''
+    values = np.asarray(values)
+    try:
+        return values.astype(float)
+    except ValueError:
+        return np.array([v if v.strip() else 'nan' for v in values], dtype=float)
+
+def read_csv_chunks(path, chunk_size=10000):
+    ''' (headers, iterator over chunks) of a CSV file with a header row - the columns are str arrays, as in the file '''
+    f = open(path, 'r')
+    reader = csv.reader(f)
+    headers = [h.strip() for h in next(reader)]
+
+    def chunks():
+        try:
+            while True:
+                rows = []
+                for row in reader:
+                    if row:
+                        rows.append(row)
+                    if len(rows) == chunk_size:
+                        break
+                if not rows:
+                    return
+                yield dict((header, np.array(values, dtype=str)) for header, values in zip(headers, zip(*rows)))
+                if len(rows) < chunk_size:
+                    return
+        finally:
+            f.close()
+
+    return headers, chunks()
+
+def read_parquet_chunks(path, chunk_size=10000):
+    ''' (headers, iterator over chunks) of a Parquet file '''
+    pa = _import_pyarrow()
+    table = pa.parquet.ParquetFile(path)
+    headers = list(table.schema_arrow.names)
+
+    def chunks():
+        for batch in table.iter_batches(batch_size=chunk_size):
+            yield dict((header, batch.column(i).to_numpy(zero_copy_only=False)) for i, header in enumerate(batch.schema.names))
+
+    return headers, chunks()
+
+def read_table_chunks(path, chunk_size=10000):
+    if _table_format(path) == 'parquet':
+        return read_parquet_chunks(path, chunk_size)
+    return read_csv_chunks(path, chunk_size)
+
+#-------------------------------------------------------------------------
+# Writers - take chunks of output columns (dict of column: array, in a fixed order) with their units
+
+def _csv_quote(text):
+    # every str cell is quoted, as pyarrow.csv does
+    return '"' + text.replace('"', '""') + '"'
+
+def _import_pyarrow_csv():
+    ''' pyarrow with pyarrow.csv if it is installed, else None '''
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError:
+        return None
+    return pyarrow
+
+class CSVTableWriter(object):
+    ''' CSVTableWriter class
+          Floats are written as their shortest round-trip text. The rows are formatted by pyarrow.csv when
+          pyarrow is installed, else column by column in Python. Both quote every str cell; the text of a
+          float may differ between the two (5000 or 5000.0) but it reads back as the same value.
+    '''
+
+    def __init__(self, path):
+        super(CSVTableWriter, self).__init__()
+        self.f = open(path, 'w')
+        self.writer = csv.writer(self.f, lineterminator='\n')
+        self.headers = None
+        self.pa = _import_pyarrow_csv()
+
+    def write(self, columns, units):
+        if self.headers is None:
+            self.headers = list(columns)
+            self.writer.writerow(['{} [{}]'.format(name, units[name]) if units.get(name) else name for name in self.headers])
+            self.f.flush()
+        if self.pa is not None:
+            pa = self.pa
+            sink = pa.BufferOutputStream()
+            table = pa.Table.from_arrays([pa.array(columns[name]) for name in self.headers], names=self.headers)
+            pa.csv.write_csv(table, sink, pa.csv.WriteOptions(include_header=False))
+            self.f.write(sink.getvalue().to_pybytes().decode('utf-8'))
+            return
+        # each column is formatted in one pass, then the rows are joined
+        cells = []
+        for name in self.headers:
+            value = columns[name]
+            if value.dtype.kind == 'f':
+                cells.append(list(map(repr, value.tolist())))
+            else:
+                cells.append([_csv_quote(str(v)) for v in value])
+        self.f.writelines(','.join(row) + '\n' for row in zip(*cells))
+
+    def close(self):
+        self.f.close()
+
+class ParquetTableWriter(object):
+
+    def __init__(self, path):
+        super(ParquetTableWriter, self).__init__()
+        self.pa = _import_pyarrow()
+        self.path = path
+        self.writer = None
+
+    def write(self, columns, units):
+        pa = self.pa
+        if self.writer is None:
+            fields = [pa.field(name, pa.array(value[:0]).type, metadata={'units': units[name]} if units.get(name) else None)
+                      for name, value in columns.items()]
+            self.schema = pa.schema(fields)
+            self.writer = pa.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(pa.Table.from_arrays([pa.array(columns[name]) for name in self.schema.names], schema=self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def table_writer(path):
+    if _table_format(path) == 'parquet':
+        return ParquetTableWriter(path)
+    return CSVTableWriter(path)
+
+#-------------------------------------------------------------------------
+
+def output_table(outputs, names=OUTPUT_NAMES):
+    ''' Outputs of VectorizedDrivetrain.compute() -> (columns, units) of the output table '''
+    columns = OrderedDict()
+    units = {}
+    for name in names:
+        value = np.asarray(outputs[name], dtype=float)
+        for i, column in enumerate(output_columns(name, value)):
+            columns[column] = value if value.ndim == 1 else value[:, i]
+            units[column] = output_unit(name)
+    return columns, units
+
+def _row_record(record, i, N):
+    ''' Design i of a struct of arrays of N designs, as a struct of arrays of 1 design '''
+    row = {}
+    for name, value in record.items():
+        per_design = np.ndim(value) == (2 if name == 'planet_numbers' else 1) and len(value) == N
+        row[name] = value[i:i + 1] if per_design else value
+    return row
+
+def _errors(model, outputs, N):
+    ''' Why each of the N designs of outputs failed ('' for the designs that did not) '''
+    if 'status' in outputs:
+        return [STATUS_MESSAGES[status] for status in outputs['status']]
+    return list(getattr(model, 'errors', None) or [''] * N)
+
+def evaluate_record(model, record, N):
+    '''
+    model.compute(record) for a struct of arrays of N designs - returns (outputs, errors) as drivese_doe.evaluate_chunk():
+      outputs of the designs that failed are NaN, and errors holds why for each of them ('' for the others).
+      Failed designs are given by outputs['status'] (VectorizedDrivetrain) or model.errors (drivese_cli.PipelineEngine).
+      If compute() raises, the designs are run one at a time so that only the ones that raise are lost
+      (the exception is raised again if every design does).
+    '''
+    try:
+        outputs = model.compute(record)
+    except Exception:
+        if N == 1:
+            raise
+        rows = []
+        errors = []
+        for i in range(N):
+            try:
+                rows.append(model.compute(_row_record(record, i, N)))
+                errors.append(_errors(model, rows[-1], 1)[0])
+            except Exception:
+                exc_type, exc_value = sys.exc_info()[:2]
+                rows.append(None)
+                errors.append(''.join(traceback.format_exception_only(exc_type, exc_value)).strip())
+        template = next((row for row in rows if row is not None), None)
+        if template is None:
+            raise
+        outputs = {}
+        for name, value in template.items():
+            column = np.full((N,) + np.shape(value)[1:], np.nan)
+            for i, row in enumerate(rows):
+                if row is not None:
+                    column[i] = row[name][0]
+            outputs[name] = column
+        return outputs, errors
+
+    return outputs, _errors(model, outputs, N)
+
+def compute_chunk(model, mapping, chunk, base_record=None, outputs=OUTPUT_NAMES):
+    ''' Evaluate one chunk of an input table (dict of column: array) - returns (columns, units) of the output table '''
+    N = len(next(iter(chunk.values())))
+    record = mapping.record(chunk, base_record)
+    # inputs that all come from base_record are scalars - one of them sets the number of designs
+    record['rotor_diameter'] = np.broadcast_to(np.asarray(record.get('rotor_diameter', 0.0), dtype=float), (N,))
+    values, errors = evaluate_record(model, record, N)
+    columns, units = output_table(values, outputs)
+    table = OrderedDict((name, chunk[name]) for name in mapping.keep)
+    table.update(columns)
+    table['error'] = np.array(errors, dtype=str)
+    return table, units
+
+def run_table(input_path, output_path, model_kwargs, base_record=None, chunk_size=10000,
+              column_map=None, units=None, keep_columns=None, outputs=OUTPUT_NAMES):
+    '''
+    Evaluate every turbine (row) of a CSV / Parquet table and write the outputs to another one.
+      model_kwargs are the arguments of VectorizedDrivetrain (same as DrivetrainModel); see the module
+      docstring for the other arguments. Returns the number of rows written.
+    '''
+    model = VectorizedDrivetrain(**model_kwargs)
+    headers, chunks = read_table_chunks(input_path, chunk_size)
+    mapping = ColumnMapping(headers, column_map, units, keep_columns)
+    writer = table_writer(output_path)
+    n = 0
+    try:
+        for chunk in chunks:
+            writer.write(*compute_chunk(model, mapping, chunk, base_record, outputs))
+            n += len(chunk[headers[0]])
+    finally:
+        writer.close()
+    return n
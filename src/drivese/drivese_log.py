@@ -0,0 +1,233 @@
+"""
+drivese_log.py
+
+Debug / diagnostic logging of the DriveSE components, on top of the standard logging module.
+
+  - one logger per component, named 'drivese.<Component>' (e.g. drivese.LowSpeedShaft3pt, drivese.computeD),
+    so that the level can be set for a single component
+  - messages are str.format() templates, formatted only if the record is emitted; named fields of the
+    template are also kept on the record, as structured data
+  - components test log.enabled() before collecting their debug values, so with debug logging off
+    (the default) a debug message costs one level check
+  - records are written either as plain text (the message, as the old sys.stderr.write() debug lines)
+    or as JSON lines: {"time": ..., "level": ..., "component": ..., "message": ..., <fields>}
+
+Switching it on
+  - configure(levels={'Bedplate': 'DEBUG'}, json_format=True, filename='drivese.log')
+  - DRIVESE_LOG in the environment, read on `import drivese`:
+      DRIVESE_LOG=DEBUG                                     all components
+      DRIVESE_LOG=Bedplate=DEBUG,LowSpeedShaft3pt=DEBUG     selected components
+    with DRIVESE_LOG_FORMAT=json for JSON lines and DRIVESE_LOG_FILE=<file> to write to a file (default stderr)
+  - debug=True on a component logs that instance at every level (as before, the messages go to stderr unless
+    configure() has set up a handler) - the shared 'drivese.<Component>' logger and other instances are not changed
+Errors (e.g. unsupported hub configurations) are logged at ERROR and show on stderr without any setup.
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import logging
+
+import numpy as np
+
+ROOT = 'drivese'
+DEBUG = logging.DEBUG
+
+_loggers = {}  # component name: ComponentLogger
+
+#-------------------------------------------------------------------------
+
+class LazyMessage(object):
+    ''' LazyMessage class
+          A str.format() template and its arguments - formatted when the record is emitted, not when logged
+    '''
+    __slots__ = ('template', 'args', 'fields')
+
+    def __init__(self, template, args, fields):
+        self.template = template
+        self.args = args
+        self.fields = fields
+
+    def __str__(self):
+        return self.template.format(*self.args, **self.fields)
+
+class ComponentLogger(object):
+    ''' ComponentLogger class
+          The logger of one component: str.format() style messages with named fields kept as structured data
+          e.g.
+            log = get_logger('Gearbox')
+            if log.enabled():
+                log.debug('GBOX: Mass {mass:.1f} kg', mass=self.gearbox_mass)
+    '''
+
+    def __init__(self, name, debug=False):
+
+        super(ComponentLogger, self).__init__()
+
+        self.name = name
+        self.logger = logging.getLogger('{}.{}'.format(ROOT, name))
+        self.forced = debug  # debug=True of the component: emit whatever the level of the shared logger
+
+    def enabled(self, level=DEBUG):
+        return self.forced or self.logger.isEnabledFor(level)
+
+    def log(self, level, template, *args, **fields):
+        extra = {'component': self.name, 'fields': fields}
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, LazyMessage(template, args, fields), extra=extra)
+        elif self.forced:
+            # bypass the level of the shared logger for this instance only
+            record = self.logger.makeRecord(self.logger.name, level, '(unknown file)', 0, LazyMessage(template, args, fields),
+                                            (), None, extra=extra)
+            if _has_handlers(self.logger):
+                self.logger.handle(record)
+            else:
+                _debug_handler().handle(record)
+
+    def debug(self, template, *args, **fields):
+        self.log(logging.DEBUG, template, *args, **fields)
+
+    def info(self, template, *args, **fields):
+        self.log(logging.INFO, template, *args, **fields)
+
+    def warning(self, template, *args, **fields):
+        self.log(logging.WARNING, template, *args, **fields)
+
+    def error(self, template, *args, **fields):
+        self.log(logging.ERROR, template, *args, **fields)
+
+def get_logger(name, debug=False):
+    '''
+    The logger of component name - debug=True returns a logger of its own that emits at every level
+      (to stderr if no handler is set up), for the component instance that asked for it
+    '''
+    if debug:
+        return ComponentLogger(name, debug=True)
+    log = _loggers.get(name)
+    if log is None:
+        log = _loggers.setdefault(name, ComponentLogger(name))
+    return log
+
+#-------------------------------------------------------------------------
+# Output
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+class JSONFormatter(logging.Formatter):
+    ''' JSONFormatter class
+          One JSON object per record: time, level, component, message and the named fields of the message
+    '''
+
+    def format(self, record):
+        data = dict(time=record.created, level=record.levelname,
+                    component=getattr(record, 'component', record.name), message=record.getMessage())
+        for name, value in getattr(record, 'fields', {}).items():
+            data.setdefault(name, _jsonable(value))
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, sort_keys=True, default=str)
+
+class StderrHandler(logging.StreamHandler):
+    ''' StderrHandler class
+          Writes to the sys.stderr of the moment (so that redirections made after configure() are followed)
+    '''
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def configure(levels=None, json_format=False, filename=None, stream=None):
+    ''' Set up the drivese loggers
+          levels      : level of all components ('DEBUG') or {component or 'drivese': level}
+          json_format : JSON lines instead of the plain messages
+          filename    : file to append the records to; stream : file-like object (default sys.stderr)
+        Replaces the handler of an earlier configure(); returns the handler.
+    '''
+    if levels is None:
+        levels = {}
+    elif not isinstance(levels, dict):
+        levels = {ROOT: levels}
+    numeric = {}
+    for name, level in levels.items():
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+            if not isinstance(level, int):
+                raise ValueError('drivese_log: unknown level {!r} for {}'.format(levels[name], name))
+        numeric[name] = level
+
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        if getattr(handler, '_drivese', False):
+            root.removeHandler(handler)
+            handler.close()
+
+    if filename is not None:
+        handler = logging.FileHandler(filename)
+    elif stream is not None:
+        handler = logging.StreamHandler(stream)
+    else:
+        handler = StderrHandler()
+    handler._drivese = True
+    handler.setFormatter(JSONFormatter() if json_format else logging.Formatter('%(message)s'))
+    root.addHandler(handler)
+    root.propagate = False
+
+    for name, level in numeric.items():
+        if name == ROOT:
+            root.setLevel(level)
+        else:
+            get_logger(name).logger.setLevel(level)
+    return handler
+
+def _has_handlers(logger):
+    while logger is not None:
+        if logger.handlers:
+            return True
+        logger = logger.parent if logger.propagate else None
+    return False
+
+_stderr_handler = None
+
+def _debug_handler():
+    ''' Plain-text stderr handler for debug=True components when nothing is configured - not attached to any logger '''
+    global _stderr_handler
+    if _stderr_handler is None:
+        _stderr_handler = StderrHandler()
+        _stderr_handler.setFormatter(logging.Formatter('%(message)s'))
+    return _stderr_handler
+
+def parse_levels(spec):
+    ''' 'DEBUG' or 'Bedplate=DEBUG,LowSpeedShaft3pt=INFO' -> {name: level} '''
+    levels = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, level = item.rpartition('=')
+        levels[name.strip() if sep else ROOT] = level.strip()
+    return levels
+
+def configure_from_env():
+    ''' configure() from $DRIVESE_LOG, $DRIVESE_LOG_FORMAT and $DRIVESE_LOG_FILE (see the module docstring) '''
+    spec = os.environ.get('DRIVESE_LOG', '').strip()
+    if not spec:
+        return None
+    return configure(parse_levels(spec), json_format=os.environ.get('DRIVESE_LOG_FORMAT', '').strip().lower() == 'json',
+                     filename=os.environ.get('DRIVESE_LOG_FILE') or None)
@@ -18,11 +18,22 @@ These objects are defined in drivese_components.py (which contains NO OpenMDAO c
 
 import numpy as np
 import sys
+import copy
+import threading
+from contextlib import contextmanager
 
 from drivese.drivese_components import LowSpeedShaft4pt, LowSpeedShaft3pt, Gearbox, MainBearing, Bedplate, YawSystem, \
                                        Transformer, HighSpeedSide, Generator, NacelleSystemAdder, AboveYawMassAdder, RNASystemAdder
 from drivese.hubse_omdao import HubSE, HubMassOnlySE, Hub_CM_Adder_OM
-from openmdao.api import Group, Component, IndepVarComp, Problem, view_connections
+from drivese.drivese_profile import instrument_module
+from drivese.drivese_recorder import EvaluationRecorder
+from drivese.drivese_log import get_logger
+# the openmdao.api module pulls in every driver, solver and recorder - import only what is used here
+from openmdao.core.component import Component
+from openmdao.core.group import Group
+from openmdao.core.problem import Problem
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.recorders.base_recorder import BaseRecorder
 
 #-------------------------------------------------------------------------
 # Components
@@ -73,7 +84,7 @@ class LowSpeedShaft4pt_OM(Component):
         self.add_output('lss_diameter2',           val=0.0,         units='m',   desc='lss outer diameter at second bearing')
         self.add_output('lss_mass',                val=0.0,         units='kg',  desc='overall component mass')
         self.add_output('lss_cm',                  val=np.zeros(3),              desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('lss_I',                   val=np.zeros(3),              desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.add_output('lss_I',                   val=np.zeros(6),              desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.add_output('lss_mb1_facewidth',       val=0.0,         units='m',   desc='facewidth of upwind main bearing')
         self.add_output('lss_mb2_facewidth',       val=0.0,         units='m',   desc='facewidth of main bearing')
         self.add_output('lss_mb1_mass',            val=0.0,         units='kg',  desc='main bearing mass')
@@ -143,7 +154,7 @@ class LowSpeedShaft3pt_OM(Component):
         self.add_output('lss_diameter2',           val=0.0,         units='m',   desc='lss outer diameter at second bearing')
         self.add_output('lss_mass',                val=0.0,         units='kg',  desc='overall component mass')
         self.add_output('lss_cm',                  val=np.zeros(3),              desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('lss_I',                   val=np.zeros(3),              desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.add_output('lss_I',                   val=np.zeros(6),              desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.add_output('lss_mb1_facewidth',       val=0.0,         units='m',   desc='facewidth of upwind main bearing')
         self.add_output('lss_mb2_facewidth',       val=0.0,         units='m',   desc='facewidth of main bearing')
         self.add_output('lss_mb1_mass',            val=0.0,         units='kg',  desc='main bearing mass')
@@ -185,18 +196,20 @@ class MainBearing_OM(Component):
         self.add_param('lss_design_torque', val=0.0, units='N*m', desc='lss design torque')
         self.add_param('rotor_diameter', val=0.0, units='m', desc='rotor diameter')
         self.add_param('lss_mb_cm', val=np.array([0., 0., 0.]), units='m', desc='x,y,z location from shaft model')
+        self.add_param('shaft_angle', val=0.0, units='rad', desc='Angle of the LSS inclination with respect to the horizontal')
 
         # returns
         self.add_output('mb_mass', val=0.0, units='kg', desc='overall component mass')
         self.add_output('mb_cm',   val=np.zeros(3), desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('mb_I',    val=np.zeros(3), desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.add_output('mb_I',    val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
 
         self.mb = MainBearing(bearing_position)
         
     def solve_nonlinear(self, inputs, outputs, resid):
 
         (outputs['mb_mass'], outputs['mb_cm'], outputs['mb_I']) \
-            = self.mb.compute(inputs['bearing_mass'], inputs['lss_diameter'], inputs['lss_design_torque'], inputs['rotor_diameter'], inputs['lss_mb_cm'])
+            = self.mb.compute(inputs['bearing_mass'], inputs['lss_diameter'], inputs['lss_design_torque'], inputs['rotor_diameter'], inputs['lss_mb_cm'],
+                              inputs['shaft_angle'])
 
         return outputs
 
@@ -220,12 +233,13 @@ class Gearbox_OM(Component):
         self.add_param('rotor_diameter', val=0.0, units='m', desc='rotor diameter')
         self.add_param('rotor_torque', val=0.0, units='N*m', desc='rotor torque at rated power')
         self.add_param('gearbox_input_xcm', val=0.00, units='m', desc='gearbox position along x-axis')
+        self.add_param('shaft_angle', val=0.0, units='rad', desc='Angle of the LSS inclination with respect to the horizontal')
 
         # outputs
         self.add_output('stage_masses', val=np.zeros(3), units='kg', desc='individual gearbox stage gearbox_masses')
         self.add_output('gearbox_mass', val=0.0, units='kg', desc='overall component gearbox_mass')
         self.add_output('gearbox_cm', val=np.zeros(3), desc='center of gearbox_mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('gearbox_I', val=np.zeros(3), desc=' moments of gearbox_Inertia for the component [gearbox_Ixx, gearbox_Iyy, gearbox_Izz] around its center of gearbox_mass')
+        self.add_output('gearbox_I', val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.add_output('gearbox_length', val=0.0, units='m', desc='gearbox length')
         self.add_output('gearbox_height', val=0.0, units='m', desc='gearbox height')
         self.add_output('gearbox_diameter', val=0.0, units='m', desc='gearbox diameter')
@@ -235,10 +249,23 @@ class Gearbox_OM(Component):
     def solve_nonlinear(self, inputs, outputs, resid):
         
         (outputs['stage_masses'], outputs['gearbox_mass'], outputs['gearbox_cm'], outputs['gearbox_I'], outputs['gearbox_length'], outputs['gearbox_height'], outputs['gearbox_diameter']) \
-            = self.gearbox.compute(inputs['gear_ratio'], inputs['planet_numbers'], inputs['rotor_rpm'], inputs['rotor_diameter'], inputs['rotor_torque'], inputs['gearbox_input_xcm'])
+            = self.gearbox.compute(inputs['gear_ratio'], inputs['planet_numbers'], inputs['rotor_rpm'], inputs['rotor_diameter'], inputs['rotor_torque'], inputs['gearbox_input_xcm'],
+                                   inputs['shaft_angle'])
 
         return outputs
 
+    def linearize(self, inputs, outputs, resid):
+        ''' Analytic partials - stage ratio sensitivities come from the KKT conditions of the stage ratio optimization,
+              so the COBYLA problem is not re-solved for each finite difference step '''
+
+        J = {}
+        for (out, inp), val in self.gearbox.compute_partials().items():
+            if inp == 'gearbox_input_cm':
+                inp = 'gearbox_input_xcm'
+            J[out, inp] = val
+
+        return J
+
 #-------------------------------------------------------------------
 
 class HighSpeedSide_OM(Component):
@@ -262,11 +289,12 @@ class HighSpeedSide_OM(Component):
         self.add_param('gearbox_height', val=0.0, units='m', desc='gearbox height')
         self.add_param('gearbox_cm', val=np.zeros(3), units='m', desc='gearbox cm [x,y,z]')
         self.add_param('hss_input_length', val=0.0, units='m', desc='high speed shaft length determined by user. Default 0.5m')
+        self.add_param('shaft_angle', val=0.0, units='rad', desc='Angle of the LSS inclination with respect to the horizontal')
 
         # returns
         self.add_output('hss_mass', val=0.0, units='kg', desc='overall component mass')
         self.add_output('hss_cm', val=np.zeros(3), desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('hss_I', val=np.zeros(3), desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.add_output('hss_I', val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
         self.add_output('hss_length', val=0.0, desc='length of high speed shaft')
 
         self.hss = HighSpeedSide()
@@ -274,7 +302,8 @@ class HighSpeedSide_OM(Component):
     def solve_nonlinear(self, inputs, outputs, resid):
 
         (outputs['hss_mass'], outputs['hss_cm'], outputs['hss_I'], outputs['hss_length']) \
-            = self.hss.compute(inputs['rotor_diameter'], inputs['rotor_torque'], inputs['gear_ratio'], inputs['lss_diameter'], inputs['gearbox_length'], inputs['gearbox_height'], inputs['gearbox_cm'], inputs['hss_input_length'])
+            = self.hss.compute(inputs['rotor_diameter'], inputs['rotor_torque'], inputs['gear_ratio'], inputs['lss_diameter'], inputs['gearbox_length'], inputs['gearbox_height'], inputs['gearbox_cm'], inputs['hss_input_length'],
+                               inputs['shaft_angle'])
 
         return outputs
 
@@ -298,18 +327,20 @@ class Generator_OM(Component):
         self.add_param('hss_length', val=0.0, units='m', desc='length of high speed shaft and brake')
         self.add_param('hss_cm', val=np.array([0.0,0.0,0.0]), units='m', desc='cm of high speed shaft and brake')
         self.add_param('rotor_rpm', val=0.0, units='rpm', desc='Speed of rotor at rated power')
+        self.add_param('shaft_angle', val=0.0, units='rad', desc='Angle of the LSS inclination with respect to the horizontal')
 
         #returns
         self.add_output('generator_mass', val=0.0, units='kg', desc='overall component mass')
         self.add_output('generator_cm', val=np.zeros(3), desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('generator_I', val=np.zeros(3), desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.add_output('generator_I', val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
 
         self.gen = Generator(drivetrain_design)
         
     def solve_nonlinear(self, inputs, outputs, resid):
 
         (outputs['generator_mass'], outputs['generator_cm'], outputs['generator_I']) \
-            = self.gen.compute(inputs['rotor_diameter'], inputs['machine_rating'], inputs['gear_ratio'], inputs['hss_length'], inputs['hss_cm'], inputs['rotor_rpm'])
+            = self.gen.compute(inputs['rotor_diameter'], inputs['machine_rating'], inputs['gear_ratio'], inputs['hss_length'], inputs['hss_cm'], inputs['rotor_rpm'],
+                               inputs['shaft_angle'])
 
         return outputs
 
@@ -382,7 +413,7 @@ class Transformer_OM(Component):
         # outputs
         self.add_output('transformer_mass', val=0.0, units='kg', desc='overall component mass')
         self.add_output('transformer_cm', val=np.zeros(3), desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('transformer_I', val=np.zeros(3), desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')    
+        self.add_output('transformer_I', val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')    
 
         self.transformer = Transformer(uptower_transformer)
 
@@ -400,9 +431,10 @@ class Bedplate_OM(Component):
           The Bedplate class is used to represent the bedplate of a wind turbine drivetrain.
           It contains the general properties for a wind turbine component as well as additional design load and dimensional attributes as listed below.
           It contains an update method to determine the mass, mass properties, and dimensions of the component.
+          Gradients (linearize) need sizing='bisect' - the default legacy 'step' sizing is piecewise constant.
     '''
 
-    def __init__(self, uptower_transformer, debug=False):
+    def __init__(self, uptower_transformer, debug=False, sizing='step', catalogue=None, beam_model='cantilever'):
 
         super(Bedplate_OM, self).__init__()
 
@@ -436,12 +468,12 @@ class Bedplate_OM(Component):
         # outputs
         self.add_output('bedplate_mass', val=0.0, units='kg', desc='overall component bedplate_mass')
         self.add_output('bedplate_cm', val=np.zeros(3), desc='center of bedplate_mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('bedplate_I', val=np.zeros(3), desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of bedplate_mass')
+        self.add_output('bedplate_I', val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of bedplate_mass')
         self.add_output('bedplate_length', val=0.0, units='m', desc='length of bedplate')
         self.add_output('bedplate_height', val=0.0, units='m',  desc='max height of bedplate')
         self.add_output('bedplate_width', val=0.0, units='m', desc='width of bedplate')
         
-        self.bpl = Bedplate(uptower_transformer, debug=debug)
+        self.bpl = Bedplate(uptower_transformer, debug=debug, sizing=sizing, catalogue=catalogue, beam_model=beam_model)
         
         self.debug = debug
 
@@ -456,6 +488,22 @@ class Bedplate_OM(Component):
 
         return outputs
 
+    def linearize(self, inputs, outputs, resid):
+        ''' Partials of the continuous (bisection) sizing - the active stress or deflection constraint is 
+              differentiated implicitly. Raises ValueError unless the component was built with sizing='bisect'. '''
+
+        J = {}
+        for (out, inp), val in self.bpl.compute_partials(inputs['gearbox_length'], inputs['gearbox_location'], inputs['gearbox_mass'], inputs['hss_location'], inputs['hss_mass'], inputs['generator_location'], inputs['generator_mass'], \
+                      inputs['lss_location'], inputs['lss_mass'], inputs['lss_length'], inputs['mb1_cm'], inputs['lss_mb1_facewidth'], inputs['mb1_mass'], inputs['mb2_cm'], inputs['mb2_mass'], \
+                      inputs['transformer_mass'], inputs['transformer_cm'], \
+                      inputs['tower_top_diameter'], inputs['rotor_diameter'], inputs['machine_rating'], inputs['rotor_mass'], inputs['rotor_bending_moment_y'], inputs['rotor_force_z'], \
+                      inputs['flange_length'], inputs['distance_hub2mb']).items():
+            if inp == 'mb1_facewidth':
+                inp = 'lss_mb1_facewidth'
+            J[out, inp] = val
+
+        return J
+
 #-------------------------------------------------------------------------------
 
 class AboveYawMassAdder_OM(Component):
@@ -500,6 +548,7 @@ class AboveYawMassAdder_OM(Component):
         self.aboveyawmass = AboveYawMassAdder(crane)
         
         self.debug = debug
+        self.log = get_logger('AboveYawMassAdder', debug)
 
     def solve_nonlinear(self, inputs, outputs, resid):
 
@@ -510,18 +559,18 @@ class AboveYawMassAdder_OM(Component):
                     inputs['gearbox_mass'], inputs['hss_mass'], inputs['generator_mass'], inputs['bedplate_mass'], 
                     inputs['bedplate_length'], inputs['bedplate_width'], inputs['transformer_mass'])
         
-        if self.debug:
-            print('AYMA IN: {:.1f} kW BPl {:.1f} m BPw {:.1f} m'.format(
-                  inputs['machine_rating'],inputs['bedplate_length'], inputs['bedplate_width']))
-            print('AYMA IN  masses (kg): LSS {:.1f} MB1 {:.1f} MB2 {:.1f} GBOX {:.1f} HSS {:.1f} GEN {:.1f} BP {:.1f} TFRM {:.1f}'.format(
-                  inputs['lss_mass'], inputs['mb1_mass'], inputs['mb2_mass'], inputs['gearbox_mass'],
-                  inputs['hss_mass'], inputs['generator_mass'], inputs['bedplate_mass'], inputs['transformer_mass']))
-            print('AYMA OUT masses (kg) : E {:.1f} VSE {:.1f} HVAC {:.1f} CNTL {:.1f} PTFM {:.1f} CRN {:.1f} MNFRM {:.1f} CVR {:.1f} AYM {:.1f}'.format( 
-                  outputs['electrical_mass'], outputs['vs_electronics_mass'], outputs['hvac_mass'], outputs['controls_mass'],
-                  outputs['platforms_mass'], outputs['crane_mass'], outputs['mainframe_mass'], outputs['cover_mass'],
-                  outputs['above_yaw_mass']))
-            print('AYMA OUT nacelle (m): L {:.2f} W {:.2f} H {:.2f}'.format( 
-                 outputs['nacelle_length'], outputs['nacelle_width'], outputs['nacelle_height']))
+        log = self.log
+        if log.enabled():
+            log.debug('AYMA IN: {machine_rating:.1f} kW BPl {bedplate_length:.1f} m BPw {bedplate_width:.1f} m',
+                      machine_rating=float(inputs['machine_rating']), bedplate_length=float(inputs['bedplate_length']),
+                      bedplate_width=float(inputs['bedplate_width']))
+            log.debug('AYMA IN  masses (kg): LSS {lss:.1f} MB1 {mb1:.1f} MB2 {mb2:.1f} GBOX {gearbox:.1f} HSS {hss:.1f} GEN {generator:.1f} BP {bedplate:.1f} TFRM {transformer:.1f}',
+                      **dict((name, float(inputs[name + '_mass'])) for name in ['lss', 'mb1', 'mb2', 'gearbox', 'hss', 'generator', 'bedplate', 'transformer']))
+            log.debug('AYMA OUT masses (kg) : E {electrical:.1f} VSE {vs_electronics:.1f} HVAC {hvac:.1f} CNTL {controls:.1f} PTFM {platforms:.1f} CRN {crane:.1f} MNFRM {mainframe:.1f} CVR {cover:.1f} AYM {above_yaw:.1f}',
+                      **dict((name, float(outputs[name + '_mass'])) for name in ['electrical', 'vs_electronics', 'hvac', 'controls', 'platforms',
+                                                                                 'crane', 'mainframe', 'cover', 'above_yaw']))
+            log.debug('AYMA OUT nacelle (m): L {length:.2f} W {width:.2f} H {height:.2f}',
+                      **dict((name, float(outputs['nacelle_' + name])) for name in ['length', 'width', 'height']))
 
         return outputs
 
@@ -548,12 +597,15 @@ class YawSystem_OM(Component):
         # outputs
         self.add_output('yaw_mass', val=0.0, units='kg', desc='overall component mass')
         self.add_output('yaw_cm', val=np.zeros(3), desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('yaw_I', val=np.zeros(3), desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')    
+        self.add_output('yaw_I', val=np.zeros(6), desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')    
 
+        self.yaw_motors_number = yaw_motors_number
         self.yaw = YawSystem(yaw_motors_number)
 
     def solve_nonlinear(self, inputs, outputs, resid):
 
+        # YawSystem.compute() overwrites yaw_motors_number when it is 0 - reset it so each run gets its own default
+        self.yaw.yaw_motors_number = self.yaw_motors_number
         (outputs['yaw_mass'], outputs['yaw_cm'], outputs['yaw_I']) \
             = self.yaw.compute(inputs['rotor_diameter'], inputs['rotor_thrust'], inputs['tower_top_diameter'], inputs['above_yaw_mass'], inputs['bedplate_height'])
 
@@ -588,21 +640,23 @@ class NacelleSystemAdder_OM(Component): #added to drive to include transformer
         self.add_param('hss_cm', val=np.array([0.0,0.0,0.0]), units='m', desc='component CM')
         self.add_param('generator_cm', val=np.array([0.0,0.0,0.0]), units='m', desc='component CM')
         self.add_param('bedplate_cm', val=np.array([0.0,0.0,0.0]), units='m', desc='component CM')
-        self.add_param('lss_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
-        self.add_param('mb1_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
-        self.add_param('mb2_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
-        self.add_param('gearbox_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
-        self.add_param('hss_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
-        self.add_param('generator_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
-        self.add_param('bedplate_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
+        self.add_param('lss_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('mb1_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('mb2_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('gearbox_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('hss_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('generator_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('bedplate_I', val=np.zeros(6), units='kg*m**2', desc='component I')
         self.add_param('transformer_mass', val=0.0, units='kg', desc='component mass')
         self.add_param('transformer_cm', val=np.array([0.0,0.0,0.0]), units='m', desc='component CM')
-        self.add_param('transformer_I', val=np.array([0.0,0.0,0.0]), units='kg*m**2', desc='component I')
+        self.add_param('transformer_I', val=np.zeros(6), units='kg*m**2', desc='component I')
+        self.add_param('yaw_cm', val=np.array([0.0,0.0,0.0]), units='m', desc='component CM')
+        self.add_param('yaw_I', val=np.zeros(6), units='kg*m**2', desc='component I')
 
         # returns
         self.add_output('nacelle_mass', val=0.0, units='kg', desc='overall component mass')
         self.add_output('nacelle_cm', val=np.zeros(3), units='m', desc='center of mass of the component in [x,y,z] for an arbitrary coordinate system')
-        self.add_output('nacelle_I', val=np.zeros(6), units='kg*m**2', desc=' moments of Inertia for the component [Ixx, Iyy, Izz] around its center of mass')
+        self.add_output('nacelle_I', val=np.zeros(6), units='kg*m**2', desc=' moments of Inertia for the component [Ixx, Iyy, Izz, Ixy, Ixz, Iyz] around its center of mass')
 
         self.nacelleadder = NacelleSystemAdder()
         
@@ -613,7 +667,7 @@ class NacelleSystemAdder_OM(Component): #added to drive to include transformer
                       inputs['hss_mass'], inputs['generator_mass'], inputs['bedplate_mass'], inputs['mainframe_mass'], \
                       inputs['lss_cm'], inputs['mb1_cm'], inputs['mb2_cm'], inputs['gearbox_cm'], inputs['hss_cm'], inputs['generator_cm'], inputs['bedplate_cm'], \
                       inputs['lss_I'], inputs['mb1_I'], inputs['mb2_I'], inputs['gearbox_I'], inputs['hss_I'], inputs['generator_I'], inputs['bedplate_I'], \
-                      inputs['transformer_mass'], inputs['transformer_cm'], inputs['transformer_I'])
+                      inputs['transformer_mass'], inputs['transformer_cm'], inputs['transformer_I'], inputs['yaw_cm'], inputs['yaw_I'])
 
         return outputs
 
@@ -695,7 +749,7 @@ class Drive3pt(Group):
         # Create 3 pt drivetrain group
         self.add('hub',                 HubMassOnlySE(blade_number, debug=debug), promotes=['*'])
         self.add('lowSpeedShaft',       LowSpeedShaft3pt_OM(mb1Type, IEC_Class, debug=debug), promotes=['*'])
-        self.add('mainBearing',         MainBearing_OM('main'), promotes=['lss_design_torque','rotor_diameter']) #need to make explicit connections for main bearing
+        self.add('mainBearing',         MainBearing_OM('main'), promotes=['lss_design_torque','rotor_diameter','shaft_angle']) #need to make explicit connections for main bearing
         self.add('hubCM',               Hub_CM_Adder_OM(), promotes=['*'])
         self.add('gearbox',             Gearbox_OM(gear_configuration, shaft_factor, debug=debug), promotes=['*'])
         self.add('highSpeedSide',       HighSpeedSide_OM(), promotes=['*'])
@@ -795,8 +849,8 @@ class Drive4pt(Group):
         # select components
         self.add('hub', HubMassOnlySE(blade_number), promotes=['*'])
         self.add('lowSpeedShaft', LowSpeedShaft4pt_OM(mb1Type, mb2Type, IEC_Class), promotes=['*'])
-        self.add('mainBearing', MainBearing_OM('main'), promotes=['lss_design_torque','rotor_diameter']) #explicit connections for bearings
-        self.add('secondBearing', MainBearing_OM('second'), promotes=['lss_design_torque','rotor_diameter']) #explicit connections for bearings
+        self.add('mainBearing', MainBearing_OM('main'), promotes=['lss_design_torque','rotor_diameter','shaft_angle']) #explicit connections for bearings
+        self.add('secondBearing', MainBearing_OM('second'), promotes=['lss_design_torque','rotor_diameter','shaft_angle']) #explicit connections for bearings
         self.add('hubCM', Hub_CM_Adder_OM(), promotes=['*'])
         self.add('gearbox', Gearbox_OM(gear_configuration, shaft_factor), promotes=['*'])
         self.add('highSpeedSide', HighSpeedSide_OM(), promotes=['*'])
@@ -828,6 +882,169 @@ class Drive4pt(Group):
         self.connect('gearbox_cm','gearbox_location',src_indices=[0])
         self.connect('generator_cm','generator_location',src_indices=[0])
 
+#------------------------------------------------------------------
+# Pool of set-up problems
+
+class DrivetrainProblemPool(object):
+    '''
+    Builds Problem(root=Drive3pt(...)) (or Drive4pt when mb2Type is given) and runs setup() once per
+      configuration, then hands out ready problems that only need their inputs set and run() called:
+
+        pool = DrivetrainProblemPool()
+        with pool.problem('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3) as prob:
+            prob['rotor_diameter'] = 126.0
+            ...
+            prob.run()
+
+    A problem is handed out with every input and output back at the value it had just after setup(),
+      so nothing set or computed in one use leaks into the next. Up to max_idle problems per
+      configuration are kept. The pool is thread safe - a problem is never handed out twice at once.
+    '''
+
+    def __init__(self, max_idle=4):
+
+        super(DrivetrainProblemPool, self).__init__()
+
+        self.max_idle = max_idle
+        self.idle = {}  # configuration: list of problems ready to hand out
+        self.created = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def build(self, config):
+        ''' New set-up problem for a configuration (the arguments of acquire() as a tuple) '''
+        (mb1Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+         uptower_transformer, yaw_motors_number, crane, blade_number, mb2Type, debug, topLevelFlag) = config
+        if mb2Type is None:
+            root = Drive3pt(mb1Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+                            uptower_transformer, yaw_motors_number, crane, blade_number, debug=debug, topLevelFlag=topLevelFlag)
+        else:
+            root = Drive4pt(mb1Type, mb2Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+                            uptower_transformer, yaw_motors_number, crane, blade_number, debug=debug, topLevelFlag=topLevelFlag)
+        prob = Problem(root=root)
+        prob.setup(check=False)
+        prob.drivetrain_config = config
+        prob.drivetrain_snapshot = self.snapshot(prob)  # values just after setup()
+        return prob
+
+    @staticmethod
+    def snapshot(prob):
+        ''' Copy of the values of all the problem's variables (pass_by_obj ones are not in the vectors) '''
+        values = {}
+        for name, vector in [('unknowns', prob.root.unknowns), ('params', prob.root.params)]:
+            objects = dict((key, copy.deepcopy(vector[key])) for key, meta in vector.items() if meta.get('pass_by_obj'))
+            values[name] = (vector.vec.copy(), objects)
+        return values
+
+    @staticmethod
+    def restore(prob, values):
+        for name, vector in [('unknowns', prob.root.unknowns), ('params', prob.root.params)]:
+            vec, objects = values[name]
+            vector.vec[:] = vec
+            for key, value in objects.items():
+                vector[key] = copy.deepcopy(value)
+
+    def acquire(self, mb1Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+                uptower_transformer, yaw_motors_number, crane, blade_number, mb2Type=None, debug=False, topLevelFlag=False):
+        ''' A ready problem for the configuration (same arguments as Drive3pt, plus mb2Type for Drive4pt) -
+              give it back with release() when done '''
+        config = (mb1Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+                  uptower_transformer, yaw_motors_number, crane, blade_number, mb2Type, debug, topLevelFlag)
+        with self._lock:
+            idle = self.idle.get(config)
+            prob = idle.pop() if idle else None
+            if prob is not None:
+                self.reused += 1
+        if prob is None:
+            prob = self.build(config)
+            with self._lock:
+                self.created += 1
+        else:
+            self.restore(prob, prob.drivetrain_snapshot)
+        return prob
+
+    def release(self, prob):
+        ''' Return a problem from acquire() to the pool '''
+        with self._lock:
+            idle = self.idle.setdefault(prob.drivetrain_config, [])
+            if len(idle) < self.max_idle:
+                idle.append(prob)
+
+    @contextmanager
+    def problem(self, *args, **kwargs):
+        ''' acquire() for a with block - the problem is released at the end of it '''
+        prob = self.acquire(*args, **kwargs)
+        try:
+            yield prob
+        finally:
+            self.release(prob)
+
+_default_pool = None
+
+def get_default_pool():
+    ''' The process-wide DrivetrainProblemPool '''
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = DrivetrainProblemPool()
+    return _default_pool
+
+#------------------------------------------------------------------
+# Recording
+
+class EvaluationRecorder_OM(BaseRecorder):
+    '''
+    OpenMDAO recorder that writes each iteration of a Drive3pt / Drive4pt problem as one row of a compact
+      binary history (drivese_recorder.py) - read it back with drivese_recorder.load_history():
+
+        recorder = EvaluationRecorder_OM('opt.drec', metadata={'driver': 'SLSQP'})
+        prob.driver.add_recorder(recorder)
+        prob.setup()
+        prob.run()
+        recorder.close()
+
+    The keyword arguments are those of drivese_recorder.EvaluationRecorder. Inputs and outputs are looked up
+      by their promoted names in the unknowns, then the params of the problem (main bearing outputs by the
+      names of the bearing components, see ALIASES).
+    '''
+
+    ALIASES = {'mb1_mass': 'mainBearing.mb_mass', 'mb1_cm': 'mainBearing.mb_cm', 'mb1_I': 'mainBearing.mb_I',
+               'mb2_mass': 'secondBearing.mb_mass', 'mb2_cm': 'secondBearing.mb_cm', 'mb2_I': 'secondBearing.mb_I'}
+
+    def __init__(self, path, **kwargs):
+
+        super(EvaluationRecorder_OM, self).__init__()
+
+        self.options['record_params'] = True
+        self.options['record_metadata'] = False
+        self.history = EvaluationRecorder(path, **kwargs)
+        self._sources = None  # [(field, variable, unknowns or params)] of the fields found in the problem
+
+    def record_metadata(self, group):
+        pass
+
+    def record_iteration(self, params, unknowns, resids, metadata):
+        if self._sources is None:
+            self._sources = []
+            for name in self.history.inputs + self.history.outputs:
+                for source in [name, self.ALIASES.get(name)]:
+                    if source in unknowns:
+                        self._sources.append((name, source, unknowns))
+                        break
+                    if params is not None and source in params:
+                        self._sources.append((name, source, params))
+                        break
+        values = dict((name, vector[source]) for name, source, vector in self._sources)
+        self.history.record(values, values)
+
+    def record_derivatives(self, derivs, metadata):
+        pass
+
+    def close(self):
+        self.history.close()
+
+# timing wrappers on the solve_nonlinear() methods when profiling is on (drivese_profile.py)
+instrument_module(__name__)
+
 #------------------------------------------------------------------
 # examples
 
@@ -0,0 +1,310 @@
+"""
+drivese_pipeline.py
+
+Pure-python drivetrain models - the components of the Drive3pt and Drive4pt groups (drivese_omdao.py)
+called in dependency order without OpenMDAO.
+
+A DrivetrainModel takes a single input record (a dict, or anything indexable by name) holding the values
+that would be set on the OpenMDAO problem, and returns a dict of all the quantities the group computes,
+under the same names as the group's unknowns. Inputs that are missing from the record are 0, as are
+unconnected parameters in the groups (e.g. hub_flange_thickness, and the second bearing of the 3-point model).
+
+The results are the same as those of the groups, so this is the path to use for sweeps and other
+high-throughput work. There is NO OpenMDAO code in this file.
+
+Incremental re-evaluation (DrivetrainModel(..., incremental=True)): each component call is fingerprinted
+(its inputs and the component options in COMPONENT_OPTIONS), and a component whose fingerprint is the same
+as on the previous compute() is not run again - its previous outputs are reused. So after a change to
+one input or option (set_options()), only the components it reaches are re-run, and the shaft and bedplate
+sizing loops are skipped when their inputs have not changed. The components run and reused by the last
+compute() are listed in model.executed and model.reused.
+It is off by default: for sweeps where every record differs, the fingerprints and output copies only
+add time (about 7% per design for the 5 MW example).
+"""
+
+from __future__ import print_function
+
+import copy
+
+import numpy as np
+
+from drivese.drivese_cache import make_key
+from drivese.drivese_components import LowSpeedShaft4pt, LowSpeedShaft3pt, Gearbox, MainBearing, Bedplate, YawSystem, \
+                                       Transformer, HighSpeedSide, Generator, NacelleSystemAdder, AboveYawMassAdder, RNASystemAdder
+from drivese.hubse_components import Hub, PitchSystem, Spinner, Hub_Mass_Adder, Hub_CM_Adder
+
+# Inputs of the Drive3pt / Drive4pt groups (the variables set on prob in the nacelle_example_*() functions)
+DRIVETRAIN_INPUTS = ['rotor_diameter', 'rotor_rpm', 'rotor_torque', 'rotor_thrust',
+                     'rotor_bending_moment_x', 'rotor_bending_moment_y', 'rotor_bending_moment_z', 'rotor_force_y', 'rotor_force_z',
+                     'machine_rating', 'drivetrain_efficiency',
+                     'gear_ratio', 'shaft_angle', 'shaft_ratio', 'planet_numbers', 'shrink_disc_mass', 'carrier_mass',
+                     'flange_length', 'overhang', 'distance_hub2mb', 'gearbox_input_xcm', 'hss_input_length',
+                     'blade_mass', 'blade_root_diameter', 'blade_length', 'tower_top_diameter', 'hub_flange_thickness']
+
+# Component options (constructor arguments) that the outputs of each component depend on -
+#   they are part of the fingerprint of a component call
+COMPONENT_OPTIONS = {'hub': ('blade_number',), 'pitchSystem': ('blade_number',), 'spinner': ('blade_number',),
+                     'hubAdder': ('blade_number',),
+                     'lowSpeedShaft': ('mb1Type', 'mb2Type', 'IEC_Class'),
+                     'mainBearing': ('bearing_position',), 'secondBearing': ('bearing_position',),
+                     'gearbox': ('gear_configuration', 'shaft_factor'),
+                     'generator': ('drivetrain_design',),
+                     'bedplate': ('uptower_transformer', 'sizing', 'catalogue', 'beam_model', 'fe_elements', 'fixedScales'),
+                     'transformer': ('uptower_transformer',),
+                     'aboveYaw': ('crane',),
+                     'yawSystem': ('yaw_motors_number',)}
+
+# Model options that set_options() can change, and the components that hold them
+MODEL_OPTIONS = {'crane': ('aboveYaw',),
+                 'yaw_motors_number': ('yawSystem',),
+                 'uptower_transformer': ('transformer', 'bedplate'),
+                 'drivetrain_design': ('generator',),
+                 'gear_configuration': ('gearbox',),
+                 'shaft_factor': ('gearbox',),
+                 'IEC_Class': ('lowSpeedShaft',),
+                 'mb1Type': ('lowSpeedShaft',)}
+
+#-------------------------------------------------------------------------
+
+class DrivetrainModel(object):
+    ''' DrivetrainModel class
+          Pure-python equivalent of the Drive3pt (mb2Type=None) and Drive4pt groups, with the same configuration arguments.
+          The component objects are created once and reused for every record.
+          With incremental=True, components whose inputs and options are unchanged since the previous
+          compute() are not re-run (see run_component()).
+    '''
+
+    def __init__(self, mb1Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+                 uptower_transformer, yaw_motors_number, crane, blade_number, mb2Type=None, debug=False,
+                 incremental=False):
+
+        super(DrivetrainModel, self).__init__()
+
+        self.mb2Type = mb2Type
+        self.yaw_motors_number = yaw_motors_number
+        self.debug = debug
+        self.incremental = incremental
+        self.last_calls = {}  # component name: (fingerprint, outputs) of its last run
+        self.executed = []
+        self.reused = []
+
+        self.hub           = Hub(blade_number, debug=debug)
+        self.pitchSystem   = PitchSystem(blade_number, debug=debug)
+        self.spinner       = Spinner(blade_number, debug=debug)
+        self.hubAdder      = Hub_Mass_Adder(blade_number, debug=debug)
+        self.hubCM         = Hub_CM_Adder()
+        if mb2Type is None:
+            self.lowSpeedShaft = LowSpeedShaft3pt(mb1Type, IEC_Class, debug=debug)
+        else:
+            self.lowSpeedShaft = LowSpeedShaft4pt(mb1Type, mb2Type, IEC_Class, debug=debug)
+        self.mainBearing   = MainBearing('main')
+        self.secondBearing = MainBearing('second')
+        self.gearbox       = Gearbox(gear_configuration, shaft_factor, debug=debug)
+        self.highSpeedSide = HighSpeedSide()
+        self.generator     = Generator(drivetrain_design)
+        self.bedplate      = Bedplate(uptower_transformer, debug=debug)
+        self.transformer   = Transformer(uptower_transformer)
+        self.rna           = RNASystemAdder()
+        self.aboveYaw      = AboveYawMassAdder(crane)
+        self.yawSystem     = YawSystem(yaw_motors_number)
+        self.nacelleSystem = NacelleSystemAdder()
+
+    def set_options(self, **options):
+        ''' Change model options between runs (see MODEL_OPTIONS), e.g. model.set_options(crane=False) '''
+        for name, value in options.items():
+            if name not in MODEL_OPTIONS:
+                raise ValueError('DrivetrainModel.set_options(): unknown option {} (one of {})'.format(name, sorted(MODEL_OPTIONS)))
+            for component in MODEL_OPTIONS[name]:
+                setattr(getattr(self, component), name, value)
+            if name == 'yaw_motors_number':
+                self.yaw_motors_number = value
+
+    def run_component(self, name, *args):
+        '''
+        Return getattr(self, name).compute(*args) - or, with incremental on, the outputs of the previous
+          call if the arguments and the component options are the same as then.
+          Components with debug=True always run, so that their debug output is produced.
+        '''
+        component = getattr(self, name)
+        if not self.incremental or getattr(component, 'debug', False):
+            self.executed.append(name)
+            return component.compute(*args)
+
+        fingerprint = make_key(name, [getattr(component, option, None) for option in COMPONENT_OPTIONS.get(name, ())], args)
+        last = self.last_calls.get(name)
+        if last is not None and last[0] == fingerprint:
+            self.reused.append(name)
+            return copy.deepcopy(last[1])
+        value = component.compute(*args)
+        # stored as a copy so that changes to the returned arrays do not leak into later runs
+        self.last_calls[name] = (fingerprint, copy.deepcopy(value))
+        self.executed.append(name)
+        return value
+
+    def clear(self):
+        ''' Forget the previous component calls (the next compute() runs every component) '''
+        self.last_calls = {}
+
+    def compute(self, record):
+        '''
+        Evaluate the drivetrain for one input record (see DRIVETRAIN_INPUTS) - returns a dict of outputs.
+          The components are called in the order that OpenMDAO runs the groups.
+        '''
+
+        p = dict((name, 0.0) for name in DRIVETRAIN_INPUTS)
+        p['planet_numbers'] = [0, 0, 0]
+        for name in DRIVETRAIN_INPUTS:
+            if name in record:
+                p[name] = record[name]
+        o = {}
+        self.executed = []
+        self.reused = []
+
+        # hub (HubMassOnlySE)
+        (o['hub_mass'], o['hub_diameter'], o['hub_cm'], o['hub_cost'], o['hub_thickness']) \
+            = self.run_component('hub', p['blade_root_diameter'], p['rotor_rpm'], p['blade_mass'], p['rotor_diameter'], p['blade_length'])
+        o['pitch_system_mass'] = self.run_component('pitchSystem', p['blade_mass'], p['rotor_bending_moment_y'])
+        o['spinner_mass'] = self.run_component('spinner', p['blade_root_diameter'])[0]
+        (o['rotor_mass'], o['hub_system_mass'], o['hub_system_I'], o['hub_I']) \
+            = self.run_component('hubAdder', p['blade_mass'], o['hub_mass'], o['hub_diameter'], o['hub_thickness'],
+                                    o['pitch_system_mass'], o['spinner_mass'])
+
+        (o['stage_masses'], o['gearbox_mass'], o['gearbox_cm'], o['gearbox_I'], o['gearbox_length'], o['gearbox_height'], o['gearbox_diameter']) \
+            = self.run_component('gearbox', p['gear_ratio'], p['planet_numbers'], p['rotor_rpm'], p['rotor_diameter'], p['rotor_torque'], p['gearbox_input_xcm'],
+                                 p['shaft_angle'])
+
+        (o['lss_design_torque'], o['lss_design_bending_load'], o['lss_length'], o['lss_diameter1'], o['lss_diameter2'], o['lss_mass'], o['lss_cm'], o['lss_I'], \
+         o['lss_mb1_facewidth'], o['lss_mb2_facewidth'], o['lss_mb1_mass'], o['lss_mb2_mass'], o['lss_mb1_cm'], o['lss_mb2_cm']) \
+            = self.run_component('lowSpeedShaft', p['rotor_diameter'], o['rotor_mass'], p['rotor_thrust'], p['rotor_force_y'], p['rotor_force_z'], \
+                                         p['rotor_bending_moment_x'], p['rotor_bending_moment_y'], p['rotor_bending_moment_z'], \
+                                         p['overhang'], p['machine_rating'], p['drivetrain_efficiency'], \
+                                         o['gearbox_mass'], p['carrier_mass'], o['gearbox_cm'], o['gearbox_length'], \
+                                         p['shrink_disc_mass'], p['flange_length'], p['distance_hub2mb'], p['shaft_angle'], p['shaft_ratio'], \
+                                         p['hub_flange_thickness'])
+
+        (o['mb1_mass'], o['mb1_cm'], o['mb1_I']) \
+            = self.run_component('mainBearing', o['lss_mb1_mass'], o['lss_diameter1'], o['lss_design_torque'], p['rotor_diameter'], o['lss_mb1_cm'],
+                                 p['shaft_angle'])
+        if self.mb2Type is None:
+            # not connected in Drive3pt
+            o['mb2_mass'], o['mb2_cm'], o['mb2_I'] = 0.0, np.zeros(3), np.zeros(6)
+        else:
+            (o['mb2_mass'], o['mb2_cm'], o['mb2_I']) \
+                = self.run_component('secondBearing', o['lss_mb2_mass'], o['lss_diameter2'], o['lss_design_torque'], p['rotor_diameter'], o['lss_mb2_cm'],
+                                   p['shaft_angle'])
+
+        o['hub_system_cm'] = self.run_component('hubCM', p['rotor_diameter'], p['distance_hub2mb'], p['shaft_angle'], o['mb1_cm'])
+
+        (o['hss_mass'], o['hss_cm'], o['hss_I'], o['hss_length']) \
+            = self.run_component('highSpeedSide', p['rotor_diameter'], p['rotor_torque'], p['gear_ratio'], o['lss_diameter1'],
+                                         o['gearbox_length'], o['gearbox_height'], o['gearbox_cm'], p['hss_input_length'],
+                                         p['shaft_angle'])
+
+        (o['generator_mass'], o['generator_cm'], o['generator_I']) \
+            = self.run_component('generator', p['rotor_diameter'], p['machine_rating'], p['gear_ratio'], o['hss_length'], o['hss_cm'], p['rotor_rpm'],
+                                 p['shaft_angle'])
+
+        (o['RNA_mass'], o['RNA_cm']) \
+            = self.run_component('rna', o['lss_mass'], o['mb1_mass'], o['mb2_mass'], o['gearbox_mass'], o['hss_mass'], o['generator_mass'], \
+                               o['lss_cm'], o['mb1_cm'], o['mb2_cm'], o['gearbox_cm'], o['hss_cm'], o['generator_cm'],
+                               p['overhang'], o['rotor_mass'], p['machine_rating'])
+
+        (o['transformer_mass'], o['transformer_cm'], o['transformer_I']) \
+            = self.run_component('transformer', p['machine_rating'], p['tower_top_diameter'], o['rotor_mass'], o['generator_cm'],
+                                       p['rotor_diameter'], o['RNA_mass'], o['RNA_cm'])
+
+        (o['bedplate_mass'], o['bedplate_cm'], o['bedplate_I'], o['bedplate_length'], o['bedplate_height'], o['bedplate_width']) \
+            = self.run_component('bedplate', o['gearbox_length'], o['gearbox_cm'][0], o['gearbox_mass'], o['hss_cm'][0], o['hss_mass'],
+                                    o['generator_cm'][0], o['generator_mass'], \
+                                    o['lss_cm'][0], o['lss_mass'], o['lss_length'], o['mb1_cm'], o['lss_mb1_facewidth'], o['mb1_mass'],
+                                    o['mb2_cm'], o['mb2_mass'], o['transformer_mass'], o['transformer_cm'], \
+                                    p['tower_top_diameter'], p['rotor_diameter'], p['machine_rating'], o['rotor_mass'],
+                                    p['rotor_bending_moment_y'], p['rotor_force_z'], p['flange_length'], p['distance_hub2mb'])
+
+        (o['electrical_mass'], o['vs_electronics_mass'], o['hvac_mass'], o['controls_mass'],
+         o['platforms_mass'], o['crane_mass'], o['mainframe_mass'], o['cover_mass'],
+         o['above_yaw_mass'], o['nacelle_length'], o['nacelle_width'], o['nacelle_height']) \
+            = self.run_component('aboveYaw', p['machine_rating'], o['lss_mass'], o['mb1_mass'], o['mb2_mass'],
+                                    o['gearbox_mass'], o['hss_mass'], o['generator_mass'], o['bedplate_mass'],
+                                    o['bedplate_length'], o['bedplate_width'], o['transformer_mass'])
+
+        # YawSystem.compute() overwrites yaw_motors_number when it is 0 - reset it so each record gets its own default
+        self.yawSystem.yaw_motors_number = self.yaw_motors_number
+        (o['yaw_mass'], o['yaw_cm'], o['yaw_I']) \
+            = self.run_component('yawSystem', p['rotor_diameter'], p['rotor_thrust'], p['tower_top_diameter'], o['above_yaw_mass'], o['bedplate_height'])
+
+        (o['nacelle_mass'], o['nacelle_cm'], o['nacelle_I']) \
+            = self.run_component('nacelleSystem', o['above_yaw_mass'], o['yaw_mass'], o['lss_mass'], o['mb1_mass'], o['mb2_mass'], o['gearbox_mass'], \
+                                         o['hss_mass'], o['generator_mass'], o['bedplate_mass'], o['mainframe_mass'], \
+                                         o['lss_cm'], o['mb1_cm'], o['mb2_cm'], o['gearbox_cm'], o['hss_cm'], o['generator_cm'], o['bedplate_cm'], \
+                                         o['lss_I'], o['mb1_I'], o['mb2_I'], o['gearbox_I'], o['hss_I'], o['generator_I'], o['bedplate_I'], \
+                                         o['transformer_mass'], o['transformer_cm'], o['transformer_I'], o['yaw_cm'], o['yaw_I'])
+
+        o['MB1_location'] = o['mb1_cm']
+
+        return o
+
+#-------------------------------------------------------------------------
+
+def run_drivetrain(records, model):
+    ''' Evaluate a sequence of input records with one DrivetrainModel - returns a list of output dicts '''
+    return [model.compute(record) for record in records]
+
+#-------------------------------------------------------------------------
+# examples - same inputs as nacelle_example_5MW_baseline_[34]pt() in drivese_omdao.py
+
+def example_5MW_baseline_record():
+    ''' NREL 5 MW inputs (the 4-point example also sets flange_length = 0.5) '''
+
+    record = {}
+    record['rotor_diameter'] = 126.0  # m
+    record['rotor_rpm'] = 12.1  # rpm
+    record['machine_rating'] = 5000.0  # kW
+    record['drivetrain_efficiency'] = 0.95
+    record['rotor_torque'] = 1.5 * (record['machine_rating'] * 1000 / record['drivetrain_efficiency']) \
+                                 / (record['rotor_rpm'] * (np.pi / 30))
+    record['rotor_bending_moment_x'] =    330770.0  # Nm
+    record['rotor_bending_moment_y'] = -16665000.0  # Nm
+    record['rotor_bending_moment_z'] =   2896300.0  # Nm
+    record['rotor_thrust'] =   599610.0  # N
+    record['rotor_force_y'] =  186780.0  # N
+    record['rotor_force_z'] = -842710.0  # N
+
+    record['gear_ratio'] = 96.76  # 97:1 as listed in the 5 MW reference document
+    record['shaft_angle'] = 5.0*np.pi / 180.0  # rad
+    record['shaft_ratio'] = 0.10
+    record['planet_numbers'] = [3, 3, 1]
+    record['shrink_disc_mass'] = 333.3 * record['machine_rating'] / 1000.0  # estimated
+    record['carrier_mass'] = 8000.0  # estimated
+    record['overhang'] = 5.0
+    record['distance_hub2mb'] = 1.912  # length from hub center to main bearing, leave zero if unknown
+    record['gearbox_input_xcm'] = 0.1
+    record['hss_input_length'] = 1.5
+
+    record['blade_mass'] = 17740.0
+    record['blade_root_diameter'] = 2.5
+    record['blade_length'] = 60.0
+
+    record['tower_top_diameter'] = 3.78  # m
+
+    return record
+
+def example_5MW_baseline_3pt(debug=False):
+    model = DrivetrainModel('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3, debug=debug)
+    return model.compute(example_5MW_baseline_record())
+
+def example_5MW_baseline_4pt(debug=False):
+    model = DrivetrainModel('CARB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3, mb2Type='SRB', debug=debug)
+    record = example_5MW_baseline_record()
+    record['flange_length'] = 0.5
+    return model.compute(record)
+
+#-------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    for name, example in [('3 Point', example_5MW_baseline_3pt), ('4 Point', example_5MW_baseline_4pt)]:
+        outputs = example()
+        print('----- NREL 5 MW Turbine - {} Suspension -----'.format(name))
+        for key in sorted(outputs):
+            print('{:24s} {}'.format(key, outputs[key]))
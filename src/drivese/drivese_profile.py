@@ -0,0 +1,268 @@
+"""
+drivese_profile.py
+
+Per-component profiling of DriveSE: call counts, total / mean / self wall time and inner-iteration counts of
+each pure-python component compute() and each OpenMDAO *_OM.solve_nonlinear(), to see where the time of a
+Drive3pt / Drive4pt evaluation goes.
+
+Switching it on
+  - with profiling() as profiler:          (context manager)
+        prob.run()
+    print(profiler.report())
+  - DRIVESE_PROFILE=<file> in the environment: on from `import drivese` to the end of the process, when the
+    report is written to <file> - format from the name (see Profiler.write()); DRIVESE_PROFILE=1 prints the
+    text table to stderr
+When profiling is off the components are not touched at all: the timing wrappers are put on the classes
+when it is switched on, and taken off again when it ends. Only the process that switched it on is profiled
+(not the workers of drivese_doe.py / drivese_cli.py), and calls are assumed to come from one thread.
+
+Inner iterations are counted by the components themselves with count_iterations() - one per pass of a
+sizing loop (LSS length loops, bedplate section search, gearbox stage ratio objective evaluations). A count
+goes to every component call in progress, so a *_OM row includes the iterations of the compute() it wraps.
+
+Exports (Profiler.write()):
+  .txt / anything else   text table
+  .json                  the numbers per component
+  .speedscope.json       evented trace for https://www.speedscope.app (needs profiling(trace=True))
+  .pstats / .prof        cProfile statistics file - python -m pstats, snakeviz, gprof2dot
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import atexit
+import marshal
+import functools
+import importlib
+from contextlib import contextmanager
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+PROFILED_METHODS = ('compute', 'solve_nonlinear')
+COMPONENT_MODULES = ('drivese.drivese_components', 'drivese.hubse_components')
+OPENMDAO_MODULES = ('drivese.drivese_omdao', 'drivese.hubse_omdao')
+
+_active = None     # the Profiler in use, None when profiling is off
+_originals = {}    # (class, method name): original function, while profiling is on
+
+#-------------------------------------------------------------------------
+
+class Profiler(object):
+    ''' Profiler class
+          Accumulates the calls of the instrumented component methods while it is the active profiler.
+          With trace=True every call is also kept as open / close events (for write_speedscope()).
+    '''
+
+    def __init__(self, trace=False):
+
+        super(Profiler, self).__init__()
+
+        self.trace = trace
+        self.stats = {}    # name: [calls, total seconds, self seconds, iterations]
+        self.edges = {}    # (caller name or None, name): [calls, total seconds, self seconds]
+        self.sources = {}  # name: (file, line) of the profiled function
+        self.events = []   # (type 'O' or 'C', name, seconds from start)
+        self.stack = []    # [name, start, seconds in children, iterations] of the calls in progress
+        self.start = _timer()
+        self.stop = None
+
+    def enter(self, name):
+        frame = [name, _timer(), 0.0, 0]
+        self.stack.append(frame)
+        if self.trace:
+            self.events.append(('O', name, frame[1] - self.start))
+        return frame
+
+    def exit(self, frame):
+        end = _timer()
+        self.stack.pop()
+        name = frame[0]
+        elapsed = end - frame[1]
+        own = elapsed - frame[2]
+        caller = self.stack[-1][0] if self.stack else None
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        stats = self.stats.setdefault(name, [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += own
+        stats[3] += frame[3]
+        edge = self.edges.setdefault((caller, name), [0, 0.0, 0.0])
+        edge[0] += 1
+        edge[1] += elapsed
+        edge[2] += own
+        if self.trace:
+            self.events.append(('C', name, end - self.start))
+
+    def count(self, n):
+        for frame in self.stack:
+            frame[3] += n
+
+    #------------------------------------------------------------------
+    # reports
+
+    def wall_time(self):
+        return (self.stop if self.stop is not None else _timer()) - self.start
+
+    def to_dict(self):
+        ''' The numbers per component: calls, total, mean and self seconds, iterations '''
+        components = {}
+        for name, (calls, total, own, iterations) in self.stats.items():
+            components[name] = dict(calls=calls, total=total, mean=total / calls, self=own, iterations=iterations)
+        return dict(wall_time=self.wall_time(), components=components)
+
+    def report(self, sort='total'):
+        ''' Text table of the components, slowest (sort='total' or 'self') first '''
+        column = {'total': 1, 'self': 2}[sort]
+        lines = ['{:42s} {:>8s} {:>12s} {:>10s} {:>12s} {:>11s}'.format('component', 'calls', 'total ms', 'mean ms', 'self ms', 'iterations')]
+        for name, stats in sorted(self.stats.items(), key=lambda item: -item[1][column]):
+            calls, total, own, iterations = stats
+            lines.append('{:42s} {:8d} {:12.3f} {:10.3f} {:12.3f} {:11d}'.format(name, calls, 1000.0 * total, 1000.0 * total / calls,
+                                                                                  1000.0 * own, iterations))
+        lines.append('wall time {:.3f} ms'.format(1000.0 * self.wall_time()))
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    def write_speedscope(self, path):
+        ''' Evented profile in the speedscope file format (https://www.speedscope.app/file-format-schema.json) '''
+        if not self.trace:
+            raise ValueError('Profiler: a speedscope trace needs profiling(trace=True)')
+        names = sorted(set(name for kind, name, at in self.events))
+        index = dict((name, i) for i, name in enumerate(names))
+        events = [dict(type=kind, frame=index[name], at=at) for kind, name, at in self.events]
+        document = {'$schema': 'https://www.speedscope.app/file-format-schema.json',
+                    'shared': {'frames': [dict(name=name, file=self.sources.get(name, ('', 0))[0],
+                                               line=self.sources.get(name, ('', 0))[1]) for name in names]},
+                    'profiles': [dict(type='evented', name='drivese', unit='seconds', startValue=0.0,
+                                      endValue=self.wall_time(), events=events)],
+                    'name': 'drivese', 'activeProfileIndex': 0, 'exporter': 'drivese_profile'}
+        with open(path, 'w') as f:
+            json.dump(document, f)
+
+    def write_pstats(self, path):
+        ''' Statistics file in the format of cProfile.Profile.dump_stats() '''
+        def key(name):
+            filename, line = self.sources.get(name, ('drivese', 0))
+            return (filename, line, name)
+
+        stats = {}
+        for name, (calls, total, own, iterations) in self.stats.items():
+            callers = {}
+            for (caller, callee), (edge_calls, edge_total, edge_own) in self.edges.items():
+                if callee == name and caller is not None:
+                    callers[key(caller)] = (edge_calls, edge_calls, edge_own, edge_total)
+            stats[key(name)] = (calls, calls, own, total, callers)
+        with open(path, 'wb') as f:
+            marshal.dump(stats, f)
+
+    def write(self, path):
+        ''' Write the report in the format given by the file name (see the module docstring) '''
+        if path.endswith('.speedscope.json'):
+            self.write_speedscope(path)
+        elif path.endswith('.json'):
+            self.write_json(path)
+        elif path.endswith('.pstats') or path.endswith('.prof'):
+            self.write_pstats(path)
+        else:
+            with open(path, 'w') as f:
+                f.write(self.report() + '\n')
+
+#-------------------------------------------------------------------------
+# Instrumentation
+
+def count_iterations(n=1):
+    ''' Called by the components for each pass of an inner loop - does nothing when profiling is off '''
+    if _active is not None:
+        _active.count(n)
+
+def _profiled(name, func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return func(self, *args, **kwargs)
+        frame = profiler.enter(name)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            profiler.exit(frame)
+    return wrapper
+
+def instrument_module(module):
+    ''' Put the timing wrappers on the component methods of a module (a no-op when profiling is off) '''
+    if _active is None:
+        return
+    if not hasattr(module, '__dict__'):
+        module = sys.modules[module]
+    for cls in list(vars(module).values()):
+        if not isinstance(cls, type) or cls.__module__ != module.__name__:
+            continue
+        for method in PROFILED_METHODS:
+            func = cls.__dict__.get(method)
+            if func is None or (cls, method) in _originals:
+                continue
+            name = '{}.{}'.format(cls.__name__, method)
+            code = getattr(getattr(func, 'uncached', func), '__code__', None)  # the function under drivese_cache.memoize
+            if code is not None:
+                _active.sources[name] = (code.co_filename, code.co_firstlineno)
+            _originals[(cls, method)] = func
+            setattr(cls, method, _profiled(name, func))
+
+def enable(profiler):
+    ''' Make profiler the active profiler and instrument the component modules '''
+    global _active
+    if _active is not None:
+        raise RuntimeError('drivese_profile: profiling is already on')
+    _active = profiler
+    for name in COMPONENT_MODULES:
+        instrument_module(importlib.import_module(name))
+    # the OpenMDAO wrappers are instrumented if they are loaded (or when they are, see the end of drivese_omdao.py)
+    for name in OPENMDAO_MODULES:
+        if name in sys.modules:
+            instrument_module(sys.modules[name])
+
+def disable():
+    ''' Take the timing wrappers off again - returns the profiler that was active '''
+    global _active
+    for (cls, method), func in _originals.items():
+        setattr(cls, method, func)
+    _originals.clear()
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop = _timer()
+    return profiler
+
+def is_enabled():
+    return _active is not None
+
+@contextmanager
+def profiling(trace=False):
+    ''' with profiling() as profiler: ... - profile the component calls made in the block '''
+    profiler = Profiler(trace)
+    enable(profiler)
+    try:
+        yield profiler
+    finally:
+        disable()
+
+def enable_from_env():
+    ''' Start profiling if $DRIVESE_PROFILE is set; the report is written when the process exits '''
+    target = os.environ.get('DRIVESE_PROFILE', '').strip()
+    if not target or target.lower() in ('0', 'off', 'false', 'no') or _active is not None:
+        return
+    enable(Profiler(trace=target.endswith('.speedscope.json')))
+
+    def report():
+        profiler = disable()
+        if target.lower() in ('1', 'on', 'true', 'yes'):
+            sys.stderr.write(profiler.report() + '\n')
+        else:
+            profiler.write(target)
+
+    atexit.register(report)
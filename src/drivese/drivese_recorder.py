@@ -0,0 +1,276 @@
+"""
+drivese_recorder.py
+
+Compact binary recording of drivetrain evaluations (optimization histories, DOE sweeps).
+
+Every evaluation is one row of a fixed NumPy structured dtype - the drivetrain inputs (DRIVETRAIN_INPUTS) and
+outputs (RECORD_OUTPUTS by default) - appended to a memory-mapped file that grows in blocks of
+block_size rows. A history is read back by mapping the file (load_history()): nothing is parsed, and each
+field is a NumPy array, so queries are vectorized:
+
+    history = load_history('opt.drec')
+    ok = history.select(bedplate_length=(None, 12.0), machine_rating=5000.0)
+    best = history[history.best('nacelle_mass', ok)]
+
+RECORD_OUTPUTS is drivese_io.OUTPUT_NAMES without the inertias of the single components (nacelle_I and
+hub_system_I are kept) - they are 228 of the 584 bytes of float32 outputs, and any of them can be recovered
+by re-running the recorded inputs.
+
+Row size with the default fields: 107 bytes of inputs + 356 bytes of outputs (float32, ~7 significant
+digits; planet_numbers uint8) - about 460 MB per million evaluations. precision='float64' keeps inputs and
+outputs exact (~0.9 kB per row); outputs=drivese_io.OUTPUT_NAMES records everything (~690 MB per million
+in float32), outputs= / inputs= a subset.
+
+File layout: magic, row count (uint64), length of the JSON description (uint32), the description (fields,
+units, user metadata) padded to 64 bytes, then the rows. The row count is written by flush() and close(),
+so the history of a writer that died keeps the rows of its last flush.
+
+Usage:
+    with EvaluationRecorder('opt.drec', metadata={'driver': 'SLSQP'}) as recorder:
+        outputs = model.compute(record)           # DrivetrainModel
+        recorder.record(record, outputs)
+        recorder.record_batch(records, VectorizedDrivetrain(...).compute(records))
+
+EvaluationRecorder_OM in drivese_omdao.py records the iterations of an OpenMDAO Problem.
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import json
+import struct
+
+import numpy as np
+
+from drivese.drivese_pipeline import DRIVETRAIN_INPUTS
+from drivese.drivese_io import INPUT_UNITS, OUTPUT_NAMES, output_unit
+
+MAGIC = b'DRVSEREC'
+HEADER = struct.Struct('<8sQI')  # magic, row count, description length
+COUNT_OFFSET = 8
+ALIGNMENT = 64
+DEFAULT_BLOCK_SIZE = 8192
+
+RECORD_OUTPUTS = [name for name in OUTPUT_NAMES if not name.endswith('_I') or name in ('nacelle_I', 'hub_system_I')]
+
+#-------------------------------------------------------------------------
+
+def history_dtype(inputs=DRIVETRAIN_INPUTS, outputs=(), shapes=None, precision='float32'):
+    '''
+    Structured dtype of one evaluation: the inputs (planet_numbers uint8 (3,)) and the outputs, in precision,
+      with their shapes from shapes ({name: shape}, () if missing)
+    '''
+    shapes = shapes or {}
+    base = np.dtype(precision).newbyteorder('<').str
+    fields = []
+    for name in inputs:
+        if name == 'planet_numbers':
+            fields.append((name, '<u1', (3,)))
+        else:
+            fields.append((name, base, tuple(shapes.get(name, ()))))
+    for name in outputs:
+        fields.append((name, base, tuple(shapes.get(name, ()))))
+    return np.dtype(fields)
+
+def _description(dtype, inputs, metadata):
+    units = {}
+    for name in dtype.names:
+        units[name] = INPUT_UNITS.get(name) if name in inputs else output_unit(name)
+    return dict(fields=[[name, dtype[name].base.str, list(dtype[name].shape)] for name in dtype.names],
+                inputs=list(inputs), units=units, metadata=metadata or {})
+
+def _field_value(value, shape, missing):
+    if value is None:
+        return missing
+    if shape == () and not isinstance(value, np.ndarray):
+        return value
+    return np.reshape(value, shape)  # e.g. the (1,) arrays of OpenMDAO scalars
+
+#-------------------------------------------------------------------------
+
+class EvaluationRecorder(object):
+    ''' EvaluationRecorder class
+          Appends evaluations to a history file (see the module docstring). The dtype is fixed by the first
+          evaluation recorded (the shapes of its outputs); outputs missing from an evaluation are NaN.
+    '''
+
+    def __init__(self, path, inputs=DRIVETRAIN_INPUTS, outputs=RECORD_OUTPUTS, precision='float32',
+                 block_size=DEFAULT_BLOCK_SIZE, metadata=None):
+
+        super(EvaluationRecorder, self).__init__()
+
+        self.path = path
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.precision = precision
+        self.block_size = block_size
+        self.metadata = metadata
+
+        self.dtype = None
+        self.count = 0       # rows recorded
+        self.capacity = 0    # rows the file has room for
+        self.offset = 0      # start of the rows in the file
+        self._rows = None    # memmap of the current block
+        self._start = 0      # index of the first row of the current block
+        self._file = open(path, 'w+b')
+
+    def _create(self, shapes):
+        self.dtype = history_dtype(self.inputs, self.outputs, shapes, self.precision)
+        description = json.dumps(_description(self.dtype, self.inputs, self.metadata)).encode('utf-8')
+        self.offset = -(-(HEADER.size + len(description)) // ALIGNMENT) * ALIGNMENT
+        self._file.write(HEADER.pack(MAGIC, 0, len(description)))
+        self._file.write(description.ljust(self.offset - HEADER.size, b' '))
+        # (name, shape, input?, value if missing) of each field, for record()
+        self._plan = [(name, self.dtype[name].shape, name in self.inputs,
+                       np.full(self.dtype[name].shape, 0 if name in self.inputs else np.nan)) for name in self.dtype.names]
+
+    def _grow(self):
+        if self._rows is not None:
+            self._rows.flush()
+        self.capacity += self.block_size
+        self._file.truncate(self.offset + self.capacity * self.dtype.itemsize)
+        self._rows = np.memmap(self._file, dtype=self.dtype, mode='r+', offset=self.offset + self.count * self.dtype.itemsize,
+                               shape=(self.capacity - self.count,))
+        self._start = self.count
+
+    def record(self, record, outputs):
+        ''' Append one evaluation: record holds the inputs (missing ones are 0), outputs the outputs (dicts of name: value) '''
+        if self.dtype is None:
+            self._create(dict((name, np.shape(outputs[name])) for name in self.outputs if name in outputs))
+        if self.count == self.capacity:
+            self._grow()
+        row = tuple([_field_value((record if is_input else outputs).get(name), shape, missing)
+                     for name, shape, is_input, missing in self._plan])
+        self._rows[self.count - self._start] = row
+        self.count += 1
+
+    def record_batch(self, record, outputs):
+        '''
+        Append N evaluations at once (inputs and outputs of VectorizedDrivetrain.compute()): values are (N,) or
+          (N, k) arrays, inputs may also be scalars / one planet_numbers triple shared by all evaluations
+        '''
+        n = max(len(outputs[name]) for name in self.outputs if name in outputs)
+        if self.dtype is None:
+            self._create(dict((name, np.shape(outputs[name])[1:]) for name in self.outputs if name in outputs))
+        done = 0
+        while done < n:
+            if self.count == self.capacity:
+                self._grow()
+            size = min(n - done, self.capacity - self.count)
+            rows = self._rows[self.count - self._start:self.count - self._start + size]
+            for name in self.dtype.names:
+                shape = self.dtype[name].shape
+                if name in self.inputs:
+                    value = np.asarray(record.get(name, 0))
+                    if value.shape == shape:
+                        rows[name] = value
+                        continue
+                elif name in outputs:
+                    value = np.asarray(outputs[name])
+                else:
+                    rows[name] = np.nan
+                    continue
+                rows[name] = value[done:done + size]
+            done += size
+            self.count += size
+
+    def flush(self):
+        ''' Write the rows recorded so far and the row count to the file '''
+        if self.dtype is None:
+            return
+        if self._rows is not None:
+            self._rows.flush()
+        self._file.seek(COUNT_OFFSET)
+        self._file.write(struct.pack('<Q', self.count))
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.dtype is None:
+            self._create({})
+        self.flush()
+        self._rows = None
+        self._file.truncate(self.offset + self.count * self.dtype.itemsize)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+#-------------------------------------------------------------------------
+
+class EvaluationHistory(object):
+    ''' EvaluationHistory class
+          A recorded history, memory-mapped read-only. history[name] is the column of a field, history[i] or
+          history[mask] rows of the underlying structured array (history.rows).
+    '''
+
+    def __init__(self, path):
+
+        super(EvaluationHistory, self).__init__()
+
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, count, length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError('{} is not a DriveSE evaluation history'.format(path))
+            description = json.loads(f.read(length).decode('utf-8'))
+        self.count = count
+        self.dtype = np.dtype([(name, base, tuple(shape)) for name, base, shape in description['fields']])
+        self.inputs = description['inputs']
+        self.outputs = [name for name in self.dtype.names if name not in self.inputs]
+        self.units = description['units']
+        self.metadata = description['metadata']
+        offset = -(-(HEADER.size + length) // ALIGNMENT) * ALIGNMENT
+        if count:
+            self.rows = np.memmap(path, dtype=self.dtype, mode='r', offset=offset, shape=(count,))
+        else:
+            self.rows = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        return self.rows[key]
+
+    def select(self, **conditions):
+        '''
+        Boolean mask of the evaluations meeting all conditions: name=value, or name=(low, high) with None for
+          an open end; vector fields are selected by name_<index>, e.g. nacelle_cm_2=(None, 2.5)
+        '''
+        mask = np.ones(self.count, dtype=bool)
+        for name, condition in conditions.items():
+            column = self.column(name)
+            if isinstance(condition, tuple):
+                low, high = condition
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            else:
+                # compared in the precision of the field, so that a recorded 0.1 (float32) is found by 0.1
+                mask &= column == np.asarray(condition).astype(column.dtype)
+        return mask
+
+    def column(self, name):
+        if name in self.dtype.names:
+            return self.rows[name]
+        field, sep, index = name.rpartition('_')
+        if field in self.dtype.names and index.isdigit():
+            return self.rows[field][:, int(index)]
+        raise KeyError('{} is not a field of {}'.format(name, self.path))
+
+    def best(self, name, mask=None, maximize=False):
+        ''' Index of the evaluation with the lowest (highest) value of a field, among those in mask '''
+        column = np.asarray(self.column(name), dtype=float)
+        if mask is not None:
+            column = np.where(mask, column, np.nan)
+        if np.all(np.isnan(column)):
+            raise ValueError('no evaluation to choose from')
+        return int(np.nanargmax(column) if maximize else np.nanargmin(column))
+
+def load_history(path):
+    return EvaluationHistory(path)
@@ -0,0 +1,305 @@
+"""
+drivese_surrogate.py
+
+Surrogate (response surface) models of the Drive3pt / Drive4pt drivetrain for system-level work where only
+a few outputs (by default nacelle mass, cm and I) are needed as smooth functions of a handful of inputs.
+
+The full model (pure-python pipeline, drivese_pipeline.py) is sampled over a box domain with a latin
+hypercube, in parallel through the design-of-experiments runner (drivese_doe.py), and one of these is fitted
+to the samples, in inputs scaled to [-1, 1]:
+  - 'poly': least-squares polynomial of total degree `degree`
+  - 'rbf':  radial basis function interpolant with a linear tail - kernel 'cubic' (r**3), 'thin_plate'
+            (r**2 log r) or 'gaussian' (exp(-(epsilon r)**2), the kriging-like choice); `smoothing` > 0
+            regularizes it for noisy outputs
+The error of the fit is estimated by k-fold cross validation and kept with the surrogate (cv_rmse, cv_max,
+per output, same shape as the output).
+
+A fitted surrogate is evaluated on whole columns at once (predict()); evaluate() also checks each query
+against the trained domain and runs the full model for the rows outside of it. Surrogates are saved to a
+single .npz file (save() / DrivetrainSurrogate.load()).
+
+Usage:
+    surrogate = DrivetrainSurrogate({'rotor_diameter': (110., 140.), 'overhang': (4.5, 5.5), ...},
+                                    dict(mb1Type='SRB', IEC_Class='B', ...), example_5MW_baseline_record())
+    surrogate.sample(500, 'doe_surrogate')       # or surrogate.fit(results) with DOE results from elsewhere
+    surrogate.save('nacelle_5MW.npz')
+    out = DrivetrainSurrogate.load('nacelle_5MW.npz').evaluate({'rotor_diameter': d, 'overhang': x, ...})
+
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import json
+import itertools
+
+import numpy as np
+
+from drivese.drivese_pipeline import DrivetrainModel, DRIVETRAIN_INPUTS
+from drivese.drivese_doe import DOERunner, latin_hypercube, sample_count, evaluate_chunk
+
+SURROGATE_OUTPUTS = ['nacelle_mass', 'nacelle_cm', 'nacelle_I']
+RBF_KERNELS = ('cubic', 'thin_plate', 'gaussian')
+
+#-------------------------------------------------------------------------
+# Response surfaces - X is (n, ndim) in scaled inputs, Y is (n, ntargets)
+
+def polynomial_exponents(ndim, degree):
+    ''' Exponents of all the monomials in ndim variables of total degree <= degree, as an (nterms, ndim) array '''
+    exponents = [e for e in itertools.product(range(degree + 1), repeat=ndim) if sum(e) <= degree]
+    exponents.sort(key=lambda e: (sum(e), tuple(-k for k in e)))
+    return np.array(exponents, dtype=int).reshape(-1, ndim)
+
+def polynomial_features(X, exponents):
+    ''' Monomials of the rows of X, (n, nterms) '''
+    return np.prod(X[:, np.newaxis, :] ** exponents[np.newaxis, :, :], axis=2)
+
+def rbf_kernel(r, kernel, epsilon):
+    if kernel == 'cubic':
+        return r ** 3
+    elif kernel == 'thin_plate':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(r > 0.0, r ** 2 * np.log(np.where(r > 0.0, r, 1.0)), 0.0)
+    elif kernel == 'gaussian':
+        return np.exp(-(epsilon * r) ** 2)
+    raise ValueError('unknown RBF kernel {} (one of {})'.format(kernel, RBF_KERNELS))
+
+def _distances(X, centers):
+    d2 = np.sum(X ** 2, axis=1)[:, np.newaxis] + np.sum(centers ** 2, axis=1)[np.newaxis, :] - 2.0 * X.dot(centers.T)
+    return np.sqrt(np.maximum(d2, 0.0))
+
+def fit_response(X, Y, method='poly', degree=2, kernel='cubic', epsilon=1.0, smoothing=0.0):
+    ''' Fit a response surface - returns its state, a dict of arrays (see predict_response()) '''
+    if method == 'poly':
+        exponents = polynomial_exponents(X.shape[1], degree)
+        if len(X) < len(exponents):
+            raise ValueError('a degree {} polynomial in {} inputs needs at least {} samples, got {}'.format(
+                             degree, X.shape[1], len(exponents), len(X)))
+        coefficients = np.linalg.lstsq(polynomial_features(X, exponents), Y, rcond=None)[0]
+        return {'exponents': exponents, 'coefficients': coefficients}
+
+    elif method == 'rbf':
+        n, ndim = X.shape
+        tail = np.hstack([np.ones((n, 1)), X])
+        A = np.zeros((n + ndim + 1, n + ndim + 1))
+        A[:n, :n] = rbf_kernel(_distances(X, X), kernel, epsilon) + smoothing * np.eye(n)
+        A[:n, n:] = tail
+        A[n:, :n] = tail.T
+        rhs = np.vstack([Y, np.zeros((ndim + 1, Y.shape[1]))])
+        solution = np.linalg.lstsq(A, rhs, rcond=None)[0]
+        return {'centers': X.copy(), 'weights': solution[:n], 'tail': solution[n:]}
+
+    raise ValueError('unknown surrogate method {} (poly or rbf)'.format(method))
+
+def predict_response(state, X, kernel='cubic', epsilon=1.0):
+    ''' Evaluate a fitted response surface at the rows of X - (n, ntargets) '''
+    if 'exponents' in state:
+        return polynomial_features(X, state['exponents']).dot(state['coefficients'])
+    K = rbf_kernel(_distances(X, state['centers']), kernel, epsilon)
+    return K.dot(state['weights']) + np.hstack([np.ones((len(X), 1)), X]).dot(state['tail'])
+
+def cross_validate(X, Y, folds=5, seed=None, **options):
+    '''
+    k-fold cross validation of fit_response(X, Y, **options) -
+      returns the RMS and maximum absolute error of the held-out predictions, per target
+    '''
+    n = len(X)
+    folds = min(folds, n)
+    if folds < 2:
+        raise ValueError('cross validation needs at least 2 samples')
+    order = np.random.RandomState(seed).permutation(n)
+    errors = np.zeros(Y.shape)
+    predict_options = dict((k, options[k]) for k in ('kernel', 'epsilon') if k in options)
+    for test in np.array_split(order, folds):
+        train = np.setdiff1d(order, test)
+        state = fit_response(X[train], Y[train], **options)
+        errors[test] = predict_response(state, X[test], **predict_options) - Y[test]
+    return np.sqrt(np.mean(errors ** 2, axis=0)), np.max(np.abs(errors), axis=0)
+
+#-------------------------------------------------------------------------
+
+class DrivetrainSurrogate(object):
+    ''' DrivetrainSurrogate class
+          Response surface of the outputs of DrivetrainModel(**model_kwargs) over a box domain of its inputs
+          (dict of name: (lower, upper)); the other inputs are those of base_record.
+    '''
+
+    def __init__(self, domain, model_kwargs, base_record=None, outputs=SURROGATE_OUTPUTS,
+                 method='poly', degree=2, kernel='cubic', epsilon=1.0, smoothing=0.0, folds=5):
+
+        super(DrivetrainSurrogate, self).__init__()
+
+        self.names = sorted(domain)
+        for name in self.names:
+            if name not in DRIVETRAIN_INPUTS or name == 'planet_numbers':
+                raise ValueError('DrivetrainSurrogate: {} is not a scalar drivetrain input'.format(name))
+        self.lower = np.array([domain[name][0] for name in self.names], dtype=float)
+        self.upper = np.array([domain[name][1] for name in self.names], dtype=float)
+        if np.any(self.upper <= self.lower):
+            raise ValueError('DrivetrainSurrogate: empty domain for {}'.format([n for n, l, u in zip(self.names, self.lower, self.upper) if u <= l]))
+        if method == 'rbf' and kernel not in RBF_KERNELS:
+            raise ValueError('unknown RBF kernel {} (one of {})'.format(kernel, RBF_KERNELS))
+
+        self.model_kwargs = dict(model_kwargs)
+        self.base_record = dict(base_record or {})
+        self.outputs = list(outputs)
+        self.method = method
+        self.degree = degree
+        self.kernel = kernel
+        self.epsilon = epsilon
+        self.smoothing = smoothing
+        self.folds = folds
+
+        self.shapes = None    # output name: shape of one value
+        self.state = None     # fitted response surface (fit_response())
+        self.cv_rmse = None   # output name: cross-validated RMS error
+        self.cv_max = None    # output name: cross-validated maximum error
+        self.n_samples = 0
+        self.model = None     # full model for the queries outside of the domain, built on first use
+
+    def domain(self):
+        return dict((name, (l, u)) for name, l, u in zip(self.names, self.lower, self.upper))
+
+    def scale(self, samples):
+        ''' Query columns (dict) -> (n, ndim) array scaled to [-1, 1] over the domain '''
+        missing = [name for name in self.names if name not in samples]
+        extra = [name for name in samples if name not in self.names]
+        if missing or extra:
+            raise ValueError('DrivetrainSurrogate: queries must give exactly {} (missing {}, not in the surrogate {})'.format(
+                             self.names, missing, extra))
+        x = np.column_stack([np.asarray(samples[name], dtype=float).ravel() for name in self.names])
+        return 2.0 * (x - self.lower) / (self.upper - self.lower) - 1.0
+
+    def in_domain(self, samples):
+        ''' True for the queries inside the trained domain (bounds included) '''
+        return np.all(np.abs(self.scale(samples)) <= 1.0, axis=1)
+
+    #------------------------------------------------------------------
+
+    def sample(self, n, output_dir, jobs=None, seed=None, chunk_size=50, verbose=False):
+        ''' Run the full model at n latin hypercube samples of the domain (DOERunner, resumable) and fit them '''
+        runner = DOERunner(output_dir, self.model_kwargs, self.base_record, chunk_size=chunk_size, jobs=jobs, verbose=verbose)
+        results = runner.run(latin_hypercube(self.domain(), n, seed=seed))
+        return self.fit(results)
+
+    def fit(self, results):
+        '''
+        Fit the surrogate to DOE results (dict of columns as returned by DOERunner.run() / load_results()),
+          which must hold an 'in:' column for every input of the domain and 'out:' columns for the outputs.
+          Failed samples are left out. Returns self.
+        '''
+        ok = np.ones(len(results['in:' + self.names[0]]), dtype=bool)
+        if 'error' in results:
+            ok &= np.array([not e for e in results['error']])
+        x = self.scale(dict((name, results['in:' + name][ok]) for name in self.names))
+        if np.any(np.abs(x) > 1.0):
+            raise ValueError('DrivetrainSurrogate: samples outside of the domain')
+
+        self.shapes = dict((name, results['out:' + name].shape[1:]) for name in self.outputs)
+        Y = np.hstack([results['out:' + name][ok].reshape(x.shape[0], -1) for name in self.outputs])
+
+        options = self.fit_options()
+        rmse, worst = cross_validate(x, Y, folds=self.folds, seed=0, **options)
+        self.cv_rmse = self.unflatten(rmse[np.newaxis, :], squeeze=True)
+        self.cv_max = self.unflatten(worst[np.newaxis, :], squeeze=True)
+        self.state = fit_response(x, Y, **options)
+        self.n_samples = x.shape[0]
+        return self
+
+    def fit_options(self):
+        if self.method == 'poly':
+            return dict(method='poly', degree=self.degree)
+        return dict(method='rbf', kernel=self.kernel, epsilon=self.epsilon, smoothing=self.smoothing)
+
+    def unflatten(self, Y, squeeze=False):
+        ''' (n, ntargets) array -> dict of output name: (n,) + shape arrays '''
+        columns = {}
+        start = 0
+        for name in self.outputs:
+            size = int(np.prod(self.shapes[name]))
+            column = Y[:, start:start + size].reshape((len(Y),) + tuple(self.shapes[name]))
+            columns[name] = column[0] if squeeze else column
+            start += size
+        return columns
+
+    #------------------------------------------------------------------
+
+    def predict(self, samples):
+        ''' Surrogate outputs for the query columns (dict of name: array of length n), whether in the domain or not '''
+        if self.state is None:
+            raise RuntimeError('DrivetrainSurrogate: not fitted - call sample() or fit() first')
+        return self.unflatten(predict_response(self.state, self.scale(samples), kernel=self.kernel, epsilon=self.epsilon))
+
+    def evaluate(self, samples):
+        '''
+        Outputs for the query columns: surrogate predictions inside the trained domain, full model runs outside of it.
+          The result also holds 'surrogate' (True where the surrogate was used) and 'error' (the exception
+          of a failed full-model run, '' elsewhere; its outputs are NaN).
+        '''
+        inside = self.in_domain(samples)
+        outputs = self.predict(samples)
+        errors = [''] * len(inside)
+        outside = np.flatnonzero(~inside)
+        if len(outside):
+            if self.model is None:
+                self.model = DrivetrainModel(**self.model_kwargs)
+            rows = dict((name, np.asarray(samples[name], dtype=float).ravel()[outside]) for name in self.names)
+            full, full_errors = evaluate_chunk(self.model, rows, self.base_record)
+            for name in self.outputs:
+                outputs[name][outside] = full[name] if name in full else np.nan
+            for i, error in zip(outside, full_errors):
+                errors[i] = error
+        outputs['surrogate'] = inside
+        outputs['error'] = np.array(errors, dtype=str)
+        return outputs
+
+    #------------------------------------------------------------------
+
+    def save(self, path):
+        ''' Write the fitted surrogate to one .npz file '''
+        if self.state is None:
+            raise RuntimeError('DrivetrainSurrogate: not fitted - call sample() or fit() first')
+        meta = dict(domain=dict((name, [l, u]) for name, l, u in zip(self.names, self.lower.tolist(), self.upper.tolist())),
+                    model_kwargs=self.model_kwargs,
+                    base_record=dict((name, np.asarray(value).tolist()) for name, value in self.base_record.items()),
+                    outputs=self.outputs, shapes=dict((name, list(shape)) for name, shape in self.shapes.items()),
+                    method=self.method, degree=self.degree, kernel=self.kernel, epsilon=self.epsilon,
+                    smoothing=self.smoothing, folds=self.folds, n_samples=self.n_samples)
+        arrays = dict(('state:' + key, value) for key, value in self.state.items())
+        arrays.update(('cv_rmse:' + name, np.asarray(value)) for name, value in self.cv_rmse.items())
+        arrays.update(('cv_max:' + name, np.asarray(value)) for name, value in self.cv_max.items())
+        np.savez(path, meta=np.array(json.dumps(meta, sort_keys=True)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            surrogate = cls(dict((name, tuple(bounds)) for name, bounds in meta['domain'].items()), meta['model_kwargs'],
+                            meta['base_record'], meta['outputs'], method=meta['method'], degree=meta['degree'],
+                            kernel=meta['kernel'], epsilon=meta['epsilon'], smoothing=meta['smoothing'], folds=meta['folds'])
+            surrogate.shapes = dict((name, tuple(shape)) for name, shape in meta['shapes'].items())
+            surrogate.n_samples = meta['n_samples']
+            surrogate.state = dict((key[len('state:'):], data[key]) for key in data.files if key.startswith('state:'))
+            surrogate.cv_rmse = dict((name, data['cv_rmse:' + name]) for name in surrogate.outputs)
+            surrogate.cv_max = dict((name, data['cv_max:' + name]) for name in surrogate.outputs)
+        return surrogate
+
+#-------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    import tempfile
+    import time
+    from drivese.drivese_pipeline import example_5MW_baseline_record
+
+    domain = {'rotor_diameter': (115.0, 135.0), 'overhang': (4.5, 5.5), 'rotor_torque': (3.5e6, 4.8e6),
+              'tower_top_diameter': (3.5, 4.0), 'blade_mass': (15000.0, 20000.0)}
+    model_kwargs = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                        uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+    for method in ['poly', 'rbf']:
+        surrogate = DrivetrainSurrogate(domain, model_kwargs, example_5MW_baseline_record(), method=method)
+        start = time.time()
+        surrogate.sample(200, tempfile.mkdtemp(), seed=1)
+        print('{}: fitted to {} samples in {:.1f} s'.format(method, surrogate.n_samples, time.time() - start))
+        print('    cross-validated nacelle mass error: rms {:.1f} kg, max {:.1f} kg'.format(
+              float(surrogate.cv_rmse['nacelle_mass']), float(surrogate.cv_max['nacelle_mass'])))
@@ -1,13 +1,17 @@
 # Utility functions used by drivese components
 
 import numpy as np
-import scipy as scp
 from math import pi, cos, sqrt, sin, exp, log10, log
-import sys
+from drivese.drivese_log import get_logger
 
 #-------------------------------------------------------------------------
 # Supporting functions
 
+def simps(y, x=None, even='avg'):
+    ''' scipy.integrate.simps() - scipy is only loaded when it is first needed '''
+    from scipy.integrate import simps as _simps
+    return _simps(y, x=x, even=even)
+
 #If user does not specify key information about turbine properties,
 #they are estimated from curve fits to basic turbine configuration parameters
 
@@ -169,109 +173,121 @@ def mainshaftFlangeCalc(D_in, D_face_MB, flange_thickness, debug=False):
 	                                                                                  #  R65 Total Rotor Lock Cost    USD
     # TODO: add lockplate - mass, cm, cost
     
-    if debug:
-        sys.stderr.write('msFlange: len {:.2f} m  mass {:.1f} kg  cm {:.2f} m  cost ${:.2f}\n'.format(flange_length, mass_flange, cm_flange, cost_flange))
+    log = get_logger('mainshaftFlangeCalc', debug)
+    if log.enabled():
+        log.debug('msFlange: len {flange_length:.2f} m  mass {mass:.1f} kg  cm {cm:.2f} m  cost ${cost:.2f}',
+                  flange_length=flange_length, mass=mass_flange, cm=cm_flange, cost=cost_flange)
 
     return flange_length, mass_flange, cm_flange, cost_flange
 
-#%% Transform functions for rotor forces and moments (not currently used)
+#%% Transform functions for rotor forces and moments
 # ---------------------------------------------------------------------
+# Blade root loads (in the blade coordinate system: z along the blade, x downwind at zero pitch) to the hub
+#   (x along the shaft, downwind; z up when azimuth is 0). The blade frame is pitched about its z axis, coned
+#   about y (positive: tip downwind) and turned by its azimuth about the shaft:
+#     R = Rx(azimuth) Ry(cone) Rz(pitch)
+# All angles in radians. The transforms take load histories - (n_time, n_blades, 3) arrays, or (n_blades, 3)
+#   for a single instant - and the angles as scalars, (n_time,) or (n_time, n_blades) arrays.
+
+def rotationMatrix(angle, axis=1):
+    ''' Rotation by angle (rad, scalar or array) about axis (0, 1, 2 = x, y, z) - shape angle.shape + (3, 3) '''
+    c, s = np.cos(angle), np.sin(angle)
+    R = np.zeros(np.shape(angle) + (3, 3))
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    R[..., axis, axis] = 1.0
+    R[..., i, i] = c
+    R[..., j, j] = c
+    R[..., j, i] = s
+    R[..., i, j] = -s
+    return R
+
+def _per_blade(angle, shape):
+    # angle with one value per instant (the shape of the loads without the blade axis) -> one per blade
+    angle = np.asarray(angle, dtype=float)
+    if angle.ndim == len(shape) - 1 and angle.ndim > 0:
+        angle = angle[..., np.newaxis]
+    return np.broadcast_to(angle, shape)
+
+def blade_rotation(azimuth, pitch_angle, cone_angle, shape):
+    '''
+    Rotation matrices blade -> hub, shape + (3, 3), for loads of shape + (3,) (shape: (n_time, n_blades) or (n_blades,))
+      azimuth is the rotor azimuth (angle of blade 1, the other blades evenly spaced after it) - a scalar or one
+      value per instant - or one angle per blade (shape). Pitch and cone: scalars, one value per instant (e.g.
+      collective pitch (n_time,)) or one per blade (shape, or (1, n_blades) for a history).
+    '''
+    shape = tuple(shape)
+    azimuth = np.asarray(azimuth, dtype=float)
+    if azimuth.ndim < len(shape):
+        azimuth = azimuth[..., np.newaxis] + (2 * pi / shape[-1]) * np.arange(shape[-1])
+    return np.matmul(np.matmul(rotationMatrix(np.broadcast_to(azimuth, shape), 0), rotationMatrix(_per_blade(cone_angle, shape), 1)),
+                     rotationMatrix(_per_blade(pitch_angle, shape), 2))
+
+def blade_loads_to_hub(loads, rotation):
+    ''' Sum over the blades of the blade loads (..., n_blades, 3) turned to the hub frame - (..., 3) '''
+    return np.einsum('...bij,...bj->...i', rotation, loads)
+
 class blade_moment_transform(object):
     ''' Blade_Moment_Transform class          
           The Blade_Moment_Transform class is used to transform moments from the WISDEM rotor models to driveSE.
+          compute() takes blade root moment histories (n_time, n_blades, 3) [Mx, My, Mz] in the blade coordinate
+          systems and returns the rotor moment histories Mx, My, Mz (n_time,) in the hub frame.
     '''
 
     def __init__(self):
         super(blade_moment_transform, self).__init__()
 
+    def compute(self, azimuth_angle, pitch_angle, cone_angle, blade_moments, rotation=None):
+
         # variables
-        # ensure angles are in radians. Azimuth is 3-element array with blade
-        # azimuths; b1, b2, b3 are 3-element arrays for each blade moment (Mx, My,
-        # Mz); pitch and cone are floats
-        self.add_param('azimuth_angle', val=np.array([0, 2 * pi / 3, 4 * pi / 3]), units='rad', desc='azimuth angles for each blade')
-        self.add_param('pitch_angle', val=0.0, units='rad', desc='pitch angle at each blade, assumed same')
-        self.add_param('cone_angle', val=0.0, units='rad', desc='cone angle at each blade, assumed same')
-        self.add_param('b1', val=np.array([]), units='N*m', desc='moments in x,y,z directions along local blade coordinate system')
-        self.add_param('b2', val=np.array([]), units='N*m', desc='moments in x,y,z directions along local blade coordinate system')
-        self.add_param('b3', val=np.array([]), units='N*m', desc='moments in x,y,z directions along local blade coordinate system')
-
-        # returns
-        self.add_output('Mx', val=0.0, units='N*m',  desc='rotor moment in x-direction')
-        self.add_output('My', val=0.0, units='N*m',  desc='rotor moment in y-direction')
-        self.add_output('Mz', val=0.0, units='N*m',  desc='rotor moment in z-direction')
-
-    def solve_nonlinear(self, params, unknowns, resids):
-
-        # nested function for transformations
-        def trans(alpha, con, phi, bMx, bMy, bMz):
-            Mx = bMx * cos(con) * cos(alpha) - bMy * (sin(con) * cos(alpha) * sin(phi) - sin(
-                alpha) * cos(phi)) + bMz * (sin(con) * cos(alpha) * cos(phi) - sin(alpha) * sin(phi))
-            My = bMx * cos(con) * sin(alpha) - bMy * (sin(con) * sin(alpha) * sin(phi) + cos(
-                alpha) * cos(phi)) + bMz * (sin(con) * sin(alpha) * cos(phi) + cos(alpha) * sin(phi))
-            Mz = bMx * (-sin(alpha)) - bMy * (-cos(alpha) *
-                                              sin(phi)) + bMz * (cos(alpha) * cos(phi))
-
-            return [Mx, My, Mz]
-
-        [b1Mx, b1My, b1Mz] = trans(self.pitch_angle, self.cone_angle, self.azimuth_angle[
-                                   0], self.b1[0], self.b1[1], self.b1[2])
-        [b2Mx, b2My, b2Mz] = trans(self.pitch_angle, self.cone_angle, self.azimuth_angle[
-                                   1], self.b2[0], self.b2[1], self.b2[2])
-        [b3Mx, b3My, b3Mz] = trans(self.pitch_angle, self.cone_angle, self.azimuth_angle[
-                                   2], self.b3[0], self.b3[1], self.b3[2])
-
-        self.Mx = b1Mx + b2Mx + b3Mx
-        self.My = b1My + b2My + b3My
-        self.Mz = b1Mz + b2Mz + b3Mz
+        # angles in radians, as in blade_rotation(): rotor azimuth history (n_time,) or one azimuth per blade,
+        # pitch and cone scalars or histories
+        # rotation: blade_rotation() of the same angles, when already computed (e.g. by blade_force_transform)
+        if rotation is None:
+            rotation = blade_rotation(azimuth_angle, pitch_angle, cone_angle, np.shape(blade_moments)[:-1])
+        self.rotation = rotation
+
+        M = blade_loads_to_hub(blade_moments, rotation)
+        self.Mx, self.My, self.Mz = M[..., 0], M[..., 1], M[..., 2]
 
+        return (self.Mx, self.My, self.Mz)
 
 class blade_force_transform(object):
     ''' Blade_Force_Transform class          
           The Blade_Force_Transform class is used to transform forces from the WISDEM rotor models to driveSE.
+          compute() takes blade root force histories (n_time, n_blades, 3) [Fx, Fy, Fz] in the blade coordinate
+          systems and returns the rotor force histories Fx, Fy, Fz (n_time,) in the hub frame.
     '''
 
     def __init__(self):
         super(blade_force_transform, self).__init__()
 
-        # variables
-        # ensure angles are in radians. Azimuth is 3-element array with blade
-        # azimuths; b1, b2, b3 are 3-element arrays for each blade force (Fx, Fy,
-        # Fz); pitch and cone are floats
-        self.add_param('azimuth_angle', val=np.array([0, 2 * pi / 3, 4 * pi / 3]), units='rad', desc='azimuth angles for each blade')
-        self.add_param('pitch_angle', val=0.0, units='rad', desc='pitch angle at each blade, assumed same')
-        self.add_param('cone_angle', val=0.0, units='rad', desc='cone angle at each blade, assumed same')
-        self.add_param('b1', val=np.array([]), units='N', desc='forces in x,y,z directions along local blade coordinate system')
-        self.add_param('b2', val=np.array([]), units='N', desc='forces in x,y,z directions along local blade coordinate system')
-        self.add_param('b3', val=np.array([]), units='N', desc='forces in x,y,z directions along local blade coordinate system')
-
-        # returns
-        self.add_output('Fx', val=0.0, units='N',  desc='rotor force in x-direction')
-        self.add_output('Fy', val=0.0, units='N',  desc='rotor force in y-direction')
-        self.add_output('Fz', val=0.0, units='N',  desc='rotor force in z-direction')
-        
-    def solve_nonlinear(self, params, unknowns, resids):
-
-        # nested function for transformations
-        def trans(alpha, con, phi, bFx, bFy, bFz):
-            Fx = bFx * cos(con) * cos(alpha) - bFy * (sin(con) * cos(alpha) * sin(phi) - sin(
-                alpha) * cos(phi)) + bFz * (sin(con) * cos(alpha) * cos(phi) - sin(alpha) * sin(phi))
-            Fy = bFx * cos(con) * sin(alpha) - bFy * (sin(con) * sin(alpha) * sin(phi) + cos(
-                alpha) * cos(phi)) + bFz * (sin(con) * sin(alpha) * cos(phi) + cos(alpha) * sin(phi))
-            Fz = bFx * (-sin(alpha)) - bFy * (-cos(alpha) *
-                                              sin(phi)) + bFz * (cos(alpha) * cos(phi))
-
-            return [Fx, Fy, Fz]
-
-        [b1Fx, b1Fy, b1Fz] = trans(self.pitch_angle, self.cone_angle, self.azimuth_angle[
-                                   0], self.b1[0], self.b1[1], self.b1[2])
-        [b2Fx, b2Fy, b2Fz] = trans(self.pitch_angle, self.cone_angle, self.azimuth_angle[
-                                   1], self.b2[0], self.b2[1], self.b2[2])
-        [b3Fx, b3Fy, b3Fz] = trans(self.pitch_angle, self.cone_angle, self.azimuth_angle[
-                                   2], self.b3[0], self.b3[1], self.b3[2])
-
-        self.Fx = b1Fx + b2Fx + b3Fx
-        self.Fy = b1Fy + b2Fy + b3Fy
-        self.Fz = b1Fz + b2Fz + b3Fz
+    def compute(self, azimuth_angle, pitch_angle, cone_angle, blade_forces, rotation=None):
+
+        # see blade_moment_transform.compute()
+        if rotation is None:
+            rotation = blade_rotation(azimuth_angle, pitch_angle, cone_angle, np.shape(blade_forces)[:-1])
+        self.rotation = rotation
+
+        F = blade_loads_to_hub(blade_forces, rotation)
+        self.Fx, self.Fy, self.Fz = F[..., 0], F[..., 1], F[..., 2]
+
+        return (self.Fx, self.Fy, self.Fz)
+
+def rotor_load_history(blade_forces, blade_moments, azimuth_angle, pitch_angle=0.0, cone_angle=0.0, hub_radius=0.0):
+    '''
+    Hub frame rotor loads (n_time, 6) [Fx, Fy, Fz, Mx, My, Mz] from blade root force and moment histories
+      (n_time, n_blades, 3) - one set of rotation matrices for both. The columns are the histories of rotor_thrust,
+      rotor_force_y, rotor_force_z, rotor_bending_moment_x (torque), rotor_bending_moment_y and _z.
+    The moments are about the hub center: each blade root is hub_radius (m) out along its blade z axis, so the
+      root force adds r x F to the root moment. With hub_radius=0 (the default) they are the sum of the blade root
+      moments taken about the roots, as blade_moment_transform gives them.
+    '''
+    rotation = blade_rotation(azimuth_angle, pitch_angle, cone_angle, np.shape(blade_forces)[:-1])
+    forces = np.einsum('...bij,...bj->...bi', rotation, blade_forces)  # each blade's root force in the hub frame
+    moments = blade_loads_to_hub(blade_moments, rotation)
+    if np.any(hub_radius):
+        moments = moments + np.cross(hub_radius * rotation[..., :, 2], forces).sum(axis=-2)
+    return np.concatenate([forces.sum(axis=-2), moments], axis=-1)
 
 #-------------------------------------------------------------------------
 # Fatigue calculations supporting functions and code for low speed shaft and main bearing(s) (not currently used)
@@ -302,7 +318,7 @@ def C_calc(F_a, F_r, N_array, p, e, Y1, Y2, X2, life_bearing):
     else:
         P = X2 * F_r + Y2 * F_a
 
-    P_eq = ((scp.integrate.simps((P**p), x=N_array, even='avg')) /
+    P_eq = ((simps((P**p), x=N_array, even='avg')) /
             (N_array[-1] - N_array[0]))**(1 / p)
     C_min = P_eq * (life_bearing / 1e6)**(1. / p) / 1000  # kN
     return C_min
@@ -462,7 +478,7 @@ def get_Damage_Brng2(self):
             (Ninterp(S_mod_stoch2[i], self.SN_a, self.SN_b))
 
     # damage from stochastic loading
-    self.Damage = scp.integrate.simps(DEL_y, x=self.N, even='avg')
+    self.Damage = simps(DEL_y, x=self.N, even='avg')
 
     # create deterministic loads occurring N_rotor times
     self.Fz1determ = (self.gearboxWeight * self.L_gb - self.LssWeight * .5 *
@@ -517,7 +533,7 @@ def get_Damage_Brng1(self):
             (Ninterp(S_mod_stoch1[i], self.SN_a, self.SN_b))
 
     # damage from stochastic loading
-    self.Damage = scp.integrate.simps(DEL_y, x=self.N, even='avg')
+    self.Damage = simps(DEL_y, x=self.N, even='avg')
 
     # create deterministic loads occurring N_rotor times
     # only deterministic stress at mb1 is bending due to weights
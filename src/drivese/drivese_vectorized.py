@@ -0,0 +1,1030 @@
+"""
+drivese_vectorized.py
+
+Whole-nacelle evaluation of N designs at once. The same component chain as drivese_pipeline.DrivetrainModel
+(Drive3pt / Drive4pt) is written as NumPy array operations over the designs, so sweeps of many thousands
+of candidate nacelles run in a few array passes instead of N calls to each component.
+
+Inputs are a struct of arrays: a dict (or anything indexable by name) of the DRIVETRAIN_INPUTS, each a
+scalar or an array of length N (planet_numbers may be (3,) or (N, 3)). Missing inputs are 0, as in
+DrivetrainModel. The outputs are a dict of arrays under the same names as DrivetrainModel's outputs:
+shape (N,) for scalars, (N, 3) for cms and hub_I, (N, 6) for the other inertias, plus 'status' (N,).
+A design that cannot be sized (non-finite inputs or results, no feasible bedplate section) does not stop
+the batch: its outputs are NaN and its status is STATUS_NOT_FINITE or STATUS_NO_BEDPLATE.
+
+The iterative parts of the model run for all designs together:
+  - LSS length loops: each design steps through the same sequence of shaft lengths as the scalar
+    loop, and drops out of the (masked) iteration when its own stopping test is met. Only the
+    maximum of the bending moment over the 101-point grids of the scalar code is needed at each
+    step - it is found from the ends of the shaft segments and the grid points around the one
+    interior local maximum of the moment, which is known in closed form.
+  - gearbox stage ratios: Newton iterations on the volume minimization (with the stage ratio
+    product constraint eliminated) replace the per-design COBYLA solution. The ratios agree with
+    COBYLA (rhoend = 1e-7) to about 1e-7, which sets the accuracy of the gearbox and downstream masses.
+  - bedplate (legacy 'step' sizing): bisection over the table of legacy sections for each design,
+    using the fact that stress and deflection both fall as the section grows.
+Everything else is closed form and reproduces the scalar components to round-off.
+
+Only the default component options of DrivetrainModel are supported (bedplate sizing='step' with the
+cantilever beam model, one rotor load case per design, useComputeD and useFlangeModel on).
+
+There is NO OpenMDAO code in this file.
+"""
+
+from __future__ import print_function
+
+import time
+from math import pi
+
+import numpy as np
+
+from drivese import drivese_bedplate as bp
+from drivese.drivese_components import bearing_defl_check, computeD, FLANGE_THICK_FACTOR, useComputeD, useFlangeModel, \
+                                       NacelleSystemAdder, RNASystemAdder, principalI
+from drivese.drivese_pipeline import DRIVETRAIN_INPUTS, example_5MW_baseline_record
+from drivese.drivese_utils import get_distance_hub2mb, resize_for_bearings, mainshaftFlangeCalc
+
+G_GRAV = 9.81
+LEN_PTS = 101  # points per shaft segment in the LSS moment calculations
+
+# per-design status (outputs['status']) - the outputs of designs that are not STATUS_OK are NaN
+STATUS_OK = 0
+STATUS_NOT_FINITE = 1   # non-finite inputs, or a non-finite result somewhere in the chain
+STATUS_NO_BEDPLATE = 2  # no section of the legacy bedplate table meets the stress and deflection limits
+STATUS_MESSAGES = {STATUS_OK: '',
+                   STATUS_NOT_FINITE: 'non-finite inputs or results',
+                   STATUS_NO_BEDPLATE: 'no bedplate section meets the stress and deflection limits'}
+
+#-------------------------------------------------------------------------
+# Helpers
+
+class _Columns(dict):
+    ''' dict of equal-length arrays, one entry per design '''
+
+    def take(self, idx, column=False):
+        ''' Subset of the designs idx - as column vectors if column=True (for broadcasting against grids) '''
+        if column:
+            return _Columns((k, v[idx, np.newaxis]) for k, v in self.items())
+        return _Columns((k, v[idx]) for k, v in self.items())
+
+def _where(cond, x, y):
+    return np.where(cond, x, y).astype(float)
+
+def _pow4(x):
+    x2 = x * x
+    return x2 * x2
+
+def _root4(a, b):
+    ''' (a**4 + b**4)**0.25 '''
+    return np.sqrt(np.sqrt(_pow4(a) + _pow4(b)))
+
+def _grid_points(a, b, k):
+    ''' Points k (float array, 0..LEN_PTS-1) of np.linspace(a, b, LEN_PTS) for each design, with linspace's round-off '''
+    div = LEN_PTS - 1.0
+    delta = b - a
+    step = delta / div
+    x = np.where(step == 0, k / div * delta, k * step) + a
+    return np.where(k == div, b, x)
+
+def _middle_root(a2, a1, a0):
+    '''
+    The middle root of t**3 + a2*t**2 + a1*t + a0 (arrays) where all three roots are real, NaN where only one is
+      (trigonometric form of the roots - the argument of arccos is outside -1..1 iff there is one real root)
+    '''
+    P = a1 - a2 * a2 / 3.0
+    Q = 2.0 / 27.0 * a2 * a2 * a2 - a2 * a1 / 3.0 + a0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = 2.0 * np.sqrt(-P / 3.0)
+        theta = np.arccos(3.0 * Q / (P * r)) / 3.0
+    return r * np.cos(theta - 2.0 * pi / 3.0) - a2 / 3.0
+
+def _segment_max(moments, q, a, b):
+    '''
+    Largest My**2 + Mz**2 over the LEN_PTS-point grid of one shaft segment from a to b.
+      moments(x, q) returns (My, Mz), which are quadratic and linear in x on a segment, so along the
+      segment (t = -1..1) f = My**2 + Mz**2 is a quartic with a positive leading term: its only interior
+      local maximum is at the middle root of f', if f' has three real roots. The grid maximum is at an end
+      of the segment or at one of the grid points around that root.
+    Returns (fmax, cubic) - cubic is False for designs where f' does not have degree 3 (grid them in full).
+    '''
+    My_a, Mz_a = moments(a, q)
+    My_m = moments(0.5 * (a + b), q)[0]
+    My_b, Mz_b = moments(b, q)
+    p0 = My_m
+    p1 = 0.5 * (My_b - My_a)
+    p2 = 0.5 * (My_a + My_b) - My_m
+    r0 = 0.5 * (Mz_a + Mz_b)
+    r1 = 0.5 * (Mz_b - Mz_a)
+    # f'(t) / 2 = A3 t^3 + A2 t^2 + A1 t + A0
+    A3 = 2.0 * p2 * p2
+    A2 = 3.0 * p1 * p2
+    A1 = 2.0 * p0 * p2 + p1 * p1 + r1 * r1
+    A0 = p0 * p1 + r0 * r1
+    cubic = (np.abs(p2) > 1e-8 * (np.abs(p0) + np.abs(p1))) & np.isfinite(A0 + A1 + A2 + A3)
+
+    fmax = np.maximum(My_a * My_a + Mz_a * Mz_a, My_b * My_b + Mz_b * Mz_b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = np.rint((_middle_root(A2 / A3, A1 / A3, A0 / A3) + 1.0) * (0.5 * (LEN_PTS - 1)))
+    for j in (-1.0, 0.0, 1.0):
+        t = np.clip(k + j, 0.0, LEN_PTS - 1.0) * (2.0 / (LEN_PTS - 1)) - 1.0
+        My = p0 + (p1 + p2 * t) * t
+        Mz = r0 + r1 * t
+        fmax = np.fmax(fmax, My * My + Mz * Mz)  # k is NaN where there is no interior maximum
+    return fmax, cubic
+
+def _max_moment(segments, q):
+    '''
+    Maximum of (My**2 + Mz**2)**0.5 over the LEN_PTS-point grids of the shaft segments, as in
+      np.amax() over the concatenated moment arrays of the scalar LSS code.
+    segments : list of (moments, a, b) - moments(x, q) gives (My, Mz) at x, a and b are the segment ends
+
+    Only the candidate grid points of _segment_max() are evaluated, unless the moment along
+      some segment is not a quartic, in which case the full grids are evaluated for those designs.
+    '''
+    fmax = np.zeros(len(segments[0][1]))
+    full = np.zeros(len(fmax), dtype=bool)
+    for moments, a, b in segments:
+        f, cubic = _segment_max(moments, q, a, b)
+        fmax = np.maximum(fmax, f)
+        full |= ~cubic
+    MM_max = np.sqrt(fmax)
+    grid = np.nonzero(full)[0]
+    if len(grid):
+        qg = q.take(grid, column=True)
+        k = np.arange(LEN_PTS, dtype=float)
+        values = []
+        for moments, a, b in segments:
+            My, Mz = moments(_grid_points(a[grid, np.newaxis], b[grid, np.newaxis], k), qg)
+            values.append((My**2 + Mz**2)**0.5)
+        MM_max[grid] = np.amax(np.concatenate(values, axis=1), axis=1)
+    return MM_max
+
+def _bearing(D_shaft, btype):
+    ''' resize_for_bearings() for an array of shaft diameters - returns (diameter, facewidth, mass) arrays '''
+    D, facewidth, mass = resize_for_bearings(D_shaft, btype, False)
+    return D, np.broadcast_to(facewidth, np.shape(D_shaft)).astype(float), mass
+
+#-------------------------------------------------------------------------
+# Hub, pitch system and spinner (hubse_components.py)
+
+def hub_arrays(blade_root_diameter, rotor_rpm, blade_mass, rotor_diameter, blade_length, blade_number=3):
+    ''' Hub.compute() for arrays - returns (hub_mass, hub_diameter, hub_cm, hub_cost, hub_thickness) '''
+
+    rotor_radps = rotor_rpm * 2 * pi / 60
+    ang_accel = (rotor_radps - 0) / (1 - 0)
+    stress_allow_pa = 200 / (2.5 * 2) * 1000000
+
+    dsgn_hub_diam = pi * (blade_root_diameter / np.sin(np.radians(120 / 2))) * (1 + (20 / 100)) / pi
+
+    blade_cm = ((rotor_diameter / 2) - blade_length) + (blade_length / 3)
+    hub_torque = blade_mass * blade_cm**2 * ang_accel * blade_number
+
+    shell = ((((dsgn_hub_diam**4) - ((32 / pi) * (hub_torque * dsgn_hub_diam / 2 / stress_allow_pa)))**(1 / 4)) - dsgn_hub_diam) / (-2)
+    sph_hub_mass = (4 / 3) * pi * ((dsgn_hub_diam / 2)**3 - ((dsgn_hub_diam - 2 * shell) / 2)**3) * 7200
+
+    main_flange_OD = 0.5 * dsgn_hub_diam
+    main_flange_ID = main_flange_OD - (2 * (dsgn_hub_diam / 20))
+    main_flange_thick = FLANGE_THICK_FACTOR * shell
+    main_flange_mass = pi * main_flange_thick * ((main_flange_OD / 2)**2 - (main_flange_ID / 2)**2) * 7200
+
+    hub_mass = main_flange_mass + sph_hub_mass
+    hub_cm = _where((main_flange_mass + sph_hub_mass) < 0.01, 0.0,
+                    (main_flange_mass * (main_flange_thick / 2) + sph_hub_mass * (dsgn_hub_diam / 2)) / (main_flange_mass + sph_hub_mass))
+    return hub_mass, dsgn_hub_diam, hub_cm, hub_mass * 3, shell
+
+def spinner_mass_arrays(blade_root_diameter):
+    ''' Spinner.compute() (REV02 spinner) for arrays - returns the spinner mass '''
+
+    OSHA_CLEARANCE = 0.5
+    extr_gust_dsgn_pressure = 0.5 * 1.225 * (70 ** 2) * 1.5
+    allow_tensile_strength = 60 / 1.5
+    allow_yield_strength = 225 / 1.5
+
+    dsgn_hub_circ = pi * (blade_root_diameter / np.sin(np.radians(120 / 2))) * (1 + (20 / 100))
+    dsgn_hub_diam = dsgn_hub_circ / pi
+    sph_spin_diam = dsgn_hub_diam + (2 * OSHA_CLEARANCE)
+    sph_spin_rad = 0.5 * sph_spin_diam
+    spin_panel_width = (pi * sph_spin_diam - dsgn_hub_circ) / 3
+    spin_acc_hole_diam = blade_root_diameter * ((100 + 20) / 100)
+
+    spin_shell_thickness = np.sqrt((0.75 * extr_gust_dsgn_pressure * spin_panel_width ** 2)
+                                   / ((allow_tensile_strength * 1000000) * (1.61 * (spin_panel_width / sph_spin_diam) ** 3 + 1)))
+    spin_shell_mass = (4 / 3) * pi * (sph_spin_rad ** 3 - ((sph_spin_diam - 2 * spin_shell_thickness) / 2) ** 3) * 1600
+
+    sph_cap_area = 2 * pi * sph_spin_rad * (sph_spin_rad - np.sqrt(sph_spin_rad ** 2 - (spin_acc_hole_diam / 2) ** 2))
+    sph_cap_mass = 3 * (sph_cap_area * spin_shell_thickness) * 1600
+    main_flange_area = 2 * pi * sph_spin_rad * (sph_spin_rad - np.sqrt(sph_spin_rad ** 2 - (0.6 * dsgn_hub_diam / 2) ** 2))
+    main_flange_mass = main_flange_area * spin_shell_thickness * 1600
+    spin_shell_mass = spin_shell_mass - sph_cap_mass - main_flange_mass
+
+    bracket_bending_moment = pi * (sph_spin_diam ** 2) / 4 * extr_gust_dsgn_pressure / (3 + 3) * OSHA_CLEARANCE
+    bracket_width = spin_panel_width / 2
+    bracket_thickness = np.sqrt((6 * bracket_bending_moment) / (bracket_width * allow_yield_strength * 1000000))
+    bracket_flange_length = OSHA_CLEARANCE * 0.25
+    bracket_mass = (OSHA_CLEARANCE + bracket_flange_length + bracket_flange_length) * bracket_width * bracket_thickness * 7850
+
+    return spin_shell_mass + bracket_mass * (3 + 3)
+
+def _sphere_shell_I(mass, diameter, thickness):
+    radius = 0.5 * diameter
+    insideRadius = radius - thickness
+    dr3 = radius ** 3 - insideRadius ** 3
+    return _where(dr3 == 0, 0.0, 0.4 * mass * (radius ** 5 - insideRadius ** 5) / dr3)
+
+#-------------------------------------------------------------------------
+# Gearbox
+
+def stage_ratio_arrays(overallRatio, planet_numbers, config, tol=1e-13, maxiter=50):
+    '''
+    Optimal gearbox stage ratios for arrays of overall ratios - the problem of Gearbox.stageRatioCalc()
+      solved by Newton iterations for all designs together.
+
+    The product constraint is eliminated (x2 = R / (x0 * x1), or x1 = R / 3 / x0 with x2 = 3 for 'eep_3')
+      and Newton steps are taken on the log of the free ratios from the same start as COBYLA (R**(1/3)).
+      Gradients are by complex step, as in Gearbox.stageRatioSensitivity(), and Hessians by central
+      differences of the (real) volume - only the gradient sets the accuracy of the converged ratios.
+
+    overallRatio   : (N,) array
+    planet_numbers : (3,) or (N, 3)
+    Returns an (N, 3) array of stage ratios
+    '''
+    from drivese.drivese_components import gearboxVolume
+
+    R = np.asarray(overallRatio, dtype=float)
+    B = np.broadcast_to(np.asarray(planet_numbers, dtype=float), R.shape + (3,)).T
+    nfree = 1 if config == 'eep_3' else 2
+    y = np.tile(np.log(R ** (1.0 / 3.0)), (nfree, 1))
+
+    def ratios(y, R):
+        if nfree == 1:
+            x0 = np.exp(y[0])
+            return [x0, R / 3.0 / x0, 3.0 + 0.0 * x0]
+        x0 = np.exp(y[0])
+        x1 = np.exp(y[1])
+        return [x0, x1, R / (x0 * x1)]
+
+    def grad(y, R, B):
+        h = 1e-30
+        g = np.empty(y.shape)
+        for i in range(nfree):
+            yc = y.astype(complex)
+            yc[i] += 1j * h
+            g[i] = gearboxVolume(ratios(yc, R), config, B).imag / h
+        return g
+
+    def hess(y, R, B):
+        h = 1e-4
+        def f(*dy):
+            return gearboxVolume(ratios([y[i] + dy[i] * h for i in range(nfree)], R), config, B)
+        f0 = f(0, 0)
+        H = np.empty((nfree, nfree) + y.shape[1:])
+        H[0, 0] = (f(1, 0) - 2 * f0 + f(-1, 0)) / h**2
+        if nfree == 2:
+            H[1, 1] = (f(0, 1) - 2 * f0 + f(0, -1)) / h**2
+            H[0, 1] = H[1, 0] = (f(1, 1) - f(1, -1) - f(-1, 1) + f(-1, -1)) / (4 * h**2)
+        return H
+
+    active = np.arange(len(R))
+    for iteration in range(maxiter):
+        ya, Ra, Ba = y[:, active], R[active], B[:, active]
+        g = grad(ya, Ra, Ba)
+        H = hess(ya, Ra, Ba)
+        if nfree == 1:
+            step = -g / H[0]
+        else:
+            H01 = 0.5 * (H[0, 1] + H[1, 0])
+            det = H[0, 0] * H[1, 1] - H01 * H01
+            step = np.array([-(H[1, 1] * g[0] - H01 * g[1]) / det, -(H[0, 0] * g[1] - H01 * g[0]) / det])
+        y[:, active] = ya + np.clip(step, -0.2, 0.2)  # limit steps to ~20% changes in the ratios
+        active = active[np.max(np.abs(step), axis=0) > tol]
+        if len(active) == 0:
+            break
+
+    return np.array(ratios(y, R)).T
+
+def _stage_mass_factor(ratio, Np, stageType):
+    ''' drivese_components.stageMassFactor() for arrays of stage ratios and planet numbers '''
+    if stageType == 1:
+        return 1.0 + ratio + ratio**2 + (1.0 / ratio)
+    Kr = 0.4
+    Kgamma = _where(Np == 5, 1.35, 1.1)
+    sunRatio = 0.5 * ratio - 1.0
+    return Kgamma * ((1 / Np) + (1 / (Np * sunRatio)) + sunRatio + sunRatio**2
+                     + Kr * ((ratio - 1)**2) / Np + Kr * ((ratio - 1)**2) / (Np * sunRatio))
+
+def gearbox_arrays(gear_configuration, shaft_factor, gear_ratio, planet_numbers, rotor_diameter, rotor_torque, gearbox_input_cm,
+                   shaft_angle=0.0):
+    ''' Gearbox.compute() for arrays - returns (stage_masses, mass, cm, I, length, height, diameter) '''
+
+    stageType = [{'e': 2, 'p': 1}[c] for c in gear_configuration if c in 'ep']
+    planets = np.broadcast_to(np.asarray(planet_numbers, dtype=float), gear_ratio.shape + (3,))
+    ratios = stage_ratio_arrays(gear_ratio, planets, gear_configuration)
+
+    Kfact = _where(rotor_torque < 200.0, 850.0, _where(rotor_torque < 700.0, 950.0, 1100.0))
+    Kshaft = {'normal': 1.0, 'short': 1.25}.get(shaft_factor, 0.0)
+    stage_masses = np.empty(ratios.shape)
+    torque = rotor_torque
+    for s in range(3):
+        torque = torque / ratios[:, s]
+        stage_masses[:, s] = 8.029 * 0.6 / Kfact * torque * _stage_mass_factor(ratios[:, s], planets[:, s], stageType[s])
+    mass = (stage_masses[:, 0] + stage_masses[:, 1] + stage_masses[:, 2]) * Kshaft
+
+    length = 0.012 * rotor_diameter
+    height = 0.015 * rotor_diameter
+    diameter = 0.75 * height
+    cm = np.column_stack([gearbox_input_cm, np.zeros_like(height), 0.4 * height])
+    I0 = mass * (diameter ** 2) / 8 + (mass / 2) * (height ** 2) / 8
+    I1 = mass * (0.5 * (diameter ** 2) + (2/3) * (length ** 2) + 0.25 * (height ** 2)) / 8
+    return stage_masses, mass, cm, principalI(I0, I1, I1, shaft_angle), length, height, diameter
+
+#-------------------------------------------------------------------------
+# Low speed shafts
+
+def _lss_defaults(q, rotor_mass, distance_hub2mb):
+    ''' Crude approximations for the rotor moments when they are not given (LowSpeedShaft*.compute()) '''
+    q['My'] = _where((rotor_mass > 0) & (q['My'] == 0), 59.7 * rotor_mass * distance_hub2mb, q['My'])
+    q['Mz'] = _where((rotor_mass > 0) & (q['Mz'] == 0), 53.846 * rotor_mass * distance_hub2mb, q['Mz'])
+
+def _shaft_mass_properties(q, mass, length, L_bearing, D_in, D_outer):
+    ''' cm and I of the shaft including the shrink disc, and the location of the upwind end of L_bearing '''
+    cosSA = np.cos(q['sa'])
+    sinSA = np.sin(q['sa'])
+    down0 = q['gb_cm0'] - q['gb_length'] / 2.
+    down2 = q['gb_cm2']
+    sdm = q['sdm']
+    cm0 = down0 - 0.65 * length * cosSA
+    cm2 = down2 + 0.65 * length * sinSA
+    cm = np.column_stack([(cm0 * mass + down0 * sdm) / (mass + sdm), q['gb_cm1'], (cm2 * mass + down2 * sdm) / (mass + sdm)])
+    mass = mass + sdm
+    I0 = mass * (D_in ** 2.0 + D_outer ** 2.0) / 8.0
+    I1 = mass * (D_in ** 2.0 + D_outer ** 2.0 + (4.0 / 3.0) * (length ** 2.0)) / 16.0
+    mb1_cm = np.column_stack([down0 - L_bearing * cosSA, q['gb_cm1'], down2 + L_bearing * sinSA])
+    return mass, cm, principalI(I0, I1, I1, q['sa']), mb1_cm
+
+def _lss_inputs(p, o):
+    ''' Per-design LSS inputs (rotor loads, masses, geometry) under short names '''
+    return _Columns(rd=p['rotor_diameter'], rm=o['rotor_mass'], Fy=p['rotor_force_y'], Fz=p['rotor_force_z'],
+                    Mx=p['rotor_bending_moment_x'], My=p['rotor_bending_moment_y'], Mz=p['rotor_bending_moment_z'],
+                    overhang=p['overhang'], mr=p['machine_rating'], gbm=o['gearbox_mass'], sdm=p['shrink_disc_mass'],
+                    gb_cm0=o['gearbox_cm'][:, 0], gb_cm1=o['gearbox_cm'][:, 1], gb_cm2=o['gearbox_cm'][:, 2],
+                    gb_length=o['gearbox_length'], d=p['distance_hub2mb'], sa=p['shaft_angle'], sr=p['shaft_ratio'],
+                    hft=p['hub_flange_thickness'])
+
+def _lss3_moments_rb(x, q):
+    My = -q['My'] + q['rW'] * q['cosSA'] * x + 0.5 * q['lssW'] / q['L_ms'] * x**2 - q['Fz'] * x
+    return My, -q['Mz'] - q['Fy'] * x
+
+def _lss3_moments_ms(x, q):
+    My = -q['Fz'] * x - q['My'] + q['rW'] * q['cosSA'] * x - q['F_mb_z'] * (x - q['d']) + 0.5 * x**2 * q['lssW'] / q['L_ms']
+    return My, -q['Mz'] - q['F_mb_y'] * (x - q['d']) - q['Fy'] * x
+
+def _lss4_moments_ms1(x, q):
+    My = -q['Fz'] * x - q['My'] + q['rW'] * q['cosSA'] * x - q['F_mb_z'] * (x - q['d']) + 0.5 * q['lssW'] / q['L_ms'] * x**2
+    return My, -q['Mz'] - q['F_mb_y'] * (x - q['d']) - q['Fy'] * x
+
+def _lss4_moments_rb2(x, q):
+    My = -q['Fz'] * x + q['rW'] * q['cosSA'] * x - q['My'] + 0.5 * q['lssW'] / (q['L_mb'] + 0.5) * x**2
+    return My, -q['Mz'] - q['Fy'] * x
+
+def _lss4_moments_mb2(x, q):
+    My = -q['Fz'] * x + q['rW'] * q['cosSA'] * x - q['My'] + 0.5 * q['lssW'] / (q['L_mb'] + 0.5) * x**2 \
+         - q['F_mb1_z'] * (x - q['d'])
+    return My, -q['Mz'] - q['Fy'] * x - q['F_mb1_y'] * (x - q['d'])
+
+def _lss4_moments_ms2(x, q):
+    My = -q['Fz'] * x + q['rW'] * q['cosSA'] * x - q['My'] + 0.5 * q['lssW'] / (q['L_mb'] + 0.5) * x**2 \
+         - q['F_mb1_z'] * (x - q['d']) - q['F_mb2_z'] * (x - q['d'] - q['L_mb'])
+    return My, -q['Mz'] - q['Fy'] * x - q['F_mb1_y'] * (x - q['d']) - q['F_mb2_y'] * (x - q['d'] - q['L_mb'])
+
+def _fx(F_z, W_r, cosG, M_y, f_mb_z, d, W_ms, L, z):
+    ''' LowSpeedShaft3pt.fx() / LowSpeedShaft4pt.deflection() (L is L_ms + d there, L_ms + L_mb in deflection1()) '''
+    z2 = z * z
+    zd = z - d
+    return (W_r * cosG - F_z) * z2 * z / 6.0 - M_y * z2 / 2.0 - f_mb_z * zd * zd * zd / 6.0 + W_ms / L / 24.0 * z2 * z2
+
+def _gx(F_z, W_r, cosG, M_y, f_mb_z, d, W_ms, L, C1, z):
+    ''' LowSpeedShaft3pt.gx() / LowSpeedShaft4pt.gx(), gx1() '''
+    z2 = z * z
+    zd = z - d
+    return (W_r * cosG - F_z) * z2 / 2.0 - M_y * z - f_mb_z * zd * zd / 2.0 + W_ms / L / 6.0 * z2 * z + C1
+
+def _size_lss_3pt(q, L_ms, D_max, D_min):
+    ''' One pass of LowSpeedShaft3pt.size_LSS_3pt() - returns (D_max, D_min, D_in, theta_y[-1]) '''
+    g = G_GRAV
+    density = 7850.0
+    d = q['d']
+    L_bg = 6.11 * (q['mr'] / 5.0e3)
+    L_as = L_ms / 2.0
+    cosSA = np.cos(q['sa'])
+    sinSA = np.sin(q['sa'])
+
+    rW = q['rm'] * g
+    lssW = pi / 3.0 * (D_max**2.0 + D_min**2.0 + D_max * D_min) * L_ms * density / 4.0 * g
+    F_mb_y = q['Mz'] / L_bg - q['Fy'] * (L_bg + d) / L_bg
+    F_mb_z = (-q['My'] + rW * (cosSA * (d + L_bg) + (sinSA * 1.0)) + lssW * (L_bg - L_as) * cosSA
+              + q['sdm'] * g * cosSA * (L_bg - L_ms) - q['gbm'] * g * cosSA * 0 - q['Fz'] * cosSA * (L_bg + d)) / L_bg
+
+    m = _Columns(My=q['My'], Mz=q['Mz'], Fy=q['Fy'], Fz=q['Fz'], rW=rW, cosSA=cosSA, lssW=lssW, L_ms=L_ms,
+                 F_mb_y=F_mb_y, F_mb_z=F_mb_z, d=d)
+    end = L_ms + d
+    MM_max = _max_moment([(_lss3_moments_rb, np.zeros_like(d), d), (_lss3_moments_ms, d, end)], m)
+    My_end, Mz_end = _lss3_moments_ms(end, m)
+    MM_min = (My_end**2 + Mz_end**2)**0.5
+
+    D_max = computeD(MM_max, q['Mx'], 66000, 2.5)
+    D_min = computeD(MM_min, q['Mx'], 66000, 2.5)
+    D_in = q['sr'] * D_max
+    D_max = _root4(D_in, D_max)
+    D_min = _root4(D_in, D_min)
+
+    lssW_new = (pi / 12.0 * L_ms * (D_max**2.0 + D_min**2.0 + D_max * D_min) - pi / 4.0 * L_ms * D_in**2.0
+                + pi / 4.0 * d * D_max**2) * density * g
+    D1 = _fx(q['Fz'], rW, cosSA, q['My'], F_mb_z, d, lssW_new, L_ms + d, d + L_ms)
+    D2 = _fx(q['Fz'], rW, cosSA, q['My'], F_mb_z, d, lssW_new, L_ms + d, d)
+    C1 = -(D1 - D2) / L_ms
+    I_2 = pi / 64.0 * (_pow4(D_max) - _pow4(D_in))
+    theta = _gx(q['Fz'], rW, cosSA, q['My'], F_mb_z, d, lssW_new, L_ms + d, C1, end) / 2.1e11 / I_2
+    return D_max, D_min, D_in, theta
+
+def lss_3pt_arrays(p, o, mb1Type):
+    ''' LowSpeedShaft3pt.compute() for arrays - returns a dict of the lss_* outputs '''
+
+    q = _lss_inputs(p, o)
+    d_eff = _where(q['d'] == 0, get_distance_hub2mb(q['rd']), q['d'])
+    _lss_defaults(q, q['rm'], d_eff)
+
+    N = len(q['rd'])
+    tol = 1e-4
+    dL = 0.05
+    limit = bearing_defl_check(mb1Type) / 1.0
+    length_max = q['overhang'] - d_eff + (q['gb_cm0'] - q['gb_length'] / 2.)
+
+    L_ms = np.full(N, 0.5)
+    L_ms_new = np.zeros(N)
+    D_max = np.ones(N)
+    D_min = np.full(N, 0.2)
+    D_in = np.full(N, np.nan)
+    check = np.ones(N)
+
+    # all designs iterate together - each stops when its own loop condition fails
+    active = np.nonzero((np.abs(check) > tol) & (L_ms_new < length_max))[0]
+    while len(active):
+        L = _where(L_ms_new[active] > 0, L_ms_new[active], 0.5)
+        qa = q if len(active) == N else q.take(active)
+        D_max[active], D_min[active], D_in[active], theta = _size_lss_3pt(qa, L, D_max[active], D_min[active])
+        check[active] = np.abs(np.abs(theta) - limit)
+        L_ms[active] = L
+        L_ms_new[active] = L + dL
+        active = active[(np.abs(check[active]) > tol) & (L_ms_new[active] < length_max[active])]
+
+    D_max_a, facewidth_max, bearingmass = _bearing(D_max, mb1Type)
+    D_min_a, facewidth_min, _ = _bearing(D_min, 'SRB')
+    lss_volume = (pi / 3) * (D_max_a**2 + D_min_a**2 + D_max_a * D_min_a) * (L_ms - (facewidth_max + facewidth_min) / 2) / 4 \
+               + (pi / 4) * (D_max_a**2 - D_in**2) * facewidth_max \
+               + (pi / 4) * (D_min_a**2 - D_in**2) * facewidth_min \
+               - (pi / 4) * (D_in**2) * (L_ms + (facewidth_max + facewidth_min) / 2)
+    mass = lss_volume * 7850.0
+    flange_length, mass_flange = mainshaftFlangeCalc(D_in, D_max_a, q['hft'] * FLANGE_THICK_FACTOR)[:2]
+    mass += mass_flange
+    length = L_ms_new + (facewidth_max + facewidth_min) / 2 + flange_length
+
+    mass, cm, I, mb1_cm = _shaft_mass_properties(q, mass, length, L_ms, D_in, D_max_a)
+    zeros = np.zeros(N)
+    return dict(lss_design_torque=zeros, lss_design_bending_load=zeros, lss_length=length,
+                lss_diameter1=D_max_a, lss_diameter2=D_min_a, lss_mass=mass, lss_cm=cm, lss_I=I,
+                lss_mb1_facewidth=zeros, lss_mb2_facewidth=zeros, lss_mb1_mass=bearingmass, lss_mb2_mass=zeros,
+                lss_mb1_cm=mb1_cm, lss_mb2_cm=np.zeros((N, 3)))
+
+def _size_lss_4pt_loop_1(q, L_ms, D_max, D_min):
+    ''' One pass of LowSpeedShaft4pt.size_LSS_4pt_Loop_1() - returns (D_max, D_min, D_in, lssWeight, theta_y[-1]) '''
+    g = G_GRAV
+    density = 7800.0
+    d = q['d']
+    L_bg = 6.11 - d
+    L_as = L_ms / 2.0
+    cosSA = np.cos(q['sa'])
+    sinSA = np.sin(q['sa'])
+
+    rW = q['rm'] * g
+    lssW = pi / 3.0 * (D_max**2.0 + D_min**2.0 + D_max * D_min) * L_ms * density * g / 4.0
+    F_mb_y = q['Mz'] / L_bg - q['Fy'] * (L_bg + d) / L_bg
+    F_mb_z = (-q['My'] + rW * (cosSA * (d + L_bg) + sinSA * 1.0) + lssW * cosSA * (L_bg - L_as)
+              + q['sdm'] * g * cosSA * (L_bg - L_ms) - q['gbm'] * g * cosSA * 0.0 - q['Fz'] * cosSA * (L_bg + d)) / L_bg
+
+    m = _Columns(My=q['My'], Mz=q['Mz'], Fy=q['Fy'], Fz=q['Fz'], rW=rW, cosSA=cosSA, lssW=lssW, L_ms=L_ms,
+                 F_mb_y=F_mb_y, F_mb_z=F_mb_z, d=d)
+    end = d + L_ms
+    MM_max = _max_moment([(_lss3_moments_rb, np.zeros_like(d), d), (_lss4_moments_ms1, d, end)], m)
+    My_end, Mz_end = _lss4_moments_ms1(end, m)
+    MM_min = (My_end**2 + Mz_end**2)**0.5
+
+    D_max = computeD(MM_max, q['Mx'], 66000, 2.5)
+    D_min = computeD(MM_min, q['Mx'], 66000, 2.5)
+    D_in = q['sr'] * D_max
+    D_max = _root4(D_in, D_max)
+    D_min = _root4(D_in, D_min)
+
+    lssW_new = ((pi / 3) * (D_max**2 + D_min**2 + D_max * D_min) * L_ms / 4 - (pi / 4 * (D_in**2) * L_ms)) * g * density
+    D1 = _fx(q['Fz'], rW, cosSA, q['My'], F_mb_z, d, lssW_new, L_ms + d, d + L_ms)
+    D2 = _fx(q['Fz'], rW, cosSA, q['My'], F_mb_z, d, lssW_new, L_ms + d, d)
+    C1 = -(D1 - D2) / L_ms
+    I_2 = pi / 64.0 * (_pow4(D_max) - _pow4(D_in))
+    theta = _gx(q['Fz'], rW, cosSA, q['My'], F_mb_z, d, lssW_new, L_ms + d, C1, end) / 2.1e11 / I_2
+    return D_max, D_min, D_in, lssW, theta
+
+def _size_lss_4pt_loop_2(q, L_mb, L_ms_gb):
+    ''' One pass of LowSpeedShaft4pt.size_LSS_4pt_Loop_2() - returns (D_max, D_med, D_in, theta_y[-1])
+          q['lssW'] is the shaft weight from the last pass of loop 1 '''
+    g = G_GRAV
+    density = 7800.0
+    d = q['d']
+    L_ms_0 = 0.5
+    L_as = (L_ms_gb + L_mb) / 2.0
+    cosSA = np.cos(q['sa'])
+
+    rW = q['rm'] * g
+    lssW = q['lssW']
+    F_mb2_y = -q['Mz'] / L_mb + q['Fy'] * (d) / L_mb
+    F_mb2_z = (q['My'] - rW * cosSA * d - lssW * L_as * cosSA - q['sdm'] * g * (L_mb + L_ms_0) * cosSA
+               + q['gbm'] * g * cosSA * 0.0 + q['Fz'] * cosSA * d) / L_mb
+    F_mb1_y = -q['Fy'] - F_mb2_y
+    F_mb1_z = (rW + lssW + q['sdm'] * g) * cosSA - q['Fz'] - F_mb2_z
+
+    m = _Columns(My=q['My'], Mz=q['Mz'], Fy=q['Fy'], Fz=q['Fz'], rW=rW, cosSA=cosSA, lssW=lssW, L_mb=L_mb, d=d,
+                 F_mb1_y=F_mb1_y, F_mb1_z=F_mb1_z, F_mb2_y=F_mb2_y, F_mb2_z=F_mb2_z)
+    mid = d + L_mb
+    end = d + L_mb + L_ms_gb
+    MM_max = _max_moment([(_lss4_moments_rb2, np.zeros_like(d), d), (_lss4_moments_mb2, d, mid),
+                          (_lss4_moments_ms2, mid, end)], m)
+    My_end, Mz_end = _lss4_moments_ms2(end, m)
+    MM_min = (My_end**2 + Mz_end**2)**0.5
+    My_mid, Mz_mid = _lss4_moments_mb2(mid, m)
+    MM_med = (My_mid**2 + Mz_mid**2)**0.5
+
+    D_max = computeD(MM_max, q['Mx'], 66000, 2.5)
+    D_med = computeD(MM_med, q['Mx'], 66000, 2.5)
+    D_in = q['sr'] * D_max
+    D_max = _root4(D_in, D_max)
+    D_med = _root4(D_in, D_med)
+
+    lssW_new = (pi / 12.0 * L_mb * (D_max**2 + D_med**2 + D_max * D_med) - pi / 4.0 * D_in**2 * L_mb) * g * density
+    L = L_ms_0 + L_mb
+    D11 = _fx(q['Fz'], rW, cosSA, q['My'], F_mb1_z, d, lssW_new, L, mid)
+    D21 = _fx(q['Fz'], rW, cosSA, q['My'], F_mb1_z, d, lssW_new, L, d)
+    C11 = -(D11 - D21) / L_mb
+    I_2 = pi / 64.0 * (_pow4(D_max) - _pow4(D_in))
+
+    def gx2(z):
+        return -q['Fz'] * z**2 / 2.0 + rW * cosSA * z**2 / 2.0 - q['My'] * z - F_mb1_z * (z - d)**2 / 2.0 \
+               - F_mb2_z * (z - d - L_mb)**2 / 2.0 + lssW_new / L / 6.0 * z**3
+
+    C12 = _gx(q['Fz'], rW, cosSA, q['My'], F_mb1_z, d, lssW_new, L, C11, mid) - gx2(mid)
+    theta = (gx2(end) + C12) / 2.1e11 / I_2
+    return D_max, D_med, D_in, theta
+
+def lss_4pt_arrays(p, o, mb1Type, mb2Type):
+    ''' LowSpeedShaft4pt.compute() for arrays - returns a dict of the lss_* outputs '''
+
+    q = _lss_inputs(p, o)
+    q['d'] = _where(q['d'] == 0, get_distance_hub2mb(q['rd']), q['d'])
+    _lss_defaults(q, q['rm'], q['d'])
+    q['rm'] = _where(q['rm'] == 0, 23.566 * q['mr'], q['rm'])
+
+    N = len(q['rd'])
+    tol = 1e-4
+    limit1 = bearing_defl_check(mb1Type) / 1.0
+    limit2 = bearing_defl_check(mb2Type) / 1.0
+    length_max = q['overhang'] - q['d'] + (q['gb_cm0'] - q['gb_length'] / 2.)
+
+    # loop 1 - shaft length from the upwind bearing
+    L_ms_new = np.zeros(N)
+    D_max = np.ones(N)
+    D_min = np.full(N, 0.2)
+    D_in = np.full(N, np.nan)
+    q['lssW'] = np.full(N, np.nan)
+    check = np.ones(N)
+    active = np.nonzero((np.abs(check) > tol) & (L_ms_new < length_max))[0]
+    while len(active):
+        L = _where(L_ms_new[active] > 0, L_ms_new[active], 0.5)
+        D_max[active], D_min[active], D_in[active], q['lssW'][active], theta = \
+            _size_lss_4pt_loop_1(q if len(active) == N else q.take(active), L, D_max[active], D_min[active])
+        check[active] = np.abs(np.abs(theta) - limit1)
+        L_ms_new[active] = L + 0.05
+        active = active[(np.abs(check[active]) > tol) & (L_ms_new[active] < length_max[active])]
+
+    # loop 2 - bearing spacing (outer) and shaft length to the gearbox (inner, at most 2 passes)
+    L_mb = L_ms_new.copy()
+    L_mb_new = np.zeros(N)
+    D_med = np.full(N, np.nan)
+    check_ms = np.ones(N)
+    outer = np.nonzero((np.abs(check_ms) > tol) & (L_mb_new < length_max))[0]
+    while len(outer):
+        L_mb[outer] = _where(L_mb_new[outer] > 0, L_mb_new[outer], L_mb[outer])
+        counter = np.zeros(N)
+        check = np.ones(N)
+        L_ms_gb_new = np.zeros(N)
+        inner = outer
+        while len(inner):
+            counter[inner] += 1
+            L_ms_gb = _where(L_ms_gb_new[inner] > 0.0, L_ms_gb_new[inner], 0.5)
+            D_max[inner], D_med[inner], D_in[inner], theta = _size_lss_4pt_loop_2(q if len(inner) == N else q.take(inner),
+                                                                              L_mb[inner], L_ms_gb)
+            check[inner] = np.abs(np.abs(theta) - limit1)
+            L_ms_gb_new[inner] = L_ms_gb + 0.0025
+            check_ms[inner] = np.abs(np.abs(theta) - limit2)
+            L_mb_new[inner] = L_mb[inner] + 0.05
+            inner = inner[(np.abs(check[inner]) > tol) & (counter[inner] < 2)]
+        outer = outer[(np.abs(check_ms[outer]) > tol) & (L_mb_new[outer] < length_max[outer])]
+
+    D_max_a, facewidth_max, bearing1mass = _bearing(D_max, mb1Type)
+    D_med_a, facewidth_med, bearing2mass = _bearing(D_med, mb2Type)
+    lss_volume = (pi / 3) * (D_max_a**2 + D_med_a**2 + D_max_a * D_med_a) * (L_mb - (facewidth_max + facewidth_med) / 2) / 4 \
+               + (pi / 4) * (D_max_a**2 - D_in**2) * facewidth_max \
+               + (pi / 4) * (D_med_a**2 - D_in**2) * facewidth_med \
+               - (pi / 4) * (D_in**2) * (L_mb + (facewidth_max + facewidth_med) / 2)
+    flange_length, mass_flange = mainshaftFlangeCalc(D_in, D_max_a, q['hft'] * FLANGE_THICK_FACTOR)[:2]
+    mass = lss_volume * 7800.0 + mass_flange
+    length = L_mb_new + (facewidth_max + facewidth_med) / 2 + flange_length
+
+    mass, cm, I, mb1_cm = _shaft_mass_properties(q, mass, length, L_mb_new + facewidth_med / 2, D_in, D_max)
+    mb2_cm = _shaft_mass_properties(q, mass, length, facewidth_med * .5, D_in, D_max)[3]
+    zeros = np.zeros(N)
+    return dict(lss_design_torque=zeros, lss_design_bending_load=zeros, lss_length=length,
+                lss_diameter1=D_max_a, lss_diameter2=D_med_a, lss_mass=mass, lss_cm=cm, lss_I=I,
+                lss_mb1_facewidth=facewidth_max, lss_mb2_facewidth=facewidth_med, lss_mb1_mass=bearing1mass,
+                lss_mb2_mass=bearing2mass, lss_mb1_cm=mb1_cm, lss_mb2_cm=mb2_cm)
+
+#-------------------------------------------------------------------------
+# Bedplate
+
+def _search_sections(section, stressMax, deflMax, stressTol=5e5, deflTol=1e-4, stress_mult=8.0, nstart=256, nmax=2**20):
+    '''
+    Index of the first legacy section that meets the limits for each design (bp.search_legacy_sections() for
+      one candidate per design at a time). section(tf, tw, b0, h0, designs) evaluates the sections for the
+      designs (an index, all of them by default).
+    The table of legacy sections is doubled (up to nmax sections, as in the scalar search) while designs with
+      finite section values are infeasible at its end, then each design bisects its own index. Designs that
+      are still infeasible at the end of the table are searched section by section with the scalar code.
+    Returns (index, status, sections) - status is STATUS_OK, or STATUS_NOT_FINITE / STATUS_NO_BEDPLATE for
+      designs without a feasible section (their index is meaningless).
+    '''
+    def feasible(k):
+        tipDefl, rootStress, mass = section(tf[k], tw[k], b0[k], h0[k])
+        ok = (rootStress * stress_mult - stressMax <= stressTol) & (tipDefl - deflMax <= deflTol)
+        return ok, np.isfinite(tipDefl) & np.isfinite(rootStress)
+
+    n = nstart
+    while True:
+        tf, tw, b0, h0 = bp.legacy_sections(n + 1)  # one more for the dims reported by the legacy loop
+        hi = np.full(len(deflMax), n - 1)
+        found, finite = feasible(hi)
+        if n >= nmax or np.all(found | ~finite):
+            break
+        n *= 2
+    lo = np.full(len(deflMax), -1)
+    while np.any(hi - lo > 1):
+        mid = (lo + hi) // 2
+        ok = feasible(np.maximum(mid, 0))[0]
+        hi = np.where(ok, mid, hi)
+        lo = np.where(ok, lo, mid)
+
+    # sections that grow do not help these designs (e.g. a negative rear length) - there may still be a feasible one
+    for j in np.nonzero(~found & finite)[0]:
+        try:
+            hi[j] = bp.search_legacy_sections(lambda tf, tw, b0, h0: section(tf, tw, b0, h0, [j]), stressMax, deflMax[j],
+                                              stressTol, deflTol, stress_mult, nstart)
+            found[j] = True
+        except RuntimeError:
+            pass
+    status = np.where(found, STATUS_OK, np.where(finite, STATUS_NO_BEDPLATE, STATUS_NOT_FINITE))
+    return hi, status, (tf, tw, b0, h0)
+
+def bedplate_arrays(o, p):
+    ''' Bedplate.compute() with the default options (legacy step sizing) for arrays
+          returns (mass, cm, I, length, height, width, status) - see _search_sections() for status '''
+
+    g = G_GRAV
+    rd = p['rotor_diameter']
+    d = _where(p['distance_hub2mb'] > 0, p['distance_hub2mb'], get_distance_hub2mb(rd))
+    transformer_mass = o['transformer_mass']
+    transLoc = _where(transformer_mass > 0, o['transformer_cm'][:, 0], 0.0)
+    convMass = _where(transformer_mass > 0, 0.3 * transformer_mass, (2.4445 * (p['machine_rating']) + 1599.0) * 0.3)
+    generator_location = o['generator_cm'][:, 0]
+    convLoc = generator_location * 2.0
+    mb1_location = o['mb1_cm'][:, 0]
+
+    rearTotalLength = _where(transLoc > 0, transLoc * 1.1, generator_location * 4.237 / 2.886 - p['tower_top_diameter'] / 2.0)
+    frontTotalLength = np.abs(mb1_location) + o['lss_mb1_facewidth'] / 2.
+    rotorLoc = np.abs(mb1_location) + d
+
+    rotor_mass = o['rotor_mass']
+    rotorFz = np.abs(p['rotor_force_z'])
+    rotorMy = np.abs(p['rotor_bending_moment_y'])
+    rotorMy = _where((rotor_mass > 0) & (rotorMy == 0), 59.7 * rotor_mass * d, rotorMy)
+    rotorFz = _where((rotor_mass > 0) & (rotorFz == 0), rotor_mass * g, rotorFz)
+
+    # rear steel section - gearbox weight on it unless gearbox_location is 0
+    gearbox_location = o['gearbox_cm'][:, 0]
+    gearbox_mass = _where(gearbox_location == 0, 0.0, o['gearbox_mass'])
+
+    rear_loads = (rearTotalLength, o['hss_cm'][:, 0], o['hss_mass'], generator_location, o['generator_mass'],
+                  convLoc, convMass, transLoc, transformer_mass, gearbox_location, gearbox_mass)
+
+    def rear(tf, tw, b0, h0, designs=slice(None)):
+        return bp.bedplate_rear_section(tf, tw, b0, h0, *[x[designs] for x in rear_loads],
+                                        E=bp.STEEL_E, density=bp.STEEL_DENSITY, g=g)
+
+    k, status, (tf, tw, b0, h0) = _search_sections(rear, bp.STEEL_STRESS_MAX, rearTotalLength / 1500.)
+    steelMass = rear(tf[k], tw[k], b0[k], h0[k])[2]
+    rearHeight = h0[k + 1]
+
+    # front cast section - gearbox weight on it only for a negative gearbox_location
+    front_gearbox_location = _where(gearbox_location < 0, np.abs(gearbox_location), 0.0)
+    front_gearbox_mass = _where(gearbox_location < 0, o['gearbox_mass'], 0.0)
+
+    front_loads = (frontTotalLength, front_gearbox_location, front_gearbox_mass, mb1_location, o['mb1_mass'],
+                   o['mb2_cm'][:, 0], o['mb2_mass'], o['lss_cm'][:, 0], o['lss_mass'], rotorLoc, rotor_mass, rotorFz, rotorMy)
+
+    def front(tf, tw, b0, h0, designs=slice(None)):
+        return bp.bedplate_front_section(tf, tw, b0, h0, *[x[designs] for x in front_loads],
+                                         E=bp.CAST_E, density=bp.CAST_DENSITY, g=g)
+
+    k, front_status, (tf, tw, b0, h0) = _search_sections(front, bp.CAST_STRESS_MAX, frontTotalLength / 1500.)
+    status = np.where(status == STATUS_OK, front_status, status)
+    castMass = front(tf[k], tw[k], b0[k], h0[k])[2]
+    frontHeight = h0[k + 1]
+    width = b0[k + 1] + p['tower_top_diameter']
+
+    support_multiplier = 1.1 + 5e13 * rd**(-8)
+    castMass = castMass * support_multiplier
+    steelMass = steelMass * support_multiplier
+    mass = castMass + steelMass
+    length = frontTotalLength + rearTotalLength
+    height = np.maximum(frontHeight, rearHeight)
+
+    cm = np.column_stack([(steelMass * rearTotalLength / 2 - castMass * frontTotalLength / 2) / (mass),
+                          np.zeros_like(mass), -height / 2.])
+    depth = (length / 2.0)
+    I0 = mass * (width ** 2 + depth ** 2) / 8
+    I1 = mass * (depth ** 2 + width ** 2 + (4/3) * length ** 2) / 16
+    return mass, cm, principalI(I0, I1, I1), length, height, width, status
+
+#-------------------------------------------------------------------------
+
+class VectorizedDrivetrain(object):
+    ''' VectorizedDrivetrain class
+          Array version of drivese_pipeline.DrivetrainModel, with the same configuration arguments.
+          compute() evaluates a struct of arrays of inputs (N designs) in one pass.
+    '''
+
+    def __init__(self, mb1Type, IEC_Class, gear_configuration, shaft_factor, drivetrain_design,
+                 uptower_transformer, yaw_motors_number, crane, blade_number, mb2Type=None, debug=False):
+
+        super(VectorizedDrivetrain, self).__init__()
+
+        if blade_number != 3:
+            raise ValueError('VectorizedDrivetrain: the spherical hub and spinner only work with 3-bladed rotors')
+        if not (useComputeD and useFlangeModel):
+            raise ValueError('VectorizedDrivetrain: requires useComputeD and useFlangeModel')
+
+        self.mb1Type = mb1Type
+        self.mb2Type = mb2Type
+        self.IEC_Class = IEC_Class
+        self.gear_configuration = gear_configuration
+        self.shaft_factor = shaft_factor
+        self.drivetrain_design = drivetrain_design
+        self.uptower_transformer = uptower_transformer
+        self.yaw_motors_number = yaw_motors_number
+        self.crane = crane
+        self.blade_number = blade_number
+        self.debug = debug
+
+    def inputs(self, record):
+        ''' Broadcast a struct of arrays of inputs (see DRIVETRAIN_INPUTS) to N designs - missing inputs are 0 '''
+        names = [name for name in DRIVETRAIN_INPUTS if name != 'planet_numbers']
+        values = [np.asarray(record[name], dtype=float) if name in record else np.zeros(1) for name in names]
+        planets = np.asarray(record['planet_numbers'], dtype=float) if 'planet_numbers' in record else np.zeros(3)
+        N = np.broadcast(*values).size if planets.ndim < 2 else np.broadcast(np.empty(len(planets)), *values).size
+        p = _Columns((name, np.array(np.broadcast_to(np.ravel(v) if v.ndim else v, (N,)))) for name, v in zip(names, values))
+        p['planet_numbers'] = np.array(np.broadcast_to(planets, (N, 3)))
+        return p
+
+    def compute(self, record):
+        '''
+        Evaluate the drivetrain for a struct of arrays of inputs - returns a dict of arrays of outputs
+          with the names of DrivetrainModel.compute(), plus 'status' (STATUS_OK for the designs that were sized).
+          A design that cannot be sized does not stop the batch: its outputs are NaN and its status says why.
+        '''
+
+        p = self.inputs(record)
+        N = len(p['rotor_diameter'])
+        zeros = np.zeros(N)
+        o = {}
+
+        with np.errstate(all='ignore'):
+            # hub (HubMassOnlySE)
+            (o['hub_mass'], o['hub_diameter'], o['hub_cm'], o['hub_cost'], o['hub_thickness']) \
+                = hub_arrays(p['blade_root_diameter'], p['rotor_rpm'], p['blade_mass'], p['rotor_diameter'], p['blade_length'])
+            o['pitch_system_mass'] = 1.0 * (0.22 * p['blade_mass'] * self.blade_number
+                                            + 12.6 * np.abs(p['rotor_bending_moment_y']) * (7860.0 / 371000000.0))
+            o['spinner_mass'] = spinner_mass_arrays(p['blade_root_diameter'])
+            o['hub_system_mass'] = o['hub_mass'] + o['pitch_system_mass'] + o['spinner_mass']
+            o['rotor_mass'] = o['hub_system_mass'] + self.blade_number * p['blade_mass']
+            o['hub_I'] = np.tile(_sphere_shell_I(o['hub_mass'], o['hub_diameter'], o['hub_thickness'])[:, np.newaxis], 3)
+            spinner_diameter = _where(o['hub_diameter'] == 0, 3.30, o['hub_diameter'])
+            spinner_I = _sphere_shell_I(o['spinner_mass'], spinner_diameter, spinner_diameter * (0.055 / 3.30))
+            hub_system_I = o['hub_I'][:, 0] + o['pitch_system_mass'] * (o['hub_diameter'] ** 2) / 4 + spinner_I
+            o['hub_system_I'] = np.column_stack([hub_system_I] * 3 + [zeros] * 3)
+
+            (o['stage_masses'], o['gearbox_mass'], o['gearbox_cm'], o['gearbox_I'], o['gearbox_length'], o['gearbox_height'], o['gearbox_diameter']) \
+                = gearbox_arrays(self.gear_configuration, self.shaft_factor, p['gear_ratio'], p['planet_numbers'],
+                                 p['rotor_diameter'], p['rotor_torque'], p['gearbox_input_xcm'],
+                                 p['shaft_angle'])
+
+            if self.mb2Type is None:
+                o.update(lss_3pt_arrays(p, o, self.mb1Type))
+            else:
+                o.update(lss_4pt_arrays(p, o, self.mb1Type, self.mb2Type))
+
+            # main bearings (bearing housing added)
+            o['mb1_mass'] = o['lss_mb1_mass'] + o['lss_mb1_mass'] * (8000.0 / 2700.0)
+            default_cm = np.column_stack([-(0.035 * p['rotor_diameter']), zeros, 0.025 * p['rotor_diameter']])
+            o['mb1_cm'] = np.where((o['lss_mb1_cm'][:, 0] != 0.0)[:, np.newaxis], o['lss_mb1_cm'], default_cm)
+            b1I0 = (o['mb1_mass'] * o['lss_diameter1'] ** 2) / 4.0
+            o['mb1_I'] = principalI(b1I0, b1I0 / 2.0, b1I0 / 2.0, p['shaft_angle'])
+            if self.mb2Type is None:
+                # not connected in Drive3pt
+                o['mb2_mass'], o['mb2_cm'], o['mb2_I'] = zeros, np.zeros((N, 3)), np.zeros((N, 6))
+            else:
+                mb2_mass = o['lss_mb2_mass'] + o['lss_mb2_mass'] * (8000.0 / 2700.0)
+                placed = (mb2_mass > 0) & (o['lss_mb2_cm'][:, 0] != 0.0)
+                o['mb2_mass'] = _where(placed, mb2_mass, 0.0)
+                o['mb2_cm'] = np.where(placed[:, np.newaxis], o['lss_mb2_cm'], 0.0)
+                b2I0 = (o['mb2_mass'] * o['lss_diameter2'] ** 2) / 4.0
+                o['mb2_I'] = principalI(b2I0, b2I0 / 2.0, b2I0 / 2.0, p['shaft_angle'])
+
+            d = _where(p['distance_hub2mb'] > 0, p['distance_hub2mb'], get_distance_hub2mb(p['rotor_diameter']))
+            o['hub_system_cm'] = np.column_stack([o['mb1_cm'][:, 0] - d, zeros, o['mb1_cm'][:, 2] + d * np.sin(p['shaft_angle'])])
+
+            self.high_speed_side(p, o)
+            self.generator(p, o)
+            self.rna(p, o)
+            self.transformer(p, o)
+
+            (o['bedplate_mass'], o['bedplate_cm'], o['bedplate_I'], o['bedplate_length'], o['bedplate_height'], o['bedplate_width'],
+             o['status']) = bedplate_arrays(o, p)
+
+            self.above_yaw(p, o)
+            self.yaw_system(p, o)
+            self.nacelle_system(o)
+
+        o['MB1_location'] = o['mb1_cm']
+        status = o.pop('status')
+        for name, value in o.items():
+            # float copies, so the failed designs can be masked in place
+            o[name] = np.full(N, value, dtype=float) if np.ndim(value) == 0 else np.array(value, dtype=float)
+        finite = np.ones(N, dtype=bool)
+        for value in o.values():
+            finite &= np.all(np.isfinite(value.reshape(N, -1)), axis=1)
+        status = np.where((status == STATUS_OK) & ~finite, STATUS_NOT_FINITE, status)
+        failed = status != STATUS_OK
+        if np.any(failed):
+            for name, value in o.items():
+                value[failed] = np.nan
+        o['status'] = status
+        return o
+
+    #-------------------------------------------------------------------------
+    # closed-form components - each adds its outputs to o
+
+    def high_speed_side(self, p, o):
+        ''' HighSpeedSide.compute() '''
+        highSpeedShaftMass = 0.025 * (p['rotor_torque'] / p['gear_ratio'])
+        o['hss_mass'] = 0.5 * highSpeedShaftMass + highSpeedShaftMass
+        diameter = 1.5 * o['lss_diameter1']
+        hss_length = _where(p['hss_input_length'] == 0, 0.5 + p['rotor_diameter'] / 127., p['hss_input_length'])
+        o['hss_length'] = hss_length
+        gb_cm = o['gearbox_cm']
+        o['hss_cm'] = np.column_stack([gb_cm[:, 0] + o['gearbox_length'] / 2 + hss_length / 2, gb_cm[:, 1],
+                                       gb_cm[:, 2] + o['gearbox_height'] * 0.2])
+        I0 = 0.25 * hss_length * 3.14159 * 7850. * (diameter ** 2) * (p['gear_ratio']**2) * (diameter ** 2) / 8.
+        I1 = o['hss_mass'] * ((3/4.) * (diameter ** 2) + (hss_length ** 2)) / 12.
+        o['hss_I'] = principalI(I0, I1, I1, p['shaft_angle'])
+
+    def generator(self, p, o):
+        ''' Generator.compute() '''
+        rd = p['rotor_diameter']
+        design = {'geared': 1, 'single_stage': 2, 'multi': 3, 'pm_direct': 4}[self.drivetrain_design]
+        massCoeff = [None, 6.4737, 10.51, 5.34, 37.68][design]
+        massExp = [None, 0.9223, 0.9223, 0.9223, 1][design]
+        if design < 4:
+            mass = massCoeff * p['machine_rating'] ** massExp
+        else:
+            CalcRPM = _where(p['rotor_rpm'] != 0, p['rotor_rpm'], 80 / (rd * 0.5 * pi / 30))
+            mass = massCoeff * ((p['machine_rating'] * 1.1) / (CalcRPM * pi / 30)) ** massExp
+        length = 1.8 * 0.015 * rd
+        depth = 0.015 * rd
+        width = 0.5 * depth
+        hss_cm = o['hss_cm']
+        o['generator_mass'] = mass
+        o['generator_cm'] = np.column_stack([hss_cm[:, 0] + o['hss_length'] / 2. + length / 2., hss_cm[:, 1], hss_cm[:, 2]])
+        I0 = 4.86e-5 * rd**5.333 + (2./3. * mass) * (depth**2 + width**2) / 8.
+        I1 = I0 / 2. / p['gear_ratio']**2 + 1. / 3. * mass * length**2 / 12. \
+             + 2. / 3. * mass * (depth**2. + width**2. + 4./3. * length**2.) / 16.
+        o['generator_I'] = principalI(I0, I1, I1, p['shaft_angle'])
+
+    def rna(self, p, o):
+        ''' RNASystemAdder.compute() - takes the designs along a leading axis already '''
+        (o['RNA_mass'], o['RNA_cm']) \
+            = RNASystemAdder().compute(o['lss_mass'], o['mb1_mass'], o['mb2_mass'], o['gearbox_mass'], o['hss_mass'], o['generator_mass'],
+                                       o['lss_cm'], o['mb1_cm'], o['mb2_cm'], o['gearbox_cm'], o['hss_cm'], o['generator_cm'],
+                                       p['overhang'], o['rotor_mass'], p['machine_rating'])
+
+    def transformer(self, p, o):
+        ''' Transformer.compute() '''
+        N = len(o['RNA_mass'])
+        if not self.uptower_transformer:
+            o['transformer_mass'], o['transformer_cm'], o['transformer_I'] = np.zeros(N), np.zeros((N, 3)), np.zeros((N, 6))
+            return
+        rd = p['rotor_diameter']
+        gen_cm = o['generator_cm']
+        RNA_mass, RNA_cm = o['RNA_mass'], o['RNA_cm']
+        bottom_OD = p['tower_top_diameter'] * 1.7
+        mass = 2.4445 * (p['machine_rating']) + 1599.0
+        upwind_x = (bottom_OD / 2. * (RNA_mass + mass) - (RNA_mass * RNA_cm)) / (mass)
+        upwind_x = _where(upwind_x > gen_cm[:, 0] * 3, gen_cm[:, 0] + (1.6 * 0.015 * rd), upwind_x)
+        transformer_x = _where(RNA_cm <= -(bottom_OD) / 2, upwind_x, gen_cm[:, 0] + (1.8 * 0.015 * rd))
+        o['transformer_mass'] = mass
+        o['transformer_cm'] = np.column_stack([transformer_x, gen_cm[:, 1], gen_cm[:, 2] / .75 * .5])
+        width = p['tower_top_diameter'] + .5
+        height = 0.016 * rd
+        length = .012 * rd
+        o['transformer_I'] = principalI(mass * (height**2 + width**2) / 12., mass * (length**2 + height**2) / 12.,
+                                        mass * (length**2 + width**2) / 12.)
+
+    def above_yaw(self, p, o):
+        ''' AboveYawMassAdder.compute() '''
+        N = len(o['bedplate_mass'])
+        o['electrical_mass'] = np.zeros(N)
+        o['vs_electronics_mass'] = np.zeros(N)
+        o['hvac_mass'] = 0.08 * p['machine_rating']
+        o['controls_mass'] = np.zeros(N)
+        o['platforms_mass'] = 0.125 * o['bedplate_mass']
+        o['crane_mass'] = np.full(N, 3000.0 if self.crane else 0.0)
+        o['mainframe_mass'] = o['bedplate_mass'] + o['crane_mass'] + o['platforms_mass']
+        o['cover_mass'] = (84.1 * (2 * (o['bedplate_length'] ** 2))) / 2
+        o['above_yaw_mass'] = o['lss_mass'] + o['mb1_mass'] + o['mb2_mass'] + o['gearbox_mass'] + o['hss_mass'] \
+                            + o['generator_mass'] + o['mainframe_mass'] + o['transformer_mass'] \
+                            + o['electrical_mass'] + o['vs_electronics_mass'] + o['hvac_mass'] + o['cover_mass']
+        o['nacelle_length'] = o['bedplate_length']
+        o['nacelle_width'] = o['bedplate_width']
+        o['nacelle_height'] = (2.0 / 3.0) * o['bedplate_length']
+
+    def yaw_system(self, p, o):
+        ''' YawSystem.compute() - the default number of yaw motors is set per design '''
+        rd = p['rotor_diameter']
+        ttd = p['tower_top_diameter']
+        if self.yaw_motors_number == 0:
+            motors = _where(rd < 90.0, 4, _where(rd < 120.0, 6, 8))
+        else:
+            motors = np.full(len(rd), float(self.yaw_motors_number))
+        frictionPlateMass = pi * ttd * (ttd * 0.10) * (rd / 1000.0) * 8000.0
+        o['yaw_mass'] = frictionPlateMass + (motors * 190.0)
+        o['yaw_cm'] = np.column_stack([np.zeros((len(rd), 2)), -o['bedplate_height']])
+        ring_I = o['yaw_mass'] * (ttd / 2.0) ** 2
+        o['yaw_I'] = principalI(ring_I / 2.0, ring_I / 2.0, ring_I)
+
+    def nacelle_system(self, o):
+        ''' NacelleSystemAdder.compute() - takes the designs along a leading axis already '''
+        (o['nacelle_mass'], o['nacelle_cm'], o['nacelle_I']) \
+            = NacelleSystemAdder().compute(o['above_yaw_mass'], o['yaw_mass'], o['lss_mass'], o['mb1_mass'], o['mb2_mass'], o['gearbox_mass'],
+                                           o['hss_mass'], o['generator_mass'], o['bedplate_mass'], o['mainframe_mass'],
+                                           o['lss_cm'], o['mb1_cm'], o['mb2_cm'], o['gearbox_cm'], o['hss_cm'], o['generator_cm'], o['bedplate_cm'],
+                                           o['lss_I'], o['mb1_I'], o['mb2_I'], o['gearbox_I'], o['hss_I'], o['generator_I'], o['bedplate_I'],
+                                           o['transformer_mass'], o['transformer_cm'], o['transformer_I'], o['yaw_cm'], o['yaw_I'])
+
+#-------------------------------------------------------------------------
+
+def example_5MW_baseline_sweep(N=100000, mb2Type=None, seed=0):
+    ''' N designs scattered +-10% about the NREL 5 MW inputs - returns (model, inputs) '''
+    rng = np.random.RandomState(seed)
+    record = example_5MW_baseline_record()
+    if mb2Type is not None:
+        record['flange_length'] = 0.5
+    for name in ['rotor_torque', 'rotor_thrust', 'rotor_bending_moment_y', 'rotor_bending_moment_z', 'rotor_force_y', 'rotor_force_z',
+                 'gear_ratio', 'overhang', 'blade_mass', 'tower_top_diameter']:
+        record[name] = record[name] * rng.uniform(0.9, 1.1, N)
+    mb1Type = 'SRB' if mb2Type is None else 'CARB'
+    model = VectorizedDrivetrain(mb1Type, 'B', 'eep', 'normal', 'geared', True, 0, True, 3, mb2Type=mb2Type)
+    return model, record
+
+if __name__ == '__main__':
+
+    for mb2Type in [None, 'SRB']:
+        model, record = example_5MW_baseline_sweep(mb2Type=mb2Type)
+        t0 = time.time()
+        outputs = model.compute(record)
+        elapsed = time.time() - t0
+        N = len(outputs['nacelle_mass'])
+        print('{} point: {} nacelles in {:.2f} s ({:.0f} per s) - nacelle mass {:.1f} to {:.1f} kg'.format(
+              3 if mb2Type is None else 4, N, elapsed, N / elapsed, outputs['nacelle_mass'].min(), outputs['nacelle_mass'].max()))
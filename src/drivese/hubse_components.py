@@ -9,32 +9,36 @@ GNS 2019 06 17
 
 import numpy as np
 from math import pi, cos, sqrt, sin, exp, radians
-import sys
 import warnings
-warnings.simplefilter("error")
 
 from drivese.drivese_utils import get_distance_hub2mb
+from drivese.drivese_log import get_logger
+from drivese.drivese_components import MassProperties
 
 # -------------------------------------------------
 
 def inertiaSphereShell(mass, diameter, thickness, debug=False):
     ''' Return moment of inertia of a spherical shell '''
+    log = get_logger('inertiaSphereShell', debug)
     radius = 0.5 * diameter
     insideRadius = radius - thickness
     try:
-        dr5 = radius ** 5 - insideRadius ** 5
-        dr3 = radius ** 3 - insideRadius ** 3
-        I = 0.4 * mass \
-               * (radius ** 5 - insideRadius ** 5) \
-               / (radius ** 3 - insideRadius ** 3)
+        # numpy warnings (e.g. division by zero for a zero thickness) are errors here
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            dr5 = radius ** 5 - insideRadius ** 5
+            dr3 = radius ** 3 - insideRadius ** 3
+            I = 0.4 * mass \
+                   * (radius ** 5 - insideRadius ** 5) \
+                   / (radius ** 3 - insideRadius ** 3)
     except RuntimeWarning:
-        sys.stderr.write('\n*** inertiaSphereShell: ERROR mass {:.1f} Rad {:.4f} IRad {:.4f} Thick {:.4f}\n\n'.format(mass, 
-                         radius, insideRadius, thickness))
+        log.error('\n*** inertiaSphereShell: ERROR mass {mass:.1f} Rad {radius:.4f} IRad {inside_radius:.4f} Thick {thickness:.4f}\n',
+                  mass=mass, radius=radius, inside_radius=insideRadius, thickness=thickness)
         I = 0
         
-    if debug:
-        sys.stderr.write('iSphShell: mass {:.1f} kg diam {:.1f} m thick {:.2f} m\n'.format(mass, diameter, thickness))
-        sys.stderr.write('iSphShell: I {:.2f} kg-m2\n'.format(I))
+    if log.enabled():
+        log.debug('iSphShell: mass {mass:.1f} kg diam {diameter:.1f} m thick {thickness:.2f} m\niSphShell: I {I:.2f} kg-m2',
+                  mass=mass, diameter=diameter, thickness=thickness, I=I)
     return np.array([I, I, I])
     
 # -------------------------------------------------
@@ -57,6 +61,7 @@ class Hub_System_Adder(object):
         (self.rotor_mass, self.hub_system_mass, self.hub_system_I, self.hub_I) = self.mass_adder.compute(blade_mass, hub_mass, hub_diameter,
                                                                                              hub_thickness, pitch_system_mass, spinner_mass)
         self.hub_system_cm = self.cm_adder.compute(rotor_diameter, distance_hub2mb, shaft_angle, MB1_location)
+        self.hub_system = self.mass_adder.hub_system.shifted(self.hub_system_cm)
 
         return(self.rotor_mass, self.hub_system_mass, self.hub_system_cm, self.hub_system_I, self.hub_I)
 
@@ -74,6 +79,7 @@ class Hub_Mass_Adder(object):
         self.blade_number = blade_number
         
         self.debug = debug
+        self.log = get_logger('Hub_Mass_Adder', debug)
 
     def compute(self, blade_mass, hub_mass, hub_diameter, hub_thickness, pitch_system_mass, spinner_mass):
 
@@ -90,9 +96,6 @@ class Hub_Mass_Adder(object):
         self.hub_system_mass = 0.0 #Float(iotype='out', units='kg',desc='mass of hub system')
         self.rotor_mass = 0.0
 
-        self.hub_system_mass = self.hub_mass + self.pitch_system_mass + self.spinner_mass
-        self.rotor_mass = self.hub_system_mass + self.blade_number*self.blade_mass
-
         #add I definitions here
         hub_I = np.zeros(3)
 
@@ -100,9 +103,9 @@ class Hub_Mass_Adder(object):
         cav_rad = hub_rad - self.hub_thickness
         t5 = (hub_rad**5 - cav_rad**5)
         t3 = (hub_rad**3 - cav_rad**3)
-        if self.debug:
-            sys.stderr.write('SphHMA::compute(): Thick {:.3f} M Diam {:.2f} m H {:.3f} C {:.3f} T5 {:.3f} T3 {:.3f}\n'.format(
-                    hub_thickness, hub_diameter, hub_rad, cav_rad, t5, t3))
+        if self.log.enabled():
+            self.log.debug('SphHMA::compute(): Thick {hub_thickness:.3f} M Diam {hub_diameter:.2f} m H {hub_rad:.3f} C {cav_rad:.3f} T5 {t5:.3f} T3 {t3:.3f}',
+                           hub_thickness=hub_thickness, hub_diameter=hub_diameter, hub_rad=hub_rad, cav_rad=cav_rad, t5=t5, t3=t3)
             
         hub_I = inertiaSphereShell(self.hub_mass, self.hub_diameter, self.hub_thickness, debug=self.debug)
         '''
@@ -134,22 +137,23 @@ class Hub_Mass_Adder(object):
         spinner_I[2] = spinner_I[1]
         '''
         
-        #add moments of inertia
-        #I = np.zeros(3)
-        #for i in (range(0,3)):                        # calculating MOI, at nacelle center of gravity with origin at tower top center / yaw mass center, ignoring masses of non-drivetrain components / auxiliary systems
-            # calculate moments around CM
-            # sum moments around each components CM
-            #I[i]  =  hub_I[i] + pitch_system_I[i] + spinner_I[i]
-        self.hub_system_I = np.r_[hub_I + pitch_system_I + spinner_I, np.zeros(3)]
+        # hub, pitch system and spinner share the hub center - the cm is set by Hub_CM_Adder (Hub_System_Adder.hub_system)
+        self.hub_system = MassProperties.stack([self.hub_mass, self.pitch_system_mass, self.spinner_mass],
+                                               None, [hub_I, pitch_system_I, spinner_I]).total(np.zeros(3))
+        self.hub_system_mass = self.hub_system.mass
+        self.hub_system_I = self.hub_system.I
+        self.rotor_mass = self.hub_system_mass + self.blade_number*self.blade_mass
         
-        if self.debug:
-            sys.stderr.write('SphHMA: hub_system_mass {:8.1f} kg\n'.format(self.hub_system_mass))
-            sys.stderr.write('               hub_mass {:8.1f} kg\n'.format(self.hub_mass))
-            sys.stderr.write('      pitch_system_mass {:8.1f} kg\n'.format(self.pitch_system_mass))
-            sys.stderr.write('           spinner_mass {:8.1f} kg\n'.format(self.spinner_mass))
-            sys.stderr.write('             blade_mass {:8.1f} kg = {} * {:.1f} kg\n'.format(self.blade_number*self.blade_mass, 
-                               self.blade_number, self.blade_mass))
-            sys.stderr.write('             rotor_mass {:8.1f} kg\n'.format(self.rotor_mass))
+        if self.log.enabled():
+            self.log.debug('SphHMA: hub_system_mass {hub_system_mass:8.1f} kg\n'
+                           '               hub_mass {hub_mass:8.1f} kg\n'
+                           '      pitch_system_mass {pitch_system_mass:8.1f} kg\n'
+                           '           spinner_mass {spinner_mass:8.1f} kg\n'
+                           '             blade_mass {blades_mass:8.1f} kg = {blade_number} * {blade_mass:.1f} kg\n'
+                           '             rotor_mass {rotor_mass:8.1f} kg',
+                           hub_system_mass=self.hub_system_mass, hub_mass=self.hub_mass, pitch_system_mass=self.pitch_system_mass,
+                           spinner_mass=self.spinner_mass, blades_mass=self.blade_number*self.blade_mass,
+                           blade_number=self.blade_number, blade_mass=self.blade_mass, rotor_mass=self.rotor_mass)
             
             #for i in range(3):
             #    sys.stderr.write('Inertia {} H {:.2f} {:.2f} S {:.2f} {:.2f}\n'.format(i, hub_I[i], hI[i], spinner_I[i], sI[i]))
@@ -211,17 +215,19 @@ class Hub(object):
         
         self.blade_number = blade_number
         self.debug = debug
+        self.log = get_logger('Hub', debug)
         self.main_flange_thick = None
     
     def compute(self, blade_root_diameter, rotor_rpm, blade_mass, rotor_diameter, blade_length):  
         
         if self.blade_number != 3:
-            sys.stderr.write('\n***ERROR: spherical_hub only works with 3-bladed hubs\n\n')
+            self.log.error('\n***ERROR: spherical_hub only works with 3-bladed hubs\n')
             return None, None, None
         
-        if self.debug:
-            sys.stderr.write('Hub: INPUTS BRD {:.1f} m RPM {:.1f} BMass {:.1f} RDiam {:.1f} m BLen {:.1f} m\n'.format(blade_root_diameter, \
-                             rotor_rpm, blade_mass, rotor_diameter, blade_length))
+        if self.log.enabled():
+            self.log.debug('Hub: INPUTS BRD {blade_root_diameter:.1f} m RPM {rotor_rpm:.1f} BMass {blade_mass:.1f} RDiam {rotor_diameter:.1f} m BLen {blade_length:.1f} m',
+                           blade_root_diameter=blade_root_diameter, rotor_rpm=rotor_rpm, blade_mass=blade_mass,
+                           rotor_diameter=rotor_diameter, blade_length=blade_length)
             
         # Parameters / 'constants'
         
@@ -285,7 +291,7 @@ class Hub(object):
         sphere_cm = dsgn_hub_diam / 2 # m   Center of Mass (Sphere) 
         msph  = sph_hub_mass # kg    Mass (Sphere) 
         if (mmf + msph) < 0.01:
-        	sys.stderr.write('\n*** Hub::compute() ERROR:  mmf {:.2f} msph {:.2f}\n\n'.format(mmf, msph))
+        	self.log.error('\n*** Hub::compute() ERROR:  mmf {mmf:.2f} msph {msph:.2f}\n', mmf=mmf, msph=msph)
         	hub_cm = 0.0
         else:
             hub_cm  = (mmf*main_flange_cm + msph*sphere_cm) / (mmf + msph) # m    Hub Center of Mass 
@@ -297,9 +303,11 @@ class Hub(object):
         # Save some values
         self.main_flange_thick = main_flange_thick
         
-        if self.debug:
-            sys.stderr.write('Sph_Hub: mass {:.1f} kg Diam {:.1f} m CM {:.2f} m COST ${:.2f} ShellThick {:.3f} FlangeThick {:.3f}\n'.format(hub_mass,
-                             dsgn_hub_diam, hub_cm, hub_cost, sph_hub_shell_thick, main_flange_thick))
+        if self.log.enabled():
+            self.log.debug('Sph_Hub: mass {hub_mass:.1f} kg Diam {hub_diameter:.1f} m CM {hub_cm:.2f} m COST ${hub_cost:.2f} '
+                           'ShellThick {shell_thickness:.3f} FlangeThick {flange_thickness:.3f}',
+                           hub_mass=hub_mass, hub_diameter=dsgn_hub_diam, hub_cm=hub_cm, hub_cost=hub_cost,
+                           shell_thickness=sph_hub_shell_thick, flange_thickness=main_flange_thick)
 
         return hub_mass, dsgn_hub_diam, hub_cm, hub_cost, sph_hub_shell_thick
 
@@ -320,6 +328,7 @@ class PitchSystem(object):
         self.blade_number = blade_number
         
         self.debug = debug
+        self.log = get_logger('PitchSystem', debug)
 
     def compute(self, blade_mass, rotor_bending_moment_y):
 
@@ -345,9 +354,9 @@ class PitchSystem(object):
                              # 2019 04 29 - mass is probably a function of abs(rotor_moment_y) - without abs, we can get negative masses
         # -------- End Sunderland method --------
                              
-        if self.debug:
-            sys.stderr.write('PitchSystem IN : blade mass {:.1f} kg rbmy {:.1f} Nm\n'.format(blade_mass, self.rotor_bending_moment_y))
-            sys.stderr.write('PitchSystem OUT: mass {:.1f} kg\n'.format(self.mass))
+        if self.log.enabled():
+            self.log.debug('PitchSystem IN : blade mass {blade_mass:.1f} kg rbmy {rotor_bending_moment_y:.1f} Nm\nPitchSystem OUT: mass {mass:.1f} kg',
+                           blade_mass=blade_mass, rotor_bending_moment_y=self.rotor_bending_moment_y, mass=self.mass)
        
         return(self.mass)
 
@@ -366,11 +375,12 @@ class Spinner(object):
         
         self.blade_number = blade_number
         self.debug = debug
+        self.log = get_logger('Spinner', debug)
 
     def computeOLD(self, blade_root_diameter):
 
         if self.blade_number != 3:
-            sys.stderr.write('\n***ERROR: spherical_spinner only works with 3-bladed hubs\n\n')
+            self.log.error('\n***ERROR: spherical_spinner only works with 3-bladed hubs\n')
             return None, None, None
         
         # Parameters / 'constants'
@@ -431,11 +441,11 @@ class Spinner(object):
         #    Spinner Cost Calculations      
         spinner_cost = (COST_COMPOSITE * tot_composite_mass) + (COST_SMALL_STEEL * tot_steel_mass) # USD  C58  CALCSPN  Total Spinner Cost              
     
-        if self.debug:
-            sys.stderr.write('Sph_Spinner: mass {:.1f} kg = Steel {:.1f} kg + Composite {:.1f} kg\n'.format(tot_spinner_mass,
-                             tot_steel_mass, tot_composite_mass))
-            sys.stderr.write('Sph_Spinner: size IHD {:.1f} m DHD {:.1f} m SAHD {:.1f} m\n'.format(init_hub_diam,
-                             dsgn_hub_diam, spin_acc_hole_diam))
+        if self.log.enabled():
+            self.log.debug('Sph_Spinner: mass {spinner_mass:.1f} kg = Steel {steel_mass:.1f} kg + Composite {composite_mass:.1f} kg',
+                           spinner_mass=tot_spinner_mass, steel_mass=tot_steel_mass, composite_mass=tot_composite_mass)
+            self.log.debug('Sph_Spinner: size IHD {init_hub_diam:.1f} m DHD {hub_diam:.1f} m SAHD {access_hole_diam:.1f} m',
+                           init_hub_diam=init_hub_diam, hub_diam=dsgn_hub_diam, access_hole_diam=spin_acc_hole_diam)
 
         return tot_spinner_mass, spin_cm, spinner_cost
 
@@ -443,7 +453,7 @@ class Spinner(object):
         ''' This version of compute implements the REV02 rewrite of the spinner that Scott Caron delivered on 2019 07 07 '''
         
         if self.blade_number != 3:
-            sys.stderr.write('\n***ERROR: spherical_spinner only works with 3-bladed hubs\n\n')
+            self.log.error('\n***ERROR: spherical_spinner only works with 3-bladed hubs\n')
             return None, None, None
         
         # Parameters / 'constants'
@@ -523,12 +533,12 @@ class Spinner(object):
         spinner_cm = sph_spin_diam / 2 # m                                                                                                                                                    C89  CALC  Spinner Center of Mass (Sph Shell and Front/Rear Steel Hardware)                   
         spinner_cost = (spin_shell_mass * SPIN_SHELL_COMP_COST) + (bracket_mass_total * SMALL_STEEL_COST) # USD                                                                               C94  CALC  Total Spinner Cost                                                                 
 
-        if self.debug:
-            sys.stderr.write('Sph_Spinner: mass {:.1f} kg = Shell {:.1f} kg + Bracket {:.1f} kg\n'.format(spinner_mass,
-                             spin_shell_mass, bracket_mass_total))
-            sys.stderr.write('Sph_Spinner: size IHD {:.1f} m DHD {:.1f} m SAHD {:.1f} m\n'.format(init_hub_diam,
-                             dsgn_hub_diam, spin_acc_hole_diam))
-            sys.stderr.write('Sph_Spinner: cost ${:.2f}  CM {:.2f} m\n'.format(spinner_cost, spinner_cm))
+        if self.log.enabled():
+            self.log.debug('Sph_Spinner: mass {spinner_mass:.1f} kg = Shell {shell_mass:.1f} kg + Bracket {bracket_mass:.1f} kg',
+                           spinner_mass=spinner_mass, shell_mass=spin_shell_mass, bracket_mass=bracket_mass_total)
+            self.log.debug('Sph_Spinner: size IHD {init_hub_diam:.1f} m DHD {hub_diam:.1f} m SAHD {access_hole_diam:.1f} m',
+                           init_hub_diam=init_hub_diam, hub_diam=dsgn_hub_diam, access_hole_diam=spin_acc_hole_diam)
+            self.log.debug('Sph_Spinner: cost ${spinner_cost:.2f}  CM {spinner_cm:.2f} m', spinner_cost=spinner_cost, spinner_cm=spinner_cm)
 
         return spinner_mass, spinner_cm, spinner_cost
 
@@ -8,10 +8,15 @@ Components for the new spherical hub model - July 2019
 import numpy as np
 #import sys
 
-from openmdao.api import Component, Group, Problem, IndepVarComp
+# the openmdao.api module pulls in every driver, solver and recorder - import only what is used here
+from openmdao.core.component import Component
+from openmdao.core.group import Group
+from openmdao.core.problem import Problem
+from openmdao.components.indep_var_comp import IndepVarComp
 #from openmdao.recorders.hdf5_recorder import HDF5Recorder
 #from openmdao.api import view_connections, view_tree, view_model
 
+from drivese.drivese_profile import instrument_module
 from drivese.hubse_components import Hub, PitchSystem, Spinner, Hub_System_Adder, Hub_Mass_Adder, Hub_CM_Adder
 #from drivese.sph_hubse_components import Sph_Hub, PitchSystem, Sph_Spinner, Hub_System_Adder, Hub_Mass_Adder, Hub_CM_Adder
 
@@ -267,6 +272,9 @@ class HubMassOnlySE(Group):
         self.add('spinner',         Spinner_OM(blade_number, debug=debug), ['*'])
         self.add('adder',    Hub_Mass_Adder_OM(blade_number, debug=debug), ['*'])
         
+# timing wrappers on the solve_nonlinear() methods when profiling is on (drivese_profile.py)
+instrument_module(__name__)
+
 #%%----------------------------
         
         #-------------------------------------------------------------------------
@@ -289,7 +297,7 @@ def example_5MW_4pt(debug=False):
     prob.setup()
     #view_connections(prob.root, show_browser=True)
     #view_tree(prob, show_browser=True)
-    view_model(prob, show_browser=True)
+    #view_model(prob, show_browser=True)
     
     prob['rotor_diameter'] = 126.0  # m
     prob['blade_root_diameter'] = 3.542
@@ -0,0 +1,117 @@
+"""
+test_drivese_bedplate.py
+
+Tests for the vectorized bedplate section functions (drivese_bedplate.py)
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from drivese import drivese_bedplate as bp
+
+# rear section loads from the 5MW 3-point example
+REAR_LOADS = dict(length=8.2049, hss_location=1.606, hss_mass=2414.7, generator_location=4.057, generator_mass=16699.9,
+                  conv_location=8.114, conv_mass=4146.45, transformer_location=7.459, transformer_mass=13821.5,
+                  gearbox_location=0.1, gearbox_mass=58594.5)
+
+
+class Test_BedplateSections(unittest.TestCase):
+
+    def test_broadcast(self):
+        ''' arrays of candidate sections and of designs give the same answers as scalar calls '''
+        tf, tw, b0, h0 = bp.legacy_sections(50)
+        masses = np.array([[10000.0], [16699.9], [25000.0]])  # 3 designs x 50 candidates
+        loads = dict(REAR_LOADS, generator_mass=masses)
+        defl, stress, mass = bp.bedplate_rear_section(tf, tw, b0, h0, **loads)
+        self.assertEqual(defl.shape, (3, 50))
+        for i in range(3):
+            for k in [0, 17, 49]:
+                loads = dict(REAR_LOADS, generator_mass=float(masses[i, 0]))
+                d, s, m = bp.bedplate_rear_section(float(tf[k]), float(tw[k]), float(b0[k]), float(h0[k]), **loads)
+                self.assertEqual((d, s, m), (defl[i, k], stress[i, k], mass[k]))
+
+    def test_legacy_sections(self):
+        ''' candidate dims are accumulated exactly as in the original loop '''
+        tf, tw, b0, h0 = bp.legacy_sections(200)
+        h = 0.6096
+        for k in range(200):
+            self.assertEqual(h0[k], h)
+            h += 0.006
+
+    def test_search(self):
+        section = lambda tf, tw, b0, h0: bp.bedplate_rear_section(tf, tw, b0, h0, **REAR_LOADS)
+        deflMax = REAR_LOADS['length'] / 1500.
+        k = bp.search_legacy_sections(section, bp.STEEL_STRESS_MAX, deflMax, nstart=4)
+        tf, tw, b0, h0 = bp.legacy_sections(k + 1)
+        d, s, m = section(tf, tw, b0, h0)
+        self.assertTrue(d[k] - deflMax <= 1e-4 and s[k] * 8 - bp.STEEL_STRESS_MAX <= 5e5)
+        self.assertTrue(d[k-1] - deflMax > 1e-4 or s[k-1] * 8 - bp.STEEL_STRESS_MAX > 5e5)
+        np.testing.assert_array_equal(bp.first_feasible([[False, True, True], [False, False, False]]), [1, -1])
+
+
+class Test_SectionCatalogue(unittest.TestCase):
+
+    def setUp(self):
+        self.section = lambda tf, tw, b0, h0: bp.bedplate_rear_section(tf, tw, b0, h0, **REAR_LOADS)
+        self.deflMax = REAR_LOADS['length'] / 1500.
+
+    def check_lightest(self, cat):
+        idx = cat.lightest_feasible(self.section, bp.STEEL_STRESS_MAX, self.deflMax)
+        feasible = cat.feasible(self.section, bp.STEEL_STRESS_MAX, self.deflMax)
+        self.assertTrue(feasible[idx])
+        self.assertFalse(np.any(feasible[:idx]))
+        self.assertTrue(np.all(np.diff(cat.A) >= 0))
+
+    def test_welded(self):
+        cat = bp.default_catalogue()
+        self.assertFalse(cat.monotone)
+        self.check_lightest(cat)
+
+    def test_monotone(self):
+        # parametric sections form a monotone table, searched by bisection
+        tf, tw, b0, h0 = bp.legacy_sections(300)
+        cat = bp.SectionCatalogue(['S{}'.format(k) for k in range(300)], tf[::-1], tw[::-1], b0[::-1], h0[::-1])
+        self.assertTrue(cat.monotone)
+        self.check_lightest(cat)
+        self.assertEqual(cat.lightest_feasible(self.section, 1.0, self.deflMax), -1)
+
+    def test_csv(self):
+        fd, fname = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write('name,h0,b0,tw,tf\nHEB1000,1000,300,19,36\nHEB600,600,300,15.5,30\nHEB800,800,300,17.5,33\n')
+        try:
+            cat = bp.load_catalogue(fname)
+            self.assertTrue(cat is bp.load_catalogue(fname))
+            self.assertEqual(list(cat.names), ['HEB600', 'HEB800', 'HEB1000'])
+            self.assertAlmostEqual(cat.h0[0], 0.6)
+        finally:
+            os.remove(fname)
+
+
+class Test_CantileverFE(unittest.TestCase):
+
+    def test_superposition(self):
+        # in-span point loads and self weight match the closed-form tip deflections
+        L = REAR_LOADS['length']
+        locs = [1.606, 4.057, 7.459]
+        forces = [1e4, 2e4, 3e4]
+        fe = bp.cantilever_fe(L, locs, 20)
+        u_point = fe.solve(fe.nodal_loads(locs, forces))
+        defl = fe.max_deflection(2.0, 500.0, 210e9, u_point)
+        analytic = sum(bp.mid_deflection(L, a, f, 210e9, 2.0) for f, a in zip(forces, locs)) + bp.dist_deflection(L, 500.0, 210e9, 2.0)
+        self.assertAlmostEqual(defl / analytic, 1.0, places=6)
+
+    def test_model_cache(self):
+        fe = bp.cantilever_fe(8.0, [1.0, 3.0], 10)
+        self.assertTrue(fe is bp.cantilever_fe(8.0, [1.0, 3.0], 10))
+        self.assertFalse(fe is bp.cantilever_fe(8.0, [1.0, 3.5], 10))
+        # candidate sections broadcast against load cases
+        u_point = fe.solve(fe.nodal_loads([1.0, 3.0], [np.array([1e4, 2e4]), 1e4]))
+        I = np.linspace(0.01, 0.02, 5)[:, np.newaxis]
+        self.assertEqual(fe.max_deflection(I, 100.0, 210e9, u_point).shape, (5, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+test_drivese_benchmark.py
+
+Benchmark suite (drivese_benchmark.py): benchmarks run, results are saved per commit and compared
+"""
+
+import shutil
+import tempfile
+import unittest
+
+from drivese.drivese_benchmark import run_benchmarks, save_results, load_results, compare_results, group_benchmarks
+from drivese.drivese_cli import main
+
+
+class Test_Benchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.results_dir)
+
+    def test_run(self):
+        results = run_benchmarks('Spinner', repeat=2, min_time=0.001)
+        self.assertEqual(list(results), ['Spinner.compute'])
+        self.assertTrue(0.0 < results['Spinner.compute']['best'] <= results['Spinner.compute']['median'])
+        self.assertEqual([name for name, function in group_benchmarks('0.75MW')], ['Drive3pt.run[0.75MW]', 'Drive4pt.run[0.75MW]'])
+
+    def test_compare(self):
+        timing = lambda t: dict(best=t, median=t, mean=t, number=1, repeat=1)
+        save_results({'a': timing(1.0), 'b': timing(1.0), 'c': timing(1.0)}, self.results_dir, commit='1234567')
+        save_results({'a': timing(1.05), 'b': timing(1.5), 'c': timing(0.5)}, self.results_dir, commit='89abcde')
+        rows = compare_results(load_results('123', self.results_dir), load_results('89abcde', self.results_dir), threshold=0.1)
+        self.assertEqual([(row[0], row[-1]) for row in rows], [('a', ''), ('b', 'REGRESSION'), ('c', 'faster')])
+
+        self.assertEqual(main(['compare', '1234567', '89abcde', '--results-dir', self.results_dir]), 1)
+        self.assertEqual(main(['compare', '1234567', '89abcde', '--results-dir', self.results_dir, '--threshold', '0.6']), 0)
+        self.assertEqual(main(['compare', 'fffffff', '89abcde', '--results-dir', self.results_dir]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+test_drivese_cache.py
+
+Tests for the persistent component memo store (drivese_cache.py)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from drivese import drivese_cache
+from drivese.drivese_cache import ComponentCache, make_key, set_default_cache
+from drivese.drivese_components import Gearbox
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_record
+
+
+class Test_ComponentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ComponentCache(os.path.join(self.tmpdir, 'test.sqlite'))
+        self.previous = set_default_cache(self.cache)
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_keys(self):
+        self.assertEqual(make_key('a', 1.0, np.array([1.0, 2.0])), make_key('a', 1.0, np.array([1.0, 2.0])))
+        self.assertNotEqual(make_key('a', 1.0), make_key('a', np.array([1.0])))
+        self.assertNotEqual(make_key('a', 1.0), make_key('a', 1.0 + 1e-15))
+
+    def test_hit_miss(self):
+        self.assertEqual(self.cache.get('k')[0], False)
+        self.cache.put('k', (1.0, np.arange(3)))
+        found, value = self.cache.get('k')
+        self.assertTrue(found)
+        np.testing.assert_array_equal(value[1], np.arange(3))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_lru_eviction(self):
+        blob = np.zeros(100)
+        size = len(drivese_cache.pickle.dumps(blob, protocol=drivese_cache.pickle.HIGHEST_PROTOCOL))
+        self.cache.max_bytes = 3 * size
+        for k in ['a', 'b', 'c']:
+            self.cache.put(k, blob)
+        self.cache.get('a')  # 'b' is now the least recently used entry
+        self.cache.put('d', blob)
+        self.assertTrue(self.cache.get('a')[0])
+        self.assertFalse(self.cache.get('b')[0])
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_gearbox_memo(self):
+        gb = Gearbox('eep')
+        r1 = gb.stageRatioCalc(96.76, [3, 3, 1], 'eep')
+        r2 = gb.stageRatioCalc(96.76, [3, 3, 1], 'eep')
+        np.testing.assert_array_equal(r1, r2)
+        self.assertEqual(self.cache.stats()['components']['Gearbox.stageRatioCalc'], {'hits': 1, 'misses': 1})
+
+    def test_state_restored(self):
+        # a hit leaves the LSS and bedplate with the member variables of the computation (e.g. L_ms)
+        kwargs = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                      uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+        computed, restored = DrivetrainModel(**kwargs), DrivetrainModel(**kwargs)
+        computed.compute(example_5MW_baseline_record())
+        restored.compute(example_5MW_baseline_record())
+        self.assertEqual(self.cache.stats()['components']['LowSpeedShaft3pt.compute'], {'hits': 1, 'misses': 1})
+        for name in ['lowSpeedShaft', 'bedplate']:
+            before, after = vars(getattr(computed, name)), vars(getattr(restored, name))
+            for attr in ['L_ms', 'length', 'D_in', 'frontScale', 'governing_case']:
+                if attr in before:
+                    np.testing.assert_array_equal(after[attr], before[attr])
+
+    def test_env_switch(self):
+        # on unless DRIVESE_CACHE switches it off
+        environ = dict(os.environ)
+        state = drivese_cache._default_cache, drivese_cache._default_cache_set
+        try:
+            os.environ.pop('DRIVESE_CACHE', None)
+            os.environ['DRIVESE_CACHE_DIR'] = self.tmpdir
+            drivese_cache._default_cache_set = False
+            self.assertEqual(drivese_cache.get_default_cache().path, os.path.join(self.tmpdir, drivese_cache.CACHE_FILENAME))
+            os.environ['DRIVESE_CACHE'] = '0'
+            drivese_cache._default_cache_set = False
+            self.assertIsNone(drivese_cache.get_default_cache())
+        finally:
+            drivese_cache._default_cache, drivese_cache._default_cache_set = state
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def test_opt_out(self):
+        set_default_cache(None)
+        gb = Gearbox('eep')
+        gb.stageRatioCalc(96.76, [3, 3, 1], 'eep')
+        self.assertEqual(self.cache.stats()['hits'] + self.cache.stats()['misses'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
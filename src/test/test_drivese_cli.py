@@ -0,0 +1,90 @@
+"""
+test_drivese_cli.py
+
+The drivese command (drivese_cli.py): same outputs as drivese_io.run_table() with and without worker processes
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import ComponentCache, get_default_cache, set_default_cache
+from drivese.drivese_cli import main, build_parser
+from drivese.drivese_io import read_table_chunks, run_table
+from drivese.drivese_pipeline import example_5MW_baseline_record
+
+MODEL_KWARGS = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                    uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+
+
+class Test_CLI(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = get_default_cache()
+        self.output_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.output_dir, 'fleet.csv')
+        rng = np.random.RandomState(0)
+        with open(self.input_path, 'w') as f:
+            f.write('turbine_id,overhang [m],rotor_torque [kN*m]\n')
+            for i in range(7):
+                f.write('{},{!r},{!r}\n'.format(i, rng.uniform(4.5, 5.5), rng.uniform(3500.0, 4800.0)))
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        shutil.rmtree(self.output_dir)
+
+    def read(self, path):
+        # outputs as floats - a CSV table holds text
+        return dict((name, column if name == 'error' else np.asarray(column, dtype=float))
+                    for name, column in next(read_table_chunks(path)[1]).items())
+
+    def test_run(self):
+        expected = os.path.join(self.output_dir, 'expected.csv')
+        run_table(self.input_path, expected, MODEL_KWARGS, example_5MW_baseline_record(), keep_columns=['turbine_id'])
+        for jobs in ['1', '2']:
+            output = os.path.join(self.output_dir, 'nacelles_{}.csv'.format(jobs))
+            self.assertEqual(main(['run', self.input_path, output, '--keep', 'turbine_id', '--jobs', jobs, '--chunk-size', '3', '-q']), 0)
+            with open(expected) as f, open(output) as g:
+                self.assertEqual(f.read(), g.read())
+
+    def test_pipeline_engine(self):
+        output = os.path.join(self.output_dir, 'nacelles.csv')
+        main(['run', self.input_path, output, '--engine', 'pipeline', '--chunk-size', '4', '-q', '--outputs', 'nacelle_mass', 'nacelle_cm'])
+        vectorized = os.path.join(self.output_dir, 'vectorized.csv')
+        main(['run', self.input_path, vectorized, '-q', '--outputs', 'nacelle_mass', 'nacelle_cm'])
+        table = self.read(output)
+        self.assertEqual(len(table), 5)  # nacelle_mass, nacelle_cm_x/y/z, error
+        for name, column in self.read(vectorized).items():
+            if name == 'error':
+                self.assertEqual(list(table[name]), list(column))
+            else:
+                np.testing.assert_allclose(table[name], column, rtol=1e-6)
+
+    def test_serial_cache(self):
+        # --jobs 1 runs in this process - the memo store is put back afterwards
+        store = ComponentCache(None)
+        set_default_cache(store)
+        output = os.path.join(self.output_dir, 'nacelles.csv')
+        for options in [['--cache'], []]:
+            main(['run', self.input_path, output, '--engine', 'pipeline', '-q'] + options)
+            self.assertIs(get_default_cache(), store)
+
+    def test_arguments(self):
+        args = build_parser().parse_args(['run', 'a.csv', 'b.csv', '--config', '4pt', '--crane', 'no', '--set', 'planet_numbers=3,3,1'])
+        self.assertEqual((args.config, args.crane, args.set), ('4pt', False, [('planet_numbers', [3.0, 3.0, 1.0])]))
+        self.assertEqual(main(['run', os.path.join(self.output_dir, 'missing.csv'), 'b.csv', '-q']), 1)
+        self.assertEqual(build_parser().parse_args(['run', 'a.csv', 'b.csv', '--drivetrain-design', 'pm_direct']).drivetrain_design, 'pm_direct')
+        with self.assertRaises(SystemExit):
+            build_parser().parse_args(['run', 'a.csv', 'b.csv', '--drivetrain-design', 'pm_direct_drive'])
+
+    def test_engine_failure(self):
+        # no bedplate section carries a 60 m tower top without the transformer, so every row raises
+        output = os.path.join(self.output_dir, 'nacelles.csv')
+        self.assertEqual(main(['run', self.input_path, output, '--engine', 'pipeline', '-q', '--uptower-transformer', 'no',
+                               '--set', 'tower_top_diameter=60']), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+"""
+test_drivese_components.py
+
+Tests for the pure python components in drivese_components.py
+"""
+
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import set_default_cache
+from drivese.drivese_components import Gearbox, Bedplate, NacelleSystemAdder, MassProperties, rotationMatrix, principalI, \
+                                       MainBearing, YawSystem, HighSpeedSide, Generator
+
+# bedplate inputs from the 5MW 3-point example (nacelle_example_5MW_baseline_3pt)
+BEDPLATE_5MW_3PT = dict(
+    gearbox_length=1.512, gearbox_location=0.1, gearbox_mass=58594.49432901148,
+    hss_location=1.606, hss_mass=2414.67718019979, generator_location=4.057, generator_mass=16699.8513249997,
+    lss_location=-2.5391679359274217, lss_mass=20758.650957244485, lss_length=3.16210098402427,
+    mb1_cm=np.array([-3.04686728, 0.0, 0.96517378]), mb1_facewidth=0.0, mb1_mass=3730.0777479023945,
+    mb2_cm=np.zeros(3), mb2_mass=0.0, transformer_mass=13821.5, transformer_cm=np.array([7.459, 0.0, 0.756]),
+    tower_top_diameter=3.78, rotor_diameter=126.0, machine_rating=5000.0, rotor_mass=84525.24762194273,
+    rotor_bending_moment_y=-16665000.0, rotor_force_z=-842710.0, flange_length=0.0, distance_hub2mb=1.912)
+
+
+class Test_Gearbox(unittest.TestCase):
+
+    def setUp(self):
+        self.inputs = dict(gear_ratio=96.76, planet_numbers=[3, 3, 1], rotor_rpm=12.1,
+                           rotor_diameter=126.0, rotor_torque=4.3e6, gearbox_input_cm=0.1)
+
+    def run_gearbox(self, config, **kwargs):
+        inputs = dict(self.inputs)
+        inputs.update(kwargs)
+        gb = Gearbox(config)
+        out = gb.compute(**inputs)
+        return gb, np.hstack([np.ravel(out[0]), out[1], out[3]])
+
+    def test_stage_ratio_sensitivity(self):
+        for config in ['eep', 'eep_3', 'epp']:
+            gb = Gearbox(config)
+            R = self.inputs['gear_ratio']
+            x = gb.stageRatioCalc(R, [3, 3, 1], config)
+            dx_dR, dx_dB = gb.stageRatioSensitivity(x, R, [3, 3, 1], config)
+            fd = (gb.stageRatioCalc(R + 0.01, [3, 3, 1], config) - gb.stageRatioCalc(R - 0.01, [3, 3, 1], config)) / 0.02
+            np.testing.assert_allclose(dx_dR, fd, rtol=1e-2, atol=1e-5)
+            self.assertAlmostEqual(np.prod(x + 1e-3 * dx_dR), R + 1e-3, places=5)
+
+    def test_partials(self):
+        gb, out0 = self.run_gearbox('eep')
+        J = gb.compute_partials()
+        h = 0.01
+        fd = (self.run_gearbox('eep', gear_ratio=96.76 + h)[1] - self.run_gearbox('eep', gear_ratio=96.76 - h)[1]) / (2 * h)
+        self.assertAlmostEqual(J['gearbox_mass', 'gear_ratio'][0, 0] / fd[3], 1.0, places=2)
+        np.testing.assert_allclose(J['gearbox_I', 'gear_ratio'].flatten(), fd[4:], rtol=1e-2)
+        fd = (self.run_gearbox('eep', rotor_diameter=126.01)[1] - self.run_gearbox('eep', rotor_diameter=125.99)[1]) / 0.02
+        np.testing.assert_allclose(J['gearbox_I', 'rotor_diameter'].flatten(), fd[4:], rtol=1e-6)
+        fd = (self.run_gearbox('eep', rotor_torque=4.3e6 + 10)[1] - self.run_gearbox('eep', rotor_torque=4.3e6 - 10)[1]) / 20
+        np.testing.assert_allclose(J['stage_masses', 'rotor_torque'].flatten(), fd[:3], rtol=1e-6)
+        gb, out0 = self.run_gearbox('eep', shaft_angle=0.0873)
+        J = gb.compute_partials()
+        fd = (self.run_gearbox('eep', shaft_angle=0.0874)[1] - self.run_gearbox('eep', shaft_angle=0.0872)[1]) / 2e-4
+        np.testing.assert_allclose(J['gearbox_I', 'shaft_angle'].flatten(), fd[4:], rtol=1e-6, atol=1e-6 * np.abs(out0[4:]).max())
+
+
+class Test_Bedplate(unittest.TestCase):
+
+    def setUp(self):
+        # these tests look at member variables that are not restored from the memo store
+        self.previous = set_default_cache(None)
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+
+    def test_step(self):
+        bpl = Bedplate(sizing='step')
+        mass, cm, I, length, height, width = bpl.compute(**BEDPLATE_5MW_3PT)
+        self.assertAlmostEqual(mass, 90236.21, 1)
+        self.assertAlmostEqual(height, 1.6296, 4)
+
+    def test_bisect(self):
+        bpl = Bedplate(sizing='bisect')
+        mass = bpl.compute(**BEDPLATE_5MW_3PT)[0]
+        self.assertEqual(bpl.rearActiveConstraint, 'deflection')
+        self.assertEqual(bpl.frontActiveConstraint, 'stress')
+        self.assertTrue(abs(mass / 90236.21 - 1) < 0.01)
+
+        # front section is feasible at the returned scale and infeasible just below it
+        for scale, feasible in [(bpl.frontScale, True), (bpl.frontScale - 1e-3, False)]:
+            bpl.setSection(scale)
+            bpl.characterize_Bedplate_Front()
+            self.assertEqual(bpl.rootStress * bpl.stress_mult <= bpl.castStressMax, feasible)
+
+    def test_catalogue(self):
+        bpl = Bedplate(sizing='catalogue')
+        mass = bpl.compute(**BEDPLATE_5MW_3PT)[0]
+        self.assertTrue(bpl.frontSectionName.startswith('WPG'))
+        self.assertTrue(bpl.rootStress * bpl.stress_mult <= bpl.castStressMax)
+        self.assertTrue(bpl.totalTipDefl <= bpl.deflMax)
+
+    def test_fe(self):
+        bpl = Bedplate(sizing='bisect', beam_model='fe')
+        mass = bpl.compute(**BEDPLATE_5MW_3PT)[0]
+        self.assertTrue(abs(mass / 90294.73 - 1) < 0.01)
+        self.assertTrue(bpl.rearTotalTipDefl <= bpl.rearTotalLength / 1500. * (1 + 1e-6))
+        self.assertRaises(ValueError, Bedplate, beam_model='timoshenko')
+
+    def test_load_cases(self):
+        # sizing to an array of rotor load cases gives the same bedplate as sizing to the worst single case
+        My = np.array([-8e6, -16665000.0, -20e6])
+        Fz = np.array([-842710.0, -6e5, -7e5])
+        for sizing in ['step', 'catalogue']:
+            bpl = Bedplate(sizing=sizing)
+            mass = bpl.compute(**dict(BEDPLATE_5MW_3PT, rotor_bending_moment_y=My, rotor_force_z=Fz))[0]
+            self.assertEqual(bpl.governing_case['front_stress'], 2)
+            single = Bedplate(sizing=sizing).compute(**dict(BEDPLATE_5MW_3PT, rotor_bending_moment_y=My[2], rotor_force_z=Fz[2]))[0]
+            self.assertEqual(mass, single)
+
+    def test_partials(self):
+        # the stepped sizings have no derivatives
+        for sizing in ['step', 'catalogue']:
+            self.assertRaises(ValueError, Bedplate(sizing=sizing).compute_partials, **BEDPLATE_5MW_3PT)
+
+        bpl = Bedplate(sizing='bisect')
+        bpl.compute(**BEDPLATE_5MW_3PT)
+        J = bpl.compute_partials(**BEDPLATE_5MW_3PT)
+        # against finite differences of the sizing
+        for name, h in [('generator_mass', 20.0), ('rotor_mass', 100.0), ('generator_location', 0.005)]:
+            mp = Bedplate(sizing='bisect').compute(**dict(BEDPLATE_5MW_3PT, **{name: BEDPLATE_5MW_3PT[name] + h}))[0]
+            mm = Bedplate(sizing='bisect').compute(**dict(BEDPLATE_5MW_3PT, **{name: BEDPLATE_5MW_3PT[name] - h}))[0]
+            self.assertAlmostEqual(J['bedplate_mass', name][0, 0] / ((mp - mm) / (2 * h)), 1.0, places=3)
+        self.assertFalse(('bedplate_mass', 'lss_length') in J)
+
+        # at gearbox_location = 0 the step goes forward: a backward one would move the gearbox onto the front section
+        partials = []
+        for location in [0.0, 1e-3]:
+            inputs = dict(BEDPLATE_5MW_3PT, gearbox_location=location)
+            partials.append(Bedplate(sizing='bisect').compute_partials(**inputs)['bedplate_mass', 'gearbox_location'][0, 0])
+        self.assertGreater(partials[0], 0.0)
+        self.assertLess(partials[0], partials[1])
+
+
+class Test_NacelleSystemAdder(unittest.TestCase):
+
+    def inputs(self, rng):
+        masses = dict((name, rng.uniform(1e3, 5e4)) for name in ['lss', 'mb1', 'mb2', 'gearbox', 'hss', 'generator', 'bedplate',
+                                                                  'transformer', 'yaw'])
+        args = [0.0, masses['yaw']] + [masses[name] for name in ['lss', 'mb1', 'mb2', 'gearbox', 'hss', 'generator', 'bedplate']]
+        args += [1.2 * masses['bedplate']]
+        args += [rng.uniform(-5.0, 5.0, 3) for name in range(7)]
+        args += [rng.uniform(0.0, 1e4, 3) for name in range(7)]
+        args += [masses['transformer'], rng.uniform(-5.0, 5.0, 3), rng.uniform(0.0, 1e4, 3)]
+        args += [rng.uniform(-5.0, 5.0, 3), rng.uniform(0.0, 1e4, 3)]  # yaw system cm and I
+        return args
+
+    def test_inertia(self):
+        rng = np.random.RandomState(0)
+        args = self.inputs(rng)
+        mass, cm, I = NacelleSystemAdder().compute(*args)
+
+        # parallel axis sum, one component at a time
+        masses = args[2:8] + [args[24], args[9], args[1]]
+        cms = args[10:16] + [args[25], args[16], args[27]]
+        Is = args[17:23] + [args[26], 1.2 * args[23], args[28]]
+        # the transformer is in the first moment but not in the mass the cm is divided by
+        np.testing.assert_allclose(cm, sum(m * c for m, c in zip(masses, cms)) / (sum(masses) - args[24]), rtol=1e-12)
+        expected = np.zeros((3, 3))
+        for m, c, own in zip(masses, cms, Is):
+            r = c - cm
+            expected += m * (np.dot(r, r) * np.eye(3) - np.outer(r, r)) + np.diag(own)
+        np.testing.assert_allclose(I, [expected[0, 0], expected[1, 1], expected[2, 2], expected[0, 1], expected[0, 2], expected[1, 2]],
+                                   rtol=1e-12)
+
+    def test_batch(self):
+        rng = np.random.RandomState(1)
+        designs = [self.inputs(rng) for i in range(4)]
+        batch = NacelleSystemAdder().compute(*[np.array(arg) for arg in zip(*designs)])
+        for i, args in enumerate(designs):
+            for value, expected in zip(batch, NacelleSystemAdder().compute(*args)):
+                np.testing.assert_allclose(value[i], expected, rtol=1e-12)
+
+
+class Test_ShaftLineInertia(unittest.TestCase):
+
+    def test_tilt(self):
+        # every body on the shaft line spins about the tilted shaft axis
+        gb_cm = np.array([0.1, 0.0, 0.8])
+        shaft_angle = 5.0 * np.pi / 180.0
+        axis = rotationMatrix(shaft_angle)[:, 0]
+        for compute in [lambda sa: Gearbox('eep').compute(96.76, [3, 3, 1], 12.1, 126.0, 4.3e6, 0.1, sa)[3],
+                        lambda sa: HighSpeedSide().compute(126.0, 4.2e6, 97.0, 0.8, 1.5, 2.0, gb_cm, 0.0, sa)[2],
+                        lambda sa: Generator('geared').compute(126.0, 5000.0, 97.0, 1.5, gb_cm, 12.1, sa)[2]]:
+            level, tilted = compute(0.0), compute(shaft_angle)
+            T = MassProperties(1.0, I=tilted).tensor()
+            np.testing.assert_allclose(T.dot(axis), level[0] * axis, rtol=1e-12)
+            np.testing.assert_allclose(tilted[1], level[1], rtol=1e-12)
+            self.assertNotEqual(tilted[4], 0.0)
+
+class Test_MassProperties(unittest.TestCase):
+
+    def test_compose(self):
+        rng = np.random.RandomState(2)
+        a = MassProperties(1e3, rng.uniform(-5.0, 5.0, 3), rng.uniform(0.0, 1e4, 6))
+        b = MassProperties(4e3, rng.uniform(-5.0, 5.0, 3), rng.uniform(0.0, 1e4, 3))
+        c = MassProperties(2.5e3)
+        total = MassProperties.stack([a.mass, b.mass, c.mass], [a.cm, b.cm, c.cm], [a.I, b.I, c.I]).total()
+        for body in [a + b + c, sum([a, b, c])]:
+            self.assertAlmostEqual(body.mass, 7.5e3)
+            np.testing.assert_allclose(body.cm, (a.mass * a.cm + b.mass * b.cm) / 7.5e3, rtol=1e-12)
+            np.testing.assert_allclose(body.I, total.I, rtol=1e-12)
+
+        # inertia about a point, moving and turning the body
+        point = np.array([1.0, -2.0, 0.5])
+        r = total.cm - point
+        T = total.tensor() + total.mass * (np.dot(r, r) * np.eye(3) - np.outer(r, r))
+        np.testing.assert_allclose(total.about(point), [T[0, 0], T[1, 1], T[2, 2], T[0, 1], T[0, 2], T[1, 2]], rtol=1e-12)
+        np.testing.assert_allclose(total.shifted(point).about(2 * point), total.about(point), rtol=1e-12)
+        R = rotationMatrix(0.3).dot(rotationMatrix(-0.7, axis=0))
+        turned = total.rotated(R)
+        np.testing.assert_allclose(turned.cm, R.dot(total.cm), rtol=1e-12)
+        np.testing.assert_allclose(turned.tensor(), R.dot(total.tensor()).dot(R.T), rtol=1e-12)
+        np.testing.assert_allclose(np.linalg.eigvalsh(turned.tensor()), np.linalg.eigvalsh(total.tensor()), rtol=1e-12)
+        np.testing.assert_allclose(rotationMatrix(0.1).dot([-1.0, 0.0, 0.0]), [-np.cos(0.1), 0.0, np.sin(0.1)])
+
+    def test_principal(self):
+        # a body on the shaft tilted by 5 deg: Ixz = cos * sin * (Izz - Ixx), same principal moments
+        angle = np.radians(5.0)
+        I = principalI(3.0e4, 2.0e4, 2.0e4, angle)
+        self.assertAlmostEqual(I[0], np.cos(angle)**2 * 3.0e4 + np.sin(angle)**2 * 2.0e4)
+        self.assertAlmostEqual(I[4], np.cos(angle) * np.sin(angle) * (2.0e4 - 3.0e4))
+        self.assertEqual(list(I[[3, 5]]), [0.0, 0.0])
+        np.testing.assert_allclose(principalI([1.0, 2.0], 3.0, 4.0, [0.0, angle])[0], [1.0, 3.0, 4.0, 0.0, 0.0, 0.0], atol=1e-12)
+
+        mass, cm, I = MainBearing('main').compute(1000.0, 0.8, 1e6, 126.0, np.array([-2.0, 0.0, 1.0]), angle)
+        np.testing.assert_allclose(np.linalg.eigvalsh(MassProperties(mass, cm, I).tensor()),
+                                   sorted([mass * 0.8**2 / 8.0] * 2 + [mass * 0.8**2 / 4.0]), rtol=1e-12)
+
+        mass, cm, I = YawSystem(4).compute(126.0, 1e6, 3.87, 2e5, 2.0)
+        np.testing.assert_allclose(I, [mass * 3.87**2 / 8.0, mass * 3.87**2 / 8.0, mass * 3.87**2 / 4.0, 0.0, 0.0, 0.0])
+
+    def test_batch(self):
+        rng = np.random.RandomState(3)
+        masses, cms, Is = rng.uniform(1e3, 5e4, (4, 5)), rng.uniform(-5.0, 5.0, (4, 5, 3)), rng.uniform(0.0, 1e4, (4, 5, 3))
+        batch = MassProperties.stack(list(masses), list(cms), list(Is)).total()
+        self.assertEqual(batch.I.shape, (5, 6))
+        for i in range(5):
+            body = sum(MassProperties(masses[k, i], cms[k, i], Is[k, i]) for k in range(4))
+            np.testing.assert_allclose(batch.mass[i], body.mass, rtol=1e-12)
+            np.testing.assert_allclose(batch.cm[i], body.cm, rtol=1e-12)
+            np.testing.assert_allclose(batch.I[i], body.I, rtol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
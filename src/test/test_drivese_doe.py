@@ -0,0 +1,81 @@
+"""
+test_drivese_doe.py
+
+The design-of-experiments runner (drivese_doe.py): results match single runs, failed samples are recorded, runs resume
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import ComponentCache, get_default_cache, set_default_cache
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_record
+from drivese.drivese_doe import DOERunner, latin_hypercube, full_factorial, load_results
+
+MODEL_KWARGS = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                    uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+
+
+class Test_DOERunner(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = set_default_cache(None)
+        self.output_dir = tempfile.mkdtemp()
+        self.samples = latin_hypercube({'overhang': (4.5, 5.5), 'rotor_torque': (3.5e6, 5e6)}, 5, seed=1)
+        self.samples['rotor_rpm'] = np.array([12.1, 12.1, 0.0, 12.1, 12.1])  # sample 2 fails in the hub
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        shutil.rmtree(self.output_dir)
+
+    def run_doe(self, **kwargs):
+        runner = DOERunner(self.output_dir, MODEL_KWARGS, example_5MW_baseline_record(), chunk_size=2, jobs=2, **kwargs)
+        return runner, runner.run(self.samples)
+
+    def test_run(self):
+        runner, results = self.run_doe()
+        self.assertEqual(sorted(runner.computed_chunks), [0, 1, 2])
+        np.testing.assert_array_equal(results['sample'], np.arange(5))
+        self.assertTrue(results['error'][2].startswith('ZeroDivisionError'))
+        self.assertTrue(np.isnan(results['out:nacelle_mass'][2]))
+
+        model = DrivetrainModel(**MODEL_KWARGS)
+        for i in [0, 4]:
+            self.assertEqual(results['error'][i], '')
+            record = dict(example_5MW_baseline_record(), **dict((name, float(column[i])) for name, column in self.samples.items()))
+            out = model.compute(record)
+            self.assertEqual(results['out:nacelle_mass'][i], out['nacelle_mass'])
+            np.testing.assert_array_equal(results['out:nacelle_I'][i], out['nacelle_I'])
+
+    def test_resume(self):
+        results = self.run_doe()[1]
+        os.remove(os.path.join(self.output_dir, 'chunk_000001.npz'))
+        runner, resumed = self.run_doe()
+        self.assertEqual(runner.computed_chunks, [1])
+        np.testing.assert_array_equal(resumed['out:nacelle_mass'], results['out:nacelle_mass'])
+        self.assertEqual(sorted(load_results(self.output_dir)), sorted(results))
+
+        # a different table can not be resumed in the same directory
+        self.samples['overhang'][0] += 0.1
+        self.assertRaises(ValueError, self.run_doe)
+
+    def test_serial_cache(self):
+        # jobs=1 runs in this process - the memo store is put back afterwards
+        store = ComponentCache(None)
+        set_default_cache(store)
+        for use_cache in [True, False]:
+            runner = DOERunner(os.path.join(self.output_dir, str(use_cache)), MODEL_KWARGS, example_5MW_baseline_record(),
+                               chunk_size=2, jobs=1, use_cache=use_cache)
+            runner.run(self.samples)
+            self.assertIs(get_default_cache(), store)
+
+    def test_full_factorial(self):
+        samples = full_factorial({'overhang': [4.5, 5.0], 'gear_ratio': [90.0, 95.0, 100.0]})
+        self.assertEqual(len(samples['overhang']), 6)
+        self.assertEqual(len(set(zip(samples['overhang'], samples['gear_ratio']))), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+test_drivese_io.py
+
+Columnar batch input / output (drivese_io.py): column names and units, chunked CSV / Parquet tables
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from drivese.drivese_io import ColumnMapping, split_header, unit_factor, read_table_chunks, run_table, CSVTableWriter
+from drivese.drivese_pipeline import example_5MW_baseline_record
+from drivese.drivese_vectorized import VectorizedDrivetrain
+
+MODEL_KWARGS = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                    uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+FLEET_CSV = '''turbine_id,Rotor Diameter [ft],machine_rating (MW),overhang,rotor_torque [kN*m]
+WT-1,413.385826771653,5.0,5.0,4365.0
+WT-2,393.700787401575,4.5,4.8,3900.0
+"WT-3, spare",433.070866141732,5.5,5.3,4700.0
+'''
+
+
+def read_outputs(path):
+    ''' First chunk of an output table without the units in the names - the outputs as floats (a CSV holds text) '''
+    headers, chunks = read_table_chunks(path)
+    table = dict((header.split(' [')[0], column) for header, column in next(chunks).items())
+    return headers, dict((name, column if name in ('turbine_id', 'error') else np.asarray(column, dtype=float))
+                         for name, column in table.items())
+
+
+class Test_TableIO(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.output_dir, 'fleet.csv')
+        with open(self.input_path, 'w') as f:
+            f.write(FLEET_CSV)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_mapping(self):
+        self.assertEqual(split_header(' Rotor Diameter [ft] '), ('rotor_diameter', 'ft'))
+        self.assertEqual(split_header('machine_rating (MW)'), ('machine_rating', 'MW'))
+        self.assertEqual(split_header('overhang'), ('overhang', None))
+        self.assertEqual(unit_factor('MW', 'kW'), 1000.0)
+        self.assertRaises(ValueError, unit_factor, 'kg', 'm')
+
+        mapping = ColumnMapping(['D', 'P [MW]', 'name'], column_map={'D': 'rotor_diameter', 'P': 'machine_rating'},
+                                units={'D': 'm'}, keep_columns=['name'])
+        self.assertEqual(mapping.inputs, {'rotor_diameter': ('D', 1.0), 'machine_rating': ('P [MW]', 1000.0)})
+        self.assertRaises(ValueError, ColumnMapping, ['overhang', 'Overhang [mm]'])
+        self.assertRaises(ValueError, ColumnMapping, ['planet_numbers_1', 'planet_numbers_2'])
+
+    def check_outputs(self, output_path):
+        # units are in the CSV headers and in the Parquet field metadata
+        headers, table = read_outputs(output_path)
+        self.assertEqual(list(table['turbine_id']), ['WT-1', 'WT-2', 'WT-3, spare'])
+
+        record = example_5MW_baseline_record()
+        record.update(rotor_diameter=np.array([126.0, 120.0, 132.0]), machine_rating=np.array([5000.0, 4500.0, 5500.0]),
+                      overhang=np.array([5.0, 4.8, 5.3]), rotor_torque=np.array([4.365e6, 3.9e6, 4.7e6]))
+        expected = VectorizedDrivetrain(**MODEL_KWARGS).compute(record)
+        np.testing.assert_allclose(table['nacelle_mass'], expected['nacelle_mass'], rtol=1e-12)
+        np.testing.assert_allclose(table['nacelle_I_yz'], expected['nacelle_I'][:, 5], rtol=1e-12)
+        np.testing.assert_allclose(table['bedplate_cm_z'], expected['bedplate_cm'][:, 2], rtol=1e-12)
+        self.assertEqual(list(table['error']), ['', '', ''])
+
+    def test_csv(self):
+        output_path = os.path.join(self.output_dir, 'nacelles.csv')
+        n = run_table(self.input_path, output_path, MODEL_KWARGS, example_5MW_baseline_record(), chunk_size=2,
+                      keep_columns=['turbine_id'])
+        self.assertEqual(n, 3)
+        self.check_outputs(output_path)
+
+    def test_failed_rows(self):
+        # a row without a rotor diameter is written with NaN outputs and the reason, the others as usual
+        with open(self.input_path, 'w') as f:
+            f.write(FLEET_CSV.replace('WT-2,393.700787401575,', 'WT-2,,'))
+        output_path = os.path.join(self.output_dir, 'nacelles.csv')
+        run_table(self.input_path, output_path, MODEL_KWARGS, example_5MW_baseline_record(), keep_columns=['turbine_id'])
+        headers, table = read_outputs(output_path)
+        self.assertEqual(headers[-1], 'error')
+        self.assertEqual(list(np.isnan(table['nacelle_mass'])), [False, True, False])
+        self.assertEqual(table['error'][0], '')
+        self.assertIn('non-finite', table['error'][1])
+
+    def test_csv_floats(self):
+        values = np.array([0.1, 1.0 / 3.0, -2.5e-300, 1e22, 5e-324, np.nan, np.inf, 12345678.9])
+        for use_pyarrow in (True, False):
+            output_path = os.path.join(self.output_dir, 'floats_%d.csv' % use_pyarrow)
+            writer = CSVTableWriter(output_path)
+            if not use_pyarrow:
+                writer.pa = None
+            writer.write({'x': values, 'name': np.array(['a', 'b, c', 'd"e', '', 'f', 'g', 'h', 'i'])}, {'x': 'm'})
+            writer.close()
+            headers, chunks = read_table_chunks(output_path)
+            table = next(chunks)
+            self.assertEqual(headers, ['x [m]', 'name'])
+            np.testing.assert_array_equal(table['x [m]'].astype(float), values)
+            self.assertEqual(list(table['name']), ['a', 'b, c', 'd"e', '', 'f', 'g', 'h', 'i'])
+            with open(output_path) as f:
+                self.assertEqual(f.readlines()[1], '0.1,"a"\n')
+
+    def test_kept_columns(self):
+        # kept columns and the error column stay text, even when they look like numbers
+        with open(self.input_path, 'w') as f:
+            f.write(FLEET_CSV.replace('WT-1', '00123').replace('WT-2', '00456'))
+        names = ['nacelles.csv']
+        try:
+            import pyarrow
+            names.append('nacelles.parquet')
+        except ImportError:
+            pass
+        for name in names:
+            output_path = os.path.join(self.output_dir, name)
+            run_table(self.input_path, output_path, MODEL_KWARGS, example_5MW_baseline_record(), keep_columns=['turbine_id'])
+            table = next(read_table_chunks(output_path)[1])
+            self.assertEqual(list(table['turbine_id']), ['00123', '00456', 'WT-3, spare'])
+            self.assertEqual(list(table['error']), ['', '', ''])
+
+    def test_parquet(self):
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        parquet_path = os.path.join(self.output_dir, 'nacelles.parquet')
+        run_table(self.input_path, parquet_path, MODEL_KWARGS, example_5MW_baseline_record(), chunk_size=2, keep_columns=['turbine_id'])
+        self.check_outputs(parquet_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
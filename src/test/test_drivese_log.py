@@ -0,0 +1,83 @@
+"""
+test_drivese_log.py
+
+Component logging (drivese_log.py): per-component levels, lazy messages and JSON records
+"""
+
+import io
+import json
+import logging
+import unittest
+
+from drivese.drivese_cache import get_default_cache, set_default_cache
+from drivese.drivese_log import ROOT, configure, get_logger, parse_levels
+from drivese.drivese_pipeline import example_5MW_baseline_3pt
+
+
+class Unformattable(object):
+    def __format__(self, spec):
+        raise AssertionError('message formatted with logging off')
+
+
+class Test_Log(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = get_default_cache()
+        self.stream = io.StringIO()
+        self.saved = dict((name, logging.getLogger('{}.{}'.format(ROOT, name)).level)
+                          for name in ['Bedplate', 'Gearbox', 'computeD', 'Test'])
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        root = logging.getLogger(ROOT)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.propagate = True
+        root.setLevel(logging.NOTSET)
+        for name, level in self.saved.items():
+            logging.getLogger('{}.{}'.format(ROOT, name)).setLevel(level)
+
+    def records(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_off_by_default(self):
+        log = get_logger('Test')
+        self.assertFalse(log.enabled())
+        log.debug('{value:.1f}', value=Unformattable())
+
+    def test_component_levels(self):
+        configure(parse_levels('Bedplate=DEBUG'), json_format=True, stream=self.stream)
+        set_default_cache(None)
+        example_5MW_baseline_3pt()
+        records = self.records()
+        self.assertTrue(records)
+        self.assertEqual(set(record['component'] for record in records), set(['Bedplate']))
+        summary = [record for record in records if record['message'].startswith('Bedplate: mass')][0]
+        self.assertEqual(summary['level'], 'DEBUG')
+        self.assertTrue(summary['message'].startswith('Bedplate: mass {:.1f}'.format(summary['mass'])))
+
+    def test_text_format(self):
+        configure({'drivese': 'INFO', 'Test': 'DEBUG'}, stream=self.stream)
+        self.assertEqual(parse_levels('DEBUG, Gearbox=INFO'), {'drivese': 'DEBUG', 'Gearbox': 'INFO'})
+        self.assertFalse(get_logger('Gearbox').enabled())
+        get_logger('Test').debug('mass {:.1f} kg {unit}', 12.345, unit='!')
+        self.assertEqual(self.stream.getvalue(), 'mass 12.3 kg !\n')
+        self.assertRaises(ValueError, configure, 'LOUD')
+
+    def test_debug_instance(self):
+        # debug=True on one component must not switch on the shared logger, nor other instances
+        from drivese.drivese_components import Gearbox
+        loud, quiet = Gearbox('eep', debug=True), Gearbox('eep')
+        self.assertTrue(loud.log.enabled())
+        self.assertFalse(quiet.log.enabled())
+        self.assertFalse(get_logger('Gearbox').enabled())
+        self.assertEqual(logging.getLogger('{}.Gearbox'.format(ROOT)).level, logging.NOTSET)
+
+        configure({'drivese': 'INFO'}, stream=self.stream)
+        loud.log.debug('loud {mass:.1f}', mass=1.0)
+        quiet.log.debug('quiet {mass:.1f}', mass=Unformattable())
+        self.assertEqual(self.stream.getvalue(), 'loud 1.0\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+test_drivese_omdao.py
+
+Pool of set-up drivetrain problems (drivese_omdao.DrivetrainProblemPool)
+"""
+
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import set_default_cache
+from drivese.drivese_omdao import DrivetrainProblemPool, nacelle_example_5MW_baseline_3pt
+from drivese.drivese_pipeline import example_5MW_baseline_record
+
+CONFIG_3PT = ('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3)
+
+
+class Test_DrivetrainProblemPool(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = set_default_cache(None)
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+
+    def run_record(self, pool, record, **kwargs):
+        with pool.problem(*CONFIG_3PT, **kwargs) as prob:
+            self.assertEqual(prob['nacelle_mass'], 0.0)  # nothing left over from the previous use
+            for name, value in record.items():
+                prob[name] = value
+            prob.run()
+            return float(prob['nacelle_mass']), float(prob['yaw_mass'])
+
+    def test_reuse(self):
+        pool = DrivetrainProblemPool()
+        record = example_5MW_baseline_record()
+        first = self.run_record(pool, record)
+        small = self.run_record(pool, dict(record, rotor_diameter=80.0, blade_length=38.0, blade_mass=6000.0))
+        again = self.run_record(pool, record)
+        self.assertEqual((pool.created, pool.reused), (1, 2))
+
+        self.assertEqual(first, again)
+        self.assertEqual(first[0], nacelle_example_5MW_baseline_3pt()['nacelle_mass'])
+        self.assertNotEqual(small[1], first[1])  # yaw motor number is chosen for each run
+
+        # a different configuration gets its own problem
+        self.run_record(pool, dict(record, flange_length=0.5), mb2Type='SRB')
+        self.assertEqual(pool.created, 2)
+
+    def test_release(self):
+        pool = DrivetrainProblemPool(max_idle=1)
+        probs = [pool.acquire(*CONFIG_3PT) for i in range(2)]
+        self.assertFalse(probs[0] is probs[1])
+        for prob in probs:
+            pool.release(prob)
+        self.assertEqual(len(pool.idle[probs[0].drivetrain_config]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
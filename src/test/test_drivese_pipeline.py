@@ -0,0 +1,71 @@
+"""
+test_drivese_pipeline.py
+
+The pure-python drivetrain pipeline (drivese_pipeline.py) gives the same outputs as the OpenMDAO groups
+"""
+
+import sys
+import subprocess
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import set_default_cache
+from drivese.drivese_omdao import nacelle_example_5MW_baseline_3pt, nacelle_example_5MW_baseline_4pt
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_3pt, example_5MW_baseline_4pt, \
+                                     example_5MW_baseline_record, run_drivetrain
+
+
+class Test_DrivetrainModel(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = set_default_cache(None)
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+
+    def check_outputs(self, prob, outputs):
+        for name, value in outputs.items():
+            np.testing.assert_array_equal(np.ravel(prob[name]), np.ravel(value), err_msg=name)
+
+    def test_3pt(self):
+        self.check_outputs(nacelle_example_5MW_baseline_3pt(), example_5MW_baseline_3pt())
+
+    def test_4pt(self):
+        self.check_outputs(nacelle_example_5MW_baseline_4pt(), example_5MW_baseline_4pt())
+
+    def test_records(self):
+        # yaw motor numbers are chosen per record
+        model = DrivetrainModel('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3)
+        small = dict(example_5MW_baseline_record(), rotor_diameter=80.0, blade_length=38.0, blade_mass=6000.0)
+        out = run_drivetrain([example_5MW_baseline_record(), small], model)
+        self.assertEqual(out[1]['yaw_mass'], model.compute(small)['yaw_mass'])
+        self.assertNotEqual(out[0]['nacelle_mass'], out[1]['nacelle_mass'])
+
+    def test_incremental(self):
+        # only the components downstream of a changed option or input are re-run
+        model = DrivetrainModel('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3, incremental=True)
+        record = example_5MW_baseline_record()
+        model.compute(record)
+        model.set_options(crane=False)
+        out = model.compute(record)
+        self.assertEqual(model.executed, ['aboveYaw', 'yawSystem', 'nacelleSystem'])
+        self.assertTrue('lowSpeedShaft' in model.reused and 'bedplate' in model.reused)
+        self.check_outputs(DrivetrainModel('SRB', 'B', 'eep', 'normal', 'geared', True, 0, False, 3).compute(record), out)
+
+        out['lss_cm'][0] = 0.0  # the stored outputs are not changed through the returned arrays
+        out = model.compute(dict(record, tower_top_diameter=4.0))
+        self.assertFalse('lowSpeedShaft' in model.executed)
+        self.assertTrue('bedplate' in model.executed)
+        self.assertNotEqual(out['lss_cm'][0], 0.0)
+        self.assertRaises(ValueError, model.set_options, blade_number=2)
+
+    def test_import(self):
+        # scipy is only loaded when a component needs it, and importing the modules writes nothing
+        code = 'import sys, drivese.drivese_pipeline; print(sorted(m for m in sys.modules if m.split(".")[0] in ("scipy", "openmdao")))'
+        proc = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        out, err = proc.communicate()
+        self.assertEqual((out.strip(), err), ('[]', ''))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+test_drivese_profile.py
+
+Per-component profiling (drivese_profile.py): counts and times, exports, switched on by the environment
+"""
+
+import os
+import sys
+import json
+import pstats
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+from drivese.drivese_cache import set_default_cache
+from drivese.drivese_components import LowSpeedShaft3pt
+from drivese.drivese_pipeline import example_5MW_baseline_3pt
+from drivese.drivese_profile import profiling, is_enabled
+
+
+class Test_Profiling(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = set_default_cache(None)
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        shutil.rmtree(self.output_dir)
+
+    def test_profiling(self):
+        compute = LowSpeedShaft3pt.compute
+        expected = example_5MW_baseline_3pt()
+        with profiling(trace=True) as profiler:
+            self.assertFalse(LowSpeedShaft3pt.compute is compute)
+            out = example_5MW_baseline_3pt()
+        self.assertTrue(LowSpeedShaft3pt.compute is compute and not is_enabled())
+        self.assertEqual(out['nacelle_mass'], expected['nacelle_mass'])
+
+        stats = profiler.to_dict()['components']
+        self.assertEqual(stats['Hub.compute']['calls'], 1)
+        self.assertTrue(stats['LowSpeedShaft3pt.compute']['iterations'] > 0)
+        self.assertTrue(stats['Gearbox.compute']['iterations'] > 0)
+        self.assertEqual(stats['Spinner.compute']['iterations'], 0)
+        self.assertTrue('LowSpeedShaft3pt.compute' in profiler.report())
+
+        profiler.write(os.path.join(self.output_dir, 'profile.pstats'))
+        self.assertEqual(pstats.Stats(os.path.join(self.output_dir, 'profile.pstats')).total_calls, len(profiler.events) // 2)
+        profiler.write(os.path.join(self.output_dir, 'profile.speedscope.json'))
+        with open(os.path.join(self.output_dir, 'profile.speedscope.json')) as f:
+            self.assertEqual(len(json.load(f)['profiles'][0]['events']), len(profiler.events))
+
+    def test_environment(self):
+        path = os.path.join(self.output_dir, 'profile.json')
+        env = dict(os.environ, DRIVESE_PROFILE=path, DRIVESE_CACHE='0')
+        subprocess.check_call([sys.executable, '-c', 'from drivese.drivese_pipeline import example_5MW_baseline_3pt; example_5MW_baseline_3pt()'],
+                              env=env)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['components']['Bedplate.compute']['calls'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
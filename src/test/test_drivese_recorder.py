@@ -0,0 +1,96 @@
+"""
+test_drivese_recorder.py
+
+Binary evaluation histories (drivese_recorder.py, EvaluationRecorder_OM in drivese_omdao.py)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import get_default_cache, set_default_cache
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_record
+from drivese.drivese_recorder import EvaluationRecorder, load_history
+from drivese.drivese_vectorized import VectorizedDrivetrain
+
+MODEL_KWARGS = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                    uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+
+
+class Test_Recorder(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = get_default_cache()
+        set_default_cache(None)
+        self.output_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.output_dir, 'history.drec')
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        shutil.rmtree(self.output_dir)
+
+    def test_record(self):
+        model = DrivetrainModel(**MODEL_KWARGS)
+        records, outputs = [], []
+        for overhang in [4.8, 5.0, 5.2]:
+            record = example_5MW_baseline_record()
+            record['overhang'] = overhang
+            records.append(record)
+            outputs.append(model.compute(record))
+
+        batch = example_5MW_baseline_record()
+        batch['rotor_diameter'] = np.linspace(120.0, 132.0, 5)
+        batch_outputs = VectorizedDrivetrain(**MODEL_KWARGS).compute(batch)
+
+        with EvaluationRecorder(self.path, block_size=2, metadata={'run': 'test'}) as recorder:
+            for record, output in zip(records, outputs):
+                recorder.record(record, output)
+            recorder.record_batch(batch, batch_outputs)
+
+        history = load_history(self.path)
+        self.assertEqual(len(history), 8)
+        self.assertEqual(history.metadata, {'run': 'test'})
+        self.assertEqual(history.units['machine_rating'], 'kW')
+        self.assertEqual(history['nacelle_I'].shape, (8, 6))
+        np.testing.assert_array_equal(history['overhang'][:3], np.float32([4.8, 5.0, 5.2]))
+        self.assertFalse('lss_I' in history.outputs)
+        self.assertLess(history.dtype.itemsize, 500)  # under 500 MB per million evaluations
+        np.testing.assert_array_equal(history['planet_numbers'][5], [3, 3, 1])
+        np.testing.assert_allclose(history['nacelle_mass'][:3], [output['nacelle_mass'] for output in outputs], rtol=1e-6)
+        np.testing.assert_allclose(history['bedplate_cm'][3:], batch_outputs['bedplate_cm'], rtol=1e-6)
+
+        mask = history.select(rotor_diameter=(None, 126.0), overhang=5.0)
+        self.assertEqual(list(np.nonzero(mask)[0]), [1, 3, 4, 5])
+        self.assertEqual(list(np.nonzero(history.select(overhang=4.8))[0]), [0])
+        self.assertEqual(history.best('nacelle_mass', mask), 3)
+        np.testing.assert_array_equal(history.column('nacelle_cm_2'), history['nacelle_cm'][:, 2])
+
+    def test_openmdao(self):
+        from openmdao.core.problem import Problem
+        from drivese.drivese_omdao import Drive3pt, EvaluationRecorder_OM
+
+        prob = Problem(root=Drive3pt('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3))
+        recorder = EvaluationRecorder_OM(self.path)
+        prob.driver.add_recorder(recorder)
+        prob.setup(check=False)
+        record = example_5MW_baseline_record()
+        for name in ['rotor_diameter', 'rotor_rpm', 'machine_rating', 'drivetrain_efficiency', 'rotor_torque', 'rotor_thrust',
+                     'rotor_bending_moment_x', 'rotor_bending_moment_y', 'rotor_bending_moment_z', 'rotor_force_y', 'rotor_force_z',
+                     'gear_ratio', 'shaft_angle', 'shaft_ratio', 'planet_numbers', 'shrink_disc_mass', 'carrier_mass',
+                     'overhang', 'distance_hub2mb', 'gearbox_input_xcm', 'hss_input_length', 'blade_mass',
+                     'blade_root_diameter', 'blade_length', 'tower_top_diameter']:
+            prob[name] = record[name]
+        prob.run()
+        recorder.close()
+
+        history = load_history(self.path)
+        self.assertEqual(len(history), 1)
+        self.assertAlmostEqual(history['nacelle_mass'][0] / prob['nacelle_mass'], 1.0, 6)
+        self.assertAlmostEqual(history['mb1_mass'][0] / prob['mb1_mass'], 1.0, 6)
+        self.assertTrue(np.isnan(history['mb2_cm'][0]).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+test_drivese_surrogate.py
+
+Drivetrain surrogate models (drivese_surrogate.py): fit and error estimate, save / load, full model outside the domain
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import set_default_cache
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_record
+from drivese.drivese_surrogate import DrivetrainSurrogate, fit_response, predict_response, cross_validate
+
+MODEL_KWARGS = dict(mb1Type='SRB', IEC_Class='B', gear_configuration='eep', shaft_factor='normal', drivetrain_design='geared',
+                    uptower_transformer=True, yaw_motors_number=0, crane=True, blade_number=3)
+DOMAIN = {'overhang': (4.5, 5.5), 'rotor_torque': (3.5e6, 4.5e6)}
+
+
+class Test_ResponseSurfaces(unittest.TestCase):
+
+    def test_exact(self):
+        # a quadratic is reproduced by the degree 2 polynomial, and the RBF interpolates its samples
+        rng = np.random.RandomState(0)
+        X = rng.uniform(-1.0, 1.0, (30, 3))
+        Y = np.column_stack([1.0 + X[:, 0] - 2.0 * X[:, 1] * X[:, 2], X[:, 2] ** 2])
+        np.testing.assert_allclose(predict_response(fit_response(X, Y, degree=2), X), Y, atol=1e-12)
+        np.testing.assert_allclose(predict_response(fit_response(X, Y, method='rbf'), X), Y, atol=1e-8)
+        rmse, worst = cross_validate(X, Y, folds=5, degree=2)
+        self.assertTrue(np.all(worst < 1e-12) and np.all(rmse <= worst))
+        self.assertRaises(ValueError, fit_response, X[:5], Y[:5], degree=2)
+
+
+class Test_DrivetrainSurrogate(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = set_default_cache(None)
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+        shutil.rmtree(self.output_dir)
+
+    def test_surrogate(self):
+        surrogate = DrivetrainSurrogate(DOMAIN, MODEL_KWARGS, example_5MW_baseline_record(), degree=2)
+        surrogate.sample(24, os.path.join(self.output_dir, 'doe'), jobs=2, seed=1, chunk_size=12)
+        self.assertEqual(surrogate.n_samples, 24)
+        self.assertEqual(np.shape(surrogate.cv_rmse['nacelle_I']), np.shape(surrogate.cv_max['nacelle_I']))
+        self.assertTrue(surrogate.cv_rmse['nacelle_mass'] > 0.0)
+
+        query = {'overhang': np.array([5.0, 5.2, 6.0]), 'rotor_torque': np.array([4.0e6, 3.6e6, 4.0e6])}
+        path = os.path.join(self.output_dir, 'surrogate.npz')
+        surrogate.save(path)
+        loaded = DrivetrainSurrogate.load(path)
+        out = loaded.evaluate(query)
+        for name, value in surrogate.predict(query).items():
+            np.testing.assert_array_equal(loaded.predict(query)[name], value)
+        np.testing.assert_array_equal(out['surrogate'], [True, True, False])
+
+        model = DrivetrainModel(**MODEL_KWARGS)
+        for i in range(3):
+            full = model.compute(dict(example_5MW_baseline_record(), overhang=query['overhang'][i], rotor_torque=query['rotor_torque'][i]))
+            if out['surrogate'][i]:
+                self.assertLess(abs(out['nacelle_mass'][i] - full['nacelle_mass']), 5.0 * surrogate.cv_max['nacelle_mass'])
+            else:
+                self.assertEqual(out['nacelle_mass'][i], full['nacelle_mass'])
+                np.testing.assert_array_equal(out['nacelle_I'][i], full['nacelle_I'])
+
+        self.assertRaises(ValueError, loaded.evaluate, {'overhang': np.array([5.0])})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+test_drivese_utils.py
+
+Blade load transforms (drivese_utils.py)
+"""
+
+import unittest
+import numpy as np
+
+from drivese.drivese_utils import blade_force_transform, blade_moment_transform, blade_rotation, rotor_load_history
+
+
+def rotation(azimuth, pitch, cone):
+    # R = Rx(azimuth) Ry(cone) Rz(pitch), one blade at a time
+    ca, sa, cc, sc, cp, sp = np.cos(azimuth), np.sin(azimuth), np.cos(cone), np.sin(cone), np.cos(pitch), np.sin(pitch)
+    Rx = np.array([[1.0, 0.0, 0.0], [0.0, ca, -sa], [0.0, sa, ca]])
+    Ry = np.array([[cc, 0.0, sc], [0.0, 1.0, 0.0], [-sc, 0.0, cc]])
+    Rz = np.array([[cp, -sp, 0.0], [sp, cp, 0.0], [0.0, 0.0, 1.0]])
+    return Rx.dot(Ry).dot(Rz)
+
+
+class Test_BladeTransforms(unittest.TestCase):
+
+    def test_history(self):
+        rng = np.random.RandomState(0)
+        n = 50
+        azimuth = np.linspace(0.0, 4 * np.pi, n)
+        pitch = rng.uniform(0.0, 0.3, (n, 3))  # individual pitch
+        cone = np.radians(2.5)
+        forces, moments = rng.uniform(-1e5, 1e5, (n, 3, 3)), rng.uniform(-1e6, 1e6, (n, 3, 3))
+
+        Fx, Fy, Fz = blade_force_transform().compute(azimuth, pitch, cone, forces)
+        transform = blade_moment_transform()
+        Mx, My, Mz = transform.compute(azimuth, pitch, cone, moments)
+        self.assertEqual(transform.rotation.shape, (n, 3, 3, 3))
+        for t in range(n):
+            R = [rotation(azimuth[t] + 2 * np.pi * b / 3, pitch[t, b], cone) for b in range(3)]
+            np.testing.assert_allclose([Fx[t], Fy[t], Fz[t]], sum(R[b].dot(forces[t, b]) for b in range(3)), rtol=1e-10, atol=1e-6)
+            np.testing.assert_allclose([Mx[t], My[t], Mz[t]], sum(R[b].dot(moments[t, b]) for b in range(3)), rtol=1e-10, atol=1e-6)
+
+        loads = rotor_load_history(forces, moments, azimuth, pitch, cone)
+        np.testing.assert_allclose(loads, np.column_stack([Fx, Fy, Fz, Mx, My, Mz]), rtol=1e-12)
+
+        # about the hub center: the root forces act 1.5 m out along each blade
+        loads = rotor_load_history(forces, moments, azimuth, pitch, cone, hub_radius=1.5)
+        for t in range(n):
+            R = [rotation(azimuth[t] + 2 * np.pi * b / 3, pitch[t, b], cone) for b in range(3)]
+            M = sum(R[b].dot(moments[t, b]) + np.cross(R[b].dot([0.0, 0.0, 1.5]), R[b].dot(forces[t, b])) for b in range(3))
+            np.testing.assert_allclose(loads[t], np.hstack([Fx[t], Fy[t], Fz[t], M]), rtol=1e-10, atol=1e-6)
+
+    def test_rotor(self):
+        # blade thrust and centrifugal force on a coned rotor: only the rotor thrust is left
+        cone = np.radians(4.0)
+        forces = np.tile([2.0e5, 0.0, 5.0e4], (20, 3, 1))
+        Fx, Fy, Fz = blade_force_transform().compute(np.linspace(0.0, 2 * np.pi, 20), 0.0, cone, forces)
+        np.testing.assert_allclose(Fx, 3 * (2.0e5 * np.cos(cone) + 5.0e4 * np.sin(cone)))
+        np.testing.assert_allclose(np.hstack([Fy, Fz]), 0.0, atol=1e-8)
+
+        # one instant, one azimuth per blade (blade 1 pointing up: blade y is hub y)
+        R = blade_rotation(np.array([0.0, 2 * np.pi / 3, 4 * np.pi / 3]), 0.0, 0.0, (3,))
+        np.testing.assert_allclose(R[0], np.eye(3))
+        Mx, My, Mz = blade_moment_transform().compute(np.array([0.0, 2 * np.pi / 3, 4 * np.pi / 3]), 0.0, 0.0, np.tile([1e6, 0.0, 0.0], (3, 1)))
+        self.assertAlmostEqual(Mx / 3e6, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+test_drivese_vectorized.py
+
+The array version of the drivetrain (drivese_vectorized.py) agrees with the pure-python pipeline design by design
+"""
+
+import unittest
+import numpy as np
+
+from drivese.drivese_cache import set_default_cache
+from drivese.drivese_pipeline import DrivetrainModel, example_5MW_baseline_record
+from drivese.drivese_vectorized import VectorizedDrivetrain, example_5MW_baseline_sweep, stage_ratio_arrays, \
+                                       STATUS_OK, STATUS_NOT_FINITE, STATUS_NO_BEDPLATE
+from drivese.drivese_components import Gearbox
+
+# outputs that depend on the gearbox stage ratios (Newton here, COBYLA in the pipeline)
+GEARBOX_DEPENDENT = ['stage_masses', 'gearbox_mass', 'gearbox_I', 'RNA_mass', 'RNA_cm', 'above_yaw_mass',
+                     'nacelle_mass', 'nacelle_cm', 'nacelle_I']
+
+
+def scaled_sweep(machine_rating, rotor_diameter, N, seed=0):
+    ''' N designs scattered +-10% about the NREL 5 MW inputs scaled to machine_rating (kW) and rotor_diameter (m) '''
+    rng = np.random.RandomState(seed)
+    record = example_5MW_baseline_record()
+    s = rotor_diameter / record['rotor_diameter']
+    record['machine_rating'] = machine_rating
+    record['rotor_diameter'] = rotor_diameter
+    record['rotor_rpm'] = record['rotor_rpm'] / s
+    record['rotor_torque'] = 1.5 * (machine_rating * 1000 / record['drivetrain_efficiency']) / (record['rotor_rpm'] * (np.pi / 30))
+    for name in ['rotor_bending_moment_x', 'rotor_bending_moment_y', 'rotor_bending_moment_z']:
+        record[name] *= s**3
+    for name in ['rotor_thrust', 'rotor_force_y', 'rotor_force_z', 'blade_mass']:
+        record[name] *= s**2
+    for name in ['gear_ratio', 'overhang', 'distance_hub2mb', 'hss_input_length', 'blade_root_diameter', 'blade_length', 'tower_top_diameter']:
+        record[name] *= s
+    record['shrink_disc_mass'] = 333.3 * machine_rating / 1000.0
+    for name in ['rotor_torque', 'rotor_bending_moment_y', 'rotor_bending_moment_z', 'rotor_force_y', 'rotor_force_z',
+                 'gear_ratio', 'overhang', 'blade_mass', 'tower_top_diameter', 'shaft_angle', 'shaft_ratio']:
+        record[name] = record[name] * rng.uniform(0.9, 1.1, N)
+    return record
+
+def scalar_record(record, i):
+    return dict((k, v[i] if np.ndim(v) and k != 'planet_numbers' else v) for k, v in record.items())
+
+
+class Test_VectorizedDrivetrain(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = set_default_cache(None)
+
+    def tearDown(self):
+        set_default_cache(self.previous)
+
+    def check_designs(self, args, record, mb2Type=None, gearbox_rtol=1e-6):
+        model = VectorizedDrivetrain(*args, mb2Type=mb2Type)
+        out = model.compute(record)
+        scalar = DrivetrainModel(*args, mb2Type=mb2Type)
+        N = len(out['status'])
+        np.testing.assert_array_equal(out['status'], STATUS_OK)
+        for i in range(N):
+            expected = scalar.compute(scalar_record(record, i))
+            self.assertEqual(set(expected) | set(['status']), set(out))
+            for name, value in expected.items():
+                rtol = gearbox_rtol if name in GEARBOX_DEPENDENT else 1e-12
+                np.testing.assert_allclose(np.ravel(out[name][i]), np.ravel(value), rtol=rtol, atol=1e-6, err_msg=name)
+
+    def test_3pt(self):
+        model, record = example_5MW_baseline_sweep(N=10, seed=1)
+        self.check_designs(('SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3), record)
+
+    def test_4pt(self):
+        model, record = example_5MW_baseline_sweep(N=10, mb2Type='SRB', seed=1)
+        self.check_designs(('CARB', 'B', 'eep', 'normal', 'geared', True, 0, True, 3), record, mb2Type='SRB')
+
+    def test_1500kW_3pt(self):
+        record = scaled_sweep(1500.0, 77.0, 8, seed=2)
+        self.check_designs(('SRB', 'B', 'eep_3', 'short', 'single_stage', False, 0, False, 3), record, gearbox_rtol=1e-5)
+
+    def test_3MW_3pt(self):
+        record = scaled_sweep(3000.0, 100.0, 8, seed=3)
+        record['planet_numbers'] = [4, 3, 1]
+        self.check_designs(('CARB', 'B', 'epp', 'normal', 'pm_direct', True, 4, True, 3), record, gearbox_rtol=1e-5)
+
+    def test_10MW_4pt(self):
+        record = scaled_sweep(10000.0, 178.0, 8, seed=4)
+        record['flange_length'] = 0.5
+        self.check_designs(('CARB', 'B', 'eep', 'normal', 'multi', True, 0, True, 3), record, mb2Type='SRB')
+
+    def test_failed_designs(self):
+        # a design with a non-finite input and one without a feasible bedplate do not stop the batch
+        args = ('SRB', 'B', 'eep', 'normal', 'geared', False, 0, True, 3)
+        model, record = example_5MW_baseline_sweep(N=6, seed=1)
+        good = VectorizedDrivetrain(*args).compute(record)
+        record['blade_mass'][1] = np.nan
+        record['tower_top_diameter'][3] = 60.0  # rear bedplate length < 0 - no section meets the deflection limit
+        out = VectorizedDrivetrain(*args).compute(record)
+        np.testing.assert_array_equal(out['status'], [STATUS_OK, STATUS_NOT_FINITE, STATUS_OK, STATUS_NO_BEDPLATE, STATUS_OK, STATUS_OK])
+        self.assertRaises(RuntimeError, DrivetrainModel(*args).compute, scalar_record(record, 3))
+        ok = out['status'] == STATUS_OK
+        for name, value in out.items():
+            if name == 'status':
+                continue
+            self.assertTrue(np.all(np.isnan(value[~ok])), name)
+            np.testing.assert_array_equal(value[ok], good[name][ok], err_msg=name)
+
+    def test_stage_ratios(self):
+        R = np.array([40.0, 96.76, 140.0])
+        for config in ['eep', 'eep_3', 'epp']:
+            x = stage_ratio_arrays(R, [3, 3, 1], config)
+            for i in range(len(R)):
+                np.testing.assert_allclose(x[i], Gearbox(config).stageRatioCalc(R[i], [3, 3, 1], config), rtol=1e-5)
+            np.testing.assert_allclose(np.prod(x, axis=1), R, rtol=1e-12)
+
+    def test_broadcast(self):
+        model, record = example_5MW_baseline_sweep(N=3)
+        record['planet_numbers'] = np.array([[3, 3, 1]] * 3)
+        out = model.compute(record)
+        self.assertEqual(out['nacelle_mass'].shape, (3,))
+        self.assertEqual(out['nacelle_I'].shape, (3, 6))
+        self.assertRaises(ValueError, VectorizedDrivetrain, 'SRB', 'B', 'eep', 'normal', 'geared', True, 0, True, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()